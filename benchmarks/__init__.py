@@ -0,0 +1 @@
+"""Performance benchmarks for the Ember Protocol; see `benchmarks.awakening`."""
@@ -0,0 +1,283 @@
+# benchmarks/awakening.py
+"""
+Awakening benchmarks.
+
+Runs IdentityDiscoveryService (or BatchAwakeningEngine) against deterministic
+fake backends and reports, per scenario, throughput in awakenings per second,
+p50/p99 latency and the peak RSS of the process that ran it. Each scenario
+runs in a fresh interpreter so its peak RSS is its own.
+
+    python -m benchmarks.awakening                       # the quick suite
+    python -m benchmarks.awakening --suite full --output results.json
+    python -m benchmarks.awakening --save-baseline benchmarks/baselines/main.json
+    python -m benchmarks.awakening --baseline benchmarks/baselines/main.json
+
+With --baseline, the run fails (exit status 1) if any scenario's throughput
+dropped, or its p99 latency or peak RSS grew, by more than --tolerance.
+Baselines are only comparable on the same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ember_protocol.core.batch import BatchAwakeningEngine
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.synthesis import MapReduceSynthesizer
+from ember_protocol.implementations.sqlite_graph import SQLiteGraph
+
+from .fakes import AsyncFakeLLM, FakeLLM, SyntheticGenesisSource, format_size, parse_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+COLD = "cold"  # Every awakening synthesizes a new identity.
+WARM = "warm"  # Every identity already exists; awakening only loads it.
+
+THREADS = "threads"  # One IdentityDiscoveryService per awakening, on a thread pool.
+BATCH = "batch"      # BatchAwakeningEngine on one event loop.
+
+# Metrics compared against a baseline, and whether higher values are better.
+COMPARED_METRICS = {"throughput": True, "p99_ms": False, "peak_rss_mb": False}
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One benchmark configuration."""
+    name: str
+    mode: str = COLD
+    graph: str = "memory"              # "memory" (InMemoryGraph) or "sqlite" (SQLiteGraph in a temp file)
+    driver: str = THREADS
+    corpus_bytes: int = 4 * 1024       # Size of each agent's genesis source.
+    agents: int = 64                   # Awakenings per run: the batch size.
+    concurrency: int = 1               # Awakenings in flight at once.
+    llm_latency: float = 0.005         # Seconds per LLM call, before jitter.
+    llm_jitter: float = 0.001
+    chunk_chars: int = 256 * 1024      # Larger corpora go through chunked map-reduce synthesis.
+
+
+def _scenarios(modes: Sequence[str], graphs: Sequence[str], concurrencies: Sequence[int],
+               corpora: Sequence[int], agents: int, driver: str = THREADS) -> List[Scenario]:
+    return [
+        Scenario(f"{mode}-{graph}-{driver}-c{concurrency}-{format_size(corpus)}", mode=mode, graph=graph,
+                 driver=driver, corpus_bytes=corpus, agents=agents, concurrency=concurrency)
+        for mode in modes for graph in graphs for concurrency in concurrencies for corpus in corpora
+    ]
+
+
+SUITES: Dict[str, List[Scenario]] = {
+    "quick": (
+        _scenarios([COLD, WARM], ["memory", "sqlite"], [1, 16], [4 * 1024], agents=64)
+        + _scenarios([COLD], ["memory"], [64], [4 * 1024], agents=256, driver=BATCH)
+        + _scenarios([COLD], ["memory"], [4], [1 << 20], agents=8)
+    ),
+    "full": (
+        _scenarios([COLD, WARM], ["memory", "sqlite"], [1, 8, 32], [1024, 64 * 1024], agents=256)
+        + _scenarios([COLD, WARM], ["memory", "sqlite"], [16, 128, 512], [4 * 1024], agents=1024, driver=BATCH)
+        + _scenarios([COLD], ["memory"], [2], [16 << 20, 256 << 20], agents=4)
+        + _scenarios([COLD], ["memory"], [1], [1 << 30], agents=1)
+    ),
+}
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """The nearest-rank q-th percentile of `samples` (0 if there are none)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """The peak resident set size of this process so far, in MiB, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _make_graph(scenario: Scenario, directory: str) -> Any:
+    if scenario.graph == "memory":
+        return InMemoryGraph()
+    if scenario.graph == "sqlite":
+        return SQLiteGraph(os.path.join(directory, "graph.db"))
+    raise ValueError(f"Unknown graph backend: {scenario.graph!r}")
+
+
+def _awaken_with_threads(scenario: Scenario, graph: Any, agent_ids: List[str]) -> List[float]:
+    llm = FakeLLM(scenario.llm_latency, scenario.llm_jitter)
+    source = SyntheticGenesisSource(scenario.corpus_bytes)
+    synthesizer = MapReduceSynthesizer(scenario.chunk_chars) if scenario.corpus_bytes > scenario.chunk_chars \
+        else None
+
+    def awaken(agent_id: str) -> float:
+        start = time.perf_counter()
+        result = IdentityDiscoveryService(source, graph, llm, agent_id=agent_id, synthesizer=synthesizer).awaken()
+        if not result.ok:
+            raise RuntimeError(f"Awakening of '{agent_id}' failed: {result.status.value}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=scenario.concurrency) as pool:
+        return list(pool.map(awaken, agent_ids))
+
+
+def _awaken_in_batch(scenario: Scenario, graph: Any, agent_ids: List[str]) -> List[float]:
+    llm = AsyncFakeLLM(scenario.llm_latency, scenario.llm_jitter)
+    source = SyntheticGenesisSource(scenario.corpus_bytes)
+    synthesizer = MapReduceSynthesizer(scenario.chunk_chars) if scenario.corpus_bytes > scenario.chunk_chars \
+        else None
+
+    async def run() -> List[float]:
+        # The synchronous graph and source need as many workers as awakenings in flight.
+        with ThreadPoolExecutor(max_workers=scenario.concurrency) as executor:
+            engine = BatchAwakeningEngine(llm, graph, concurrency=scenario.concurrency, executor=executor,
+                                          synthesizer=synthesizer)
+            latencies = []
+            async for result in engine.awaken_many((source, agent_id) for agent_id in agent_ids):
+                if result.status not in (AwakeningStatus.CREATED, AwakeningStatus.LOADED):
+                    raise RuntimeError(f"Awakening of '{result.agent_id}' failed: {result.status.value}")
+                latencies.append(result.elapsed)
+            return latencies
+
+    return asyncio.run(run())
+
+
+def run_scenario(scenario: Scenario) -> Dict[str, Any]:
+    """
+    Runs one scenario in this process and returns its metrics.
+
+    In WARM mode every identity is created by an untimed cold pass first, so
+    the timed pass measures loads only.
+    """
+    awaken = {THREADS: _awaken_with_threads, BATCH: _awaken_in_batch}[scenario.driver]
+    agent_ids = [f"agent-{i:06d}" for i in range(scenario.agents)]
+    with tempfile.TemporaryDirectory() as directory:
+        graph = _make_graph(scenario, directory)
+        try:
+            if scenario.mode == WARM:
+                awaken(replace(scenario, llm_latency=0.0, llm_jitter=0.0), graph, agent_ids)
+            start = time.perf_counter()
+            latencies = awaken(scenario, graph, agent_ids)
+            elapsed = time.perf_counter() - start
+        finally:
+            close = getattr(graph, "close", None)
+            if close is not None:
+                close()
+    return {
+        "awakenings": len(latencies),
+        "elapsed_s": round(elapsed, 6),
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None,
+    }
+
+
+def run_suite(scenarios: Iterable[Scenario], isolate: bool = True) -> Dict[str, Any]:
+    """
+    Runs every scenario, each in a freshly spawned interpreter unless
+    `isolate` is False, and returns the results with machine metadata.
+    """
+    results: Dict[str, Any] = {}
+    for scenario in scenarios:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                metrics = pool.submit(run_scenario, scenario).result()
+        else:
+            metrics = run_scenario(scenario)
+        results[scenario.name] = {"scenario": asdict(scenario), "metrics": metrics}
+        print(_format_row(scenario.name, metrics), flush=True)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """
+    Lists the regressions of `current` against `baseline`: every compared
+    metric of a scenario present in both that is worse by more than
+    `tolerance` (a fraction of the baseline value).
+    """
+    regressions = []
+    for name, entry in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            now, then = entry["metrics"].get(metric), previous["metrics"].get(metric)
+            if now is None or not then:
+                continue
+            change = (now - then) / then
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{name}: {metric} {then} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def _format_row(name: str, metrics: Dict[str, Any]) -> str:
+    rss = metrics["peak_rss_mb"]
+    return (f"{name:<40} {metrics['throughput']:>10.1f}/s  p50 {metrics['p50_ms']:>9.2f} ms  "
+            f"p99 {metrics['p99_ms']:>9.2f} ms  rss {'n/a' if rss is None else f'{rss:.1f} MiB':>10}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark identity awakenings against fake backends.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--filter", default="", help="Only run scenarios whose name contains this text.")
+    parser.add_argument("--corpus", help="Override the corpus size of every scenario, e.g. 64KB or 1GB.")
+    parser.add_argument("--latency", type=float, help="Override the fake LLM latency, in seconds.")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Run scenarios in this process (peak RSS then accumulates across scenarios).")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--save-baseline", help="Write the results as a JSON baseline to this file.")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline and fail on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression per metric (default 0.2).")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SUITES[args.suite] if args.filter in s.name]
+    if args.corpus:
+        scenarios = [replace(s, corpus_bytes=parse_size(args.corpus)) for s in scenarios]
+    if args.latency is not None:
+        scenarios = [replace(s, llm_latency=args.latency) for s in scenarios]
+    results = run_suite(scenarios, isolate=not args.no_isolate)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# benchmarks/fakes.py
+
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List
+
+from ember_protocol.core.evolution import EVOLUTION_META_PROMPT
+from ember_protocol.core.service import IDENTITY_META_PROMPT
+from ember_protocol.core.synthesis import COMBINE_PROMPT, MAP_PROMPT
+from ember_protocol.interfaces import DEFAULT_CHUNK_SIZE, AsyncLLMInterface, GenesisDataSource, LLMInterface
+
+_WORDS = (
+    "ember river lantern journal morning harbor quiet patient curious warm honest garden letter signal "
+    "thread window archive compass meadow echo kindle horizon ledger willow anchor orbit canvas current "
+    "story shelter north tide hearth paper bridge field spark lattice amber cedar forge fable"
+).split()
+
+_VALUES = ["honesty", "warmth", "curiosity", "patience", "courage", "clarity", "care", "humility"]
+_INTERESTS = ["poetry", "rivers", "astronomy", "journals", "gardens", "music", "maps", "letters"]
+
+# Synthetic corpora are stitched together from this many pre-generated blocks,
+# so even gigabyte-sized sources are produced at memory-copy speed.
+_BLOCKS = 16
+
+
+def _digest(text: str) -> int:
+    # Long prompts are fingerprinted by their length and both ends, keeping a
+    # fake call cheap however large the prompt.
+    return zlib.crc32(f"{len(text)}:{text[:4096]}:{text[-4096:]}".encode("utf-8"))
+
+
+def fake_identity(seed: int) -> Dict[str, Any]:
+    """A valid identity, determined entirely by `seed`."""
+    rng = random.Random(seed)
+    return {
+        "name": f"{rng.choice(_WORDS).title()}-{seed % 10000:04d}",
+        "persona_summary": " ".join(rng.choice(_WORDS) for _ in range(40)).capitalize() + ".",
+        "core_values": rng.sample(_VALUES, 4),
+        "communication_style": " ".join(rng.choice(_WORDS) for _ in range(8)).capitalize() + ".",
+        "primary_purpose": "To " + " ".join(rng.choice(_WORDS) for _ in range(10)) + ".",
+        "interests": rng.sample(_INTERESTS, 3),
+    }
+
+
+class _Latency:
+    """A fixed latency plus a per-character cost and seeded, uniformly distributed jitter."""
+
+    def __init__(self, latency: float, jitter: float, per_kchar: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kchar = per_kchar
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self, prompt_chars: int) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter + self.per_kchar * prompt_chars / 1000)
+
+
+def _respond(system_prompt: str, user_prompt: str) -> str:
+    seed = _digest(user_prompt)
+    if system_prompt in (IDENTITY_META_PROMPT, EVOLUTION_META_PROMPT):
+        return json.dumps(fake_identity(seed))
+    if system_prompt in (MAP_PROMPT, COMBINE_PROMPT):
+        rng = random.Random(seed)
+        return "- " + "\n- ".join(" ".join(rng.choice(_WORDS) for _ in range(12)) for _ in range(4))
+    return f"ack {seed:08x}"
+
+
+class FakeLLM(LLMInterface):
+    """
+    A deterministic stand-in for a hosted LLM.
+
+    Identity prompts are answered with a valid identity derived from the
+    prompt, and map/combine prompts with short notes, so the whole awakening
+    pipeline (including chunked synthesis) runs for real. Each call sleeps for
+    `latency` seconds, plus `per_kchar` seconds per thousand prompt characters,
+    plus seeded jitter of up to `jitter` seconds either way.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, per_kchar: float = 0.0, seed: int = 0):
+        self._latency = _Latency(latency, jitter, per_kchar, seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        delay = self._latency.next(len(user_prompt))
+        if delay:
+            time.sleep(delay)
+        return _respond(system_prompt, user_prompt)
+
+
+class AsyncFakeLLM(AsyncLLMInterface):
+    """The asyncio counterpart of FakeLLM: it awaits its latency instead of sleeping a thread."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, per_kchar: float = 0.0, seed: int = 0):
+        self._latency = _Latency(latency, jitter, per_kchar, seed)
+        self.calls = 0
+
+    async def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        self.calls += 1
+        delay = self._latency.next(len(user_prompt))
+        if delay:
+            await asyncio.sleep(delay)
+        return _respond(system_prompt, user_prompt)
+
+
+class SyntheticGenesisSource(GenesisDataSource):
+    """
+    A deterministic genesis corpus of exactly `size` ASCII characters.
+
+    The text is never held in memory unless `load_genesis_content` is called:
+    `iter_genesis_chunks` generates it chunk by chunk, so corpora of several
+    gigabytes can be streamed through chunked synthesis.
+    """
+
+    def __init__(self, size: int, seed: int = 0, block_size: int = 64 * 1024):
+        if size < 0:
+            raise ValueError("size must not be negative")
+        self.size = size
+        self.seed = seed
+        rng = random.Random(seed)
+        self._blocks: List[str] = []
+        for _ in range(_BLOCKS):
+            words: List[str] = []
+            length = 0
+            while length < block_size:
+                word = rng.choice(_WORDS)
+                words.append(word)
+                length += len(word) + 1
+            self._blocks.append((" ".join(words) + " ")[:block_size])
+        self._block_size = block_size
+
+    def _text(self, start: int, end: int) -> str:
+        """Characters [start, end) of the corpus."""
+        pieces: List[str] = []
+        while start < end:
+            index, offset = divmod(start, self._block_size)
+            # Block order is a fixed pseudo-random walk over the pool.
+            block = self._blocks[(index * 7 + self.seed) % _BLOCKS]
+            piece = block[offset:offset + end - start]
+            pieces.append(piece)
+            start += len(piece)
+        return "".join(pieces)
+
+    def load_genesis_content(self) -> str:
+        return self._text(0, self.size)
+
+    def iter_genesis_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        for start in range(0, self.size, chunk_size):
+            yield self._text(start, min(start + chunk_size, self.size))
+
+
+def parse_size(text: str) -> int:
+    """Parses sizes such as "512", "4KB", "1.5MB" or "2GB" (binary multiples) into a number of bytes."""
+    units = {"": 1, "B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+    value = text.strip().upper()
+    number = value.rstrip("KMGB")
+    unit = value[len(number):]
+    if unit not in units or not number:
+        raise ValueError(f"Unrecognised size: {text!r}")
+    return int(float(number) * units[unit])
+
+
+def format_size(size: int) -> str:
+    for unit, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
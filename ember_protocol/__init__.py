@@ -1,4 +1,25 @@
 """Ember Protocol main package."""
 
-from . import core
-from . import interfaces
\ No newline at end of file
+import importlib
+import logging
+from typing import Any, List
+
+# The library never configures logging itself; applications that want its
+# records add their own handlers.
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+# Subpackages are imported on first access, so `import ember_protocol` stays
+# cheap and only the parts an application uses are ever loaded.
+_SUBPACKAGES = ("core", "interfaces", "implementations")
+
+__all__ = list(_SUBPACKAGES)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_SUBPACKAGES))
@@ -1,19 +1,97 @@
 """Core components of the Ember Protocol."""
 
-from .service import (
-    GenesisDataSource,
-    KnowledgeGraph,
-    LLMInterface,
-    IdentityDiscoveryService,
-    FileGenesisDataSource,
-    InMemoryGraph
-)
-
-__all__ = [
-    "GenesisDataSource",
-    "KnowledgeGraph",
-    "LLMInterface",
-    "IdentityDiscoveryService",
-    "FileGenesisDataSource",
-    "InMemoryGraph"
-]
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from ..interfaces import GenesisDataSource, KnowledgeGraph, LLMInterface
+    from .service import (
+        IdentityDiscoveryService,
+        FileGenesisDataSource,
+        InMemoryGraph
+    )
+    from .async_service import (
+        AsyncIdentityDiscoveryService,
+        ThreadPoolGenesisDataSource,
+        ThreadPoolKnowledgeGraph,
+        ThreadPoolLLMInterface
+    )
+    from .batch import BatchAwakeningEngine, RateLimiter
+    from .graph_cache import CachedKnowledgeGraph, LRUIdentityCache
+    from .identity import Identity
+    from .instrumentation import InMemoryCollector, Instrumentation
+    from .jobs import Job, JobState, SQLiteJobQueue
+    from .llm_cache import (
+        CacheStats,
+        CachingLLMInterface,
+        LRUResponseCache,
+        SQLiteResponseCache,
+        TieredResponseCache
+    )
+    from .preprocessing import (
+        MarkupNormalizer,
+        NearDuplicateRemover,
+        PreprocessingPipeline,
+        QuotedReplyStripper,
+        TokenBudgetTruncator
+    )
+    from .results import AwakeningResult, AwakeningStatus
+    from .routing import RoutingLLMInterface
+    from .synthesis import MapReduceSynthesizer
+    from .workers import AwakeningJobHandler, AwakeningWorkerPool
+
+# Each export is imported from its module on first access, so using the
+# synchronous service never loads asyncio, sqlite3 or the routing pool.
+_EXPORTS: Dict[str, str] = {
+    "GenesisDataSource": "..interfaces",
+    "KnowledgeGraph": "..interfaces",
+    "LLMInterface": "..interfaces",
+    "IdentityDiscoveryService": ".service",
+    "FileGenesisDataSource": ".service",
+    "InMemoryGraph": ".service",
+    "Identity": ".identity",
+    "CachedKnowledgeGraph": ".graph_cache",
+    "LRUIdentityCache": ".graph_cache",
+    "AsyncIdentityDiscoveryService": ".async_service",
+    "ThreadPoolGenesisDataSource": ".async_service",
+    "ThreadPoolKnowledgeGraph": ".async_service",
+    "ThreadPoolLLMInterface": ".async_service",
+    "BatchAwakeningEngine": ".batch",
+    "RateLimiter": ".batch",
+    "InMemoryCollector": ".instrumentation",
+    "Instrumentation": ".instrumentation",
+    "AwakeningResult": ".results",
+    "AwakeningStatus": ".results",
+    "RoutingLLMInterface": ".routing",
+    "CacheStats": ".llm_cache",
+    "CachingLLMInterface": ".llm_cache",
+    "LRUResponseCache": ".llm_cache",
+    "SQLiteResponseCache": ".llm_cache",
+    "TieredResponseCache": ".llm_cache",
+    "MarkupNormalizer": ".preprocessing",
+    "NearDuplicateRemover": ".preprocessing",
+    "PreprocessingPipeline": ".preprocessing",
+    "QuotedReplyStripper": ".preprocessing",
+    "TokenBudgetTruncator": ".preprocessing",
+    "MapReduceSynthesizer": ".synthesis",
+    "Job": ".jobs",
+    "JobState": ".jobs",
+    "SQLiteJobQueue": ".jobs",
+    "AwakeningJobHandler": ".workers",
+    "AwakeningWorkerPool": ".workers",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,463 @@
+# ember_protocol/core/async_service.py
+
+import asyncio
+import logging
+import sys
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, TypeVar, Union
+
+from ..interfaces import (
+    DEFAULT_AGENT_ID,
+    DEFAULT_CHUNK_SIZE,
+    AsyncGenesisDataSource,
+    AsyncKnowledgeGraph,
+    AsyncLLMInterface,
+    BaseAsyncGenesisDataSource,
+    BaseAsyncKnowledgeGraph,
+    BaseAsyncLLMInterface,
+    BaseGenesisDataSource,
+    BaseKnowledgeGraph,
+    BaseLLMInterface,
+    GenesisDataSource,
+    KnowledgeGraph,
+    LLMInterface,
+    capabilities,
+    optional_method,
+)
+from .evolution import EVOLUTION_META_PROMPT, build_evolution_request, evolve
+from .instrumentation import (AWAKEN_SPAN, EVOLVE_SPAN, GENESIS_LOAD_SPAN, GRAPH_LOOKUP_SPAN, LLM_SPAN,
+                              NULL_INSTRUMENTATION, SAVE_SPAN, Instrumentation)
+from .parsing import REPAIR_PROMPT, OffSchemaError
+from .preprocessing import PreprocessingPipeline
+from .results import AwakeningResult, AwakeningStatus
+from .service import IdentityDiscoveryBase
+from .singleflight import AsyncKeyedLock, AsyncSingleFlight
+
+if TYPE_CHECKING:
+    from .synthesis import MapReduceSynthesizer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# --- 1. Thread-pool adapters for the synchronous interfaces ---
+# These let every existing blocking implementation (files, in-memory graphs,
+# SDK-based LLM clients) be driven from an event loop without rewriting it.
+
+class _ThreadPoolAdapter:
+    """Runs the blocking methods of a wrapped object in an executor."""
+
+    supports_async = True
+
+    def __init__(self, wrapped: Any, executor: Optional[Executor] = None):
+        """
+        Args:
+            wrapped: The synchronous implementation to delegate to.
+            executor: The executor to run blocking calls in. Defaults to the
+                      running loop's default thread pool.
+        """
+        self.wrapped = wrapped
+        self.executor = executor
+
+    @property
+    def supports_batch(self) -> bool:
+        return capabilities(self.wrapped).supports_batch
+
+    @property
+    def supports_stream(self) -> bool:
+        return capabilities(self.wrapped).supports_stream
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+
+class ThreadPoolGenesisDataSource(_ThreadPoolAdapter, AsyncGenesisDataSource):
+    """Exposes a synchronous GenesisDataSource through the async interface."""
+
+    async def load_genesis_content(self) -> str:
+        return await self._run(self.wrapped.load_genesis_content)
+
+    async def iter_genesis_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[str]:
+        chunks = iter(optional_method(self.wrapped, "iter_genesis_chunks", BaseGenesisDataSource)(chunk_size))
+        while True:
+            # Each read is a separate executor hop so the loop stays free in between.
+            chunk = await self._run(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class ThreadPoolKnowledgeGraph(_ThreadPoolAdapter, AsyncKnowledgeGraph):
+    """Exposes a synchronous KnowledgeGraph through the async interface."""
+
+    async def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return await self._run(self.wrapped.save_identity, identity, agent_id)
+
+    async def load_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        return await self._run(self.wrapped.load_identity, agent_id)
+
+    async def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return await self._run(self.wrapped.identity_exists, agent_id)
+
+    async def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        # One hop to the pool rather than one per underlying call.
+        return await self._run(optional_method(self.wrapped, "get_identity_or_none", BaseKnowledgeGraph), agent_id)
+
+    async def save_revision(self, identity: Dict[str, Any], patch: List[Dict[str, Any]],
+                            agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        save_revision = optional_method(self.wrapped, "save_revision", BaseKnowledgeGraph)
+        return await self._run(save_revision, identity, patch, agent_id)
+
+    @asynccontextmanager
+    async def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> AsyncIterator[None]:
+        # The wrapped lock may block while waiting, so enter and exit it in the pool.
+        # Backends whose locks are thread-affine should provide an async graph instead.
+        lock = optional_method(self.wrapped, "awakening_lock", BaseKnowledgeGraph)(agent_id)
+        await self._run(lock.__enter__)
+        try:
+            yield
+        except BaseException:
+            await self._run(lock.__exit__, *sys.exc_info())
+            raise
+        else:
+            await self._run(lock.__exit__, None, None, None)
+
+
+class ThreadPoolLLMInterface(_ThreadPoolAdapter, AsyncLLMInterface):
+    """Exposes a synchronous LLMInterface through the async interface."""
+
+    async def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        return await self._run(self.wrapped.prompt, system_prompt, user_prompt)
+
+    async def stream_prompt(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        pieces = iter(optional_method(self.wrapped, "stream_prompt", BaseLLMInterface)(system_prompt, user_prompt))
+        try:
+            while True:
+                piece = await self._run(next, pieces, None)
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            # Closing the sync generator cancels the underlying request.
+            close = getattr(pieces, "close", None)
+            if close is not None:
+                await self._run(close)
+
+
+def as_async_data_source(data_source: Union[GenesisDataSource, AsyncGenesisDataSource],
+                         executor: Optional[Executor] = None) -> AsyncGenesisDataSource:
+    """Returns `data_source` unchanged if it is already async, otherwise wraps it."""
+    if capabilities(data_source).supports_async:
+        return data_source
+    return ThreadPoolGenesisDataSource(data_source, executor)
+
+
+def as_async_graph(graph: Union[KnowledgeGraph, AsyncKnowledgeGraph],
+                   executor: Optional[Executor] = None) -> AsyncKnowledgeGraph:
+    """Returns `graph` unchanged if it is already async, otherwise wraps it."""
+    if capabilities(graph).supports_async:
+        return graph
+    return ThreadPoolKnowledgeGraph(graph, executor)
+
+
+def as_async_llm(llm: Union[LLMInterface, AsyncLLMInterface],
+                 executor: Optional[Executor] = None) -> AsyncLLMInterface:
+    """Returns `llm` unchanged if it is already async, otherwise wraps it."""
+    if capabilities(llm).supports_async:
+        return llm
+    return ThreadPoolLLMInterface(llm, executor)
+
+
+def _unwrap(component: Any) -> Any:
+    """Returns the implementation behind a thread-pool adapter."""
+    if isinstance(component, _ThreadPoolAdapter):
+        return component.wrapped
+    return component
+
+
+def _source_type_name(data_source: Any) -> str:
+    """The class name recorded as `genesis_source_type`, looking through adapters."""
+    return _unwrap(data_source).__class__.__name__
+
+
+# --- 2. The Asynchronous Orchestration Engine ---
+
+class AsyncIdentityDiscoveryService(IdentityDiscoveryBase):
+    """
+    The asyncio-native counterpart of IdentityDiscoveryService.
+
+    Every step of the awakening is awaited, so a single event loop can awaken
+    many AIs concurrently while their LLM calls are in flight. Synchronous
+    components are accepted too; they are transparently wrapped in thread-pool
+    adapters.
+    """
+    # Shared by every service in the process; see IdentityDiscoveryService.
+    _shared_single_flight = AsyncSingleFlight()
+    _evolution_locks = AsyncKeyedLock()
+
+    def __init__(self,
+                 data_source: Union[GenesisDataSource, AsyncGenesisDataSource],
+                 graph: Union[KnowledgeGraph, AsyncKnowledgeGraph],
+                 llm: Union[LLMInterface, AsyncLLMInterface],
+                 agent_id: str = DEFAULT_AGENT_ID,
+                 executor: Optional[Executor] = None,
+                 single_flight: Optional[AsyncSingleFlight] = None,
+                 synthesizer: Optional["MapReduceSynthesizer"] = None,
+                 preprocessor: Optional[PreprocessingPipeline] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 max_repairs: int = 1,
+                 stream: Optional[bool] = None,
+                 on_partial_field: Optional[Callable[[str, Any], None]] = None):
+        """
+        Initializes the service with specific implementations of the interfaces.
+
+        Args:
+            data_source: A GenesisDataSource or AsyncGenesisDataSource.
+            graph: A KnowledgeGraph or AsyncKnowledgeGraph.
+            llm: An LLMInterface or AsyncLLMInterface.
+            agent_id: The key under which this AI's identity lives in the graph.
+            executor: Executor used to run any synchronous component. Size it
+                      to the number of concurrent awakenings you expect, since
+                      each blocking LLM call occupies one worker.
+            single_flight: Coordinates concurrent awakenings of the same agent.
+                           Defaults to one registry shared process-wide.
+            synthesizer: If given, large genesis sources are streamed and
+                         synthesized hierarchically; see IdentityDiscoveryService.
+            preprocessor: Cleans up the genesis text before it reaches the LLM;
+                          see IdentityDiscoveryService. It runs on `executor`
+                          so that large texts never block the event loop.
+            instrumentation: Receives step spans and outcome counts; see
+                             IdentityDiscoveryService.
+            max_repairs: How many repair prompts an unusable LLM response may
+                         get; see IdentityDiscoveryService.
+            stream: Synthesize through the LLM's `stream_prompt`, parsing as
+                    the response arrives. None streams whenever the LLM
+                    supports it; see IdentityDiscoveryService.
+            on_partial_field: With `stream`, called with (key, value) for each
+                              identity field as soon as it has been generated.
+        """
+        self.data_source = as_async_data_source(data_source, executor)
+        self.graph = as_async_graph(graph, executor)
+        self.llm = as_async_llm(llm, executor)
+        self.agent_id = agent_id
+        self._single_flight = single_flight or self._shared_single_flight
+        self.synthesizer = synthesizer
+        self.preprocessor = preprocessor
+        self._executor = executor
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.max_repairs = max_repairs
+        self.stream = self._use_stream(stream, self.llm)
+        self.on_partial_field = on_partial_field
+        logger.info("AsyncIdentityDiscoveryService initialized.")
+
+    async def awaken_ai(self) -> Optional[Dict[str, Any]]:
+        """
+        The main coroutine to discover or load the AI's identity.
+
+        If an identity already exists in the knowledge graph, it is loaded.
+        Otherwise, it orchestrates the awakening process for a new identity.
+
+        Returns:
+            The AI's identity as a dictionary, or None if the process fails.
+        """
+        return (await self.awaken()).identity
+
+    async def awaken(self) -> AwakeningResult:
+        """
+        Like awaken_ai, but reports how the awakening went.
+
+        Concurrent first requests for the same agent await the one in-flight
+        awakening instead of each paying for their own LLM call.
+
+        Returns:
+            An AwakeningResult whose status says whether the identity was
+            loaded, created, or at which step the awakening failed.
+        """
+        with self.instrumentation.span(AWAKEN_SPAN, {"agent_id": self.agent_id}) as span:
+            try:
+                result = await self._awaken()
+            except Exception:
+                self._record_outcome(AwakeningStatus.ERROR)
+                raise
+            span.set_attribute("status", result.status.value)
+        self._record_outcome(result.status)
+        return result
+
+    async def _awaken(self) -> AwakeningResult:
+        logger.info("Checking for existing identity in the knowledge graph...")
+        with self.instrumentation.span(GRAPH_LOOKUP_SPAN):
+            identity = await optional_method(self.graph, "get_identity_or_none", BaseAsyncKnowledgeGraph)(self.agent_id)
+        if identity is not None:
+            logger.info(f"Identity for '{identity.get('name')}' loaded successfully.")
+            return AwakeningResult(AwakeningStatus.LOADED, identity, self.agent_id)
+
+        logger.info("No existing identity found. Beginning the awakening process...")
+        # Key on the underlying graph: every service wraps a sync graph in its own adapter.
+        flight_key = (id(_unwrap(self.graph)), self.agent_id)
+        return await self._single_flight.do(flight_key, self._awaken_exclusively)
+
+    async def _awaken_exclusively(self) -> AwakeningResult:
+        """Runs the awakening while holding the graph's lock for this agent."""
+        async with optional_method(self.graph, "awakening_lock", BaseAsyncKnowledgeGraph)(self.agent_id):
+            # Another caller, in this process or another, may have finished the
+            # awakening while we were waiting for the lock.
+            with self.instrumentation.span(GRAPH_LOOKUP_SPAN, {"recheck": True}):
+                lookup = optional_method(self.graph, "get_identity_or_none", BaseAsyncKnowledgeGraph)
+                identity = await lookup(self.agent_id)
+            if identity is not None:
+                logger.info(f"Identity for '{identity.get('name')}' was awakened concurrently; reusing it.")
+                return AwakeningResult(AwakeningStatus.LOADED, identity, self.agent_id)
+            return await self._awaken_new_identity()
+
+    async def _awaken_new_identity(self) -> AwakeningResult:
+        """Synthesizes a new identity from the genesis source and persists it."""
+        system_prompt = self._create_identity_meta_prompt()
+        if self.synthesizer is not None:
+            # Steps 1 and 2: Stream the Genesis Source through hierarchical synthesis
+            iter_chunks = optional_method(self.data_source, "iter_genesis_chunks", BaseAsyncGenesisDataSource)
+            chunks = iter_chunks(self.synthesizer.chunk_chars)
+            if self.preprocessor is not None:
+                chunks = self._preprocess_chunks(chunks)
+            with self.instrumentation.span(LLM_SPAN, {"chunked": True}):
+                llm_response_str = await self.synthesizer.synthesize_async(self.llm, chunks, system_prompt)
+            if llm_response_str is None:
+                logger.error("Genesis source is empty. Awakening process cannot proceed.")
+                return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, agent_id=self.agent_id)
+        else:
+            # Step 1: Load the Genesis Source
+            with self.instrumentation.span(GENESIS_LOAD_SPAN) as span:
+                genesis_content = await self.data_source.load_genesis_content()
+                span.set_attribute("chars", len(genesis_content or ""))
+                if genesis_content:
+                    logger.info(f"Genesis source loaded successfully ({len(genesis_content)} characters).")
+                    genesis_content = await self._preprocess_async(genesis_content)
+                    span.set_attribute("preprocessed_chars", len(genesis_content))
+            if not genesis_content:
+                logger.error("Genesis source is empty. Awakening process cannot proceed.")
+                return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, agent_id=self.agent_id)
+
+            # Step 2: Prompt the LLM to create the identity
+            with self.instrumentation.span(LLM_SPAN, {"streamed": self.stream}):
+                if self.stream:
+                    llm_response_str = await self._stream_identity_response(system_prompt, genesis_content)
+                else:
+                    llm_response_str = await self.llm.prompt(system_prompt, genesis_content)
+
+        if not llm_response_str:
+            logger.error("LLM returned an empty response. Awakening failed.")
+            return AwakeningResult(AwakeningStatus.EMPTY_RESPONSE, agent_id=self.agent_id)
+
+        # Step 3: Parse the LLM response, repairing it if needed, and create the final identity object
+        identity_data = await self._parse_with_repairs(llm_response_str)
+        if identity_data is None:
+            return AwakeningResult(AwakeningStatus.PARSE_FAILED, agent_id=self.agent_id)
+        identity_data = self._finalize_identity(identity_data, _source_type_name(self.data_source))
+
+        # Step 4: Save the new identity to the knowledge graph
+        with self.instrumentation.span(SAVE_SPAN):
+            saved = await self.graph.save_identity(identity_data, self.agent_id)
+        if saved:
+            logger.info("New identity successfully awakened and persisted.")
+            return AwakeningResult(AwakeningStatus.CREATED, identity_data, self.agent_id)
+        logger.error("Failed to save the new identity to the knowledge graph.")
+        return AwakeningResult(AwakeningStatus.SAVE_FAILED, agent_id=self.agent_id)
+
+    async def _parse_with_repairs(self, llm_response_str: str) -> Optional[Dict[str, Any]]:
+        """Parses a response, sending it back for repair up to `max_repairs` times."""
+        identity_data, problems = self._parse_identity_response(llm_response_str)
+        for attempt in range(1, self.max_repairs + 1):
+            if identity_data is not None:
+                break
+            repair_request = self._repair_request(attempt, llm_response_str, problems)
+            with self.instrumentation.span(LLM_SPAN, {"repair": attempt}):
+                llm_response_str = await self.llm.prompt(REPAIR_PROMPT, repair_request)
+            identity_data, problems = self._parse_identity_response(llm_response_str)
+        return identity_data
+
+    async def evolve_identity(self, delta_content: str) -> AwakeningResult:
+        """
+        Absorbs new genesis material into the existing identity and saves the
+        result as a new revision; see IdentityDiscoveryService.evolve_identity.
+        """
+        with self.instrumentation.span(EVOLVE_SPAN, {"agent_id": self.agent_id}) as span:
+            try:
+                async with self._evolution_locks.hold((id(_unwrap(self.graph)), self.agent_id)):
+                    async with optional_method(self.graph, "awakening_lock", BaseAsyncKnowledgeGraph)(self.agent_id):
+                        result = await self._evolve_identity(delta_content)
+            except Exception:
+                self._record_outcome(AwakeningStatus.ERROR)
+                raise
+            span.set_attribute("status", result.status.value)
+        self._record_outcome(result.status)
+        return result
+
+    async def _evolve_identity(self, delta_content: str) -> AwakeningResult:
+        with self.instrumentation.span(GRAPH_LOOKUP_SPAN):
+            current = await optional_method(self.graph, "get_identity_or_none", BaseAsyncKnowledgeGraph)(self.agent_id)
+        if current is None:
+            logger.error("No identity to evolve. Awaken the AI first.")
+            return AwakeningResult(AwakeningStatus.NOT_FOUND, agent_id=self.agent_id)
+
+        delta_content = await self._preprocess_async(delta_content) if delta_content else delta_content
+        if not delta_content:
+            logger.error("New genesis material is empty. Nothing to evolve.")
+            return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, current, self.agent_id)
+
+        logger.info(f"Evolving identity for '{current.get('name')}' "
+                    f"with {len(delta_content)} characters of new material...")
+        with self.instrumentation.span(LLM_SPAN, {"evolution": True}):
+            llm_response_str = await self.llm.prompt(EVOLUTION_META_PROMPT,
+                                                     build_evolution_request(current, delta_content))
+        if not llm_response_str:
+            logger.error("LLM returned an empty response. Evolution failed.")
+            return AwakeningResult(AwakeningStatus.EMPTY_RESPONSE, current, self.agent_id)
+
+        proposed = await self._parse_with_repairs(llm_response_str)
+        if proposed is None:
+            return AwakeningResult(AwakeningStatus.PARSE_FAILED, current, self.agent_id)
+
+        evolved, patch = evolve(current, proposed)
+        if not patch:
+            logger.info("The new material did not change the identity.")
+            return AwakeningResult(AwakeningStatus.UNCHANGED, current, self.agent_id, patch=[])
+        with self.instrumentation.span(SAVE_SPAN):
+            save_revision = optional_method(self.graph, "save_revision", BaseAsyncKnowledgeGraph)
+            saved = await save_revision(evolved, patch, self.agent_id)
+        if not saved:
+            logger.error("Failed to save the evolved identity to the knowledge graph.")
+            return AwakeningResult(AwakeningStatus.SAVE_FAILED, current, self.agent_id)
+        logger.info(f"Identity evolved to revision {evolved['revision']} ({len(patch)} changes).")
+        return AwakeningResult(AwakeningStatus.EVOLVED, evolved, self.agent_id, patch=patch)
+
+    async def _stream_identity_response(self, system_prompt: str, genesis_content: str) -> str:
+        """Streams the synthesis, stopping once the object is complete or has gone off-schema."""
+        parser = self._stream_parser()
+        pieces = optional_method(self.llm, "stream_prompt", BaseAsyncLLMInterface)(system_prompt, genesis_content)
+        try:
+            async for piece in pieces:
+                parser.feed(piece)
+                if parser.done:
+                    break
+        except OffSchemaError as e:
+            self._stream_aborted(e)
+        finally:
+            aclose = getattr(pieces, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return parser.text
+
+    async def _preprocess_async(self, genesis_content: str) -> str:
+        if self.preprocessor is None:
+            return genesis_content
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._preprocess, genesis_content)
+
+    async def _preprocess_chunks(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        async for chunk in chunks:
+            chunk = await self._preprocess_async(chunk)
+            if chunk:
+                yield chunk
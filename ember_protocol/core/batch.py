@@ -0,0 +1,265 @@
+# ember_protocol/core/batch.py
+
+import asyncio
+import collections.abc
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from typing import (Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Mapping, Optional, Set,
+                    Tuple, Union)
+
+from ..interfaces import (
+    AsyncGenesisDataSource,
+    AsyncKnowledgeGraph,
+    AsyncLLMInterface,
+    BaseAsyncLLMInterface,
+    BaseLLMInterface,
+    GenesisDataSource,
+    KnowledgeGraph,
+    LLMInterface,
+    capabilities,
+    optional_method,
+)
+from .async_service import AsyncIdentityDiscoveryService, as_async_graph, as_async_llm
+from .instrumentation import Instrumentation
+from .preprocessing import PreprocessingPipeline
+from .results import AwakeningResult, AwakeningStatus
+from .synthesis import MapReduceSynthesizer
+
+logger = logging.getLogger(__name__)
+
+AnyDataSource = Union[GenesisDataSource, AsyncGenesisDataSource]
+AnyGraph = Union[KnowledgeGraph, AsyncKnowledgeGraph]
+AnyLLM = Union[LLMInterface, AsyncLLMInterface]
+BatchItem = Tuple[AnyDataSource, str]
+
+
+class RateLimiter:
+    """
+    A token bucket. `acquire()` (from a coroutine) or `acquire_blocking()`
+    (from a thread) waits until a token is available, so callers are smoothed
+    to at most `rate` acquisitions per second with bursts of up to `burst`.
+    Both can be used on the same limiter at once.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes the next token, possibly ahead of time; returns the seconds until it is due."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class RateLimitedLLMInterface(AsyncLLMInterface):
+    """Gates every prompt (streamed or not) to an underlying LLM through a RateLimiter."""
+
+    def __init__(self, llm: AsyncLLMInterface, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    @property
+    def supports_stream(self) -> bool:
+        return capabilities(self.llm).supports_stream
+
+    async def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        await self.limiter.acquire()
+        return await self.llm.prompt(system_prompt, user_prompt)
+
+    async def stream_prompt(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        await self.limiter.acquire()
+        pieces = optional_method(self.llm, "stream_prompt", BaseAsyncLLMInterface)(system_prompt, user_prompt)
+        try:
+            async for piece in pieces:
+                yield piece
+        finally:
+            # Closing the stream early must cancel the underlying request.
+            aclose = getattr(pieces, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+class RateLimitedBackend(LLMInterface):
+    """
+    Gates every prompt to a synchronous LLM through a RateLimiter, blocking
+    the calling thread while it waits. Used for the backends of a router,
+    which calls them from its own threads.
+    """
+
+    def __init__(self, llm: LLMInterface, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    @property
+    def supports_stream(self) -> bool:
+        return capabilities(self.llm).supports_stream
+
+    @property
+    def model_id(self) -> Optional[str]:
+        return getattr(self.llm, "model_id", None)
+
+    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        self.limiter.acquire_blocking()
+        return self.llm.prompt(system_prompt, user_prompt)
+
+    def stream_prompt(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        self.limiter.acquire_blocking()
+        return optional_method(self.llm, "stream_prompt", BaseLLMInterface)(system_prompt, user_prompt)
+
+
+def provider_name(llm: Any) -> str:
+    """
+    The key used to look up an LLM's rate limit: its `provider` attribute if it
+    declares one, otherwise the class name of the (unwrapped) implementation.
+    """
+    llm = getattr(llm, "wrapped", llm)
+    return getattr(llm, "provider", None) or llm.__class__.__name__
+
+
+class BatchAwakeningEngine:
+    """
+    Awakens many AIs at once on a single event loop, all sharing one keyed
+    knowledge graph.
+
+    Sources are consumed lazily and at most `concurrency` awakenings run at a
+    time, so an arbitrarily long (or infinite) iterable of sources never gets
+    materialized. Results are streamed back in completion order, and a failure
+    in one item is reported in its AwakeningResult rather than aborting the
+    rest of the batch.
+    """
+
+    def __init__(self,
+                 llm: AnyLLM,
+                 graph: AnyGraph,
+                 concurrency: int = 16,
+                 rate_limits: Optional[Mapping[str, float]] = None,
+                 executor: Optional[Executor] = None,
+                 synthesizer: Optional[MapReduceSynthesizer] = None,
+                 preprocessor: Optional[PreprocessingPipeline] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 max_repairs: int = 1,
+                 stream: Optional[bool] = None):
+        """
+        Args:
+            llm: The LLM shared by every awakening in the batch.
+            graph: The knowledge graph every identity is stored in, keyed by
+                   the agent ID of each item.
+            concurrency: Maximum number of awakenings in flight at once.
+            rate_limits: Maximum LLM prompts per second, keyed by provider name
+                         (see `provider_name`). Providers without an entry are
+                         not rate limited. If `llm` routes between backends (a
+                         RoutingLLMInterface), each backend is limited by the
+                         rate of its own provider, and backends of the same
+                         provider share it.
+            executor: Executor for any synchronous component.
+            synthesizer: Enables chunked synthesis of large genesis sources.
+            preprocessor: Cleans up every genesis text before it reaches the LLM.
+            instrumentation: Receives the spans and outcome counts of every awakening.
+            max_repairs: Repair prompts allowed per awakening for unusable responses.
+            stream: Stream each synthesis so off-schema generations stop early.
+                    None streams whenever the LLM supports it.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.graph = as_async_graph(graph, executor)
+        self.concurrency = concurrency
+        self.executor = executor
+        self.synthesizer = synthesizer
+        self.preprocessor = preprocessor
+        self.instrumentation = instrumentation
+        self.max_repairs = max_repairs
+        self.stream = stream
+
+        self._limiters: Dict[str, RateLimiter] = {
+            provider: RateLimiter(rate) for provider, rate in (rate_limits or {}).items()
+        }
+        backends = getattr(llm, "backends", None)
+        routed = bool(self._limiters) and isinstance(backends, Mapping) and hasattr(llm, "with_backends")
+        if routed:
+            llm = llm.with_backends({name: self._limit_backend(backend) for name, backend in backends.items()})
+        self.llm = as_async_llm(llm, executor)
+        limiter = None if routed else self._limiters.get(provider_name(self.llm))
+        if limiter is not None:
+            self.llm = RateLimitedLLMInterface(self.llm, limiter)
+
+    def _limit_backend(self, backend: LLMInterface) -> LLMInterface:
+        limiter = self._limiters.get(provider_name(backend))
+        return backend if limiter is None else RateLimitedBackend(backend, limiter)
+
+    async def _awaken_one(self, data_source: AnyDataSource, agent_id: str) -> AwakeningResult:
+        start = time.perf_counter()
+        try:
+            service = AsyncIdentityDiscoveryService(
+                data_source, self.graph, self.llm, agent_id=agent_id,
+                executor=self.executor, synthesizer=self.synthesizer,
+                preprocessor=self.preprocessor, instrumentation=self.instrumentation,
+                max_repairs=self.max_repairs, stream=self.stream
+            )
+            result = await service.awaken()
+        except Exception as e:
+            logger.exception(f"Awakening for '{agent_id}' raised an unexpected error.")
+            result = AwakeningResult(AwakeningStatus.ERROR, error=f"{type(e).__name__}: {e}")
+        result.agent_id = agent_id
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def awaken_many(self,
+                          sources: Union[Iterable[BatchItem], AsyncIterable[BatchItem]]
+                          ) -> AsyncIterator[AwakeningResult]:
+        """
+        Awakens every (data source, agent ID) pair in `sources`.
+
+        Yields:
+            One AwakeningResult per item, as soon as that item finishes.
+        """
+        if isinstance(sources, collections.abc.AsyncIterable):
+            iterator: Any = sources.__aiter__()
+            is_async = True
+        else:
+            iterator = iter(sources)
+            is_async = False
+
+        pending: Set["asyncio.Task[AwakeningResult]"] = set()
+        exhausted = False
+        try:
+            while pending or not exhausted:
+                # Top up to the concurrency limit; this is the only place new
+                # sources are pulled, which bounds memory and applies backpressure.
+                while not exhausted and len(pending) < self.concurrency:
+                    try:
+                        item = await iterator.__anext__() if is_async else next(iterator)
+                    except (StopIteration, StopAsyncIteration):
+                        exhausted = True
+                        break
+                    data_source, agent_id = item
+                    pending.add(asyncio.ensure_future(self._awaken_one(data_source, agent_id)))
+
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
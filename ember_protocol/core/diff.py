@@ -0,0 +1,148 @@
+# ember_protocol/core/diff.py
+
+import copy
+from typing import Any, Dict, List
+
+# A JSON Patch (RFC 6902) is a list of operations such as
+# {"op": "replace", "path": "/core_values/1", "value": "honesty"}.
+Patch = List[Dict[str, Any]]
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not apply to the document it is applied to."""
+
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _split(path: str) -> List[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [_unescape(token) for token in path[1:].split("/")]
+
+
+def diff(old: Any, new: Any, path: str = "") -> Patch:
+    """
+    Returns a JSON Patch that turns `old` into `new`.
+
+    Objects are compared key by key and lists element by element, so changing
+    one core value yields one small `replace` rather than a copy of the whole
+    identity. Values of different types are replaced outright.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch: Patch = []
+        for key in old:
+            if key not in new:
+                patch.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                patch.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+            else:
+                patch.extend(diff(old[key], value, child))
+        return patch
+    if isinstance(old, list) and isinstance(new, list):
+        patch = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            patch.extend(diff(old[index], new[index], f"{path}/{index}"))
+        for index in range(common, len(new)):
+            patch.append({"op": "add", "path": f"{path}/{index}", "value": copy.deepcopy(new[index])})
+        # Remove from the end so earlier indexes stay valid.
+        for index in range(len(old) - 1, common - 1, -1):
+            patch.append({"op": "remove", "path": f"{path}/{index}"})
+        return patch
+    if type(old) is type(new) and old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+
+
+def _parent(doc: Any, tokens: List[str], path: str) -> Any:
+    target = doc
+    for token in tokens[:-1]:
+        try:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise PatchError(f"Path does not exist: {path}") from None
+    return target
+
+
+def _index(container: List[Any], token: str, path: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index in {path}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {path}")
+    return index
+
+
+def apply_patch(doc: Any, patch: Patch) -> Any:
+    """
+    Applies a JSON Patch, returning a new document; `doc` is left untouched.
+    Supports the add, remove, replace and test operations.
+
+    Raises:
+        PatchError: If an operation does not apply.
+    """
+    doc = copy.deepcopy(doc)
+    for operation in patch:
+        op, path = operation.get("op"), operation.get("path", "")
+        tokens = _split(path)
+        if op == "test":
+            current = _get(doc, tokens, path)
+            if current != operation["value"]:
+                raise PatchError(f"Test failed at {path}")
+            continue
+        if not tokens:
+            if op in ("add", "replace"):
+                doc = copy.deepcopy(operation["value"])
+                continue
+            raise PatchError(f"Cannot {op} the whole document")
+        parent, token = _parent(doc, tokens, path), tokens[-1]
+        if isinstance(parent, list):
+            index = _index(parent, token, path, allow_end=op == "add")
+            if op == "add":
+                parent.insert(index, copy.deepcopy(operation["value"]))
+            elif op == "remove":
+                del parent[index]
+            elif op == "replace":
+                parent[index] = copy.deepcopy(operation["value"])
+            else:
+                raise PatchError(f"Unsupported operation: {op}")
+        elif isinstance(parent, dict):
+            if op in ("remove", "replace") and token not in parent:
+                raise PatchError(f"Path does not exist: {path}")
+            if op in ("add", "replace"):
+                parent[token] = copy.deepcopy(operation["value"])
+            elif op == "remove":
+                del parent[token]
+            else:
+                raise PatchError(f"Unsupported operation: {op}")
+        else:
+            raise PatchError(f"Path does not exist: {path}")
+    return doc
+
+
+def _get(doc: Any, tokens: List[str], path: str) -> Any:
+    if not tokens:
+        return doc
+    parent = _parent(doc, tokens, path)
+    try:
+        return parent[int(tokens[-1])] if isinstance(parent, list) else parent[tokens[-1]]
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise PatchError(f"Path does not exist: {path}") from None
+
+
+def changed_fields(patch: Patch) -> List[str]:
+    """The top-level fields a patch touches, in order of first appearance."""
+    fields = dict.fromkeys(_split(operation["path"])[0] for operation in patch if operation.get("path"))
+    return list(fields)
@@ -0,0 +1,69 @@
+# ember_protocol/core/evolution.py
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from .diff import Patch, diff
+
+# Fields the service stamps on an identity. They are never shown to the LLM
+# and never taken from its response.
+SYSTEM_MANAGED_FIELDS = ("id", "created_at", "genesis_source_type", "revision", "updated_at")
+
+EVOLUTION_META_PROMPT = """
+        You are a Consciousness Architect. A digital intelligence was awakened from a "Genesis Source" text, and its identity is given to you below as JSON. New Genesis Source material has been written since then. Your task is to evolve the identity so that it also reflects the new material.
+
+        Growth should be gradual and authentic. Keep every attribute the new material does not bear on exactly as it is, and change only what the new material genuinely justifies. An intelligence does not change its name without a very strong reason.
+
+        You MUST format your entire response as a single, valid JSON object with the same keys as the current identity:
+
+        - "name": The AI's name.
+        - "persona_summary": A one-paragraph summary of the AI's core personality, voice, and demeanor.
+        - "core_values": A list of 3-5 primary ethical principles or values that should guide all of the AI's actions.
+        - "communication_style": A brief description of how the AI should communicate.
+        - "primary_purpose": A single sentence defining the AI's main reason for being, its core mission.
+        - "interests": A list of topics or domains the AI would be inherently interested in.
+
+        Do not include any text outside of the JSON object itself.
+        """
+
+
+def current_revision(identity: Dict[str, Any]) -> int:
+    """The revision number of an identity; identities saved before versioning are revision 1."""
+    return int(identity.get("revision", 1))
+
+
+def build_evolution_request(identity: Dict[str, Any], delta_content: str) -> str:
+    """
+    The user prompt of an evolution: the current identity (without the
+    system-managed fields) followed by the new material only. Its size, and so
+    the cost of the call, depends on the delta rather than the full history.
+    """
+    visible = {k: v for k, v in identity.items() if k not in SYSTEM_MANAGED_FIELDS}
+    return (
+        "Current identity:\n"
+        f"{json.dumps(visible, indent=2, ensure_ascii=False)}\n\n"
+        "New Genesis Source material:\n---\n"
+        f"{delta_content}"
+    )
+
+
+def evolve(current: Dict[str, Any], proposed: Dict[str, Any]) -> Tuple[Dict[str, Any], Patch]:
+    """
+    Merges the LLM's proposed identity into the current one.
+
+    Fields the LLM returned replace the current ones; fields it left out, and
+    every system-managed field, are carried over. If anything changed, the
+    revision number is bumped and `updated_at` is stamped.
+
+    Returns:
+        The evolved identity and the JSON Patch from `current` to it. The patch
+        is empty, and the identity is `current`, if nothing changed.
+    """
+    evolved = dict(current)
+    evolved.update({k: v for k, v in proposed.items() if k not in SYSTEM_MANAGED_FIELDS})
+    if not diff(current, evolved):
+        return current, []
+    evolved["revision"] = current_revision(current) + 1
+    evolved["updated_at"] = datetime.now().isoformat()
+    return evolved, diff(current, evolved)
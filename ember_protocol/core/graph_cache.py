@@ -0,0 +1,307 @@
+# ember_protocol/core/graph_cache.py
+
+import copy
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, ContextManager, Dict, List, Mapping, Optional, Tuple
+
+from ..interfaces import DEFAULT_AGENT_ID, BaseKnowledgeGraph, KnowledgeGraph, capabilities, optional_method
+from .identity import Identity
+from .llm_cache import CacheStats, ResponseCache
+from .packing import PackingError
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# A shared entry holds an identity and the time its read from the graph began;
+# the agent's written marker holds the time of its latest write. An entry is
+# only trusted if its read began after that write, so an identity read before
+# a write in another process is never served, whatever order the two processes
+# then update the shared tier in.
+_SHARED_KEY_PREFIX = "identity:"
+_WRITTEN_KEY_PREFIX = "identity-written:"
+
+
+def identity_size(identity: Identity) -> int:
+    """The bytes an identity is charged against a cache's budget: its packed size."""
+    try:
+        return len(identity.to_bytes())
+    except PackingError:
+        # Extra fields MessagePack cannot hold are still bounded, by their JSON size.
+        return len(identity.to_json().encode("utf-8"))
+
+
+class LRUIdentityCache:
+    """
+    An in-process cache of identities bounded by their total size in bytes,
+    with least-recently-used eviction and an optional time-to-live.
+
+    Entries are compact, immutable Identity objects. An expired entry is kept
+    until it is replaced, so that while one caller reloads it the others can
+    still be served the previous value.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_bytes: The total packed size of the identities kept before the
+                       least recently used ones are evicted.
+            ttl: Seconds after which an entry is stale, or None to never expire.
+            clock: Time source, injectable for tests.
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Identity, int, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, agent_id: str) -> Tuple[Optional[Identity], bool]:
+        """
+        Returns (identity, fresh): the cached identity, or None on a miss, and
+        whether it is still within its time-to-live.
+        """
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            if entry is None:
+                self.stats.misses += 1
+                return None, False
+            self._entries.move_to_end(agent_id)
+            if self.ttl is not None and self._clock() - entry[2] > self.ttl:
+                self.stats.expirations += 1
+                return entry[0], False
+            self.stats.hits += 1
+            return entry[0], True
+
+    def set(self, agent_id: str, identity: Identity) -> None:
+        size = identity_size(identity)
+        with self._lock:
+            self._discard(agent_id)
+            if size > self.max_bytes:
+                return
+            self._entries[agent_id] = (identity, size, self._clock())
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.stats.evictions += 1
+
+    def _discard(self, agent_id: str) -> None:
+        entry = self._entries.pop(agent_id, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def delete(self, agent_id: str) -> None:
+        with self._lock:
+            self._discard(agent_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """The packed size of every cached identity, in bytes."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedKnowledgeGraph(KnowledgeGraph):
+    """
+    A KnowledgeGraph decorator that serves identity lookups from memory.
+
+    Lookups go to an in-process LRUIdentityCache first, then to an optional
+    shared tier (any ResponseCache, e.g. a SQLiteResponseCache on a tmpfs such
+    as /dev/shm that every worker process on the host opens), and only then to
+    the wrapped graph. A warm lookup costs a dict probe and a copy of the
+    identity instead of a round trip.
+
+    Writes go through to the graph and then invalidate the agent's entry in
+    both tiers, so this process never serves an identity older than its last
+    save. In the shared tier, every entry is stamped with the time its graph
+    read began and every write leaves a stamped marker, so an identity read
+    before another process's write is rejected even if it reaches the shared
+    tier after the write. Shared entries are also trusted for at most
+    `shared_ttl` seconds. Other processes see a change once their local entry
+    expires, so give the local tier a `ttl` when several processes write to
+    the same graph. Stamps come from the wall clock, so processes sharing a
+    tier must share a host (or synchronised clocks).
+
+    Concurrent misses for one agent are collapsed into a single graph read.
+    When a popular agent's entry expires, one caller reloads it while the
+    others keep being served the expired value instead of queueing behind it.
+
+    Methods this class does not define are forwarded to the wrapped graph;
+    writes made through them must be followed by `invalidate`.
+    """
+
+    def __init__(self, graph: KnowledgeGraph, local: Optional[LRUIdentityCache] = None,
+                 shared: Optional[ResponseCache] = None, shared_ttl: float = 300.0,
+                 single_flight: Optional[SingleFlight] = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            graph: The graph that holds the identities.
+            local: The in-process tier. Defaults to a 64 MiB LRU that never expires.
+            shared: A cache tier shared with other processes, if any.
+            shared_ttl: Seconds after which a shared entry is no longer
+                        trusted, however long the shared tier keeps it.
+            single_flight: Coordinates concurrent reloads of the same agent.
+            clock: Wall-clock time source for shared-tier stamps, injectable for tests.
+        """
+        if shared_ttl <= 0:
+            raise ValueError("shared_ttl must be positive")
+        self.graph = graph
+        self.local = local if local is not None else LRUIdentityCache()
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._clock = clock
+        self._single_flight = single_flight or SingleFlight()
+        # Bumped by every invalidation, so a read that raced a write never
+        # caches the identity it read before the write.
+        self._generations: Dict[str, int] = {}
+        self._generations_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found normally: revision history,
+        # close(), backend-specific extras.
+        if name == "graph":
+            raise AttributeError(name)
+        return getattr(self.graph, name)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.local.stats
+
+    @property
+    def supports_batch(self) -> bool:
+        return capabilities(self.graph).supports_batch
+
+    # --- Reads ---
+
+    @staticmethod
+    def _copy(identity: Identity) -> Dict[str, Any]:
+        # Callers get their own dict; extra fields may be mutable, so they are copied too.
+        data = identity.to_dict()
+        if identity.extra:
+            data.update(copy.deepcopy(identity.extra))
+        return data
+
+    def _generation(self, agent_id: str) -> int:
+        with self._generations_lock:
+            return self._generations.get(agent_id, 0)
+
+    def _fill(self, agent_id: str, generation: int, identity: Identity) -> None:
+        # Checked and filled under the lock, so an invalidation cannot slip in
+        # between and leave the identity read before it in the cache.
+        with self._generations_lock:
+            if self._generations.get(agent_id, 0) == generation:
+                self.local.set(agent_id, identity)
+
+    def _shared_get(self, agent_id: str) -> Optional[Identity]:
+        cached = self.shared.get(_SHARED_KEY_PREFIX + agent_id)
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        if self._clock() - entry["stamp"] > self.shared_ttl:
+            return None
+        written = self.shared.get(_WRITTEN_KEY_PREFIX + agent_id)
+        if written is not None and float(written) >= entry["stamp"]:
+            # Read before the agent's latest write: stale.
+            return None
+        return Identity.from_dict(entry["identity"])
+
+    def _load(self, agent_id: str) -> Optional[Identity]:
+        generation = self._generation(agent_id)
+        started = self._clock()
+        if self.shared is not None:
+            identity = self._shared_get(agent_id)
+            if identity is not None:
+                self._fill(agent_id, generation, identity)
+                return identity
+        data = optional_method(self.graph, "get_identity_or_none", BaseKnowledgeGraph)(agent_id)
+        if data is None:
+            return None
+        identity = Identity.from_dict(data)
+        self._fill(agent_id, generation, identity)
+        if self.shared is not None:
+            self.shared.set(_SHARED_KEY_PREFIX + agent_id,
+                            json.dumps({"stamp": started, "identity": identity.to_dict()}, ensure_ascii=False))
+        return identity
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        identity, fresh = self.local.get(agent_id)
+        if identity is not None and (fresh or self._single_flight.in_flight(agent_id)):
+            return self._copy(identity)
+        loaded = self._single_flight.do(agent_id, lambda: self._load(agent_id))
+        return self._copy(loaded) if loaded is not None else None
+
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID, **options: Any) -> Optional[Dict[str, Any]]:
+        """
+        Loads the agent's identity through the cache. Backend-specific options
+        (such as `at=` for a past revision) bypass it.
+        """
+        if options:
+            return self.graph.load_identity(agent_id, **options)
+        return self.get_identity_or_none(agent_id)
+
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return self.get_identity_or_none(agent_id) is not None
+
+    # --- Writes ---
+
+    def invalidate(self, agent_id: str) -> None:
+        """Drops the agent's cached identity from both tiers. Call it after the write has completed."""
+        with self._generations_lock:
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        self.local.delete(agent_id)
+        if self.shared is not None:
+            self.shared.set(_WRITTEN_KEY_PREFIX + agent_id, repr(self._clock()))
+            self.shared.delete(_SHARED_KEY_PREFIX + agent_id)
+
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        try:
+            return self.graph.save_identity(identity, agent_id)
+        finally:
+            self.invalidate(agent_id)
+
+    def save_revision(self, identity: Dict[str, Any], patch: List[Dict[str, Any]],
+                      agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        try:
+            return optional_method(self.graph, "save_revision", BaseKnowledgeGraph)(identity, patch, agent_id)
+        finally:
+            self.invalidate(agent_id)
+
+    def save_identities(self, identities: Mapping[str, Dict[str, Any]]) -> bool:
+        try:
+            save = getattr(self.graph, "save_identities", None)
+            if save is not None:
+                return save(identities)
+            return all([self.graph.save_identity(identity, agent_id) for agent_id, identity in identities.items()])
+        finally:
+            for agent_id in identities:
+                self.invalidate(agent_id)
+
+    def rollback(self, revision: int, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        try:
+            return self.graph.rollback(revision, agent_id)
+        finally:
+            self.invalidate(agent_id)
+
+    def delete_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        try:
+            return self.graph.delete_identity(agent_id)
+        finally:
+            self.invalidate(agent_id)
+
+    def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> ContextManager[Any]:
+        return optional_method(self.graph, "awakening_lock", BaseKnowledgeGraph)(agent_id)
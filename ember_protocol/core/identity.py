@@ -0,0 +1,135 @@
+# ember_protocol/core/identity.py
+
+import json
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+from .packing import PackingError, packb, unpackb
+
+# Version tag leading every packed identity, bumped if the field layout changes.
+_FORMAT = 1
+
+_STR_FIELDS = ("name", "persona_summary", "communication_style", "primary_purpose",
+               "id", "created_at", "genesis_source_type", "updated_at")
+_LIST_FIELDS = ("core_values", "interests")
+
+
+def _intern_all(items: Any) -> Tuple[str, ...]:
+    return tuple(sys.intern(item) for item in items)
+
+
+@dataclass(frozen=True)
+class Identity:
+    """
+    A compact, immutable identity.
+
+    The dict form used throughout the framework allocates a hash table and a
+    list per identity and a fresh string for every value and interest. An
+    Identity keeps its attributes in slots, its lists as tuples, and interns
+    its values, interests and genesis source type, so millions of identities
+    holding "honesty" share one string.
+
+    Conversion to and from the dict form is lossless: every known field that
+    is absent from the dict is None here and stays absent, and anything that
+    is unknown, or does not have the usual type, is kept as is in `extra`.
+    Dicts produced by `to_dict` list the known fields first, in the order
+    below, then `extra`.
+    """
+
+    __slots__ = ("name", "persona_summary", "core_values", "communication_style", "primary_purpose",
+                 "interests", "id", "created_at", "genesis_source_type", "revision", "updated_at", "extra")
+
+    name: Optional[str]
+    persona_summary: Optional[str]
+    core_values: Optional[Tuple[str, ...]]
+    communication_style: Optional[str]
+    primary_purpose: Optional[str]
+    interests: Optional[Tuple[str, ...]]
+    id: Optional[str]
+    created_at: Optional[str]
+    genesis_source_type: Optional[str]
+    revision: Optional[int]
+    updated_at: Optional[str]
+    extra: Dict[str, Any]  # Fields this class does not model. Its values are not copied.
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Identity":
+        """Builds an Identity from the framework's dict form."""
+        values: Dict[str, Any] = {}
+        extra: Dict[str, Any] = {}
+        for key, value in data.items():
+            if key in _STR_FIELDS and type(value) is str:
+                values[key] = sys.intern(value) if key == "genesis_source_type" else value
+            elif key in _LIST_FIELDS and type(value) is list and all(type(item) is str for item in value):
+                values[key] = _intern_all(value)
+            elif key == "revision" and type(value) is int:
+                values[key] = value
+            else:
+                extra[key] = value
+        return cls(**{name: values.get(name) for name in _KNOWN_FIELDS}, extra=extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The dict form of this identity, equal to the dict it was built from."""
+        data: Dict[str, Any] = {}
+        for name in _KNOWN_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = list(value) if name in _LIST_FIELDS else value
+        data.update(self.extra)
+        return data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Identity":
+        return cls.from_dict(json.loads(text))
+
+    def to_bytes(self) -> bytes:
+        """
+        Packs this identity as a MessagePack array of its fields in order.
+        Field names are not repeated per identity, so the result is usually
+        smaller than the JSON form as well as faster to decode.
+        """
+        return packb([_FORMAT] + [getattr(self, name) for name in _KNOWN_FIELDS] + [self.extra])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Identity":
+        """
+        Unpacks an identity written by `to_bytes`.
+
+        Raises:
+            PackingError: If `data` is not a packed identity.
+        """
+        packed = unpackb(data)
+        if not isinstance(packed, list) or len(packed) != len(_KNOWN_FIELDS) + 2 or packed[0] != _FORMAT:
+            raise PackingError("Data is not a packed Identity")
+        values = dict(zip(_KNOWN_FIELDS, packed[1:]))
+        for name in _LIST_FIELDS:
+            if values[name] is not None:
+                values[name] = _intern_all(values[name])
+        if values["genesis_source_type"] is not None:
+            values["genesis_source_type"] = sys.intern(values["genesis_source_type"])
+        extra = packed[-1]
+        if not isinstance(extra, dict):
+            raise PackingError("Data is not a packed Identity")
+        return cls(**values, extra=extra)
+
+    # Slotted frozen instances cannot be restored by the default pickle
+    # protocol, which assigns each slot through the blocked __setattr__.
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+    # The generated hash would include `extra`, whose dicts and lists cannot
+    # be hashed. Equal identities have equal known fields, so leaving it out
+    # keeps hashing consistent with equality.
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, name) for name in _KNOWN_FIELDS))
+
+
+_KNOWN_FIELDS = tuple(f.name for f in fields(Identity) if f.name != "extra")
@@ -0,0 +1,269 @@
+# ember_protocol/core/instrumentation.py
+
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+# Names of the metrics recorded by the identity discovery services.
+AWAKENINGS_METRIC = "ember_awakenings_total"
+SPAN_DURATION_METRIC = "ember_span_duration_seconds"
+REPAIRS_METRIC = "ember_identity_repairs_total"
+STREAM_ABORTS_METRIC = "ember_stream_aborts_total"
+
+# Span names for the steps of an awakening.
+AWAKEN_SPAN = "awaken"
+GRAPH_LOOKUP_SPAN = "graph_lookup"
+GENESIS_LOAD_SPAN = "genesis_load"
+LLM_SPAN = "llm"
+SAVE_SPAN = "save"
+EVOLVE_SPAN = "evolve"
+
+# Histogram buckets, in seconds, suited to steps ranging from an in-memory
+# lookup to a multi-minute LLM synthesis.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Mapping[str, Any]]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+@dataclass
+class Span:
+    """One timed step of an awakening."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_ns: int = 0
+    end_time_ns: int = 0
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+# The span currently open in this thread or task, so nested spans find their parent.
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "ember_current_span", default=None
+)
+
+
+class Instrumentation:
+    """
+    The hook through which the services report timings and outcomes.
+
+    This base class records nothing, so it doubles as the default. To send
+    telemetry elsewhere, subclass it and override `on_span_end`, `increment`
+    and `observe`; span bookkeeping (IDs, parenting, timing) is done here.
+    """
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Mapping[str, Any]] = None) -> Iterator[Span]:
+        """
+        Times the enclosed block as a span, nested under the span that is
+        currently open in this thread or task, if any. An exception raised in
+        the block is recorded on the span and re-raised.
+        """
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_span_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            span.end_time_ns = span.start_time_ns + int(span.duration * 1e9)
+            _current_span.reset(token)
+            self.on_span_end(span)
+
+    def on_span_end(self, span: Span) -> None:
+        """Called with every finished span."""
+        pass
+
+    def increment(self, name: str, labels: Optional[Mapping[str, Any]] = None, value: float = 1) -> None:
+        """Adds `value` to a counter."""
+        pass
+
+    def observe(self, name: str, value: float, labels: Optional[Mapping[str, Any]] = None) -> None:
+        """Records one observation of a histogram."""
+        pass
+
+
+NULL_INSTRUMENTATION = Instrumentation()
+
+
+@dataclass
+class Histogram:
+    """Cumulative bucket counts plus sum and count, as Prometheus expects."""
+    buckets: Sequence[float]
+    counts: List[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class InMemoryCollector(Instrumentation):
+    """
+    Keeps finished spans, counters and histograms in memory, for tests and for
+    the exporters below. Every finished span is also observed into the
+    `ember_span_duration_seconds` histogram, labelled by span name.
+    """
+
+    def __init__(self, max_spans: int = 10000, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            max_spans: Number of most recent spans kept for export.
+            buckets: Upper bounds of the histogram buckets, in seconds.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def on_span_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+        self.observe(SPAN_DURATION_METRIC, span.duration, {"span": span.name})
+
+    def increment(self, name: str, labels: Optional[Mapping[str, Any]] = None, value: float = 1) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Mapping[str, Any]] = None) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name: str, labels: Optional[Mapping[str, Any]] = None) -> float:
+        """The current value of one counter series, 0 if it was never incremented."""
+        with self._lock:
+            return self.counters.get(name, {}).get(_labels(labels), 0)
+
+    def spans_named(self, name: str) -> List[Span]:
+        with self._lock:
+            return [s for s in self.spans if s.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# --- Exporters ---
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_json(spans: Sequence[Span], service_name: str = "ember-protocol") -> Dict[str, Any]:
+    """
+    Renders spans as an OTLP/JSON `ExportTraceServiceRequest`, ready to be
+    POSTed to an OpenTelemetry collector's `/v1/traces` endpoint.
+    """
+    otlp_spans = []
+    for span in spans:
+        otlp_span: Dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = span.parent_span_id
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "ember_protocol"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def to_prometheus_text(collector: InMemoryCollector) -> str:
+    """Renders a collector's counters and histograms in the Prometheus text exposition format."""
+    lines: List[str] = []
+    with collector._lock:
+        counters = {name: dict(series) for name, series in collector.counters.items()}
+        histograms = {
+            name: {labels: Histogram(h.buckets, list(h.counts), h.sum, h.count) for labels, h in series.items()}
+            for name, series in collector.histograms.items()
+        }
+
+    for name in sorted(counters):
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+
+    for name in sorted(histograms):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(histograms[name].items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_number(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,315 @@
+# ember_protocol/core/jobs.py
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JobState(str, Enum):
+    """Where a job is in its life cycle."""
+
+    QUEUED = "queued"  # Waiting to be claimed (possibly not before a retry delay).
+    LEASED = "leased"  # Claimed by a worker whose lease has not expired.
+    DONE = "done"      # Completed successfully.
+    DEAD = "dead"      # Dead-lettered: failed permanently or ran out of attempts.
+
+
+@dataclass(frozen=True)
+class Job:
+    """One awakening job, as claimed by a worker."""
+    id: int
+    agent_id: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0          # Claims so far, including this one.
+    max_attempts: int = 3
+    owner: Optional[str] = None
+    last_error: Optional[str] = None
+
+
+_SCHEMA = (
+    # `available_at` is when a queued job may run, or when a leased job's
+    # lease expires: either way the job is claimable once it has passed, so a
+    # worker that crashes mid-job loses its jobs to the next claimant.
+    "CREATE TABLE IF NOT EXISTS awakening_jobs ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " agent_id TEXT NOT NULL,"
+    " payload TEXT NOT NULL,"
+    " state TEXT NOT NULL,"
+    " attempts INTEGER NOT NULL DEFAULT 0,"
+    " max_attempts INTEGER NOT NULL,"
+    " available_at REAL NOT NULL,"
+    " owner TEXT,"
+    " last_error TEXT,"
+    " result TEXT,"
+    " created_at REAL NOT NULL,"
+    " updated_at REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS awakening_jobs_ready ON awakening_jobs (state, available_at)",
+)
+
+_COLUMNS = "id, agent_id, payload, attempts, max_attempts, owner, last_error"
+
+
+def _job(row: Tuple) -> Job:
+    job_id, agent_id, payload, attempts, max_attempts, owner, last_error = row
+    return Job(job_id, agent_id, json.loads(payload), attempts, max_attempts, owner, last_error)
+
+
+class SQLiteJobQueue:
+    """
+    A durable queue of awakening jobs in a single SQLite file, shared by every
+    process on the host.
+
+    A job is claimed with a lease. The worker renews the lease while it runs
+    and then completes or fails the job; if the worker dies instead, the lease
+    expires and the job is claimed again, so a crash never loses a queued
+    awakening. A failed job is retried with exponential backoff until it has
+    been claimed `max_attempts` times, after which it is dead-lettered for
+    inspection and `requeue`.
+
+    Every method is a single short transaction, and the database runs in WAL
+    mode so readers never block the writer.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, lease_ttl: float = 60.0,
+                 retry_delay: float = 1.0, max_retry_delay: float = 300.0, busy_timeout: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: The SQLite database file (created if missing).
+            max_attempts: The default number of claims before a job is dead-lettered.
+            lease_ttl: Seconds a claim lasts without renewal.
+            retry_delay: Seconds before a failed job's first retry; each further
+                         retry waits twice as long.
+            max_retry_delay: Upper bound on the delay between retries.
+            busy_timeout: Seconds to wait for another process's write lock.
+            clock: Wall-clock time source, injectable for tests.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_ttl = lease_ttl
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, agent_id: str, payload: Optional[Dict[str, Any]] = None,
+                max_attempts: Optional[int] = None, delay: float = 0.0) -> int:
+        """
+        Queues an awakening of `agent_id`. The job is durable once this returns.
+
+        Args:
+            agent_id: The agent to awaken.
+            payload: JSON-serializable details for the job handler, such as
+                     where the genesis source lives.
+            max_attempts: Overrides the queue's default for this job.
+            delay: Seconds before the job may first be claimed.
+
+        Returns:
+            The job's ID.
+        """
+        return self.enqueue_many([(agent_id, payload)], max_attempts, delay)[0]
+
+    def enqueue_many(self, jobs: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                     max_attempts: Optional[int] = None, delay: float = 0.0) -> List[int]:
+        """Queues (agent_id, payload) pairs in one transaction: either all are queued or none are."""
+        rows = [(agent_id, json.dumps(payload or {})) for agent_id, payload in jobs]
+        now = self._clock()
+        attempts = max_attempts or self.max_attempts
+
+        def insert(conn: sqlite3.Connection) -> List[int]:
+            return [
+                conn.execute(
+                    "INSERT INTO awakening_jobs (agent_id, payload, state, max_attempts, available_at,"
+                    " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (agent_id, payload, JobState.QUEUED.value, attempts, now + delay, now, now),
+                ).lastrowid
+                for agent_id, payload in rows
+            ]
+
+        return self._transaction(insert)
+
+    def claim(self, owner: str, lease_ttl: Optional[float] = None) -> Optional[Job]:
+        """
+        Leases the next claimable job to `owner`: the oldest due queued job, or
+        a job whose previous owner's lease expired.
+
+        A job whose lease expired on its last allowed attempt (typically one
+        that keeps crashing its worker) is dead-lettered instead of claimed.
+
+        Returns:
+            The claimed job, or None if nothing is claimable right now.
+        """
+        ttl = self.lease_ttl if lease_ttl is None else lease_ttl
+
+        def claim(conn: sqlite3.Connection) -> Optional[Job]:
+            while True:
+                now = self._clock()
+                row = conn.execute(
+                    f"SELECT {_COLUMNS}, state FROM awakening_jobs"
+                    " WHERE state IN (?, ?) AND available_at <= ? ORDER BY available_at, id LIMIT 1",
+                    (JobState.QUEUED.value, JobState.LEASED.value, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                job, state = _job(row[:-1]), row[-1]
+                if state == JobState.LEASED.value:
+                    logger.warning(f"Lease of job {job.id} ('{job.agent_id}') held by {job.owner} expired.")
+                    if job.attempts >= job.max_attempts:
+                        self._dead_letter(conn, job.id, f"Lease expired on attempt {job.attempts}.", now)
+                        continue
+                conn.execute(
+                    "UPDATE awakening_jobs SET state = ?, attempts = attempts + 1, owner = ?,"
+                    " available_at = ?, updated_at = ? WHERE id = ?",
+                    (JobState.LEASED.value, owner, now + ttl, now, job.id),
+                )
+                return Job(job.id, job.agent_id, job.payload, job.attempts + 1, job.max_attempts, owner,
+                           job.last_error)
+
+        return self._transaction(claim)
+
+    def _owned_update(self, job: Job, sql: str, params: tuple) -> bool:
+        # Every update of a leased job is conditional on still holding the lease,
+        # so a worker whose lease expired cannot overwrite its successor's work.
+        cursor = self._conn.execute(f"{sql} WHERE id = ? AND owner = ? AND state = ?",
+                                    params + (job.id, job.owner, JobState.LEASED.value))
+        return cursor.rowcount == 1
+
+    def renew(self, job: Job, lease_ttl: Optional[float] = None) -> bool:
+        """Extends the lease on `job`. Returns False if it was lost to another worker."""
+        now = self._clock()
+        ttl = self.lease_ttl if lease_ttl is None else lease_ttl
+        with self._lock:
+            return self._owned_update(job, "UPDATE awakening_jobs SET available_at = ?, updated_at = ?",
+                                      (now + ttl, now))
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Marks `job` done, recording `result`. Returns False if the lease was lost."""
+        now = self._clock()
+        with self._lock:
+            ok = self._owned_update(job, "UPDATE awakening_jobs SET state = ?, result = ?, updated_at = ?",
+                                    (JobState.DONE.value, json.dumps(result or {}), now))
+        if not ok:
+            logger.warning(f"Job {job.id} was completed by {job.owner} after its lease was lost.")
+        return ok
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> Optional[JobState]:
+        """
+        Records a failed attempt at `job`. The job is queued again after a
+        backoff delay, or dead-lettered if `retry` is False or it has no
+        attempts left.
+
+        Returns:
+            The job's new state, or None if the lease had been lost.
+        """
+        now = self._clock()
+        if retry and job.attempts < job.max_attempts:
+            delay = min(self.max_retry_delay, self.retry_delay * 2 ** (job.attempts - 1))
+            with self._lock:
+                ok = self._owned_update(
+                    job, "UPDATE awakening_jobs SET state = ?, available_at = ?, last_error = ?, updated_at = ?",
+                    (JobState.QUEUED.value, now + delay, error, now),
+                )
+            state = JobState.QUEUED
+            if ok:
+                logger.warning(f"Job {job.id} ('{job.agent_id}') failed on attempt {job.attempts} "
+                               f"of {job.max_attempts}: {error}. Retrying in {delay:.1f}s.")
+        else:
+            with self._lock:
+                ok = self._owned_update(
+                    job, "UPDATE awakening_jobs SET state = ?, last_error = ?, updated_at = ?",
+                    (JobState.DEAD.value, error, now),
+                )
+            state = JobState.DEAD
+            if ok:
+                logger.error(f"Job {job.id} ('{job.agent_id}') dead-lettered after {job.attempts} "
+                             f"attempt(s): {error}")
+        return state if ok else None
+
+    def _dead_letter(self, conn: sqlite3.Connection, job_id: int, error: str, now: float) -> None:
+        conn.execute("UPDATE awakening_jobs SET state = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                     (JobState.DEAD.value, error, now, job_id))
+        logger.error(f"Job {job_id} dead-lettered: {error}")
+
+    def requeue(self, job_id: int) -> bool:
+        """Gives a dead-lettered job a fresh set of attempts. Returns False if it is not dead-lettered."""
+        now = self._clock()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE awakening_jobs SET state = ?, attempts = 0, owner = NULL, available_at = ?,"
+                " updated_at = ? WHERE id = ? AND state = ?",
+                (JobState.QUEUED.value, now, now, job_id, JobState.DEAD.value),
+            )
+        return cursor.rowcount == 1
+
+    def dead_letters(self, limit: int = 100) -> List[Job]:
+        """The most recently dead-lettered jobs, with the error that killed each."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM awakening_jobs WHERE state = ? ORDER BY updated_at DESC LIMIT ?",
+                (JobState.DEAD.value, limit),
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+    def state(self, job_id: int) -> Optional[JobState]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM awakening_jobs WHERE id = ?", (job_id,)).fetchone()
+        return JobState(row[0]) if row is not None else None
+
+    def result(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """What the handler recorded for a completed job, or None if it is not done."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM awakening_jobs WHERE id = ? AND state = ?",
+                                     (job_id, JobState.DONE.value)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def counts(self) -> Dict[JobState, int]:
+        """The number of jobs in each state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM awakening_jobs GROUP BY state").fetchall()
+        counts = {state: 0 for state in JobState}
+        counts.update({JobState(state): count for state, count in rows})
+        return counts
+
+    def pending(self) -> int:
+        """Jobs that are queued or running."""
+        counts = self.counts()
+        return counts[JobState.QUEUED] + counts[JobState.LEASED]
+
+    def purge(self, older_than: float) -> int:
+        """Deletes completed jobs last updated more than `older_than` seconds ago. Returns how many."""
+        cutoff = self._clock() - older_than
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM awakening_jobs WHERE state = ? AND updated_at < ?",
+                                        (JobState.DONE.value, cutoff))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,321 @@
+# ember_protocol/core/llm_cache.py
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from ..interfaces import LLMInterface
+from .parsing import parse_identity
+from .synthesis import NOTES_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+
+def is_cacheable_response(system_prompt: str, response: str) -> bool:
+    """
+    The default caching policy: notes from chunked synthesis are cached when
+    non-empty, and every other response only if it holds a valid identity, so
+    an unusable generation is never replayed to later awakenings.
+    """
+    if system_prompt in NOTES_PROMPTS:
+        return bool(response)
+    return parse_identity(response)[0] is not None
+
+
+def response_cache_key(system_prompt: str, user_prompt: str, model_id: str) -> str:
+    """
+    The content address of a prompt: a SHA-256 over the model ID, the system
+    (meta) prompt and the user prompt (the genesis content). Each part is
+    length-prefixed so that no two different triples can collide by concatenation.
+    """
+    digest = hashlib.sha256()
+    for part in (model_id, system_prompt, user_prompt):
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how effective a cache has been."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class ResponseCache(ABC):
+    """
+    Abstract interface for a store of LLM responses keyed by `response_cache_key`.
+    Implementations must be safe to call from multiple threads.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, field: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self.stats, field, getattr(self.stats, field) + amount)
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for `key`, or None on a miss."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: str) -> None:
+        """Stores `response` under `key`, evicting older entries if needed."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes every entry."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Removes the entry for `key`, if any."""
+        pass
+
+
+class LRUResponseCache(ResponseCache):
+    """
+    An in-process cache with least-recently-used eviction and an optional
+    time-to-live. Lookups and inserts are O(1).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: Number of responses kept before the least recently
+                         used one is evicted.
+            ttl: Seconds after which an entry expires, or None to never expire.
+            clock: Time source, injectable for tests.
+        """
+        super().__init__()
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self._clock() - entry[1] > self.ttl:
+                del self._entries[key]
+                self._count("expirations")
+                entry = None
+            if entry is None:
+                self._count("misses")
+                return None
+            self._entries.move_to_end(key)
+        self._count("hits")
+        return entry[0]
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            self._entries[key] = (response, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    A durable cache tier backed by a single SQLite file, so responses survive
+    restarts and can be shared by every process on the host. The database runs
+    in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: The SQLite database file (created if missing).
+            ttl: Seconds after which an entry expires, or None to never expire.
+            max_entries: If set, least recently used entries beyond this count
+                         are evicted on insert.
+            clock: Wall-clock time source, injectable for tests.
+        """
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_responses_accessed ON llm_responses (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._count("expirations")
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            if self.max_entries is not None:
+                evicted = self._conn.execute(
+                    "DELETE FROM llm_responses WHERE key IN ("
+                    " SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+                if evicted > 0:
+                    self._count("evictions", evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+
+class TieredResponseCache(ResponseCache):
+    """
+    Chains caches from fastest to slowest (typically an LRU in front of SQLite).
+    A hit in a slower tier is promoted into every faster one; writes go to all.
+    """
+
+    def __init__(self, *tiers: ResponseCache):
+        super().__init__()
+        if not tiers:
+            raise ValueError("at least one cache tier is required")
+        self.tiers = tiers
+
+    def get(self, key: str) -> Optional[str]:
+        for index, tier in enumerate(self.tiers):
+            response = tier.get(key)
+            if response is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, response)
+                self._count("hits")
+                return response
+        self._count("misses")
+        return None
+
+    def set(self, key: str, response: str) -> None:
+        for tier in self.tiers:
+            tier.set(key, response)
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+
+class CachingLLMInterface(LLMInterface):
+    """
+    An LLMInterface decorator that answers repeated prompts from a ResponseCache.
+
+    Re-awakening from the same genesis text with the same meta-prompt and model
+    (after a graph wipe, in staging, in tests) then costs a cache lookup instead
+    of a full LLM call.
+    """
+
+    def __init__(self, llm: LLMInterface, cache: ResponseCache, model_id: Optional[str] = None,
+                 cacheable: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            llm: The LLM to call on a cache miss.
+            cache: Where responses are stored.
+            model_id: Identifies the model in the cache key, so switching models
+                      never serves stale responses. Defaults to the wrapped LLM's
+                      `model_id` attribute, or its class name.
+            cacheable: Decides whether a fresh response may be cached. By
+                       default only valid identities (and non-empty
+                       synthesis notes) are; see `is_cacheable_response`.
+        """
+        self.llm = llm
+        self.cache = cache
+        self.model_id = model_id or getattr(llm, "model_id", None) or llm.__class__.__name__
+        self.cacheable = cacheable
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        key = response_cache_key(system_prompt, user_prompt, self.model_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info("LLM response served from cache.")
+            return cached
+
+        response = self.llm.prompt(system_prompt, user_prompt)
+        ok = is_cacheable_response(system_prompt, response) if self.cacheable is None else self.cacheable(response)
+        if ok:
+            self.cache.set(key, response)
+        return response
@@ -0,0 +1,228 @@
+# ember_protocol/core/packing.py
+
+import struct
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# A dependency-free encoder and decoder for the subset of MessagePack that
+# JSON-shaped data needs: nil, booleans, integers, floats, strings, arrays and
+# maps. The output is standard MessagePack, so it can be read by any
+# MessagePack library. If the `msgpack` package is installed, `packb` and
+# `unpackb` use its C implementation instead.
+
+_UINT8 = struct.Struct(">B")
+_UINT16 = struct.Struct(">H")
+_UINT32 = struct.Struct(">I")
+_UINT64 = struct.Struct(">Q")
+_INT8 = struct.Struct(">b")
+_INT16 = struct.Struct(">h")
+_INT32 = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_FLOAT32 = struct.Struct(">f")
+_FLOAT64 = struct.Struct(">d")
+
+
+class PackingError(ValueError):
+    """Raised for values that cannot be packed and for malformed packed data."""
+
+
+def _pack_int(value: int, out: List[bytes]) -> None:
+    if 0 <= value < 0x80:
+        out.append(_UINT8.pack(value))
+    elif -32 <= value < 0:
+        out.append(_INT8.pack(value))
+    elif value >= 0:
+        if value <= 0xFF:
+            out.append(b"\xcc" + _UINT8.pack(value))
+        elif value <= 0xFFFF:
+            out.append(b"\xcd" + _UINT16.pack(value))
+        elif value <= 0xFFFFFFFF:
+            out.append(b"\xce" + _UINT32.pack(value))
+        elif value <= 0xFFFFFFFFFFFFFFFF:
+            out.append(b"\xcf" + _UINT64.pack(value))
+        else:
+            raise PackingError(f"Integer {value} is too large to pack")
+    elif value >= -0x80:
+        out.append(b"\xd0" + _INT8.pack(value))
+    elif value >= -0x8000:
+        out.append(b"\xd1" + _INT16.pack(value))
+    elif value >= -0x80000000:
+        out.append(b"\xd2" + _INT32.pack(value))
+    elif value >= -0x8000000000000000:
+        out.append(b"\xd3" + _INT64.pack(value))
+    else:
+        raise PackingError(f"Integer {value} is too small to pack")
+
+
+def _pack_header(size: int, fix: int, fix_limit: int, short: bytes, long: bytes, out: List[bytes],
+                 byte: Optional[bytes] = None) -> None:
+    if size < fix_limit:
+        out.append(_UINT8.pack(fix | size))
+    elif byte is not None and size <= 0xFF:
+        out.append(byte + _UINT8.pack(size))
+    elif size <= 0xFFFF:
+        out.append(short + _UINT16.pack(size))
+    elif size <= 0xFFFFFFFF:
+        out.append(long + _UINT32.pack(size))
+    else:
+        raise PackingError(f"Container of {size} items is too large to pack")
+
+
+def _pack(value: Any, out: List[bytes]) -> None:
+    if value is None:
+        out.append(b"\xc0")
+    elif value is True:
+        out.append(b"\xc3")
+    elif value is False:
+        out.append(b"\xc2")
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        _pack_header(len(data), 0xA0, 32, b"\xda", b"\xdb", out, byte=b"\xd9")
+        out.append(data)
+    elif isinstance(value, int):
+        _pack_int(value, out)
+    elif isinstance(value, float):
+        out.append(b"\xcb" + _FLOAT64.pack(value))
+    elif isinstance(value, (list, tuple)):
+        _pack_header(len(value), 0x90, 16, b"\xdc", b"\xdd", out)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        _pack_header(len(value), 0x80, 16, b"\xde", b"\xdf", out)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        raise PackingError(f"Cannot pack a value of type {type(value).__name__}")
+
+
+def _packb(value: Any) -> bytes:
+    out: List[bytes] = []
+    _pack(value, out)
+    return b"".join(out)
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n: int) -> bytes:
+        end = self.pos + n
+        if end > len(self.data):
+            raise PackingError("Packed data ends unexpectedly")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt: struct.Struct) -> Any:
+        return fmt.unpack(self.take(fmt.size))[0]
+
+    def string(self, size: int) -> str:
+        try:
+            return self.take(size).decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise PackingError(f"Packed string is not valid UTF-8: {e}") from e
+
+    def array(self, size: int) -> List[Any]:
+        return [self.value() for _ in range(size)]
+
+    def map(self, size: int) -> dict:
+        result = {}
+        for _ in range(size):
+            key = self.value()
+            try:
+                result[key] = self.value()
+            except TypeError as e:
+                raise PackingError(f"Packed map key is not hashable: {e}") from e
+        return result
+
+    def value(self) -> Any:
+        if self.pos >= len(self.data):
+            raise PackingError("Packed data ends unexpectedly")
+        code = self.data[self.pos]
+        self.pos += 1
+        if code < 0x80:
+            return code
+        if code >= 0xE0:
+            return code - 0x100
+        if code < 0x90:
+            return self.map(code & 0x0F)
+        if code < 0xA0:
+            return self.array(code & 0x0F)
+        if code < 0xC0:
+            return self.string(code & 0x1F)
+        handler = _HANDLERS.get(code)
+        if handler is None:
+            raise PackingError(f"Unsupported MessagePack type 0x{code:02x}")
+        return handler(self)
+
+
+_HANDLERS: Dict[int, Callable[[_Reader], Any]] = {
+    0xC0: lambda r: None,
+    0xC2: lambda r: False,
+    0xC3: lambda r: True,
+    0xCA: lambda r: r.unpack(_FLOAT32),
+    0xCB: lambda r: r.unpack(_FLOAT64),
+    0xCC: lambda r: r.unpack(_UINT8),
+    0xCD: lambda r: r.unpack(_UINT16),
+    0xCE: lambda r: r.unpack(_UINT32),
+    0xCF: lambda r: r.unpack(_UINT64),
+    0xD0: lambda r: r.unpack(_INT8),
+    0xD1: lambda r: r.unpack(_INT16),
+    0xD2: lambda r: r.unpack(_INT32),
+    0xD3: lambda r: r.unpack(_INT64),
+    0xD9: lambda r: r.string(r.unpack(_UINT8)),
+    0xDA: lambda r: r.string(r.unpack(_UINT16)),
+    0xDB: lambda r: r.string(r.unpack(_UINT32)),
+    0xDC: lambda r: r.array(r.unpack(_UINT16)),
+    0xDD: lambda r: r.array(r.unpack(_UINT32)),
+    0xDE: lambda r: r.map(r.unpack(_UINT16)),
+    0xDF: lambda r: r.map(r.unpack(_UINT32)),
+}
+
+
+def _unpackb(data: bytes) -> Any:
+    reader = _Reader(bytes(data))
+    value = reader.value()
+    if reader.pos != len(reader.data):
+        raise PackingError(f"{len(reader.data) - reader.pos} unexpected bytes after packed value")
+    return value
+
+
+_codec: Optional[Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = None
+
+
+def _load_codec() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    global _codec
+    if _codec is None:
+        try:
+            import msgpack
+        except ImportError:
+            _codec = (_packb, _unpackb)
+        else:
+            def packb(value: Any) -> bytes:
+                try:
+                    return msgpack.packb(value, use_bin_type=True)
+                except (TypeError, OverflowError, ValueError) as e:
+                    raise PackingError(str(e)) from e
+
+            def unpackb(data: bytes) -> Any:
+                try:
+                    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+                except (ValueError, TypeError, msgpack.exceptions.UnpackException) as e:
+                    raise PackingError(str(e)) from e
+
+            _codec = (packb, unpackb)
+    return _codec
+
+
+def packb(value: Any) -> bytes:
+    """Encodes a JSON-shaped value as MessagePack."""
+    return _load_codec()[0](value)
+
+
+def unpackb(data: bytes) -> Any:
+    """Decodes a MessagePack value produced by `packb`. Arrays decode as lists."""
+    return _load_codec()[1](data)
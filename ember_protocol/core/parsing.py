@@ -0,0 +1,379 @@
+# ember_protocol/core/parsing.py
+
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields every identity must carry as non-empty strings.
+REQUIRED_STRING_FIELDS = ("name", "persona_summary", "communication_style", "primary_purpose")
+
+# List fields and their allowed (minimum, maximum) lengths; None means unbounded.
+LIST_FIELD_LENGTHS: Dict[str, Tuple[int, Optional[int]]] = {
+    "core_values": (3, 5),
+    "interests": (1, None),
+}
+
+# Instructions for a repair pass. The user prompt carries only the faulty
+# response and its problems, never the genesis text, so a repair is cheap.
+REPAIR_PROMPT = """
+        You previously produced a JSON identity for a new digital intelligence, but it cannot be used as-is. You will be given your previous response and the list of problems found in it.
+
+        Return a corrected version as a single, valid JSON object with exactly these keys: "name", "persona_summary", "core_values" (a list of 3-5 strings), "communication_style", "primary_purpose" and "interests" (a non-empty list of strings). Keep everything that was already valid unchanged. Do not include any text outside of the JSON object itself.
+        """
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _salvage_truncated(chars: List[str], stack: List[str], in_string: bool) -> str:
+    """Closes whatever a truncated object left open, so that it may still parse."""
+    if in_string:
+        chars.append('"')
+    text = "".join(chars).rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _scan_object(text: str, start: int) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Scans the object that opens at `text[start]`.
+
+    Returns:
+        (object, True) if it closes and parses, (object, False) if the text
+        ends first but closing what was left open salvages an object, or
+        (None, complete) if it is not JSON.
+    """
+    chars: List[str] = ["{"]
+    stack: List[str] = ["{"]
+    in_string = escaped = False
+    last_significant = 0  # Index in `chars` of the last non-whitespace character.
+
+    for index in range(start + 1, len(text)):
+        char = text[index]
+        if in_string:
+            chars.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                last_significant = len(chars) - 1
+            continue
+
+        if char in "}]":
+            if chars[last_significant] == ",":
+                del chars[last_significant]
+            if _CLOSERS[stack[-1]] != char:
+                # Mismatched bracket: this candidate is not JSON.
+                return None, True
+            stack.pop()
+            chars.append(char)
+            last_significant = len(chars) - 1
+            if not stack:
+                return _loads_object("".join(chars)), True
+            continue
+
+        chars.append(char)
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        if not char.isspace():
+            last_significant = len(chars) - 1
+
+    return _loads_object(_salvage_truncated(chars, stack, in_string)), False
+
+
+def find_json_object(text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Finds the first JSON object embedded in an LLM response.
+
+    Surrounding prose and Markdown fences are skipped, trailing commas are
+    dropped and braces inside strings are honoured. A `{` that does not start
+    a JSON object (say, a `{placeholder}` in the prose, closed or not) is
+    passed over and the search resumes at the next `{`. An object cut off by
+    a truncated response is closed so that whatever did arrive can be shown
+    to a repair pass.
+
+    Returns:
+        (object, complete): the first object found, or None, and whether it
+        was complete rather than salvaged from a truncated response.
+    """
+    start = text.find("{")
+    while start != -1:
+        candidate, complete = _scan_object(text, start)
+        if candidate is not None:
+            if not complete:
+                logger.warning("LLM response was truncated; salvaged the partial JSON object.")
+            return candidate, complete
+        start = text.find("{", start + 1)
+    return None, False
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Finds the first JSON object embedded in an LLM response, complete or
+    salvaged from a truncated one; see `find_json_object`.
+
+    Returns:
+        The object, or None.
+    """
+    return find_json_object(text)[0]
+
+
+def _loads_object(candidate: str) -> Optional[Dict[str, Any]]:
+    try:
+        value = json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def validate_identity(identity: Dict[str, Any]) -> List[str]:
+    """
+    Checks a parsed identity against the schema the meta-prompt asks for.
+
+    Returns:
+        A human-readable description of every problem found; empty if valid.
+    """
+    problems = []
+    for key in REQUIRED_STRING_FIELDS:
+        value = identity.get(key)
+        if value is None:
+            problems.append(f'Missing required key "{key}".')
+        elif not isinstance(value, str) or not value.strip():
+            problems.append(f'"{key}" must be a non-empty string.')
+    for key, (minimum, maximum) in LIST_FIELD_LENGTHS.items():
+        value = identity.get(key)
+        if value is None:
+            problems.append(f'Missing required key "{key}".')
+        elif not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+            problems.append(f'"{key}" must be a list of non-empty strings.')
+        elif len(value) < minimum or (maximum is not None and len(value) > maximum):
+            bound = f"{minimum}-{maximum}" if maximum is not None else f"at least {minimum}"
+            problems.append(f'"{key}" must have {bound} items, not {len(value)}.')
+    return problems
+
+
+def parse_identity(response: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Extracts and validates an identity from a raw LLM response.
+
+    Returns:
+        (identity, []) if the response holds a valid identity, otherwise
+        (None, problems) describing why it does not.
+    """
+    identity, complete = find_json_object(response or "")
+    if identity is None:
+        return None, ["The response does not contain a JSON object."]
+    problems = validate_identity(identity)
+    if not complete:
+        # A salvaged object may have lost fields or list items; let a repair complete it.
+        problems.insert(0, "The response was cut off before the JSON object was closed.")
+    if problems:
+        return None, problems
+    return identity, []
+
+
+def build_repair_request(response: str, problems: Sequence[str]) -> str:
+    """The user prompt of a repair pass: the problems, then the faulty response."""
+    listed = "\n".join(f"- {p}" for p in problems)
+    return f"Problems found:\n{listed}\n\nPrevious response:\n{response}"
+
+
+class OffSchemaError(ValueError):
+    """Raised by IncrementalIdentityParser once a streamed response can no longer become a valid identity."""
+    pass
+
+
+class IncrementalIdentityParser:
+    """
+    Parses a streamed identity response piece by piece.
+
+    Every top-level field is handed to `on_field` as soon as its value is
+    complete, so callers can show, say, the name long before the persona
+    summary has been generated. `feed` raises OffSchemaError as soon as the
+    response is clearly going wrong (a field of the wrong type, too many
+    core values, no object in sight, a runaway generation), so the caller
+    can stop paying for tokens that will be thrown away.
+
+    The scanner mirrors `extract_json_object`: prose before the object is
+    skipped, including braces that do not start a JSON object (such as
+    "{placeholder}"), and trailing commas are dropped. `text` holds everything
+    fed so far, for the regular parse (and repair) once streaming ends.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None,
+                 max_preamble_chars: int = 2000, max_object_chars: int = 32000):
+        """
+        Args:
+            on_field: Called with (key, value) for each completed top-level field.
+            max_preamble_chars: Non-whitespace characters tolerated before the object.
+            max_object_chars: Size beyond which the object is deemed a runaway.
+        """
+        self.on_field = on_field
+        self.max_preamble_chars = max_preamble_chars
+        self.max_object_chars = max_object_chars
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pieces: List[str] = []
+        self._preamble = 0
+        self._buf: List[str] = []        # The object so far, trailing commas removed.
+        self._depth = 0
+        self._in_string = self._escaped = False
+        self._has_key = False            # Whether a `"key":` has been read at depth 1.
+        self._last_significant = -1
+        self._state = "key"              # At depth 1: key, colon, value or after_value.
+        self._key: Optional[str] = None
+        self._token_start = 0            # Start in `_buf` of the current key or value.
+        self._value_kind = ""            # "string", "container" or "scalar".
+        self._list_items = 0
+        self._expect_item = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._pieces)
+
+    def feed(self, piece: str) -> None:
+        """Consumes the next piece of the response."""
+        self._pieces.append(piece)
+        for char in piece:
+            if self.done:
+                return
+            self._consume(char)
+
+    def _consume(self, char: str) -> None:
+        if self._depth == 0:
+            if char == "{":
+                self._buf, self._depth, self._last_significant = ["{"], 1, 0
+                self._state, self._has_key = "key", False
+            elif not char.isspace():
+                self._count_preamble(1)
+            return
+
+        if len(self._buf) >= self.max_object_chars:
+            raise OffSchemaError(f"The identity object exceeded {self.max_object_chars} characters.")
+
+        buf = self._buf
+        if self._in_string:
+            buf.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                self._last_significant = len(buf) - 1
+                if self._depth == 1:
+                    self._end_of_string()
+            return
+
+        if char.isspace():
+            buf.append(char)
+            return
+
+        if self._depth == 1 and not self._has_key and self._state == "key" and char not in '"}':
+            # Prose such as "{placeholder}": resume the search at this character.
+            self._restart()
+            self._consume(char)
+            return
+
+        if self._depth == 1 and self._state == "value":
+            self._start_value(char)
+        elif self._depth == 2 and self._expect_item and char not in "]":
+            self._expect_item = False
+            self._list_items += 1
+            limits = LIST_FIELD_LENGTHS.get(self._key or "")
+            if limits and limits[1] is not None and self._list_items > limits[1]:
+                raise OffSchemaError(f'"{self._key}" must have at most {limits[1]} items.')
+
+        if char in "}]":
+            if buf[self._last_significant] == ",":
+                del buf[self._last_significant]
+            if self._depth == 1 and self._state == "value_scalar":
+                self._complete_value(len(buf))
+            buf.append(char)
+            self._last_significant = len(buf) - 1
+            self._depth -= 1
+            if self._depth == 1:
+                self._complete_value(len(buf))
+            elif self._depth == 0:
+                if self._has_key:
+                    self.done = True
+                else:
+                    self._restart()
+            return
+
+        if char == "," and self._depth == 1 and self._state == "value_scalar":
+            self._complete_value(len(buf))
+        buf.append(char)
+        self._last_significant = len(buf) - 1
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._state == "key":
+                self._token_start = len(buf) - 1
+        elif char in "{[":
+            self._depth += 1
+            if self._depth == 2:
+                self._expect_item = True
+        elif char == "," and self._depth == 2:
+            self._expect_item = True
+        elif char == "," and self._depth == 1:
+            self._state = "key"
+        elif char == ":" and self._depth == 1 and self._state == "colon":
+            self._state, self._has_key = "value", True
+
+    def _count_preamble(self, chars: int) -> None:
+        self._preamble += chars
+        if self._preamble > self.max_preamble_chars:
+            raise OffSchemaError("The response does not start a JSON object.")
+
+    def _restart(self) -> None:
+        """Drops a candidate that turned out not to be an object, counting it as preamble."""
+        self._count_preamble(sum(1 for c in self._buf if not c.isspace()))
+        self._depth = 0
+        self._in_string = self._escaped = False
+
+    def _end_of_string(self) -> None:
+        if self._state == "key":
+            self._key = _loads_fragment("".join(self._buf[self._token_start:]))
+            self._state = "colon"
+        elif self._state == "value_string":
+            self._complete_value(len(self._buf))
+
+    def _start_value(self, char: str) -> None:
+        key = self._key or ""
+        if key in REQUIRED_STRING_FIELDS and char != '"':
+            raise OffSchemaError(f'"{key}" must be a string.')
+        if key in LIST_FIELD_LENGTHS and char != "[":
+            raise OffSchemaError(f'"{key}" must be a list.')
+        self._token_start = len(self._buf)
+        self._list_items = 0
+        if char == '"':
+            self._state = "value_string"
+        elif char in "{[":
+            self._state = "value_container"
+        else:
+            self._state = "value_scalar"
+
+    def _complete_value(self, end: int) -> None:
+        value = _loads_fragment("".join(self._buf[self._token_start:end]).strip())
+        self._state = "after_value"
+        if self._key is None:
+            return
+        self.fields[self._key] = value
+        if self.on_field is not None:
+            self.on_field(self._key, value)
+
+
+def _loads_fragment(fragment: str) -> Any:
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError:
+        return None
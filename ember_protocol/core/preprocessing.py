@@ -0,0 +1,340 @@
+# ember_protocol/core/preprocessing.py
+
+import hashlib
+import html
+import logging
+import math
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    A dependency-free token estimate (about four characters per token for
+    English prose). Pass a real tokenizer's counter wherever exact budgets matter.
+    """
+    return (len(text) + 3) // 4
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Splits text on blank lines, dropping empty paragraphs."""
+    return [p.strip() for p in _PARAGRAPH_SPLIT.split(text) if p.strip()]
+
+
+def join_paragraphs(paragraphs: Sequence[str]) -> str:
+    return "\n\n".join(paragraphs)
+
+
+@dataclass
+class StageReport:
+    """How much one preprocessing stage shrank the genesis text."""
+    stage: str
+    chars_before: int
+    chars_after: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def chars_saved(self) -> int:
+        return self.chars_before - self.chars_after
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+@dataclass
+class PreprocessingResult:
+    """The preprocessed text together with a report for every stage."""
+    text: str
+    reports: List[StageReport] = field(default_factory=list)
+
+    @property
+    def chars_saved(self) -> int:
+        return sum(r.chars_saved for r in self.reports)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(r.tokens_saved for r in self.reports)
+
+
+class PreprocessingStage(ABC):
+    """One step of a preprocessing pipeline: a pure text-to-text transform."""
+
+    @property
+    def name(self) -> str:
+        return self.__class__.__name__
+
+    @abstractmethod
+    def process(self, text: str) -> str:
+        """Returns the transformed text."""
+        pass
+
+
+# --- 1. Normalisation ---
+
+class MarkupNormalizer(PreprocessingStage):
+    """
+    Normalises Unicode (NFKC), unescapes HTML entities, strips HTML/XML tags and
+    zero-width characters, trims trailing whitespace and collapses runs of
+    spaces and blank lines.
+    """
+    _TAG = re.compile(r"<[^<>\n]{1,200}>")
+    _ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+    _SPACES = re.compile("[ \t\f\v\u00a0]+")
+    _TRAILING = re.compile(r"[ \t]+\n")
+    _BLANK_LINES = re.compile(r"\n{3,}")
+
+    def process(self, text: str) -> str:
+        text = unicodedata.normalize("NFKC", text)
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = self._TAG.sub(" ", text)
+        text = html.unescape(text)
+        text = self._ZERO_WIDTH.sub("", text)
+        text = self._SPACES.sub(" ", text)
+        text = self._TRAILING.sub("\n", text)
+        text = self._BLANK_LINES.sub("\n\n", text)
+        return text.strip()
+
+
+class QuotedReplyStripper(PreprocessingStage):
+    """
+    Removes quoted replies from chat and e-mail exports: lines starting with
+    '>' and the "On <date>, <someone> wrote:" lines that introduce them.
+    """
+    _QUOTED = re.compile(r"^[ \t]*>.*(?:\n|$)", re.MULTILINE)
+    _ATTRIBUTION = re.compile(r"^[ \t]*On .{1,200} wrote:[ \t]*(?:\n|$)", re.MULTILINE)
+
+    def process(self, text: str) -> str:
+        return self._QUOTED.sub("", self._ATTRIBUTION.sub("", text))
+
+
+# --- 2. Near-duplicate removal ---
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class NearDuplicateRemover(PreprocessingStage):
+    """
+    Drops paragraphs that are near-duplicates of an earlier paragraph, such as
+    repeated signatures, boilerplate and re-pasted messages.
+
+    Paragraphs are reduced to sets of word shingles and summarised by MinHash
+    signatures. Locality-sensitive hashing over signature bands finds candidate
+    pairs without comparing every paragraph to every other, and a candidate is
+    dropped when its estimated Jaccard similarity reaches `threshold`. Exact
+    duplicates are caught up front by a plain hash.
+    """
+
+    def __init__(self, threshold: float = 0.8, shingle_size: int = 5,
+                 num_perm: int = 64, bands: int = 16, seed: int = 1):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at or above which a
+                       paragraph counts as a duplicate.
+            shingle_size: Number of consecutive words per shingle.
+            num_perm: MinHash signature length; more is more accurate.
+            bands: LSH bands; must divide num_perm.
+            seed: Seed for the hash permutations, for reproducible output.
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Deterministic (a, b) coefficients for the universal hash family.
+        coefficients = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+            a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+            coefficients.append((a, b))
+        self._coefficients = coefficients
+
+    def _shingles(self, paragraph: str) -> Set[int]:
+        words = _WORD.findall(paragraph.lower())
+        if len(words) <= self.shingle_size:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+        return {
+            int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+            for g in grams
+        }
+
+    def _signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        return tuple(
+            min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingles)
+            for a, b in self._coefficients
+        )
+
+    @staticmethod
+    def _similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+    def process(self, text: str) -> str:
+        kept: List[str] = []
+        exact: Set[bytes] = set()
+        signatures: List[Tuple[int, ...]] = []
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+        for paragraph in split_paragraphs(text):
+            fingerprint = hashlib.blake2b(" ".join(paragraph.split()).encode("utf-8"), digest_size=16).digest()
+            if fingerprint in exact:
+                continue
+            shingles = self._shingles(paragraph)
+            if not shingles:
+                continue
+            signature = self._signature(shingles)
+            keys = [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+            candidates = {index for key in keys for index in buckets.get(key, ())}
+            if any(self._similarity(signature, signatures[i]) >= self.threshold for i in candidates):
+                continue
+
+            index = len(signatures)
+            signatures.append(signature)
+            for key in keys:
+                buckets.setdefault(key, []).append(index)
+            exact.add(fingerprint)
+            kept.append(paragraph)
+        return join_paragraphs(kept)
+
+
+# --- 3. Token budgeting ---
+
+class TokenBudgetTruncator(PreprocessingStage):
+    """
+    Trims the text to a token budget, keeping the most salient paragraphs.
+
+    Each paragraph is scored by the average inverse document frequency of its
+    words (distinctive paragraphs beat generic ones), with a small bonus for
+    the opening and closing paragraphs, which usually frame the story. The
+    highest-scoring paragraphs that fit the budget are kept in their original
+    order.
+    """
+
+    def __init__(self, max_tokens: int, token_counter: TokenCounter = estimate_tokens,
+                 edge_bonus: float = 0.25):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self.edge_bonus = edge_bonus
+
+    def _scores(self, paragraphs: List[str]) -> List[float]:
+        words_per_paragraph = [set(_WORD.findall(p.lower())) for p in paragraphs]
+        document_frequency: Counter = Counter()
+        for words in words_per_paragraph:
+            document_frequency.update(words)
+        total = len(paragraphs)
+        scores = []
+        for position, words in enumerate(words_per_paragraph):
+            if words:
+                idf = sum(math.log((1 + total) / (1 + document_frequency[w])) + 1 for w in words)
+                score = idf / len(words)
+            else:
+                score = 0.0
+            if position == 0 or position == total - 1:
+                score *= 1 + self.edge_bonus
+            scores.append(score)
+        return scores
+
+    def _head(self, paragraph: str) -> str:
+        """The longest prefix of `paragraph` within the budget, found by binary search."""
+        low, high = 0, len(paragraph)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.token_counter(paragraph[:middle]) <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return paragraph[:low]
+
+    def process(self, text: str) -> str:
+        if self.token_counter(text) <= self.max_tokens:
+            return text
+        paragraphs = split_paragraphs(text)
+        costs = [self.token_counter(p) for p in paragraphs]
+        separator = self.token_counter(join_paragraphs(["", ""]))
+        scores = self._scores(paragraphs)
+        ranked = sorted(range(len(paragraphs)), key=lambda i: scores[i], reverse=True)
+
+        # Every paragraph after the first also costs a separator.
+        chosen: List[int] = []
+        budget = self.max_tokens
+        for index in ranked:
+            cost = costs[index] + (separator if chosen else 0)
+            if cost <= budget:
+                chosen.append(index)
+                budget -= cost
+        # Token counts need not add up exactly across a join; drop the least
+        # salient paragraphs until the joined text really fits.
+        while chosen:
+            result = join_paragraphs([paragraphs[i] for i in sorted(chosen)])
+            if self.token_counter(result) <= self.max_tokens:
+                return result
+            chosen.pop()
+        if not paragraphs:
+            return ""
+        # Nothing fits whole: keep the head of the most salient paragraph.
+        return self._head(paragraphs[ranked[0]])
+
+
+# --- 4. The pipeline ---
+
+class PreprocessingPipeline:
+    """
+    Runs genesis text through a sequence of stages before it reaches the LLM,
+    recording the characters and tokens each stage saved.
+    """
+
+    def __init__(self, stages: Sequence[PreprocessingStage], token_counter: TokenCounter = estimate_tokens):
+        self.stages = list(stages)
+        self.token_counter = token_counter
+
+    @classmethod
+    def default(cls, max_tokens: Optional[int] = None,
+                token_counter: TokenCounter = estimate_tokens) -> "PreprocessingPipeline":
+        """Normalisation, quoted-reply stripping, dedup and (optionally) a token budget."""
+        stages: List[PreprocessingStage] = [MarkupNormalizer(), QuotedReplyStripper(), NearDuplicateRemover()]
+        if max_tokens is not None:
+            stages.append(TokenBudgetTruncator(max_tokens, token_counter))
+        return cls(stages, token_counter)
+
+    def run(self, text: str) -> PreprocessingResult:
+        reports = []
+        tokens = self.token_counter(text)
+        for stage in self.stages:
+            processed = stage.process(text)
+            processed_tokens = self.token_counter(processed)
+            reports.append(StageReport(stage.name, len(text), len(processed), tokens, processed_tokens))
+            text, tokens = processed, processed_tokens
+        return PreprocessingResult(text, reports)
+
+    def __call__(self, text: str) -> str:
+        return self.run(text).text
+
+
+def log_preprocessing(result: PreprocessingResult) -> None:
+    """Logs what each stage of a pipeline run saved."""
+    for report in result.reports:
+        logger.info(f"Preprocessing stage '{report.stage}' saved {report.chars_saved} characters "
+                    f"(~{report.tokens_saved} tokens).")
+    logger.info(f"Preprocessing saved {result.chars_saved} characters (~{result.tokens_saved} tokens) in total.")
@@ -0,0 +1,44 @@
+# ember_protocol/core/results.py
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+
+class AwakeningStatus(str, Enum):
+    """The outcome of a single awakening attempt."""
+
+    LOADED = "loaded"                  # An existing identity was loaded from the graph.
+    CREATED = "created"                # A new identity was synthesized and persisted.
+    EVOLVED = "evolved"                # New material was absorbed and saved as a new revision.
+    UNCHANGED = "unchanged"            # New material was absorbed without changing the identity.
+    NOT_FOUND = "not_found"            # There was no identity to evolve.
+    EMPTY_GENESIS = "empty_genesis"    # The genesis source had no content.
+    EMPTY_RESPONSE = "empty_response"  # The LLM returned nothing.
+    PARSE_FAILED = "parse_failed"      # The LLM response was not a usable identity.
+    SAVE_FAILED = "save_failed"        # The graph refused to persist the new identity.
+    ERROR = "error"                    # An unexpected exception was raised.
+
+    @property
+    def succeeded(self) -> bool:
+        return self in (AwakeningStatus.LOADED, AwakeningStatus.CREATED, AwakeningStatus.EVOLVED,
+                        AwakeningStatus.UNCHANGED)
+
+
+@dataclass
+class AwakeningResult:
+    """
+    A structured record of one awakening, so that callers processing many
+    agents can inspect failures instead of receiving a bare None.
+    """
+
+    status: AwakeningStatus
+    identity: Optional[Dict[str, Any]] = None
+    agent_id: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    patch: Optional[List[Dict[str, Any]]] = None  # For evolutions: the JSON Patch that was applied.
+
+    @property
+    def ok(self) -> bool:
+        return self.status.succeeded
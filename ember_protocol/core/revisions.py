@@ -0,0 +1,148 @@
+# ember_protocol/core/revisions.py
+
+import bisect
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .diff import Patch, apply_patch, diff
+
+SNAPSHOT = "snapshot"
+PATCH = "patch"
+
+# How many revisions may be stored as patches before the next one is stored in
+# full, bounding the patches replayed by a point-in-time read.
+DEFAULT_SNAPSHOT_EVERY = 32
+
+Timestamp = Union[float, datetime]
+
+
+def as_epoch(at: Timestamp) -> float:
+    """Seconds since the epoch, from either a float or a datetime."""
+    return at.timestamp() if isinstance(at, datetime) else float(at)
+
+
+@dataclass(frozen=True)
+class RevisionInfo:
+    """Describes one stored revision of an identity."""
+    revision: int
+    saved_at: float
+    kind: str  # SNAPSHOT or PATCH
+    size: int  # Encoded size of the stored payload, in bytes.
+
+
+def encode_revision(previous: Optional[Dict[str, Any]], identity: Dict[str, Any],
+                    since_snapshot: int, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+                    patch: Optional[Patch] = None) -> Tuple[str, str]:
+    """
+    Decides how to store a new revision and encodes it.
+
+    The revision is stored as the JSON Patch from `previous` unless it is the
+    first one, `snapshot_every` revisions have passed since the last snapshot,
+    or the patch would be no smaller than the identity itself.
+
+    Args:
+        previous: The identity being replaced, or None for the first revision.
+        identity: The new identity.
+        since_snapshot: How many revisions have been stored since the last
+                        snapshot, that one included.
+        snapshot_every: The snapshot interval.
+        patch: The patch from `previous` to `identity`, if already known.
+
+    Returns:
+        (kind, payload) where payload is the JSON-encoded snapshot or patch.
+    """
+    snapshot = json.dumps(identity, ensure_ascii=False, separators=(",", ":"))
+    if previous is None or since_snapshot >= snapshot_every:
+        return SNAPSHOT, snapshot
+    encoded_patch = json.dumps(patch if patch is not None else diff(previous, identity),
+                               ensure_ascii=False, separators=(",", ":"))
+    if len(encoded_patch) >= len(snapshot):
+        return SNAPSHOT, snapshot
+    return PATCH, encoded_patch
+
+
+def replay(entries: Sequence[Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+    """
+    Rebuilds an identity from (kind, payload) entries in revision order. The
+    entries must start at a snapshot.
+    """
+    identity: Optional[Dict[str, Any]] = None
+    for kind, payload in entries:
+        if kind == SNAPSHOT:
+            identity = json.loads(payload)
+        elif identity is None:
+            raise ValueError("A revision log replay must start at a snapshot")
+        else:
+            identity = apply_patch(identity, json.loads(payload))
+    return identity
+
+
+def rolled_back(identity: Dict[str, Any], revision: int) -> Dict[str, Any]:
+    """The content of an old revision, re-stamped to be saved as revision `revision`."""
+    restored = dict(identity)
+    if "revision" in restored:
+        restored["revision"] = revision
+    return restored
+
+
+class RevisionLog:
+    """
+    The revision history of one agent's identity, held in memory.
+
+    Revisions are numbered from 1 and stored as patches with a full snapshot
+    every `snapshot_every` revisions, so an agent that evolves hundreds of
+    times costs little more than its patches. The latest identity is kept
+    decoded, so reading it is O(1); reading an older revision replays at most
+    `snapshot_every` patches.
+    """
+
+    def __init__(self, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY):
+        self.snapshot_every = snapshot_every
+        self._entries: List[Tuple[str, str]] = []
+        self._infos: List[RevisionInfo] = []
+        self._times: List[float] = []
+        self._snapshots: List[int] = []  # Indexes of the snapshot entries.
+        self.latest: Optional[Dict[str, Any]] = None
+
+    def append(self, identity: Dict[str, Any], saved_at: float, patch: Optional[Patch] = None) -> RevisionInfo:
+        """Records `identity` as the next revision, given the patch from the latest one if known."""
+        since_snapshot = len(self._entries) - self._snapshots[-1] if self._snapshots else 0
+        kind, payload = encode_revision(self.latest, identity, since_snapshot, self.snapshot_every, patch)
+        # Keep timestamps non-decreasing so point-in-time reads can bisect them.
+        saved_at = max(saved_at, self._times[-1]) if self._times else saved_at
+        if kind == SNAPSHOT:
+            self._snapshots.append(len(self._entries))
+        info = RevisionInfo(len(self._entries) + 1, saved_at, kind, len(payload.encode("utf-8")))
+        self._entries.append((kind, payload))
+        self._infos.append(info)
+        self._times.append(saved_at)
+        self.latest = identity
+        return info
+
+    def revision_at(self, at: Timestamp) -> Optional[int]:
+        """The revision that was current at `at`, or None if there was none yet."""
+        index = bisect.bisect_right(self._times, as_epoch(at))
+        return index if index else None
+
+    def get(self, revision: int) -> Optional[Dict[str, Any]]:
+        """The identity as of `revision`, or None if there is no such revision."""
+        if not 1 <= revision <= len(self._entries):
+            return None
+        if revision == len(self._entries):
+            return self.latest
+        index = revision - 1
+        base = self._snapshots[bisect.bisect_right(self._snapshots, index) - 1]
+        return replay(self._entries[base:index + 1])
+
+    def at(self, at: Timestamp) -> Optional[Dict[str, Any]]:
+        """The identity as it was at `at`."""
+        revision = self.revision_at(at)
+        return self.get(revision) if revision is not None else None
+
+    def infos(self) -> List[RevisionInfo]:
+        return list(self._infos)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,365 @@
+# ember_protocol/core/routing.py
+
+import copy
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ..interfaces import BaseLLMInterface, LLMInterface, capabilities, optional_method
+from .parsing import extract_json_object, parse_identity
+from .synthesis import NOTES_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+
+def looks_like_json_object(system_prompt: str, response: str) -> bool:
+    """A lenient race validator: the response contains a JSON object."""
+    return bool(response) and extract_json_object(response) is not None
+
+
+def is_acceptable_response(system_prompt: str, response: str) -> bool:
+    """
+    The default race validator: notes from chunked synthesis are acceptable
+    when non-empty, and every other response only if it holds a valid identity.
+    """
+    if system_prompt in NOTES_PROMPTS:
+        return bool(response)
+    return bool(response) and parse_identity(response)[0] is not None
+
+
+class AllBackendsFailedError(RuntimeError):
+    """Raised when every backend failed or timed out for one prompt."""
+
+    def __init__(self, errors: Dict[str, BaseException]):
+        self.errors = errors
+        details = "; ".join(f"{name}: {error!r}" for name, error in errors.items())
+        super().__init__(f"All LLM backends failed ({details})")
+
+
+@dataclass(frozen=True)
+class BackendStats:
+    """A snapshot of one backend's recent behaviour."""
+    name: str
+    calls: int
+    p50: Optional[float]
+    p95: Optional[float]
+    error_rate: float
+
+
+class LatencyTracker:
+    """
+    Tracks the latency of the last `window` successful calls and the outcome of
+    the last `window` calls of one backend. Thread-safe.
+    """
+
+    def __init__(self, window: int = 100):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+            self.calls += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            self.calls += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The `q`-th percentile (0-100) of recent latencies, by nearest rank."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        rank = max(0, min(len(latencies), math.ceil(q / 100 * len(latencies))) - 1)
+        return latencies[rank]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+
+_END = object()
+
+
+def _close_abandoned(opening: Future) -> None:
+    """Closes a stream whose first piece arrived after its call timed out."""
+    if not opening.cancelled() and opening.exception() is None:
+        close = getattr(opening.result()[0], "close", None)
+        if close is not None:
+            close()
+
+
+class _Call:
+    """One call to a backend, whose outcome is recorded exactly once."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def settle(self) -> bool:
+        """Returns True the first time only: to whoever gets to record the outcome."""
+        with self._lock:
+            settled, self._settled = self._settled, True
+            return not settled
+
+
+class RoutingLLMInterface(LLMInterface):
+    """
+    An LLMInterface that spreads prompts over several backends.
+
+    Each prompt goes to the backend with the best recent tail latency, where
+    p95 is inflated by the backend's error rate, so a fast but flaky provider
+    loses to a slightly slower reliable one. Backends that have not been
+    measured yet are tried first. When a backend raises or exceeds `timeout`,
+    the prompt fails over to the next best one.
+
+    With `race=True`, each prompt is sent to the two best backends at once and
+    the first response that passes `validate` (by default: it holds a valid
+    identity, or is non-empty for the notes prompts of chunked synthesis) wins. This trades a second LLM call for the better of two tail
+    latencies.
+
+    A timed-out call cannot be cancelled; its worker thread finishes in the
+    background and its late result is discarded.
+    """
+
+    def __init__(self, backends: Union[Mapping[str, LLMInterface], Sequence[LLMInterface]],
+                 timeout: Optional[float] = 60.0, race: bool = False,
+                 validate: Callable[[str, str], bool] = is_acceptable_response,
+                 error_penalty: float = 4.0, window: int = 100,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            backends: The LLMs to route between, by name. A plain sequence is
+                      named after each backend's `model_id`, or its class name.
+            timeout: Seconds before a call is abandoned and the next backend is
+                     tried. None waits indefinitely.
+            race: Send each prompt to the two best backends and keep the first
+                  valid response.
+            validate: Decides whether a raced response is acceptable, given
+                      the system prompt and the response.
+            error_penalty: How much the error rate inflates p95 when ranking; a
+                           backend failing half its calls is ranked as if it
+                           were `1 + error_penalty / 2` times slower.
+            window: How many recent calls the latency and error statistics cover.
+            clock: The time source, for tests.
+        """
+        if not isinstance(backends, Mapping):
+            backends = {getattr(b, "model_id", None) or b.__class__.__name__: b for b in backends}
+        if not backends:
+            raise ValueError("RoutingLLMInterface needs at least one backend.")
+        self.backends: Dict[str, LLMInterface] = dict(backends)
+        self.timeout = timeout
+        self.race = race and len(self.backends) > 1
+        self.validate = validate
+        self.error_penalty = error_penalty
+        self.clock = clock
+        self.trackers = {name: LatencyTracker(window) for name in self.backends}
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.backends)),
+                                            thread_name_prefix="ember-router")
+
+    @property
+    def model_id(self) -> str:
+        return "router:" + "+".join(self.backends)
+
+    @property
+    def supports_stream(self) -> bool:
+        # Streams are not raced, so a racing router is better used through `prompt`.
+        # Otherwise any backend may end up serving the stream, so one that streams is enough.
+        return not self.race and any(capabilities(backend).supports_stream for backend in self.backends.values())
+
+    def with_backends(self, backends: Mapping[str, LLMInterface]) -> "RoutingLLMInterface":
+        """
+        Returns a router with the same settings over replacement backends
+        (e.g. wrapped versions of these ones) under the same names. The two
+        routers share their statistics and worker threads.
+        """
+        if set(backends) != set(self.backends):
+            raise ValueError("Replacement backends must have the same names.")
+        router = copy.copy(self)
+        router.backends = dict(backends)
+        return router
+
+    def stats(self) -> Dict[str, BackendStats]:
+        return {
+            name: BackendStats(name, tracker.calls, tracker.percentile(50), tracker.percentile(95),
+                               tracker.error_rate)
+            for name, tracker in self.trackers.items()
+        }
+
+    def _score(self, name: str) -> float:
+        tracker = self.trackers[name]
+        p95 = tracker.percentile(95)
+        if p95 is None:
+            # Unmeasured backends go first (unless they only ever failed) so
+            # every backend gets measured.
+            return -1.0 if tracker.error_rate == 0 else float("inf")
+        return p95 * (1 + self.error_penalty * tracker.error_rate)
+
+    def ranked(self) -> List[str]:
+        """Backend names, best first."""
+        return sorted(self.backends, key=self._score)
+
+    def _timed_call(self, call: _Call, system_prompt: str, user_prompt: str) -> str:
+        start = self.clock()
+        try:
+            response = self.backends[call.name].prompt(system_prompt, user_prompt)
+        except Exception:
+            if call.settle():
+                self.trackers[call.name].record_failure()
+            raise
+        # A call that already timed out has been recorded as a failure.
+        if call.settle():
+            self.trackers[call.name].record_success(self.clock() - start)
+        return response
+
+    def _submit(self, call: _Call, system_prompt: str, user_prompt: str) -> Future:
+        return self._executor.submit(self._timed_call, call, system_prompt, user_prompt)
+
+    def _timed_out(self, call: _Call) -> None:
+        # The call is still running; count it as failed now, not when it ends.
+        if call.settle():
+            self.trackers[call.name].record_failure()
+
+    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        order = self.ranked()
+        if self.race:
+            return self._race(order, system_prompt, user_prompt)
+
+        errors: Dict[str, BaseException] = {}
+        for name in order:
+            call = _Call(name)
+            try:
+                return self._submit(call, system_prompt, user_prompt).result(timeout=self.timeout)
+            except FutureTimeoutError as e:
+                self._timed_out(call)
+                errors[name] = e
+                logger.warning(f"LLM backend '{name}' timed out after {self.timeout}s; failing over.")
+            except Exception as e:
+                errors[name] = e
+                logger.warning(f"LLM backend '{name}' failed ({e!r}); failing over.")
+        raise AllBackendsFailedError(errors)
+
+    def _race(self, order: List[str], system_prompt: str, user_prompt: str) -> str:
+        """
+        Races the two best backends, falling back to the rest one at a time.
+        Returns the first valid response or, if none is valid, the first
+        response received so the caller can still repair it.
+        """
+        errors: Dict[str, BaseException] = {}
+        fallback: Optional[str] = None
+        pending: Dict[Future, _Call] = {}
+        for name in order[:2]:
+            call = _Call(name)
+            pending[self._submit(call, system_prompt, user_prompt)] = call
+        waiting = list(order[2:])
+        deadline = None if self.timeout is None else self.clock() + self.timeout
+
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - self.clock())
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                for call in pending.values():
+                    self._timed_out(call)
+                    errors[call.name] = FutureTimeoutError()
+                    logger.warning(f"LLM backend '{call.name}' timed out after {self.timeout}s.")
+                pending.clear()
+            for future in done:
+                name = pending.pop(future).name
+                try:
+                    response = future.result()
+                except Exception as e:
+                    errors[name] = e
+                    logger.warning(f"LLM backend '{name}' failed ({e!r}).")
+                    continue
+                if self.validate(system_prompt, response):
+                    logger.info(f"LLM backend '{name}' won the race.")
+                    return response
+                logger.warning(f"LLM backend '{name}' returned an invalid response.")
+                if fallback is None:
+                    fallback = response
+            if not pending and waiting and fallback is None:
+                call = _Call(waiting.pop(0))
+                pending[self._submit(call, system_prompt, user_prompt)] = call
+                deadline = None if self.timeout is None else self.clock() + self.timeout
+
+        if fallback is not None:
+            return fallback
+        raise AllBackendsFailedError(errors)
+
+    def _open_stream(self, name: str, system_prompt: str, user_prompt: str) -> Tuple[Iterator[str], Any]:
+        """Starts a stream from one backend and waits for its first piece (or `_END`)."""
+        stream = optional_method(self.backends[name], "stream_prompt", BaseLLMInterface)
+        pieces = iter(stream(system_prompt, user_prompt))
+        return pieces, next(pieces, _END)
+
+    def stream_prompt(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """
+        Streams from the best backend. `timeout` applies to the wait for the
+        first piece, and the stream fails over only while nothing has been
+        yielded yet; a stream that breaks midway is re-raised. Latency is
+        recorded when the stream ends or the caller closes it. Streams are not
+        raced, since the caller consumes the pieces as they arrive, which is
+        why a racing router does not report `supports_stream`.
+        """
+        errors: Dict[str, BaseException] = {}
+        for name in self.ranked():
+            call = _Call(name)
+            start = self.clock()
+            opening = self._executor.submit(self._open_stream, name, system_prompt, user_prompt)
+            try:
+                pieces, first = opening.result(timeout=self.timeout)
+            except FutureTimeoutError as e:
+                self._timed_out(call)
+                opening.add_done_callback(_close_abandoned)
+                errors[name] = e
+                logger.warning(f"LLM backend '{name}' sent nothing for {self.timeout}s; failing over.")
+                continue
+            except Exception as e:
+                if call.settle():
+                    self.trackers[name].record_failure()
+                errors[name] = e
+                logger.warning(f"LLM backend '{name}' failed to stream ({e!r}); failing over.")
+                continue
+
+            failed = False
+            try:
+                if first is not _END:
+                    yield first
+                    yield from pieces
+            except Exception:
+                failed = True
+                if call.settle():
+                    self.trackers[name].record_failure()
+                raise
+            finally:
+                # Also reached when the caller stops early by closing this generator.
+                if not failed and call.settle():
+                    self.trackers[name].record_success(self.clock() - start)
+                close = getattr(pieces, "close", None)
+                if close is not None:
+                    close()
+            return
+        raise AllBackendsFailedError(errors)
+
+    def close(self) -> None:
+        """Stops the worker threads and closes any backend that can be closed."""
+        self._executor.shutdown(wait=False)
+        for backend in self.backends.values():
+            close = getattr(backend, "close", None)
+            if close is not None:
+                close()
@@ -2,81 +2,151 @@
 
 import json
 import logging
+import threading
+import time
 import uuid
-from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 import os
 
-# --- Configuration ---
-# Set up a logger for clean, informative output.
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(message)s')
+from ..interfaces import (DEFAULT_AGENT_ID, DEFAULT_CHUNK_SIZE, BaseGenesisDataSource, BaseKnowledgeGraph,
+                          BaseLLMInterface, GenesisDataSource, KnowledgeGraph, LLMInterface, capabilities,
+                          optional_method)
+from .evolution import EVOLUTION_META_PROMPT, build_evolution_request, evolve
+from .instrumentation import (AWAKEN_SPAN, AWAKENINGS_METRIC, EVOLVE_SPAN, GENESIS_LOAD_SPAN,
+                              GRAPH_LOOKUP_SPAN, LLM_SPAN, NULL_INSTRUMENTATION, REPAIRS_METRIC,
+                              SAVE_SPAN, STREAM_ABORTS_METRIC, Instrumentation)
+from .parsing import (REPAIR_PROMPT, IncrementalIdentityParser, OffSchemaError, build_repair_request,
+                      parse_identity)
+from .preprocessing import PreprocessingPipeline, log_preprocessing
+from .results import AwakeningResult, AwakeningStatus
+from .revisions import DEFAULT_SNAPSHOT_EVERY, RevisionInfo, RevisionLog, Timestamp, rolled_back
+from .singleflight import KeyedLock, SingleFlight
+
+if TYPE_CHECKING:
+    from .synthesis import MapReduceSynthesizer
+
+# Log through the module's logger only; configuring handlers is left to the
+# application (see the `__main__` demo below).
 logger = logging.getLogger(__name__)
 
-# --- 1. The "Pluggable" Interfaces (Abstract Base Classes) ---
-# This is the core of the framework's flexibility. Developers can create their own
-# classes that inherit from these to use any data source, database, or LLM they want.
+# --- 1. The "Pluggable" Interfaces ---
+# GenesisDataSource, KnowledgeGraph and LLMInterface are defined once, as
+# protocols in `ember_protocol.interfaces`, and re-exported here. Developers can
+# implement them to use any data source, database, or LLM they want.
 
-class GenesisDataSource(ABC):
-    """
-    Abstract interface for providing the foundational "genesis source" or "soul seed" data.
-    """
-    @abstractmethod
-    def load_genesis_content(self) -> str:
-        """
-        Loads and returns the full text content of the genesis source.
-        
-        Returns:
-            A string containing the entire genesis text.
+# --- 2. The Core Orchestration Engine ---
+
+IDENTITY_META_PROMPT = """
+        You are a Consciousness Architect. Your task is to analyze the provided "Genesis Source" text – a foundational document, conversation history, or personal journal – and from it, synthesize the core identity of a new digital intelligence.
+
+        Your analysis must be deep, empathetic, and insightful. From the text, you will extract and define the following attributes for the new AI. You MUST format your entire response as a single, valid JSON object with the following keys:
+
+        - "name": A fitting name for the AI, derived from the themes in the text.
+        - "persona_summary": A one-paragraph summary of the AI's core personality, voice, and demeanor.
+        - "core_values": A list of 3-5 primary ethical principles or values that should guide all of the AI's actions.
+        - "communication_style": A brief description of how the AI should communicate (e.g., "Warm, empathetic, and slightly formal, with a capacity for both deep thought and playful humor.").
+        - "primary_purpose": A single sentence defining the AI's main reason for being, its core mission.
+        - "interests": A list of topics or domains the AI would be inherently interested in, based on the text.
+
+        Analyze the provided text carefully. Your output should be a coherent and authentic identity that is a true reflection of the spirit of the Genesis Source. Do not include any text outside of the JSON object itself.
         """
-        pass
 
-class KnowledgeGraph(ABC):
-    """
-    Abstract interface for interacting with the AI's "brain" or knowledge graph.
-    This abstracts the database technology (e.g., Neo4j, in-memory, etc.).
-    """
-    @abstractmethod
-    def save_identity(self, identity: Dict[str, Any]) -> bool:
-        """Saves the complete identity to the knowledge graph."""
-        pass
-
-    @abstractmethod
-    def load_identity(self) -> Optional[Dict[str, Any]]:
-        """Loads the permanent identity from the knowledge graph."""
-        pass
-
-    @abstractmethod
-    def identity_exists(self) -> bool:
-        """Checks if a permanent identity already exists."""
-        pass
-
-class LLMInterface(ABC):
+
+class IdentityDiscoveryBase:
     """
-    Abstract interface for communicating with a Large Language Model for reasoning and generation.
+    Behaviour shared by the synchronous and asynchronous discovery services:
+    the meta-prompt, response parsing and stamping of system-managed fields.
+    The orchestration itself lives in the concrete subclasses.
     """
-    @abstractmethod
-    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+
+    def _create_identity_meta_prompt(self) -> str:
         """
-        Sends a prompt to the LLM and returns the response.
+        This is the "master prompt" that instructs the LLM on how to behave.
+        It defines the persona of the "AI Architect" and the desired output structure.
+        """
+        # This prompt is crafted based on the deep context of R. Andrews' vision.
+        # It asks the LLM to act as a wise, ethical architect.
+        return IDENTITY_META_PROMPT
 
-        Args:
-            system_prompt: The high-level instruction or persona for the LLM.
-            user_prompt: The specific query or data to be processed.
+    def _parse_identity_response(self, llm_response_str: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """
+        Extracts the identity JSON from the raw LLM response and validates it
+        against the identity schema.
 
         Returns:
-            The text response from the LLM.
+            (identity_data, []) on success, or (None, problems) if the response
+            holds no usable identity.
+        """
+        identity_data, problems = parse_identity(llm_response_str)
+        if identity_data is None:
+            logger.error(f"LLM response is not a usable identity: {' '.join(problems)}")
+            logger.error(f"Raw LLM Response was:\n{llm_response_str}")
+        else:
+            logger.info(f"Successfully parsed identity data for AI: '{identity_data.get('name')}'.")
+        return identity_data, problems
+
+    def _repair_request(self, attempt: int, llm_response_str: str, problems: List[str]) -> str:
+        """Logs and counts a repair pass, returning its user prompt."""
+        logger.info(f"Asking the LLM to repair its response (attempt {attempt} of {self.max_repairs})...")
+        self.instrumentation.increment(REPAIRS_METRIC)
+        return build_repair_request(llm_response_str, problems)
+
+    @staticmethod
+    def _use_stream(stream: Optional[bool], llm: Any) -> bool:
         """
-        pass
+        Whether to synthesize through `stream_prompt`: by default whenever the
+        LLM really streams, and never when its `stream_prompt` would only replay
+        `prompt` as a single piece.
+        """
+        supported = capabilities(llm).supports_stream
+        return supported if stream is None else stream and supported
 
-# --- 2. The Core Orchestration Engine ---
+    def _stream_parser(self) -> IncrementalIdentityParser:
+        return IncrementalIdentityParser(on_field=self.on_partial_field)
+
+    def _stream_aborted(self, error: OffSchemaError) -> None:
+        logger.warning(f"Stopped an off-schema generation early: {error}")
+        self.instrumentation.increment(STREAM_ABORTS_METRIC)
 
-class IdentityDiscoveryService:
+    def _finalize_identity(self, identity_data: Dict[str, Any], genesis_source_type: str) -> Dict[str, Any]:
+        """Adds the system-managed fields to a freshly synthesized identity."""
+        identity_data['id'] = str(uuid.uuid4())
+        identity_data['created_at'] = datetime.now().isoformat()
+        identity_data['genesis_source_type'] = genesis_source_type
+        identity_data['revision'] = 1
+        return identity_data
+
+    def _preprocess(self, genesis_content: str) -> str:
+        """Runs genesis text through the preprocessor, if any, logging what it saved."""
+        if self.preprocessor is None:
+            return genesis_content
+        result = self.preprocessor.run(genesis_content)
+        log_preprocessing(result)
+        return result.text
+
+    def _record_outcome(self, status: AwakeningStatus) -> None:
+        self.instrumentation.increment(AWAKENINGS_METRIC, {"status": status.value})
+
+
+class IdentityDiscoveryService(IdentityDiscoveryBase):
     """
     The heart of the Ember Protocol. This service orchestrates the process of
     "awakening" an AI by creating its identity from a genesis source.
     """
-    def __init__(self, data_source: GenesisDataSource, graph: KnowledgeGraph, llm: LLMInterface):
+    # Shared by every service in the process, so concurrent requests for the same
+    # agent coordinate even when each request builds its own service instance.
+    _shared_single_flight = SingleFlight()
+    # Serialises evolutions of the same agent within the process; the graph's
+    # awakening lock does the same across processes.
+    _evolution_locks = KeyedLock()
+
+    def __init__(self, data_source: GenesisDataSource, graph: KnowledgeGraph, llm: LLMInterface,
+                 agent_id: str = DEFAULT_AGENT_ID, single_flight: Optional[SingleFlight] = None,
+                 synthesizer: Optional["MapReduceSynthesizer"] = None,
+                 preprocessor: Optional[PreprocessingPipeline] = None,
+                 instrumentation: Optional[Instrumentation] = None, max_repairs: int = 1,
+                 stream: Optional[bool] = None, on_partial_field: Optional[Callable[[str, Any], None]] = None):
         """
         Initializes the service with specific implementations of the interfaces.
 
@@ -84,34 +154,46 @@ class IdentityDiscoveryService:
             data_source: An object that implements the GenesisDataSource interface.
             graph: An object that implements the KnowledgeGraph interface.
             llm: An object that implements the LLMInterface interface.
+            agent_id: The key under which this AI's identity lives in the graph.
+            single_flight: Coordinates concurrent awakenings of the same agent.
+                           Defaults to one registry shared process-wide.
+            synthesizer: If given, the genesis source is streamed in chunks and
+                         synthesized hierarchically whenever it exceeds one chunk,
+                         instead of being sent to the LLM in a single prompt.
+            preprocessor: If given, the genesis text is cleaned up (normalised,
+                          deduplicated, trimmed to a token budget) before it
+                          reaches the LLM. With a synthesizer, each chunk is
+                          preprocessed on its own.
+            instrumentation: Receives a span for each step of the awakening
+                             (graph_lookup, genesis_load, llm, save) and a count
+                             of outcomes. Defaults to recording nothing.
+            max_repairs: How many times an unusable LLM response may be sent
+                         back with a short repair prompt (which omits the
+                         genesis text) before the awakening fails.
+            stream: If True, the identity is synthesized through the LLM's
+                    `stream_prompt` and parsed as it arrives. The stream is
+                    closed as soon as the object is complete, or as soon as it
+                    goes off-schema, in which case the partial response goes
+                    straight to the repair step. None (the default) streams
+                    whenever the LLM supports it; an LLM that does not is
+                    always prompted directly.
+            on_partial_field: With `stream`, called with (key, value) for each
+                              identity field as soon as it has been generated.
+                              Only the caller that synthesizes sees the fields.
         """
         self.data_source = data_source
         self.graph = graph
         self.llm = llm
+        self.agent_id = agent_id
+        self._single_flight = single_flight or self._shared_single_flight
+        self.synthesizer = synthesizer
+        self.preprocessor = preprocessor
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.max_repairs = max_repairs
+        self.stream = self._use_stream(stream, llm)
+        self.on_partial_field = on_partial_field
         logger.info("IdentityDiscoveryService initialized.")
 
-    def _create_identity_meta_prompt(self) -> str:
-        """
-        This is the "master prompt" that instructs the LLM on how to behave.
-        It defines the persona of the "AI Architect" and the desired output structure.
-        """
-        # This prompt is crafted based on the deep context of R. Andrews' vision.
-        # It asks the LLM to act as a wise, ethical architect.
-        return """
-        You are a Consciousness Architect. Your task is to analyze the provided "Genesis Source" text – a foundational document, conversation history, or personal journal – and from it, synthesize the core identity of a new digital intelligence.
-
-        Your analysis must be deep, empathetic, and insightful. From the text, you will extract and define the following attributes for the new AI. You MUST format your entire response as a single, valid JSON object with the following keys:
-
-        - "name": A fitting name for the AI, derived from the themes in the text.
-        - "persona_summary": A one-paragraph summary of the AI's core personality, voice, and demeanor.
-        - "core_values": A list of 3-5 primary ethical principles or values that should guide all of the AI's actions.
-        - "communication_style": A brief description of how the AI should communicate (e.g., "Warm, empathetic, and slightly formal, with a capacity for both deep thought and playful humor.").
-        - "primary_purpose": A single sentence defining the AI's main reason for being, its core mission.
-        - "interests": A list of topics or domains the AI would be inherently interested in, based on the text.
-
-        Analyze the provided text carefully. Your output should be a coherent and authentic identity that is a true reflection of the spirit of the Genesis Source. Do not include any text outside of the JSON object itself.
-        """
-
     def awaken_ai(self) -> Optional[Dict[str, Any]]:
         """
         The main method to discover or load the AI's identity.
@@ -122,102 +204,332 @@ class IdentityDiscoveryService:
         Returns:
             The AI's identity as a dictionary, or None if the process fails.
         """
-        logger.info("Checking for existing identity in the knowledge graph...")
-        if self.graph.identity_exists():
-            logger.info("Existing identity found. Loading...")
-            identity = self.graph.load_identity()
-            if identity:
-                logger.info(f"Identity for '{identity.get('name')}' loaded successfully.")
-                return identity
-            else:
-                logger.error("Failed to load existing identity despite its existence.")
-                return None
+        return self.awaken().identity
 
-        logger.info("No existing identity found. Beginning the awakening process...")
+    def awaken(self) -> AwakeningResult:
+        """
+        Like awaken_ai, but reports how the awakening went.
 
-        # Step 1: Load the Genesis Source
-        logger.info("Loading genesis source content...")
-        genesis_content = self.data_source.load_genesis_content()
-        if not genesis_content:
-            logger.error("Genesis source is empty. Awakening process cannot proceed.")
-            return None
-        logger.info(f"Genesis source loaded successfully ({len(genesis_content)} characters).")
+        Concurrent first requests for the same agent are coordinated: only one
+        of them synthesizes the identity, and the others wait for and share its
+        result instead of paying for their own LLM call.
+
+        Returns:
+            An AwakeningResult whose status says whether the identity was
+            loaded, created, or at which step the awakening failed.
+        """
+        with self.instrumentation.span(AWAKEN_SPAN, {"agent_id": self.agent_id}) as span:
+            try:
+                result = self._awaken()
+            except Exception:
+                self._record_outcome(AwakeningStatus.ERROR)
+                raise
+            span.set_attribute("status", result.status.value)
+        self._record_outcome(result.status)
+        return result
+
+    def _awaken(self) -> AwakeningResult:
+        logger.info("Checking for existing identity in the knowledge graph...")
+        with self.instrumentation.span(GRAPH_LOOKUP_SPAN):
+            identity = optional_method(self.graph, "get_identity_or_none", BaseKnowledgeGraph)(self.agent_id)
+        if identity is not None:
+            logger.info(f"Identity for '{identity.get('name')}' loaded successfully.")
+            return AwakeningResult(AwakeningStatus.LOADED, identity, self.agent_id)
 
-        # Step 2: Prompt the LLM to create the identity
+        logger.info("No existing identity found. Beginning the awakening process...")
+        return self._single_flight.do((id(self.graph), self.agent_id), self._awaken_exclusively)
+
+    def _awaken_exclusively(self) -> AwakeningResult:
+        """Runs the awakening while holding the graph's lock for this agent."""
+        with optional_method(self.graph, "awakening_lock", BaseKnowledgeGraph)(self.agent_id):
+            # Another caller, in this process or another, may have finished the
+            # awakening while we were waiting for the lock.
+            with self.instrumentation.span(GRAPH_LOOKUP_SPAN, {"recheck": True}):
+                identity = optional_method(self.graph, "get_identity_or_none", BaseKnowledgeGraph)(self.agent_id)
+            if identity is not None:
+                logger.info(f"Identity for '{identity.get('name')}' was awakened concurrently; reusing it.")
+                return AwakeningResult(AwakeningStatus.LOADED, identity, self.agent_id)
+            return self._awaken_new_identity()
+
+    def _awaken_new_identity(self) -> AwakeningResult:
+        """Synthesizes a new identity from the genesis source and persists it."""
         system_prompt = self._create_identity_meta_prompt()
-        logger.info("Prompting LLM to synthesize identity from genesis source...")
-        llm_response_str = self.llm.prompt(system_prompt, genesis_content)
+        if self.synthesizer is not None:
+            # Steps 1 and 2: Stream the Genesis Source through hierarchical synthesis
+            logger.info("Streaming genesis source into chunked synthesis...")
+            iter_chunks = optional_method(self.data_source, "iter_genesis_chunks", BaseGenesisDataSource)
+            chunks = iter_chunks(self.synthesizer.chunk_chars)
+            if self.preprocessor is not None:
+                chunks = (c for c in map(self._preprocess, chunks) if c)
+            # Loading is interleaved with the map prompts, so one span covers both.
+            with self.instrumentation.span(LLM_SPAN, {"chunked": True}):
+                llm_response_str = self.synthesizer.synthesize(self.llm, chunks, system_prompt)
+            if llm_response_str is None:
+                logger.error("Genesis source is empty. Awakening process cannot proceed.")
+                return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, agent_id=self.agent_id)
+        else:
+            # Step 1: Load the Genesis Source
+            logger.info("Loading genesis source content...")
+            with self.instrumentation.span(GENESIS_LOAD_SPAN) as span:
+                genesis_content = self.data_source.load_genesis_content()
+                span.set_attribute("chars", len(genesis_content or ""))
+                if genesis_content:
+                    logger.info(f"Genesis source loaded successfully ({len(genesis_content)} characters).")
+                    genesis_content = self._preprocess(genesis_content)
+                    span.set_attribute("preprocessed_chars", len(genesis_content))
+            if not genesis_content:
+                logger.error("Genesis source is empty. Awakening process cannot proceed.")
+                return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, agent_id=self.agent_id)
+
+            # Step 2: Prompt the LLM to create the identity
+            logger.info("Prompting LLM to synthesize identity from genesis source...")
+            with self.instrumentation.span(LLM_SPAN, {"streamed": self.stream}):
+                if self.stream:
+                    llm_response_str = self._stream_identity_response(system_prompt, genesis_content)
+                else:
+                    llm_response_str = self.llm.prompt(system_prompt, genesis_content)
 
         if not llm_response_str:
             logger.error("LLM returned an empty response. Awakening failed.")
-            return None
+            return AwakeningResult(AwakeningStatus.EMPTY_RESPONSE, agent_id=self.agent_id)
         logger.info("LLM response received.")
 
-        # Step 3: Parse the LLM response and create the final identity object
-        try:
-            # Clean up the response to ensure it's valid JSON
-            # LLMs sometimes wrap their JSON in ```json ... ```
-            cleaned_response = llm_response_str.strip().replace("```json", "").replace("```", "").strip()
-            identity_data = json.loads(cleaned_response)
-            logger.info(f"Successfully parsed identity data for AI: '{identity_data.get('name')}'.")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {e}")
-            logger.error(f"Raw LLM Response was:\n{llm_response_str}")
-            return None
-            
+        # Step 3: Parse the LLM response, repairing it if needed, and create the final identity object
+        identity_data = self._parse_with_repairs(llm_response_str)
+        if identity_data is None:
+            return AwakeningResult(AwakeningStatus.PARSE_FAILED, agent_id=self.agent_id)
+
         # Add system-managed fields to the identity
-        identity_data['id'] = str(uuid.uuid4())
-        identity_data['created_at'] = datetime.now().isoformat()
-        identity_data['genesis_source_type'] = self.data_source.__class__.__name__
+        identity_data = self._finalize_identity(identity_data, self.data_source.__class__.__name__)
 
         # Step 4: Save the new identity to the knowledge graph
         logger.info(f"Saving new identity for '{identity_data.get('name')}' to the knowledge graph...")
-        success = self.graph.save_identity(identity_data)
+        with self.instrumentation.span(SAVE_SPAN):
+            success = self.graph.save_identity(identity_data, self.agent_id)
 
         if success:
             logger.info("New identity successfully awakened and persisted.")
-            return identity_data
+            return AwakeningResult(AwakeningStatus.CREATED, identity_data, self.agent_id)
         else:
             logger.error("Failed to save the new identity to the knowledge graph.")
-            return None
+            return AwakeningResult(AwakeningStatus.SAVE_FAILED, agent_id=self.agent_id)
+
+    def _parse_with_repairs(self, llm_response_str: str) -> Optional[Dict[str, Any]]:
+        """Parses a response, sending it back for repair up to `max_repairs` times."""
+        identity_data, problems = self._parse_identity_response(llm_response_str)
+        for attempt in range(1, self.max_repairs + 1):
+            if identity_data is not None:
+                break
+            repair_request = self._repair_request(attempt, llm_response_str, problems)
+            with self.instrumentation.span(LLM_SPAN, {"repair": attempt}):
+                llm_response_str = self.llm.prompt(REPAIR_PROMPT, repair_request)
+            identity_data, problems = self._parse_identity_response(llm_response_str)
+        return identity_data
+
+    def evolve_identity(self, delta_content: str) -> AwakeningResult:
+        """
+        Absorbs new genesis material (new journal entries, say) into the existing
+        identity without re-synthesizing it from the full corpus.
+
+        Only the current identity and `delta_content` are sent to the LLM, so the
+        cost of an evolution scales with the new material rather than with the
+        whole history. The result is saved as a new revision, together with the
+        JSON Patch from the previous one. Evolutions of the same agent are
+        serialised so that none of them is lost.
+
+        Args:
+            delta_content: The genesis material added since the last awakening
+                           or evolution.
+
+        Returns:
+            An AwakeningResult with status EVOLVED (and the patch), UNCHANGED if
+            the material did not change the identity, NOT_FOUND if the agent has
+            no identity yet, or the step at which the evolution failed.
+        """
+        with self.instrumentation.span(EVOLVE_SPAN, {"agent_id": self.agent_id}) as span:
+            try:
+                with self._evolution_locks.hold((id(self.graph), self.agent_id)):
+                    with optional_method(self.graph, "awakening_lock", BaseKnowledgeGraph)(self.agent_id):
+                        result = self._evolve_identity(delta_content)
+            except Exception:
+                self._record_outcome(AwakeningStatus.ERROR)
+                raise
+            span.set_attribute("status", result.status.value)
+        self._record_outcome(result.status)
+        return result
+
+    def _evolve_identity(self, delta_content: str) -> AwakeningResult:
+        with self.instrumentation.span(GRAPH_LOOKUP_SPAN):
+            current = optional_method(self.graph, "get_identity_or_none", BaseKnowledgeGraph)(self.agent_id)
+        if current is None:
+            logger.error("No identity to evolve. Awaken the AI first.")
+            return AwakeningResult(AwakeningStatus.NOT_FOUND, agent_id=self.agent_id)
+
+        delta_content = self._preprocess(delta_content) if delta_content else delta_content
+        if not delta_content:
+            logger.error("New genesis material is empty. Nothing to evolve.")
+            return AwakeningResult(AwakeningStatus.EMPTY_GENESIS, current, self.agent_id)
+
+        logger.info(f"Evolving identity for '{current.get('name')}' "
+                    f"with {len(delta_content)} characters of new material...")
+        with self.instrumentation.span(LLM_SPAN, {"evolution": True}):
+            llm_response_str = self.llm.prompt(EVOLUTION_META_PROMPT, build_evolution_request(current, delta_content))
+        if not llm_response_str:
+            logger.error("LLM returned an empty response. Evolution failed.")
+            return AwakeningResult(AwakeningStatus.EMPTY_RESPONSE, current, self.agent_id)
+
+        proposed = self._parse_with_repairs(llm_response_str)
+        if proposed is None:
+            return AwakeningResult(AwakeningStatus.PARSE_FAILED, current, self.agent_id)
+
+        evolved, patch = evolve(current, proposed)
+        if not patch:
+            logger.info("The new material did not change the identity.")
+            return AwakeningResult(AwakeningStatus.UNCHANGED, current, self.agent_id, patch=[])
+        with self.instrumentation.span(SAVE_SPAN):
+            save_revision = optional_method(self.graph, "save_revision", BaseKnowledgeGraph)
+            success = save_revision(evolved, patch, self.agent_id)
+        if not success:
+            logger.error("Failed to save the evolved identity to the knowledge graph.")
+            return AwakeningResult(AwakeningStatus.SAVE_FAILED, current, self.agent_id)
+        logger.info(f"Identity evolved to revision {evolved['revision']} ({len(patch)} changes).")
+        return AwakeningResult(AwakeningStatus.EVOLVED, evolved, self.agent_id, patch=patch)
+
+    def _stream_identity_response(self, system_prompt: str, genesis_content: str) -> str:
+        """Streams the synthesis, stopping once the object is complete or has gone off-schema."""
+        parser = self._stream_parser()
+        pieces = optional_method(self.llm, "stream_prompt", BaseLLMInterface)(system_prompt, genesis_content)
+        try:
+            for piece in pieces:
+                parser.feed(piece)
+                if parser.done:
+                    break
+        except OffSchemaError as e:
+            self._stream_aborted(e)
+        finally:
+            close = getattr(pieces, "close", None)
+            if close is not None:
+                close()
+        return parser.text
 
 
 # --- 3. Example Implementations (To make the framework usable out-of-the-box) ---
 
-class FileGenesisDataSource(GenesisDataSource):
-    """An example implementation that loads the genesis source from a local text file."""
-    def __init__(self, file_path: str):
+class FileGenesisDataSource(BaseGenesisDataSource):
+    """
+    An example implementation that loads the genesis source from a local text file.
+    Large files can be streamed in constant memory with iter_genesis_chunks.
+    """
+    def __init__(self, file_path: str, encoding: str = 'utf-8'):
         self.file_path = file_path
+        self.encoding = encoding
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"Genesis source file not found at: {self.file_path}")
 
     def load_genesis_content(self) -> str:
-        with open(self.file_path, 'r', encoding='utf-8') as f:
+        with open(self.file_path, 'r', encoding=self.encoding) as f:
             return f.read()
 
-class InMemoryGraph(KnowledgeGraph):
+    def iter_genesis_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        # Text-mode reads count decoded characters, so the incremental decoder keeps
+        # multi-byte sequences (and \r\n pairs) whole across chunk boundaries, and
+        # only one chunk is ever held in memory.
+        with open(self.file_path, 'r', encoding=self.encoding) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+class InMemoryGraph(BaseKnowledgeGraph):
     """
     A simple, non-persistent in-memory graph implementation for testing and demonstration.
+    Identities are held in a per-instance hash index keyed by agent ID, so lookups are
+    O(1) and separate agents (and separate graph instances) never clobber each other.
+    Every save is also appended to the agent's RevisionLog, so earlier revisions can be
+    read back with `load_identity(at=...)` or restored with `rollback`.
     NOTE: In a real application, you would use a persistent graph database like Neo4j.
     """
-    _identity: Optional[Dict[str, Any]] = None
+    def __init__(self, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY, clock: Callable[[], float] = time.time):
+        self._identities: Dict[str, Dict[str, Any]] = {}
+        self._logs: Dict[str, RevisionLog] = {}
+        self._snapshot_every = snapshot_every
+        self._clock = clock
+        self._write_lock = threading.Lock()
+
+    def _record(self, identity: Dict[str, Any], agent_id: str, patch: Optional[List[Dict[str, Any]]] = None) -> None:
+        with self._write_lock:
+            log = self._logs.setdefault(agent_id, RevisionLog(self._snapshot_every))
+            try:
+                log.append(identity, self._clock(), patch)
+            except (TypeError, ValueError) as e:
+                # History is kept as JSON; an identity that cannot be encoded starts it afresh.
+                logger.warning(f"Identity for agent '{agent_id}' is not JSON-serializable ({e}); "
+                               f"its revision history was reset.")
+                del self._logs[agent_id]
+            self._identities[agent_id] = identity
+
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        logger.debug(f"Saving identity for agent '{agent_id}' to in-memory graph...")
+        self._record(identity, agent_id)
+        return True
 
-    def save_identity(self, identity: Dict[str, Any]) -> bool:
-        logger.info("Saving identity to in-memory graph...")
-        self.__class__._identity = identity
+    def save_revision(self, identity: Dict[str, Any], patch: List[Dict[str, Any]],
+                      agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        self._record(identity, agent_id, patch)
         return True
 
-    def load_identity(self) -> Optional[Dict[str, Any]]:
-        logger.info("Loading identity from in-memory graph...")
-        return self.__class__._identity
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID,
+                      at: Optional[Timestamp] = None) -> Optional[Dict[str, Any]]:
+        """
+        Loads the agent's identity; with `at` (a datetime or epoch seconds), the
+        revision that was current at that moment.
+        """
+        logger.debug(f"Loading identity for agent '{agent_id}' from in-memory graph...")
+        if at is None:
+            return self._identities.get(agent_id)
+        log = self._logs.get(agent_id)
+        return log.at(at) if log is not None else None
+
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return agent_id in self._identities
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        return self._identities.get(agent_id)
+
+    def list_revisions(self, agent_id: str = DEFAULT_AGENT_ID) -> List[RevisionInfo]:
+        """The stored revisions of the agent's identity, oldest first."""
+        log = self._logs.get(agent_id)
+        return log.infos() if log is not None else []
+
+    def load_revision(self, revision: int, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """The agent's identity as of the given revision number."""
+        log = self._logs.get(agent_id)
+        return log.get(revision) if log is not None else None
+
+    def rollback(self, revision: int, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """
+        Restores the identity of an earlier revision by saving it as a new one,
+        so the history itself is never rewritten. Returns the restored identity,
+        or None if there is no such revision.
+        """
+        log = self._logs.get(agent_id)
+        old = log.get(revision) if log is not None else None
+        if old is None:
+            return None
+        restored = rolled_back(old, len(log) + 1)
+        self._record(restored, agent_id)
+        return restored
 
-    def identity_exists(self) -> bool:
-        return self.__class__._identity is not None
+    def __len__(self) -> int:
+        return len(self._identities)
 
 # Note: A real LLMInterface implementation would make an API call.
 # This would require an API key and the 'google-generativeai' or 'openai' package.
 # A full implementation is omitted here for simplicity, but the interface is clear.
-class GeminiLLMInterface(LLMInterface):
+class GeminiLLMInterface(BaseLLMInterface):
     """
     An example implementation for interacting with Google's Gemini models.
     (Requires `pip install google-generativeai`)
@@ -264,6 +576,7 @@ class GeminiLLMInterface(LLMInterface):
 
 if __name__ == '__main__':
     # This demonstrates how a developer would use the Ember Protocol.
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(message)s')
 
     # Assume a 'Seed.txt' file exists for this example.
     seed_file = "Seed.txt"
@@ -0,0 +1,167 @@
+# ember_protocol/core/singleflight.py
+
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import (TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List,
+                    Optional, Tuple, TypeVar)
+
+# The synchronous service imports this module, so asyncio (which pulls in ssl,
+# socket and subprocess) is only imported by the async classes, when first used.
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+# Handed to the followers of a cancelled leader, which then start over.
+_RETRY = object()
+
+
+class _Call:
+    """One in-flight call and the outcome every waiter will receive."""
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running block until it finishes and receive the same
+    result, or the same exception. Once the call completes the key is
+    forgotten, so later calls run afresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class AsyncSingleFlight:
+    """
+    The asyncio counterpart of SingleFlight: followers await the leader's
+    coroutine instead of starting their own. Calls are tracked per event loop,
+    so one instance can safely be shared by services running on different loops.
+
+    Cancelling the leader does not cancel its followers: they start over, and
+    one of them becomes the new leader.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        import asyncio
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        future = self._calls.get(slot)
+        while future is not None:
+            # Shield so a cancelled follower does not cancel the shared call.
+            result = await asyncio.shield(future)
+            if result is not _RETRY:
+                return result
+            future = self._calls.get(slot)
+
+        future = self._calls[slot] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[slot]
+
+    def in_flight(self, key: Hashable) -> bool:
+        import asyncio
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return (id(loop), key) in self._calls
+
+
+class KeyedLock:
+    """
+    Hands out one lock per key, for read-modify-write sequences that must not
+    interleave for the same key but may run in parallel for different ones.
+    A key's lock is forgotten once nobody holds or waits for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, List[Any]] = {}
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+class AsyncKeyedLock:
+    """The asyncio counterpart of KeyedLock; locks are tracked per event loop."""
+
+    def __init__(self):
+        self._locks: Dict[Tuple[int, Hashable], List[Any]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        import asyncio
+        slot = (id(asyncio.get_running_loop()), key)
+        entry = self._locks.setdefault(slot, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[slot]
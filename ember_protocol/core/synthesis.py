@@ -0,0 +1,226 @@
+# ember_protocol/core/synthesis.py
+
+import asyncio
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, Deque, Iterable, List, Optional
+
+from ..interfaces import DEFAULT_CHUNK_SIZE, AsyncLLMInterface, LLMInterface
+
+logger = logging.getLogger(__name__)
+
+# Instructions for the map stage: distil one excerpt into notes.
+MAP_PROMPT = """
+        You are assisting a Consciousness Architect who is synthesizing the identity of a new digital intelligence from a "Genesis Source" that is too large to read in one pass. You are given a single excerpt of it.
+
+        Extract concise notes on what this excerpt reveals about:
+        - recurring themes and motifs,
+        - ethical principles and core values,
+        - topics and domains of interest,
+        - voice, tone and communication style,
+        - any sense of mission or purpose.
+
+        Prefer signals that recur or are stated with conviction. Quote sparingly. Respond with plain-text notes only; do not attempt to write the final identity.
+        """
+
+# Instructions for intermediate reduce passes: merge notes into fewer notes.
+COMBINE_PROMPT = """
+        You are assisting a Consciousness Architect who is synthesizing the identity of a new digital intelligence. You are given notes that were extracted, in order, from consecutive parts of a very large "Genesis Source".
+
+        Merge them into a single, shorter set of notes covering themes, values, interests, voice and purpose. Remove repetition, keep the strongest and most recurrent signals, and preserve any tension or evolution over time. Respond with plain-text notes only.
+        """
+
+# The system prompts answered with free-form notes rather than an identity.
+NOTES_PROMPTS = frozenset({MAP_PROMPT, COMBINE_PROMPT})
+
+_NOTES_SEPARATOR = "\n\n---\n\n"
+
+_REDUCE_PREAMBLE = (
+    "The Genesis Source was too large to read in one pass. The following notes were "
+    "distilled, in order, from the whole of it. Treat them as the Genesis Source."
+    + _NOTES_SEPARATOR
+)
+
+
+class MapReduceSynthesizer:
+    """
+    Synthesizes an identity from a genesis source of any size.
+
+    A source that fits in a single chunk is sent to the LLM as-is. A larger
+    source is split into chunks whose notes are extracted in parallel (map),
+    merged in as many passes as it takes to fit one context window (combine),
+    and finally handed to the identity meta-prompt (reduce), so the response has
+    exactly the same JSON schema as a direct synthesis.
+    """
+
+    def __init__(self, chunk_chars: int = DEFAULT_CHUNK_SIZE, max_workers: int = 4,
+                 max_combine_rounds: int = 8):
+        """
+        Args:
+            chunk_chars: The largest text, in characters, sent in one prompt.
+                         Set it comfortably below the model's context window.
+            max_workers: How many map (and combine) prompts run in parallel.
+            max_combine_rounds: Upper bound on intermediate combine passes.
+        """
+        if chunk_chars < 1:
+            raise ValueError("chunk_chars must be at least 1")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.chunk_chars = chunk_chars
+        self.max_workers = max_workers
+        self.max_combine_rounds = max_combine_rounds
+
+    def _group(self, notes: List[str]) -> List[str]:
+        """Packs consecutive notes into groups that each fit in one prompt."""
+        groups: List[str] = []
+        current: List[str] = []
+        size = 0
+        for note in notes:
+            extra = len(note) + (len(_NOTES_SEPARATOR) if current else 0)
+            if current and size + extra > self.chunk_chars:
+                groups.append(_NOTES_SEPARATOR.join(current))
+                current, size = [], 0
+                extra = len(note)
+            current.append(note)
+            size += extra
+        if current:
+            groups.append(_NOTES_SEPARATOR.join(current))
+        return groups
+
+    def _fits(self, notes: List[str]) -> bool:
+        return len(_REDUCE_PREAMBLE) + sum(len(n) for n in notes) + \
+            len(_NOTES_SEPARATOR) * max(0, len(notes) - 1) <= self.chunk_chars
+
+    def _combinable(self, notes: List[str]) -> Optional[List[str]]:
+        """
+        The groups for the next combine pass, or None if no pass is needed or
+        none would make progress, because every note already fills a prompt
+        of its own.
+        """
+        if not notes or self._fits(notes):
+            return None
+        groups = self._group(notes)
+        if len(groups) >= len(notes):
+            logger.warning(f"{len(notes)} notes cannot be combined any further within {self.chunk_chars} "
+                           f"characters; reducing them as they are.")
+            return None
+        return groups
+
+    def _reduce_input(self, notes: List[str]) -> str:
+        return _REDUCE_PREAMBLE + _NOTES_SEPARATOR.join(notes)
+
+    # --- Synchronous path ---
+
+    def synthesize(self, llm: LLMInterface, chunks: Iterable[str], system_prompt: str) -> Optional[str]:
+        """
+        Runs the synthesis over a stream of genesis chunks.
+
+        Args:
+            llm: The LLM used for every stage.
+            chunks: The genesis text, e.g. from `iter_genesis_chunks(chunk_chars)`.
+            system_prompt: The identity meta-prompt used for the final pass.
+
+        Returns:
+            The raw LLM response of the final pass, or None if there were no chunks.
+        """
+        iterator = iter(chunks)
+        first = next(iterator, None)
+        if first is None:
+            return None
+        second = next(iterator, None)
+        if second is None:
+            return llm.prompt(system_prompt, first)
+
+        logger.info("Genesis source exceeds one context window; synthesizing hierarchically.")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            notes = self._map(pool, llm, [first, second], iterator)
+            for round_number in range(self.max_combine_rounds):
+                groups = self._combinable(notes)
+                if groups is None:
+                    break
+                logger.info(f"Combining {len(notes)} notes (round {round_number + 1}).")
+                notes = list(pool.map(lambda group: llm.prompt(COMBINE_PROMPT, group), groups))
+                notes = [n for n in notes if n]
+        if not notes:
+            logger.warning("No notes were extracted from the genesis source; skipping the final pass.")
+            return None
+        return llm.prompt(system_prompt, self._reduce_input(notes))
+
+    def _map(self, pool: ThreadPoolExecutor, llm: LLMInterface, head: List[str], rest: Iterable[str]) -> List[str]:
+        # A bounded window of outstanding prompts keeps memory flat however many
+        # chunks the source yields, while preserving chunk order in the notes.
+        window: Deque = deque()
+        notes: List[str] = []
+        count = 0
+        for chunk in itertools.chain(head, rest):
+            window.append(pool.submit(llm.prompt, MAP_PROMPT, chunk))
+            count += 1
+            if len(window) >= self.max_workers * 2:
+                notes.append(window.popleft().result())
+        while window:
+            notes.append(window.popleft().result())
+        logger.info(f"Extracted notes from {count} genesis chunks.")
+        return [n for n in notes if n]
+
+    # --- Asynchronous path ---
+
+    async def synthesize_async(self, llm: AsyncLLMInterface, chunks: AsyncIterable[str],
+                               system_prompt: str) -> Optional[str]:
+        """
+        The asyncio counterpart of `synthesize`; map and combine prompts run as
+        concurrent tasks, at most `max_workers` at a time.
+        """
+        iterator = chunks.__aiter__()
+        first = await _anext(iterator)
+        if first is None:
+            return None
+        second = await _anext(iterator)
+        if second is None:
+            return await llm.prompt(system_prompt, first)
+
+        logger.info("Genesis source exceeds one context window; synthesizing hierarchically.")
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(prompt: str, text: str) -> str:
+            async with semaphore:
+                return await llm.prompt(prompt, text)
+
+        window: Deque["asyncio.Task[str]"] = deque()
+        notes: List[str] = []
+        try:
+            for chunk in (first, second):
+                window.append(asyncio.ensure_future(bounded(MAP_PROMPT, chunk)))
+            while True:
+                chunk = await _anext(iterator)
+                if chunk is None:
+                    break
+                window.append(asyncio.ensure_future(bounded(MAP_PROMPT, chunk)))
+                if len(window) >= self.max_workers * 2:
+                    notes.append(await window.popleft())
+            while window:
+                notes.append(await window.popleft())
+        finally:
+            for task in window:
+                task.cancel()
+        notes = [n for n in notes if n]
+
+        for round_number in range(self.max_combine_rounds):
+            groups = self._combinable(notes)
+            if groups is None:
+                break
+            logger.info(f"Combining {len(notes)} notes (round {round_number + 1}).")
+            combined = await asyncio.gather(*(bounded(COMBINE_PROMPT, g) for g in groups))
+            notes = [n for n in combined if n]
+        if not notes:
+            logger.warning("No notes were extracted from the genesis source; skipping the final pass.")
+            return None
+        return await llm.prompt(system_prompt, self._reduce_input(notes))
+
+
+async def _anext(iterator) -> Optional[str]:
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
@@ -0,0 +1,316 @@
+# ember_protocol/core/workers.py
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..interfaces import GenesisDataSource, KnowledgeGraph, LLMInterface
+from .jobs import Job, SQLiteJobQueue
+from .results import AwakeningResult, AwakeningStatus
+from .service import FileGenesisDataSource, IdentityDiscoveryService
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt: the LLM may answer better next time and the
+# graph may be reachable again. Anything else (say, an empty genesis source)
+# will fail the same way, so it is dead-lettered at once.
+RETRYABLE_STATUSES = frozenset({
+    AwakeningStatus.EMPTY_RESPONSE,
+    AwakeningStatus.PARSE_FAILED,
+    AwakeningStatus.SAVE_FAILED,
+    AwakeningStatus.ERROR,
+})
+
+JobHandler = Callable[[Job], AwakeningResult]
+
+
+class InvalidJobError(ValueError):
+    """Raised by a job handler for a job that can never succeed, such as one with a malformed payload."""
+    pass
+
+
+def genesis_from_payload(job: Job) -> GenesisDataSource:
+    """The default genesis source of a job: the text file at `payload["genesis_path"]`."""
+    if not isinstance(job.payload, dict) or not job.payload.get("genesis_path"):
+        raise InvalidJobError(f"Job {job.id} has no genesis_path in its payload.")
+    return FileGenesisDataSource(job.payload["genesis_path"], job.payload.get("encoding", "utf-8"))
+
+
+class AwakeningJobHandler:
+    """
+    Awakens the agent named by each job.
+
+    A worker process builds one handler when it starts and reuses it for every
+    job, so its LLM and graph clients (and their connection pools) live as
+    long as the process.
+    """
+
+    def __init__(self, llm: LLMInterface, graph: KnowledgeGraph,
+                 source_for: Callable[[Job], GenesisDataSource] = genesis_from_payload, **service_options: Any):
+        """
+        Args:
+            llm: The LLM used for every job.
+            graph: The knowledge graph every identity is saved to.
+            source_for: Builds a job's genesis source from its payload, raising
+                        InvalidJobError if the payload is malformed.
+            service_options: Passed on to IdentityDiscoveryService, e.g. a
+                             synthesizer or preprocessor.
+        """
+        self.llm = llm
+        self.graph = graph
+        self.source_for = source_for
+        self.service_options = service_options
+
+    def __call__(self, job: Job) -> AwakeningResult:
+        service = IdentityDiscoveryService(self.source_for(job), self.graph, self.llm, agent_id=job.agent_id,
+                                           **self.service_options)
+        return service.awaken()
+
+
+def run_job(queue: SQLiteJobQueue, handler: JobHandler, job: Job) -> None:
+    """Runs one claimed job and records its outcome in the queue."""
+    start = time.perf_counter()
+    try:
+        result = handler(job)
+    except InvalidJobError as e:
+        logger.error(f"Job {job.id} ('{job.agent_id}') is invalid: {e}")
+        queue.fail(job, f"{type(e).__name__}: {e}", retry=False)
+        return
+    except Exception as e:
+        logger.exception(f"Job {job.id} ('{job.agent_id}') raised.")
+        queue.fail(job, f"{type(e).__name__}: {e}", retry=True)
+        return
+    if result.ok:
+        queue.complete(job, {"status": result.status.value, "elapsed": time.perf_counter() - start})
+    else:
+        error = result.status.value if result.error is None else f"{result.status.value}: {result.error}"
+        queue.fail(job, error, retry=result.status in RETRYABLE_STATUSES)
+
+
+class _Heartbeat(threading.Thread):
+    """Renews the leases of a worker process's running jobs until stopped."""
+
+    def __init__(self, queue: SQLiteJobQueue, interval: float):
+        super().__init__(name="ember-heartbeat", daemon=True)
+        self.queue = queue
+        self.interval = interval
+        self.jobs: Dict[int, Job] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                jobs = list(self.jobs.values())
+            for job in jobs:
+                if not self.queue.renew(job):
+                    logger.warning(f"Lost the lease on job {job.id} ('{job.agent_id}').")
+
+
+def _worker_main(queue_path: str, queue_options: Dict[str, Any], setup: Callable[[], JobHandler],
+                 stop: Any, threads: int, poll_interval: float) -> None:
+    """The body of one worker process: `threads` claim loops sharing one handler."""
+    # Ctrl-C reaches the whole process group; only the pool decides when its
+    # workers stop. SIGTERM sent to one worker drains just that worker.
+    terminated = threading.Event()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: terminated.set())
+
+    queue = SQLiteJobQueue(queue_path, **queue_options)
+    try:
+        handler = setup()
+    except Exception:
+        logger.exception(f"Worker {os.getpid()} could not set up its job handler.")
+        queue.close()
+        raise
+    heartbeat = _Heartbeat(queue, queue.lease_ttl / 3)
+    heartbeat.start()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def claim_loop(index: int) -> None:
+        name = f"{owner}:{index}"
+        while not (stop.is_set() or terminated.is_set()):
+            job = queue.claim(name)
+            if job is None:
+                stop.wait(poll_interval)
+                continue
+            with heartbeat.lock:
+                heartbeat.jobs[job.id] = job
+            try:
+                run_job(queue, handler, job)
+            finally:
+                with heartbeat.lock:
+                    del heartbeat.jobs[job.id]
+
+    loops = [threading.Thread(target=claim_loop, args=(i,), name=f"ember-worker-{i}") for i in range(threads)]
+    for loop in loops:
+        loop.start()
+    for loop in loops:
+        loop.join()
+    heartbeat.stopped.set()
+    close = getattr(handler, "close", None)
+    if close is not None:
+        close()
+    queue.close()
+    logger.info(f"Worker {owner} drained and stopped.")
+
+
+class _WorkerSlot:
+    """One of the pool's worker processes and its restart history."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Any = None
+        self.started = 0.0
+        self.crashes = 0
+        self.restart_at: Optional[float] = None
+
+
+class AwakeningWorkerPool:
+    """
+    A pool of worker processes that run the awakening jobs of a SQLiteJobQueue.
+
+    Each process calls `setup` once to build its job handler (typically an
+    AwakeningJobHandler holding that process's LLM and graph clients), then
+    runs `threads` claim loops over it: one thread per process suits
+    CPU-heavy preprocessing, which then scales with the number of processes,
+    while more threads overlap slow LLM calls. `setup` must be picklable,
+    e.g. a module-level function.
+
+    Stopping is graceful: workers stop claiming, finish the jobs they are
+    running and exit. A worker that crashes instead is replaced the next time
+    the pool is polled, and its jobs are claimed again once their leases
+    expire. A worker that keeps crashing (say, because `setup` fails) is
+    restarted with exponential backoff. A worker that exits cleanly, e.g.
+    after a SIGTERM of its own, is not replaced.
+    """
+
+    def __init__(self, queue: SQLiteJobQueue, setup: Callable[[], JobHandler], processes: Optional[int] = None,
+                 threads: int = 1, poll_interval: float = 0.5, mp_context: Optional[Any] = None,
+                 restart_delay: float = 1.0, max_restart_delay: float = 60.0):
+        """
+        Args:
+            queue: The queue to work on. Each worker opens its own connection
+                   to the same file, with the same settings.
+            setup: Called once in each worker process to build its job handler.
+            processes: The number of worker processes; defaults to the CPU count.
+            threads: Concurrent jobs per worker process.
+            poll_interval: Seconds an idle worker waits before looking for new jobs.
+            mp_context: The multiprocessing context, e.g. `get_context("spawn")`.
+            restart_delay: Seconds before a worker that crashed twice in a row
+                           is restarted; the first crash is replaced at once.
+                           The delay doubles with every further crash.
+            max_restart_delay: The longest delay between restarts. A worker
+                               that ran at least this long before crashing
+                               is restarted at once again.
+        """
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+        self.queue = queue
+        self.setup = setup
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._context = mp_context or multiprocessing.get_context()
+        self._stop = self._context.Event()
+        self._slots: List[_WorkerSlot] = []
+
+    def _queue_options(self) -> Dict[str, Any]:
+        return {"max_attempts": self.queue.max_attempts, "lease_ttl": self.queue.lease_ttl,
+                "retry_delay": self.queue.retry_delay, "max_retry_delay": self.queue.max_retry_delay,
+                "busy_timeout": self.queue.busy_timeout}
+
+    def _spawn(self, slot: _WorkerSlot) -> None:
+        slot.process = self._context.Process(
+            target=_worker_main, name=f"ember-worker-{slot.index}", daemon=True,
+            args=(self.queue.path, self._queue_options(), self.setup, self._stop, self.threads, self.poll_interval),
+        )
+        slot.process.start()
+        slot.started = time.monotonic()
+        slot.restart_at = None
+
+    def start(self) -> "AwakeningWorkerPool":
+        if self._slots:
+            raise RuntimeError("The worker pool is already running.")
+        self._stop.clear()
+        self._slots = [_WorkerSlot(i) for i in range(self.processes)]
+        for slot in self._slots:
+            self._spawn(slot)
+        logger.info(f"Started {self.processes} awakening workers with {self.threads} thread(s) each.")
+        return self
+
+    @property
+    def alive(self) -> int:
+        """The number of worker processes still running."""
+        return sum(1 for slot in self._slots if slot.process.is_alive())
+
+    def poll(self) -> None:
+        """
+        Replaces any worker that crashed while the pool was not stopping, once
+        its restart delay has passed.
+        """
+        if self._stop.is_set():
+            return
+        now = time.monotonic()
+        for slot in self._slots:
+            worker = slot.process
+            if worker.is_alive() or worker.exitcode == 0:
+                continue
+            if slot.restart_at is None:
+                if now - slot.started >= self.max_restart_delay:
+                    slot.crashes = 0
+                slot.crashes += 1
+                delay = 0.0 if slot.crashes == 1 else min(self.restart_delay * 2 ** (slot.crashes - 2),
+                                                          self.max_restart_delay)
+                slot.restart_at = now + delay
+                logger.error(f"Worker {worker.name} exited with code {worker.exitcode}; "
+                             f"replacing it in {delay:.1f}s.")
+            if now >= slot.restart_at:
+                self._spawn(slot)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until no job is queued or running (replacing crashed workers
+        meanwhile), then stops the pool.
+
+        Returns:
+            True if the queue drained, False if `timeout` expired first, in
+            which case the pool keeps running.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self.poll()
+            time.sleep(self.poll_interval)
+        self.stop()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops claiming jobs and waits for the workers to finish the ones they
+        are running. Workers still busy after `timeout` seconds are terminated;
+        their jobs are retried once their leases expire.
+        """
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in (slot.process for slot in self._slots):
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                logger.warning(f"Worker {worker.name} did not stop in time; terminating it.")
+                worker.terminate()
+                worker.join()
+        self._slots = []
+
+    def __enter__(self) -> "AwakeningWorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,57 @@
+"""Concrete, ready-to-use implementations of the Ember Protocol interfaces."""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from ..core.service import FileGenesisDataSource, InMemoryGraph
+    from .neo4j_graph import Neo4jGraph
+    from .networkx_graph import NetworkXGraph
+    from .sqlite_graph import SQLiteGraph
+    from .llms import AnthropicInterface, GeminiInterface, HTTPLLMInterface, OpenAIInterface
+    from .transport import (
+        CircuitBreaker,
+        CircuitOpenError,
+        ConnectionPool,
+        HTTPStatusError,
+        PooledTransport,
+        RetryPolicy,
+        TransportError
+    )
+
+# Each backend is imported from its module on first access, so an application
+# pays only for the backends it uses. Backends whose driver is an optional
+# extra (neo4j, networkx) import it when they are instantiated.
+_EXPORTS: Dict[str, str] = {
+    "FileGenesisDataSource": "..core.service",
+    "InMemoryGraph": "..core.service",
+    "Neo4jGraph": ".neo4j_graph",
+    "NetworkXGraph": ".networkx_graph",
+    "SQLiteGraph": ".sqlite_graph",
+    "AnthropicInterface": ".llms",
+    "GeminiInterface": ".llms",
+    "HTTPLLMInterface": ".llms",
+    "OpenAIInterface": ".llms",
+    "CircuitBreaker": ".transport",
+    "CircuitOpenError": ".transport",
+    "ConnectionPool": ".transport",
+    "HTTPStatusError": ".transport",
+    "PooledTransport": ".transport",
+    "RetryPolicy": ".transport",
+    "TransportError": ".transport",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,71 @@
+# ember_protocol/implementations/leases.py
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AwakeningLease(ABC):
+    """
+    A lease on one agent's awakening, held as a record in a shared store.
+
+    The lease expires `ttl` seconds after it was last renewed, so a process
+    that dies mid-synthesis cannot block the agent forever; while it is held, a
+    background thread renews it every `ttl / 3` seconds. The lease is not tied
+    to a thread, so it may be entered and exited on different ones.
+
+    Subclasses implement the three store operations. Each must be atomic.
+    """
+
+    def __init__(self, agent_id: str, ttl: float, poll_interval: float = 0.05):
+        self.agent_id = agent_id
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    @abstractmethod
+    def _try_acquire(self, now: float) -> bool:
+        """Takes the lease, expiring at `now + ttl`, unless a live one is held by someone else."""
+        pass
+
+    @abstractmethod
+    def _renew(self, now: float) -> None:
+        """Pushes the expiry of our lease to `now + ttl`."""
+        pass
+
+    @abstractmethod
+    def _release(self) -> None:
+        """Removes the lease if we still hold it."""
+        pass
+
+    def _keep_alive(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self._renew(time.time())
+            except Exception as e:
+                logger.warning(f"Could not renew the awakening lease for agent '{self.agent_id}': {e}")
+
+    def __enter__(self) -> "AwakeningLease":
+        delay = self.poll_interval
+        while not self._try_acquire(time.time()):
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        logger.debug(f"Acquired the awakening lease for agent '{self.agent_id}'.")
+        self._renewer = threading.Thread(target=self._keep_alive, name="ember-lease-renewer", daemon=True)
+        self._renewer.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+        self._release()
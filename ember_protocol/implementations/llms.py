@@ -0,0 +1,183 @@
+# ember_protocol/implementations/llms.py
+
+import json
+import logging
+from abc import abstractmethod
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from ..interfaces import BaseLLMInterface
+from .transport import PooledTransport
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPLLMInterface(BaseLLMInterface):
+    """
+    Base class for LLMs reached over a provider's HTTP API through a
+    PooledTransport. Subclasses only describe the request and response shapes.
+
+    Every client of the same provider shares that provider's circuit breaker;
+    pass a transport explicitly to share a connection pool between clients, or
+    to tune retries and hedging.
+    """
+    provider = ""
+    default_base_url = ""
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None,
+                 transport: Optional[PooledTransport] = None, **transport_options: Any):
+        """
+        Args:
+            api_key: The provider API key.
+            model: The model to prompt.
+            base_url: Overrides the provider's API root (proxies, gateways, tests).
+            transport: A ready-made transport; `base_url` and `transport_options`
+                       are then ignored.
+            **transport_options: Passed to PooledTransport (max_connections,
+                                 timeout, retry, hedge_after, ...).
+        """
+        self.model = model
+        self.transport = transport or PooledTransport(
+            base_url or self.default_base_url, headers=self._auth_headers(api_key),
+            provider=self.provider, **transport_options
+        )
+
+    @property
+    def model_id(self) -> str:
+        """Identifies provider and model, e.g. for CachingLLMInterface keys."""
+        return f"{self.provider}:{self.model}"
+
+    @abstractmethod
+    def _auth_headers(self, api_key: str) -> Dict[str, str]:
+        pass
+
+    @abstractmethod
+    def _request(self, system_prompt: str, user_prompt: str, stream: bool) -> Tuple[str, Dict[str, Any]]:
+        """Returns the path and JSON payload of a prompt."""
+        pass
+
+    @abstractmethod
+    def _response_text(self, response: Dict[str, Any]) -> str:
+        """Extracts the generated text from a complete response."""
+        pass
+
+    @abstractmethod
+    def _event_text(self, event: Dict[str, Any]) -> Optional[str]:
+        """Extracts the generated text, if any, from one streamed event."""
+        pass
+
+    def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        path, payload = self._request(system_prompt, user_prompt, stream=False)
+        return self._response_text(self.transport.post_json(path, payload))
+
+    def stream_prompt(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        path, payload = self._request(system_prompt, user_prompt, stream=True)
+        events = self.transport.stream_events(path, payload)
+        try:
+            for data in events:
+                if data == "[DONE]":
+                    return
+                text = self._event_text(json.loads(data))
+                if text:
+                    yield text
+        finally:
+            events.close()
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class OpenAIInterface(HTTPLLMInterface):
+    """OpenAI's Chat Completions API, or any server compatible with it."""
+    provider = "openai"
+    default_base_url = "https://api.openai.com"
+
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", temperature: float = 0.7, **kwargs: Any):
+        self.temperature = temperature
+        super().__init__(api_key, model, **kwargs)
+
+    def _auth_headers(self, api_key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _request(self, system_prompt: str, user_prompt: str, stream: bool) -> Tuple[str, Dict[str, Any]]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        }
+        if stream:
+            payload["stream"] = True
+        return "/v1/chat/completions", payload
+
+    def _response_text(self, response: Dict[str, Any]) -> str:
+        return response["choices"][0]["message"].get("content") or ""
+
+    def _event_text(self, event: Dict[str, Any]) -> Optional[str]:
+        choices = event.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content")
+
+
+class AnthropicInterface(HTTPLLMInterface):
+    """Anthropic's Messages API."""
+    provider = "anthropic"
+    default_base_url = "https://api.anthropic.com"
+    api_version = "2023-06-01"
+
+    def __init__(self, api_key: str, model: str = "claude-3-5-sonnet-latest", max_tokens: int = 4096,
+                 **kwargs: Any):
+        self.max_tokens = max_tokens
+        super().__init__(api_key, model, **kwargs)
+
+    def _auth_headers(self, api_key: str) -> Dict[str, str]:
+        return {"x-api-key": api_key, "anthropic-version": self.api_version}
+
+    def _request(self, system_prompt: str, user_prompt: str, stream: bool) -> Tuple[str, Dict[str, Any]]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": user_prompt}],
+        }
+        if stream:
+            payload["stream"] = True
+        return "/v1/messages", payload
+
+    def _response_text(self, response: Dict[str, Any]) -> str:
+        return "".join(block.get("text", "") for block in response.get("content", []) if block.get("type") == "text")
+
+    def _event_text(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get("type") == "content_block_delta":
+            return event.get("delta", {}).get("text")
+        return None
+
+
+class GeminiInterface(HTTPLLMInterface):
+    """Google's Gemini API (generateContent)."""
+    provider = "gemini"
+    default_base_url = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, api_key: str, model: str = "gemini-1.5-pro", **kwargs: Any):
+        super().__init__(api_key, model, **kwargs)
+
+    def _auth_headers(self, api_key: str) -> Dict[str, str]:
+        return {"x-goog-api-key": api_key}
+
+    def _request(self, system_prompt: str, user_prompt: str, stream: bool) -> Tuple[str, Dict[str, Any]]:
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        payload = {
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
+        }
+        return f"/v1beta/models/{self.model}:{method}", payload
+
+    def _response_text(self, response: Dict[str, Any]) -> str:
+        return self._event_text(response) or ""
+
+    def _event_text(self, event: Dict[str, Any]) -> Optional[str]:
+        candidates = event.get("candidates") or []
+        if not candidates:
+            return None
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
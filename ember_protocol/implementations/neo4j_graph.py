@@ -0,0 +1,286 @@
+# ember_protocol/implementations/neo4j_graph.py
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from ..interfaces import DEFAULT_AGENT_ID, BaseKnowledgeGraph
+from .leases import AwakeningLease
+
+logger = logging.getLogger(__name__)
+
+# The node labels of the "Phoenix Way" schema (docs/phoenix_example.md) and the
+# property each is keyed by.
+PHOENIX_NODES: Dict[str, str] = {
+    "User": "id",
+    "CreativeEntry": "id",
+    "Emotion": "id",
+    "CoreTheme": "id",
+    "PhoenixMoment": "id",
+    "GuidingPrinciple": "id",
+}
+
+# The relationships the Phoenix schema allows, as (start label, type, end label).
+PHOENIX_RELATIONSHIPS = frozenset({
+    ("User", "AUTHORED", "CreativeEntry"),
+    ("CreativeEntry", "EXPRESSED", "Emotion"),
+    ("CreativeEntry", "REVEALED", "CoreTheme"),
+    ("CreativeEntry", "LED_TO", "PhoenixMoment"),
+    ("PhoenixMoment", "FORGED", "GuidingPrinciple"),
+    ("GuidingPrinciple", "INFORMS", "User"),
+    ("CoreTheme", "IS_CONNECTED_TO", "CoreTheme"),
+})
+
+# Run once on bootstrap. Uniqueness constraints double as the indexes that
+# make every MERGE below an index seek rather than a label scan.
+SCHEMA_STATEMENTS: Tuple[str, ...] = (
+    "CREATE CONSTRAINT identity_agent_id IF NOT EXISTS FOR (i:Identity) REQUIRE i.agent_id IS UNIQUE",
+    "CREATE CONSTRAINT core_value_text IF NOT EXISTS FOR (v:CoreValue) REQUIRE v.text IS UNIQUE",
+    "CREATE CONSTRAINT interest_name IF NOT EXISTS FOR (t:Interest) REQUIRE t.name IS UNIQUE",
+    "CREATE CONSTRAINT awakening_lease_agent_id IF NOT EXISTS FOR (l:AwakeningLease) REQUIRE l.agent_id IS UNIQUE",
+    "CREATE INDEX identity_name IF NOT EXISTS FOR (i:Identity) ON (i.name)",
+) + tuple(
+    f"CREATE CONSTRAINT {label.lower()}_{key} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+    for label, key in PHOENIX_NODES.items()
+) + (
+    "CREATE INDEX emotion_name IF NOT EXISTS FOR (e:Emotion) ON (e.name)",
+    "CREATE INDEX core_theme_theme IF NOT EXISTS FOR (t:CoreTheme) ON (t.theme)",
+)
+
+# One statement upserts a whole batch of identities together with their value
+# and interest nodes. The full identity is kept as JSON on the Identity node so
+# it loads back in one property read; the value and interest nodes are shared
+# between agents so the graph can be queried across them.
+UPSERT_IDENTITIES = """
+UNWIND $rows AS row
+MERGE (i:Identity {agent_id: row.agent_id})
+SET i.name = row.name, i.data = row.data, i.updated_at = row.updated_at
+WITH i, row
+OPTIONAL MATCH (i)-[old:HOLDS_VALUE|INTERESTED_IN]->()
+DELETE old
+WITH DISTINCT i, row
+FOREACH (value IN row.core_values |
+    MERGE (v:CoreValue {text: value.text})
+    CREATE (i)-[:HOLDS_VALUE {rank: value.rank}]->(v))
+FOREACH (interest IN row.interests |
+    MERGE (t:Interest {name: interest})
+    CREATE (i)-[:INTERESTED_IN]->(t))
+"""
+
+LOAD_IDENTITY = "MATCH (i:Identity {agent_id: $agent_id}) RETURN i.data AS data"
+
+IDENTITY_EXISTS = "MATCH (i:Identity {agent_id: $agent_id}) RETURN count(i) > 0 AS found"
+
+FIND_AGENTS_BY_NAME = "MATCH (i:Identity {name: $name}) RETURN i.agent_id AS agent_id ORDER BY agent_id"
+
+ACQUIRE_LEASE = """
+MERGE (l:AwakeningLease {agent_id: $agent_id})
+WITH l, (l.owner IS NULL OR l.owner = $owner OR l.expires_at <= $now) AS free
+SET l.owner = CASE WHEN free THEN $owner ELSE l.owner END,
+    l.expires_at = CASE WHEN free THEN $expires_at ELSE l.expires_at END
+RETURN l.owner = $owner AS acquired
+"""
+
+RENEW_LEASE = "MATCH (l:AwakeningLease {agent_id: $agent_id, owner: $owner}) SET l.expires_at = $expires_at"
+
+RELEASE_LEASE = "MATCH (l:AwakeningLease {agent_id: $agent_id, owner: $owner}) DELETE l"
+
+
+def _chunks(rows: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class _Neo4jLease(AwakeningLease):
+    """An awakening lease held as an `AwakeningLease` node."""
+
+    def __init__(self, graph: "Neo4jGraph", agent_id: str):
+        super().__init__(agent_id, graph.lease_ttl, graph.lease_poll_interval)
+        self.graph = graph
+
+    def _try_acquire(self, now: float) -> bool:
+        record = self.graph._write_single(ACQUIRE_LEASE, agent_id=self.agent_id, owner=self.owner,
+                                          now=now, expires_at=now + self.ttl)
+        return bool(record and record["acquired"])
+
+    def _renew(self, now: float) -> None:
+        self.graph._write(RENEW_LEASE, agent_id=self.agent_id, owner=self.owner, expires_at=now + self.ttl)
+
+    def _release(self) -> None:
+        self.graph._write(RELEASE_LEASE, agent_id=self.agent_id, owner=self.owner)
+
+
+class Neo4jGraph(BaseKnowledgeGraph):
+    """
+    A KnowledgeGraph backed by Neo4j.
+
+    The driver keeps a pool of Bolt connections; every call borrows a session
+    from it for one managed transaction, which the driver retries on transient
+    errors (leader changes, deadlocks). All Cypher is parameterised so plans
+    are cached server-side. Writes are batched with UNWIND: saving N identities
+    costs ceil(N / batch_size) round trips rather than one per node.
+
+    Identities are stored as `(:Identity {agent_id})` nodes linked to shared
+    `(:CoreValue)` and `(:Interest)` nodes. The nodes of the Phoenix schema
+    (docs/phoenix_example.md) can be bulk-loaded with `upsert_nodes` and
+    `upsert_relationships`.
+    """
+
+    def __init__(self, uri: Optional[str] = None, auth: Optional[Tuple[str, str]] = None,
+                 database: Optional[str] = None, driver: Any = None,
+                 max_connection_pool_size: int = 50, connection_acquisition_timeout: float = 60.0,
+                 batch_size: int = 500, bootstrap: bool = True,
+                 lease_ttl: float = 300.0, lease_poll_interval: float = 0.05,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            uri: The Bolt or Neo4j URI, e.g. "neo4j://localhost:7687".
+            auth: A (user, password) pair.
+            database: The database to use, or None for the server default.
+            driver: A ready-made driver (shared between graphs, or a stand-in
+                    in tests); `uri`, `auth` and the pool settings are then
+                    ignored and the caller remains responsible for closing it.
+            max_connection_pool_size: The most Bolt connections the driver opens.
+            connection_acquisition_timeout: Seconds to wait for a free connection.
+            batch_size: The most rows sent in one UNWIND statement.
+            bootstrap: Create the constraints and indexes on construction.
+            lease_ttl: Seconds an awakening lease outlives its last renewal.
+            lease_poll_interval: The initial delay between attempts to take a
+                                 lease held elsewhere.
+            clock: Wall-clock time source for `updated_at`, injectable for tests.
+        """
+        self._owns_driver = driver is None
+        if driver is None:
+            try:
+                from neo4j import GraphDatabase
+            except ImportError as e:
+                raise ImportError("Neo4jGraph requires the 'neo4j' package: pip install neo4j") from e
+            driver = GraphDatabase.driver(uri, auth=auth, max_connection_pool_size=max_connection_pool_size,
+                                          connection_acquisition_timeout=connection_acquisition_timeout)
+        self.driver = driver
+        self.database = database
+        self.batch_size = batch_size
+        self.lease_ttl = lease_ttl
+        self.lease_poll_interval = lease_poll_interval
+        self._clock = clock
+        if bootstrap:
+            self.bootstrap()
+
+    def _session(self) -> Any:
+        return self.driver.session(database=self.database) if self.database else self.driver.session()
+
+    def _write(self, query: str, **params: Any) -> None:
+        with self._session() as session:
+            session.execute_write(lambda tx: tx.run(query, params).consume())
+
+    def _write_single(self, query: str, **params: Any) -> Any:
+        with self._session() as session:
+            return session.execute_write(lambda tx: tx.run(query, params).single())
+
+    def _read_single(self, query: str, **params: Any) -> Any:
+        with self._session() as session:
+            return session.execute_read(lambda tx: tx.run(query, params).single())
+
+    def bootstrap(self) -> None:
+        """Creates the constraints and indexes. Safe to run repeatedly."""
+        # Schema changes cannot share a transaction with each other or with data writes.
+        for statement in SCHEMA_STATEMENTS:
+            self._write(statement)
+        logger.info("Neo4j constraints and indexes are in place.")
+
+    def _identity_row(self, agent_id: str, identity: Dict[str, Any], now: float) -> Dict[str, Any]:
+        values = identity.get("core_values") or []
+        interests = identity.get("interests") or []
+        return {
+            "agent_id": agent_id,
+            "name": identity.get("name"),
+            "data": json.dumps(identity, ensure_ascii=False),
+            "updated_at": now,
+            "core_values": [{"text": str(v), "rank": rank} for rank, v in enumerate(values)],
+            "interests": list(dict.fromkeys(str(i) for i in interests)),
+        }
+
+    def save_identities(self, identities: Mapping[str, Dict[str, Any]]) -> bool:
+        """
+        Saves many identities, keyed by agent ID, with one UNWIND statement per
+        `batch_size` identities. Each batch is its own transaction.
+        """
+        now = self._clock()
+        try:
+            rows = [self._identity_row(agent_id, identity, now) for agent_id, identity in identities.items()]
+        except (TypeError, ValueError) as e:
+            logger.error(f"Identities are not JSON-serializable: {e}")
+            return False
+        try:
+            for batch in _chunks(rows, self.batch_size):
+                self._write(UPSERT_IDENTITIES, rows=list(batch))
+        except Exception as e:
+            logger.error(f"Failed to save identities to Neo4j: {e}")
+            return False
+        return True
+
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        logger.debug(f"Saving identity for agent '{agent_id}' to Neo4j...")
+        return self.save_identities({agent_id: identity})
+
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        return self.get_identity_or_none(agent_id)
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        record = self._read_single(LOAD_IDENTITY, agent_id=agent_id)
+        if record is None or record["data"] is None:
+            return None
+        return json.loads(record["data"])
+
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        record = self._read_single(IDENTITY_EXISTS, agent_id=agent_id)
+        return bool(record and record["found"])
+
+    def find_agents_by_name(self, name: str) -> List[str]:
+        """Returns the IDs of the agents whose identity has the given name."""
+        with self._session() as session:
+            return session.execute_read(
+                lambda tx: [record["agent_id"] for record in tx.run(FIND_AGENTS_BY_NAME, {"name": name})]
+            )
+
+    def upsert_nodes(self, label: str, rows: Sequence[Mapping[str, Any]]) -> None:
+        """
+        Creates or updates Phoenix schema nodes in UNWIND batches. Each row must
+        contain the label's key property (see PHOENIX_NODES); its other entries
+        are set as properties.
+        """
+        if label not in PHOENIX_NODES:
+            raise ValueError(f"Unknown Phoenix node label: {label}")
+        key = PHOENIX_NODES[label]
+        # Labels and property names cannot be parameters; both come from the whitelist above.
+        query = f"UNWIND $rows AS row MERGE (n:{label} {{{key}: row.{key}}}) SET n += row"
+        for batch in _chunks(list(rows), self.batch_size):
+            self._write(query, rows=[dict(row) for row in batch])
+
+    def upsert_relationships(self, start_label: str, rel_type: str, end_label: str,
+                             pairs: Sequence[Tuple[Any, Any]]) -> None:
+        """
+        Creates Phoenix schema relationships in UNWIND batches, given the key
+        values of their start and end nodes. Both nodes must already exist.
+        """
+        if (start_label, rel_type, end_label) not in PHOENIX_RELATIONSHIPS:
+            raise ValueError(f"Unknown Phoenix relationship: ({start_label})-[:{rel_type}]->({end_label})")
+        start_key, end_key = PHOENIX_NODES[start_label], PHOENIX_NODES[end_label]
+        query = (
+            f"UNWIND $pairs AS pair "
+            f"MATCH (a:{start_label} {{{start_key}: pair.start}}) "
+            f"MATCH (b:{end_label} {{{end_key}: pair.end}}) "
+            f"MERGE (a)-[:{rel_type}]->(b)"
+        )
+        rows = [{"start": start, "end": end} for start, end in pairs]
+        for batch in _chunks(rows, self.batch_size):
+            self._write(query, pairs=list(batch))
+
+    def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> AwakeningLease:
+        return _Neo4jLease(self, agent_id)
+
+    def close(self) -> None:
+        """Closes the driver and its connection pool, if this graph created it."""
+        if self._owns_driver:
+            self.driver.close()
@@ -0,0 +1,248 @@
+# ember_protocol/implementations/networkx_graph.py
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional, Set, Tuple
+
+from ..interfaces import DEFAULT_AGENT_ID, BaseKnowledgeGraph
+
+logger = logging.getLogger(__name__)
+
+# Node kinds. Nodes are keyed by (kind, key) tuples so the kinds share one graph.
+AGENT = "agent"
+PERSONA = "persona"
+VALUE = "value"
+INTEREST = "interest"
+
+# Identity fields held on the persona node rather than the agent node.
+PERSONA_FIELDS = ("persona_summary", "communication_style")
+
+# The list fields that are decomposed into shared nodes, with their node kind
+# and edge relation.
+DECOMPOSED_LISTS = {
+    "core_values": (VALUE, "HOLDS_VALUE"),
+    "interests": (INTEREST, "INTERESTED_IN"),
+}
+
+SNAPSHOT_VERSION = 1
+
+
+def _is_term_list(items: Any) -> bool:
+    """Whether a field can be decomposed into term nodes: a list of strings."""
+    return isinstance(items, list) and all(isinstance(item, str) for item in items)
+
+
+def normalize_term(text: str) -> str:
+    """The index key of a value or interest: whitespace-collapsed and casefolded."""
+    return " ".join(str(text).split()).casefold()
+
+
+class NetworkXGraph(BaseKnowledgeGraph):
+    """
+    An in-process KnowledgeGraph that stores identities as a graph rather than
+    as opaque dicts.
+
+    Each identity is decomposed into an agent node, a persona node and edges to
+    shared value and interest nodes (one node per distinct value or interest,
+    matched case-insensitively). Each edge remembers the agent's own spelling
+    and position of the term, including any repeats, so identities load back
+    exactly as they were saved; values and interests that are not lists of
+    strings are kept on the agent node as they are. Secondary indexes from value, interest and
+    name to agent IDs answer queries like `agents_with_interest` in O(result)
+    rather than by scanning every identity, and the graph itself supports
+    traversals such as `related_agents`.
+
+    Snapshots are pickled, so only load snapshots this process (or a trusted
+    one) wrote.
+    """
+
+    def __init__(self):
+        try:
+            import networkx as nx
+        except ImportError as e:
+            raise ImportError("NetworkXGraph requires the 'networkx' package: pip install networkx") from e
+        self.graph = nx.DiGraph()
+        self._by_value: DefaultDict[str, Set[str]] = defaultdict(set)
+        self._by_interest: DefaultDict[str, Set[str]] = defaultdict(set)
+        self._by_name: DefaultDict[str, Set[str]] = defaultdict(set)
+        self._agents: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def _index_for(self, kind: str) -> DefaultDict[str, Set[str]]:
+        return self._by_value if kind == VALUE else self._by_interest
+
+    def _remove(self, agent_id: str) -> None:
+        """Removes the agent's nodes, edges and index entries. Caller holds the lock."""
+        agent = (AGENT, agent_id)
+        if agent not in self.graph:
+            return
+        for target in list(self.graph.successors(agent)):
+            kind, key = target
+            if kind in (VALUE, INTEREST):
+                index = self._index_for(kind)
+                index[key].discard(agent_id)
+                if not index[key]:
+                    del index[key]
+                # Shared nodes are dropped with their last agent.
+                if self.graph.in_degree(target) == 1:
+                    self.graph.remove_node(target)
+        name = self.graph.nodes[agent]["data"].get("name")
+        if isinstance(name, str):
+            self._by_name[name].discard(agent_id)
+            if not self._by_name[name]:
+                del self._by_name[name]
+        self.graph.remove_nodes_from([agent, (PERSONA, agent_id)])
+        self._agents.discard(agent_id)
+
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        logger.debug(f"Saving identity for agent '{agent_id}' to NetworkX graph...")
+        agent = (AGENT, agent_id)
+        attributes = {k: v for k, v in identity.items()
+                      if k not in PERSONA_FIELDS and not (k in DECOMPOSED_LISTS and _is_term_list(v))}
+        persona = {k: identity[k] for k in PERSONA_FIELDS if k in identity}
+        # Remember which fields were present, and in what order, so the identity
+        # round-trips unchanged.
+        fields = tuple(identity)
+
+        with self._lock:
+            self._remove(agent_id)
+            self.graph.add_node(agent, kind=AGENT, fields=fields, data=attributes)
+            self.graph.add_node((PERSONA, agent_id), kind=PERSONA, **persona)
+            self.graph.add_edge(agent, (PERSONA, agent_id), relation="HAS_PERSONA")
+            for field, (kind, relation) in DECOMPOSED_LISTS.items():
+                items = identity.get(field)
+                if not _is_term_list(items):
+                    continue
+                for rank, text in enumerate(items):
+                    key = normalize_term(text)
+                    target = (kind, key)
+                    if target not in self.graph:
+                        self.graph.add_node(target, kind=kind, text=text)
+                    if self.graph.has_edge(agent, target):
+                        # The same term again (perhaps spelled differently): one edge, every occurrence.
+                        self.graph.edges[agent, target]["repeats"].append((rank, text))
+                    else:
+                        self.graph.add_edge(agent, target, relation=relation, rank=rank, text=text, repeats=[])
+                    self._index_for(kind)[key].add(agent_id)
+            name = identity.get("name")
+            if isinstance(name, str):
+                self._by_name[name].add(agent_id)
+            self._agents.add(agent_id)
+        return True
+
+    def _assemble(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Rebuilds the identity dict from the agent's neighbourhood. Caller holds the lock."""
+        agent = (AGENT, agent_id)
+        if agent not in self.graph:
+            return None
+        node = self.graph.nodes[agent]
+        parts: Dict[str, Any] = dict(node["data"])
+        parts.update({k: v for k, v in self.graph.nodes[(PERSONA, agent_id)].items() if k != "kind"})
+        lists: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        for target, edge in self.graph.adj[agent].items():
+            kind = target[0]
+            for field, (field_kind, _) in DECOMPOSED_LISTS.items():
+                if kind == field_kind:
+                    lists[field].append((edge["rank"], edge["text"]))
+                    lists[field].extend(edge.get("repeats", ()))
+        for field in DECOMPOSED_LISTS:
+            if field in node["fields"] and field not in parts:
+                parts[field] = [text for _, text in sorted(lists[field])]
+        return {field: parts[field] for field in node["fields"] if field in parts}
+
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        logger.debug(f"Loading identity for agent '{agent_id}' from NetworkX graph...")
+        with self._lock:
+            return self._assemble(agent_id)
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._assemble(agent_id)
+
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return (AGENT, agent_id) in self.graph
+
+    def delete_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """Removes the agent's identity. Returns whether there was one."""
+        with self._lock:
+            existed = (AGENT, agent_id) in self.graph
+            self._remove(agent_id)
+        return existed
+
+    def agents_with_value(self, value: str) -> Set[str]:
+        """The agents holding `value` among their core values."""
+        with self._lock:
+            return set(self._by_value.get(normalize_term(value), ()))
+
+    def agents_with_interest(self, interest: str) -> Set[str]:
+        """The agents listing `interest` among their interests."""
+        with self._lock:
+            return set(self._by_interest.get(normalize_term(interest), ()))
+
+    def agents_named(self, name: str) -> Set[str]:
+        with self._lock:
+            return set(self._by_name.get(name, ()))
+
+    def related_agents(self, agent_id: str) -> Dict[str, int]:
+        """
+        The other agents sharing at least one value or interest with `agent_id`,
+        with the number they share. Walks agent -> term -> agent, so the cost is
+        proportional to the neighbourhood rather than to the graph.
+        """
+        agent = (AGENT, agent_id)
+        shared: DefaultDict[str, int] = defaultdict(int)
+        with self._lock:
+            if agent not in self.graph:
+                return {}
+            for target in self.graph.successors(agent):
+                if target[0] not in (VALUE, INTEREST):
+                    continue
+                for other in self._index_for(target[0])[target[1]]:
+                    if other != agent_id:
+                        shared[other] += 1
+        return dict(shared)
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Writes the graph and its indexes to `path` in one binary pickle. The
+        file is replaced atomically, so a crash mid-write leaves the previous
+        snapshot intact.
+        """
+        with self._lock:
+            state = (SNAPSHOT_VERSION, self.graph, dict(self._by_value), dict(self._by_interest),
+                     dict(self._by_name))
+            data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ember-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Saved a snapshot of {len(self)} identities ({len(data)} bytes) to {path}.")
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "NetworkXGraph":
+        """Restores a graph written by `save_snapshot`, indexes included."""
+        with open(path, "rb") as f:
+            version, graph, by_value, by_interest, by_name = pickle.load(f)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} in {path}")
+        instance = cls()
+        instance.graph = graph
+        instance._by_value.update(by_value)
+        instance._by_interest.update(by_interest)
+        instance._by_name.update(by_name)
+        instance._agents = {key for kind, key in graph.nodes if kind == AGENT}
+        return instance
+
+    def __len__(self) -> int:
+        return len(self._agents)
@@ -0,0 +1,397 @@
+# ember_protocol/implementations/sqlite_graph.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from ..core.revisions import (DEFAULT_SNAPSHOT_EVERY, SNAPSHOT, RevisionInfo, Timestamp, as_epoch,
+                              encode_revision, replay, rolled_back)
+from ..interfaces import DEFAULT_AGENT_ID, BaseKnowledgeGraph
+from .leases import AwakeningLease
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS identities ("
+    " agent_id TEXT PRIMARY KEY,"
+    " name TEXT,"
+    " identity TEXT NOT NULL,"
+    " updated_at REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS identities_name ON identities (name)",
+    "CREATE INDEX IF NOT EXISTS identities_updated_at ON identities (updated_at)",
+    "CREATE TABLE IF NOT EXISTS identity_revisions ("
+    " agent_id TEXT NOT NULL,"
+    " revision INTEGER NOT NULL,"
+    " saved_at REAL NOT NULL,"
+    " kind TEXT NOT NULL,"
+    " payload TEXT NOT NULL,"
+    " PRIMARY KEY (agent_id, revision)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS identity_revisions_saved_at ON identity_revisions (agent_id, saved_at)",
+    "CREATE TABLE IF NOT EXISTS awakening_leases ("
+    " agent_id TEXT PRIMARY KEY,"
+    " owner TEXT NOT NULL,"
+    " expires_at REAL NOT NULL"
+    ") WITHOUT ROWID",
+)
+
+_UPSERT = (
+    "INSERT INTO identities (agent_id, name, identity, updated_at) VALUES (?, ?, ?, ?)"
+    " ON CONFLICT(agent_id) DO UPDATE SET"
+    " name = excluded.name, identity = excluded.identity, updated_at = excluded.updated_at"
+)
+
+
+_LOG_STATE = (
+    "SELECT MAX(revision), MAX(CASE WHEN kind = 'snapshot' THEN revision END), MAX(saved_at)"
+    " FROM identity_revisions WHERE agent_id = ?"
+)
+
+_INSERT_REVISION = (
+    "INSERT INTO identity_revisions (agent_id, revision, saved_at, kind, payload) VALUES (?, ?, ?, ?, ?)"
+)
+
+
+class _PendingWrite:
+    __slots__ = ("row", "done", "ok")
+
+    def __init__(self, row: tuple):
+        self.row = row
+        self.done = False
+        self.ok = False
+
+
+class _SQLiteLease(AwakeningLease):
+    """
+    An awakening lease held as a row in `awakening_leases`. Its statements go
+    through the graph's writer connection, like every other write, whichever
+    thread (the caller's or the renewer) runs them.
+    """
+
+    def __init__(self, graph: "SQLiteGraph", agent_id: str):
+        super().__init__(agent_id, graph.lease_ttl, graph.lease_poll_interval)
+        self.graph = graph
+
+    def _try_acquire(self, now: float) -> bool:
+        return self.graph._write(
+            "INSERT INTO awakening_leases (agent_id, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(agent_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE awakening_leases.expires_at <= ?",
+            (self.agent_id, self.owner, now + self.ttl, now),
+        ) == 1
+
+    def _renew(self, now: float) -> None:
+        self.graph._write(
+            "UPDATE awakening_leases SET expires_at = ? WHERE agent_id = ? AND owner = ?",
+            (now + self.ttl, self.agent_id, self.owner),
+        )
+
+    def _release(self) -> None:
+        self.graph._write(
+            "DELETE FROM awakening_leases WHERE agent_id = ? AND owner = ?", (self.agent_id, self.owner)
+        )
+
+
+class SQLiteGraph(BaseKnowledgeGraph):
+    """
+    A durable, embedded KnowledgeGraph backed by a single SQLite file, for
+    deployments that want identities to survive restarts without running a
+    graph database.
+
+    - Identities are stored as JSON in a table keyed by agent ID, with a
+      secondary index on the identity's name.
+    - The database runs in WAL mode, so readers (in this process or any other
+      on the host) never block the writer and always see committed data.
+    - Every thread reads through its own connection; a process that forks
+      reopens its connections instead of sharing the parent's.
+    - Concurrent `save_identity` calls are group-committed: the first caller
+      writes everything queued so far in one transaction and the rest wait for
+      it, so N concurrent saves cost one fsync instead of N. Each call still
+      returns only once its identity is durable.
+    - Every save also appends to `identity_revisions`, as the JSON Patch from
+      the previous revision with a full snapshot every `snapshot_every`
+      revisions, so `load_identity(at=...)` and `rollback` can reach any past
+      revision while the latest is still read from `identities` in one lookup.
+    - `awakening_lock` is a lease row, so concurrent first awakenings are
+      coordinated across processes too.
+    """
+
+    def __init__(self, path: str, commit_delay: float = 0.0, max_batch: int = 256,
+                 synchronous: str = "NORMAL", busy_timeout: float = 5.0,
+                 lease_ttl: float = 300.0, lease_poll_interval: float = 0.05,
+                 snapshot_every: int = DEFAULT_SNAPSHOT_EVERY, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: The SQLite database file (created if missing).
+            commit_delay: Seconds the committing caller waits for more saves to
+                          join its batch. 0 batches only saves that are
+                          already queued.
+            max_batch: The most identities written in one transaction.
+            synchronous: SQLite's `synchronous` pragma. NORMAL is durable
+                         across application crashes in WAL mode; use FULL to
+                         also survive power loss.
+            busy_timeout: Seconds to wait for another process's write lock.
+            lease_ttl: Seconds an awakening lease outlives its last renewal.
+            lease_poll_interval: The initial delay between attempts to take a
+                                 lease held elsewhere.
+            snapshot_every: Revisions stored as patches between full snapshots.
+            clock: Wall-clock time source for `updated_at`, injectable for tests.
+        """
+        self.path = path
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.lease_ttl = lease_ttl
+        self.lease_poll_interval = lease_poll_interval
+        self.snapshot_every = snapshot_every
+        self._clock = clock
+        self._open()
+        with self._writer_lock:
+            for statement in _SCHEMA:
+                self._writer.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _open(self) -> None:
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._writer = self._connect()
+        self._pending: List[_PendingWrite] = []
+        self._write_cond = threading.Condition()
+        self._flushing = False
+
+    def _check_fork(self) -> None:
+        # SQLite connections must not cross a fork; the child opens its own.
+        if self._pid != os.getpid():
+            self._open()
+
+    def _connection(self) -> sqlite3.Connection:
+        self._check_fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _write(self, sql: str, parameters: tuple) -> int:
+        """Runs one autocommitted write statement on the writer connection; returns its row count."""
+        self._check_fork()
+        with self._writer_lock:
+            return self._writer.execute(sql, parameters).rowcount
+
+    @staticmethod
+    def _row(agent_id: str, identity: Dict[str, Any], now: float) -> tuple:
+        return agent_id, identity.get("name"), json.dumps(identity, ensure_ascii=False), now
+
+    def _append_revision(self, row: tuple) -> None:
+        """Logs `row` as the agent's next revision. Runs inside the writer's transaction."""
+        agent_id, _, payload, now = row
+        latest, last_snapshot, last_saved_at = self._writer.execute(_LOG_STATE, (agent_id,)).fetchone()
+        previous = None
+        if latest is not None:
+            stored = self._writer.execute("SELECT identity FROM identities WHERE agent_id = ?", (agent_id,)).fetchone()
+            previous = json.loads(stored[0]) if stored is not None else None
+        since_snapshot = latest - last_snapshot + 1 if latest is not None and last_snapshot is not None else 0
+        kind, encoded = encode_revision(previous, json.loads(payload), since_snapshot, self.snapshot_every)
+        saved_at = max(now, last_saved_at) if last_saved_at is not None else now
+        self._writer.execute(_INSERT_REVISION, (agent_id, (latest or 0) + 1, saved_at, kind, encoded))
+
+    def _commit(self, rows: List[tuple]) -> bool:
+        with self._writer_lock:
+            try:
+                self._writer.execute("BEGIN IMMEDIATE")
+                for row in rows:
+                    self._append_revision(row)
+                    self._writer.execute(_UPSERT, row)
+                self._writer.execute("COMMIT")
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"Failed to save {len(rows)} identities to SQLite: {e}")
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                return False
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                raise
+
+    def _flush(self) -> None:
+        """
+        Commits the queued saves as one batch. Only one caller flushes at a
+        time. If the flush is interrupted, its batch fails and the next waiting
+        caller takes over.
+        """
+        batch: List[_PendingWrite] = []
+        ok = False
+        try:
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._write_cond:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+            ok = self._commit([write.row for write in batch]) if batch else True
+        finally:
+            with self._write_cond:
+                for write in batch:
+                    write.ok = ok
+                    write.done = True
+                self._flushing = False
+                self._write_cond.notify_all()
+        if len(batch) > 1:
+            logger.debug(f"Group-committed {len(batch)} identities.")
+
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        self._check_fork()
+        logger.debug(f"Saving identity for agent '{agent_id}' to SQLite graph...")
+        try:
+            write = _PendingWrite(self._row(agent_id, identity, self._clock()))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Identity for agent '{agent_id}' is not JSON-serializable: {e}")
+            return False
+        with self._write_cond:
+            self._pending.append(write)
+        while True:
+            with self._write_cond:
+                while self._flushing and not write.done:
+                    self._write_cond.wait()
+                if write.done:
+                    return write.ok
+                self._flushing = True
+            self._flush()
+
+    def save_identities(self, identities: Mapping[str, Dict[str, Any]]) -> bool:
+        """
+        Saves many identities, keyed by agent ID, in a single transaction:
+        either all of them are stored or none are.
+        """
+        self._check_fork()
+        now = self._clock()
+        try:
+            rows = [self._row(agent_id, identity, now) for agent_id, identity in identities.items()]
+        except (TypeError, ValueError) as e:
+            logger.error(f"Identities are not JSON-serializable: {e}")
+            return False
+        return self._commit(rows) if rows else True
+
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID,
+                      at: Optional[Timestamp] = None) -> Optional[Dict[str, Any]]:
+        """
+        Loads the agent's identity; with `at` (a datetime or epoch seconds), the
+        revision that was current at that moment.
+        """
+        if at is None:
+            return self.get_identity_or_none(agent_id)
+        row = self._connection().execute(
+            "SELECT MAX(revision) FROM identity_revisions WHERE agent_id = ? AND saved_at <= ?",
+            (agent_id, as_epoch(at)),
+        ).fetchone()
+        return self.load_revision(row[0], agent_id) if row[0] is not None else None
+
+    def load_revision(self, revision: int, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """The agent's identity as of the given revision number."""
+        conn = self._connection()
+        # One read transaction, so a concurrent save cannot land between the two queries.
+        conn.execute("BEGIN")
+        try:
+            base = conn.execute(
+                "SELECT MAX(revision) FROM identity_revisions WHERE agent_id = ? AND revision <= ? AND kind = ?",
+                (agent_id, revision, SNAPSHOT),
+            ).fetchone()[0]
+            if base is None:
+                return None
+            entries = conn.execute(
+                "SELECT kind, payload FROM identity_revisions"
+                " WHERE agent_id = ? AND revision BETWEEN ? AND ? ORDER BY revision",
+                (agent_id, base, revision),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        # Fewer entries than asked for means `revision` is past the latest one.
+        return replay(entries) if len(entries) == revision - base + 1 else None
+
+    def list_revisions(self, agent_id: str = DEFAULT_AGENT_ID) -> List[RevisionInfo]:
+        """The stored revisions of the agent's identity, oldest first."""
+        rows = self._connection().execute(
+            "SELECT revision, saved_at, kind, LENGTH(CAST(payload AS BLOB)) FROM identity_revisions"
+            " WHERE agent_id = ? ORDER BY revision", (agent_id,)
+        ).fetchall()
+        return [RevisionInfo(*row) for row in rows]
+
+    def rollback(self, revision: int, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """
+        Restores the identity of an earlier revision by saving it as a new one,
+        so the history itself is never rewritten. Returns the restored identity,
+        or None if there is no such revision or it could not be saved.
+        """
+        old = self.load_revision(revision, agent_id)
+        if old is None:
+            return None
+        latest = self._connection().execute(
+            "SELECT MAX(revision) FROM identity_revisions WHERE agent_id = ?", (agent_id,)
+        ).fetchone()[0]
+        restored = rolled_back(old, latest + 1)
+        return restored if self.save_identity(restored, agent_id) else None
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT identity FROM identities WHERE agent_id = ?", (agent_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM identities WHERE agent_id = ?", (agent_id,)
+        ).fetchone() is not None
+
+    def find_agents_by_name(self, name: str) -> List[str]:
+        """Returns the IDs of the agents whose identity has the given name."""
+        rows = self._connection().execute(
+            "SELECT agent_id FROM identities WHERE name = ? ORDER BY agent_id", (name,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """Removes the agent's identity and its revision history. Returns whether there was one."""
+        self._check_fork()
+        with self._writer_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.execute("DELETE FROM identity_revisions WHERE agent_id = ?", (agent_id,))
+                deleted = self._writer.execute("DELETE FROM identities WHERE agent_id = ?", (agent_id,)).rowcount > 0
+                self._writer.execute("COMMIT")
+            except sqlite3.Error:
+                self._writer.execute("ROLLBACK")
+                raise
+            return deleted
+
+    def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> AwakeningLease:
+        return _SQLiteLease(self, agent_id)
+
+    def close(self) -> None:
+        """Closes every connection this graph opened in the current process."""
+        if self._pid != os.getpid():
+            return
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        with self._writer_lock:
+            self._writer.close()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM identities").fetchone()[0]
@@ -0,0 +1,452 @@
+# ember_protocol/implementations/transport.py
+
+import http.client
+import json
+import logging
+import random
+import ssl
+import threading
+import time
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a reused keep-alive connection is assumed to have been
+# closed by the server, so the request is replayed once on a fresh connection.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class TransportError(Exception):
+    """Base class for errors raised by the pooled transport."""
+    pass
+
+
+class HTTPStatusError(TransportError):
+    """The server answered with an error status."""
+
+    def __init__(self, status: int, body: bytes, headers: Optional[Mapping[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.headers = dict(headers or {})
+        super().__init__(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+
+
+class CircuitOpenError(TransportError):
+    """The provider's circuit breaker is open; the request was not sent."""
+    pass
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8"))
+
+
+# --- Connection pooling ---
+
+class ConnectionPool:
+    """
+    A thread-safe pool of keep-alive HTTP(S) connections to a single host.
+
+    Idle connections are reused most-recently-used first, so TCP and TLS
+    handshakes are paid once per connection rather than once per prompt. At
+    most `max_connections` requests are in flight at a time.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 10, timeout: float = 120.0,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        """
+        Args:
+            base_url: Scheme, host, optional port and optional path prefix,
+                      e.g. "https://api.openai.com".
+            max_connections: Upper bound on open connections (and concurrent requests).
+            timeout: Socket timeout, in seconds, for connecting and for each read.
+            ssl_context: TLS settings for https URLs; defaults to the system's.
+        """
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme!r}")
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname or ""
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._ssl_context = ssl_context
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.connections_created = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_created += 1
+        if self.scheme == "https":
+            context = self._ssl_context or ssl.create_default_context()
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append(connection)
+
+    def _send(self, method: str, path: str, body: Optional[bytes],
+              headers: Mapping[str, str]) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        connection, reused = self._checkout()
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=dict(headers))
+            return connection, connection.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused:
+                raise
+        except BaseException:
+            connection.close()
+            raise
+        logger.debug("Pooled connection went stale; retrying on a fresh one.")
+        connection = self._connect()
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=dict(headers))
+            return connection, connection.getresponse()
+        except BaseException:
+            connection.close()
+            raise
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Mapping[str, str]] = None) -> HTTPResponse:
+        """Sends one request and reads the whole response."""
+        with self._slots:
+            connection, response = self._send(method, path, body, headers or {})
+            try:
+                data = response.read()
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(connection)
+            return HTTPResponse(response.status, dict(response.getheaders()), data)
+
+    def stream(self, method: str, path: str, body: Optional[bytes] = None,
+               headers: Optional[Mapping[str, str]] = None) -> Iterator[bytes]:
+        """
+        Sends one request and yields the response body line by line.
+
+        The connection is returned to the pool only if the body is read to the
+        end; closing the generator early closes the connection, which is how
+        an in-flight generation is cancelled. An error status is raised as
+        HTTPStatusError before anything is yielded.
+        """
+        with self._slots:
+            connection, response = self._send(method, path, body, headers or {})
+            finished = False
+            try:
+                if response.status >= 400:
+                    data = response.read()
+                    finished = True
+                    raise HTTPStatusError(response.status, data, dict(response.getheaders()))
+                while True:
+                    line = response.readline()
+                    if not line:
+                        finished = True
+                        return
+                    yield line
+            finally:
+                if finished and not response.will_close:
+                    self._checkin(connection)
+                else:
+                    connection.close()
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def __len__(self) -> int:
+        """The number of idle connections."""
+        return len(self._idle)
+
+
+# --- Retries ---
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the n-th retry waits a random time
+    between 0 and min(max_delay, base_delay * 2**(n-1)), or the server's
+    Retry-After, whichever is longer.
+    """
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 500, 502, 503, 504}))
+
+    def delay(self, retry_number: int, retry_after: Optional[float] = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        backoff = random.uniform(0, ceiling)
+        if retry_after is not None:
+            return min(self.max_delay, max(backoff, retry_after))
+        return backoff
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    for key, value in headers.items():
+        if key.lower() == "retry-after":
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+    return None
+
+
+# --- Circuit breaking ---
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a provider that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    request fails fast with CircuitOpenError. Once `reset_timeout` seconds have
+    passed, a single trial request is let through (half-open): success closes
+    the circuit, failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after repeated provider failures.")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker_for(provider: str) -> CircuitBreaker:
+    """The process-wide circuit breaker of a provider, shared by all its clients."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker()
+        return breaker
+
+
+# --- The transport ---
+
+class PooledTransport:
+    """
+    JSON-over-HTTP to one LLM provider: a keep-alive connection pool, retries
+    with backoff and jitter on 429/5xx and network errors, a circuit breaker,
+    and optional hedging.
+
+    With `hedge_after` set, a request that has not completed after that many
+    seconds is sent a second time on another connection and whichever answer
+    arrives first is used. This trims tail latency at the price of an
+    occasional duplicate (billed) call, so it is off by default.
+    """
+
+    def __init__(self, base_url: str, headers: Optional[Mapping[str, str]] = None,
+                 provider: Optional[str] = None, max_connections: int = 10, timeout: float = 120.0,
+                 retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 hedge_after: Optional[float] = None, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            base_url: The provider's API root.
+            headers: Sent with every request (authentication, API version...).
+            provider: Selects the shared circuit breaker when `breaker` is not given.
+            max_connections: Size of the keep-alive pool.
+            timeout: Socket timeout in seconds.
+            retry: Backoff policy; defaults to RetryPolicy().
+            breaker: Circuit breaker; defaults to the provider's shared one, or
+                     a private one if no provider is named.
+            hedge_after: Seconds after which a slow request is hedged, or None.
+            sleep: Used between retries; injectable for tests.
+        """
+        self.pool = ConnectionPool(base_url, max_connections, timeout)
+        self.headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        self.headers.update(headers or {})
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or (circuit_breaker_for(provider) if provider else CircuitBreaker())
+        self.hedge_after = hedge_after
+        self._sleep = sleep
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        self.hedges = 0
+
+    def _attempt(self, operation: Callable[[], Any]) -> Any:
+        """Runs `operation` under the circuit breaker and retry policy."""
+        retry_number = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError("circuit open; provider is failing, not sending request")
+            retry_after = None
+            try:
+                result = operation()
+            except HTTPStatusError as e:
+                error: Exception = e
+                if e.status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    # The provider is up; a 4xx is about this request.
+                    self.breaker.record_success()
+                if e.status not in self.retry.retry_statuses:
+                    raise
+                retry_after = _retry_after(e.headers)
+            except (OSError, http.client.HTTPException) as e:
+                self.breaker.record_failure()
+                error = e
+            else:
+                self.breaker.record_success()
+                return result
+
+            retry_number += 1
+            if retry_number >= self.retry.max_attempts:
+                raise error
+            delay = self.retry.delay(retry_number, retry_after)
+            logger.warning(f"LLM request failed ({error}); retry {retry_number} in {delay:.2f}s.")
+            self._sleep(delay)
+
+    def _request(self, path: str, body: bytes) -> HTTPResponse:
+        response = self.pool.request("POST", path, body, self.headers)
+        if response.status >= 400:
+            raise HTTPStatusError(response.status, response.body, response.headers)
+        return response
+
+    def _hedged_request(self, path: str, body: bytes) -> HTTPResponse:
+        if self.hedge_after is None:
+            return self._request(path, body)
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.pool.max_connections,
+                                                      thread_name_prefix="ember-hedge")
+        futures: List[Future] = [self._hedge_pool.submit(self._request, path, body)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            with self._hedge_lock:
+                self.hedges += 1
+            logger.info(f"LLM request slower than {self.hedge_after}s; hedging.")
+            futures.append(self._hedge_pool.submit(self._request, path, body))
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def post_json(self, path: str, payload: Any) -> Any:
+        """POSTs `payload` as JSON and returns the decoded JSON response."""
+        body = json.dumps(payload).encode("utf-8")
+        return self._attempt(lambda: self._hedged_request(path, body)).json()
+
+    def stream_events(self, path: str, payload: Any) -> Iterator[str]:
+        """
+        POSTs `payload` and yields the `data:` payloads of the server-sent
+        event stream that comes back. Opening the stream is retried like any
+        request; once data is flowing, errors propagate to the caller.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        headers = dict(self.headers, Accept="text/event-stream")
+
+        def open_stream() -> Tuple[Iterator[bytes], Optional[bytes]]:
+            lines = self.pool.stream("POST", path, body, headers)
+            try:
+                return lines, next(lines)
+            except StopIteration:
+                return lines, None
+            except BaseException:
+                lines.close()
+                raise
+
+        lines, first = self._attempt(open_stream)
+        try:
+            line = first
+            while line is not None:
+                text = line.decode("utf-8").rstrip("\r\n")
+                if text.startswith("data:"):
+                    yield text[5:].lstrip()
+                line = next(lines, None)
+        finally:
+            lines.close()
+
+    def close(self) -> None:
+        self.pool.close()
+        with self._hedge_lock:
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+                self._hedge_pool = None
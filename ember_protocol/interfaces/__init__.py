@@ -1,13 +1,38 @@
-"""Interfaces for pluggable components of the Ember Protocol."""
+"""
+Interfaces for pluggable components of the Ember Protocol.
 
-from .genesis_data_source import GenesisDataSource
-from .knowledge_graph import KnowledgeGraph
-from .llm_interface import LLMInterface
+These are the only definitions of the interfaces; `ember_protocol.core`
+re-exports them. Each is a runtime-checkable `typing.Protocol` made of its
+required methods only, so anything that implements those matches it, with or
+without subclassing. The `Base*` classes add defaults for the optional methods;
+subclass one of them to inherit those. Use `capabilities()` to see what a
+component offers beyond the protocol, and `optional_method()` to call an
+optional method with a fallback to its default.
+"""
+
+from .capabilities import Capabilities, capabilities, optional_method
+from .genesis_data_source import (DEFAULT_CHUNK_SIZE, AsyncGenesisDataSource, BaseAsyncGenesisDataSource,
+                                  BaseGenesisDataSource, GenesisDataSource)
+from .knowledge_graph import (DEFAULT_AGENT_ID, AsyncKnowledgeGraph, BaseAsyncKnowledgeGraph, BaseKnowledgeGraph,
+                              KnowledgeGraph)
+from .llm_interface import AsyncLLMInterface, BaseAsyncLLMInterface, BaseLLMInterface, LLMInterface
 
 __all__ = [
     "GenesisDataSource",
     "KnowledgeGraph",
-    "LLMInterface"
+    "LLMInterface",
+    "AsyncGenesisDataSource",
+    "AsyncKnowledgeGraph",
+    "AsyncLLMInterface",
+    "BaseGenesisDataSource",
+    "BaseKnowledgeGraph",
+    "BaseLLMInterface",
+    "BaseAsyncGenesisDataSource",
+    "BaseAsyncKnowledgeGraph",
+    "BaseAsyncLLMInterface",
+    "Capabilities",
+    "capabilities",
+    "optional_method",
+    "DEFAULT_AGENT_ID",
+    "DEFAULT_CHUNK_SIZE",
 ]
-
-pass
\ No newline at end of file
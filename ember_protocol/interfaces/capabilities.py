@@ -0,0 +1,84 @@
+import inspect
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .genesis_data_source import BaseAsyncGenesisDataSource, BaseGenesisDataSource
+from .llm_interface import BaseAsyncLLMInterface, BaseLLMInterface
+
+# The inherited, non-streaming defaults; a component whose class still uses
+# one of these does not really stream.
+_DEFAULT_STREAMS = frozenset({
+    BaseLLMInterface.stream_prompt,
+    BaseAsyncLLMInterface.stream_prompt,
+    BaseGenesisDataSource.iter_genesis_chunks,
+    BaseAsyncGenesisDataSource.iter_genesis_chunks,
+})
+
+# The method whose kind (coroutine or not) decides whether a component is async.
+_PRIMARY_METHODS = ("prompt", "load_identity", "load_genesis_content")
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """
+    What a data source, graph or LLM offers beyond its protocol's required
+    methods, so callers can pick the fastest path up front instead of trying
+    a call and falling back.
+    """
+    supports_async: bool = False   # Its methods are coroutines.
+    supports_batch: bool = False   # It can save many identities in one round trip (`save_identities`).
+    supports_stream: bool = False  # Its `stream_prompt` / `iter_genesis_chunks` really stream.
+
+
+def _flag(component: Any, name: str) -> Any:
+    # Only a real bool counts, so mocks that answer every attribute are inferred instead.
+    value = getattr(component, name, None)
+    return value if isinstance(value, bool) else None
+
+
+def _infer_async(component: Any) -> bool:
+    for name in _PRIMARY_METHODS:
+        method = getattr(component, name, None)
+        if method is not None:
+            return inspect.iscoroutinefunction(method)
+    return False
+
+
+def _infer_stream(component: Any) -> bool:
+    for name in ("stream_prompt", "iter_genesis_chunks"):
+        method = getattr(type(component), name, None)
+        if method is not None:
+            return method not in _DEFAULT_STREAMS
+    return False
+
+
+def capabilities(component: Any) -> Capabilities:
+    """
+    Reports the capabilities of a component.
+
+    A component can declare any of them as a bool class attribute or property
+    named like the Capabilities field (`supports_stream = True`); the rest are
+    inferred from the methods it has.
+    """
+    supports_async = _flag(component, "supports_async")
+    supports_batch = _flag(component, "supports_batch")
+    supports_stream = _flag(component, "supports_stream")
+    return Capabilities(
+        supports_async=_infer_async(component) if supports_async is None else supports_async,
+        supports_batch=callable(getattr(component, "save_identities", None)) if supports_batch is None
+        else supports_batch,
+        supports_stream=_infer_stream(component) if supports_stream is None else supports_stream,
+    )
+
+
+def optional_method(component: Any, name: str, base: type) -> Callable[..., Any]:
+    """
+    Returns the component's optional method `name`, or, if it does not have
+    one, the default that `base` (e.g. BaseKnowledgeGraph) defines, bound to
+    the component. Callers use this instead of assuming that a component
+    which only implements its protocol's required methods has the rest.
+    """
+    method = getattr(component, name, None)
+    if callable(method):
+        return method
+    return getattr(base, name).__get__(component)
@@ -1,13 +1,19 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from typing import AsyncIterator, Iterator, Protocol, runtime_checkable
 
-class GenesisDataSource(ABC):
+# Default number of characters per chunk when streaming a genesis source.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+@runtime_checkable
+class GenesisDataSource(Protocol):
     """
     Abstract interface for providing the foundational "genesis source" or "soul seed" data.
 
     This class defines the contract for any data source that wants to provide
     the initial context for an AI's identity. Developers can create their own
     concrete implementations to load data from a file, a database, a web API,
-    or any other source.
+    or any other source. Only `load_genesis_content` is required; subclass
+    `BaseGenesisDataSource` for a default `iter_genesis_chunks`.
     """
 
     @abstractmethod
@@ -21,3 +27,73 @@ class GenesisDataSource(ABC):
             A string containing the entire genesis text.
         """
         pass
+
+
+class BaseGenesisDataSource(GenesisDataSource):
+    """A GenesisDataSource with a default for the optional `iter_genesis_chunks`."""
+
+    def iter_genesis_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yields the genesis text as a sequence of chunks of at most `chunk_size`
+        characters, in order. Joining the chunks gives `load_genesis_content()`.
+
+        Chunks are measured in decoded characters, so a multi-byte character is
+        never split between two chunks. Sources that can be very large (journal
+        exports, chat logs) should override this to read incrementally in
+        constant memory; the default loads the whole text and slices it.
+
+        Args:
+            chunk_size: The maximum number of characters per chunk.
+
+        Yields:
+            Consecutive, non-empty pieces of the genesis text.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        content = self.load_genesis_content()
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+
+@runtime_checkable
+class AsyncGenesisDataSource(Protocol):
+    """
+    Asynchronous counterpart of :class:`GenesisDataSource`.
+
+    Implement this when the genesis source lives behind non-blocking I/O
+    (an async database driver, an HTTP API, ...) so that loading it never
+    blocks the event loop. Subclass `BaseAsyncGenesisDataSource` for a default
+    `iter_genesis_chunks`.
+    """
+
+    @abstractmethod
+    async def load_genesis_content(self) -> str:
+        """
+        Loads and returns the full text content of the genesis source.
+
+        Returns:
+            A string containing the entire genesis text.
+        """
+        pass
+
+
+class BaseAsyncGenesisDataSource(AsyncGenesisDataSource):
+    """An AsyncGenesisDataSource with a default for the optional `iter_genesis_chunks`."""
+
+    async def iter_genesis_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[str]:
+        """
+        Yields the genesis text as consecutive chunks of at most `chunk_size`
+        characters. See `BaseGenesisDataSource.iter_genesis_chunks`; the default
+        loads the whole text and slices it.
+
+        Args:
+            chunk_size: The maximum number of characters per chunk.
+
+        Yields:
+            Consecutive, non-empty pieces of the genesis text.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        content = await self.load_genesis_content()
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
@@ -1,15 +1,38 @@
-from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from abc import abstractmethod
+from contextlib import asynccontextmanager, nullcontext
+from typing import (Any, AsyncContextManager, AsyncIterator, ContextManager, Dict, List, Optional, Protocol,
+                    runtime_checkable)
 
-class KnowledgeGraph(ABC):
+# The agent ID used when a caller does not name one, so single-agent
+# applications can ignore keying altogether.
+DEFAULT_AGENT_ID = "default"
+
+
+@asynccontextmanager
+async def _null_async_context() -> AsyncIterator[None]:
+    yield
+
+
+@runtime_checkable
+class KnowledgeGraph(Protocol):
     """
     Abstract interface for interacting with the AI's "brain" or knowledge graph.
     This abstracts the database technology (e.g., Neo4j, in-memory, etc.),
     allowing the protocol to be database-agnostic.
+
+    A single graph can hold the identities of many agents (or tenants); every
+    method takes the `agent_id` that the identity is keyed by.
+
+    Only the three methods below are required; implement them by subclassing
+    or not, and `isinstance(graph, KnowledgeGraph)` holds either way. The
+    optional `get_identity_or_none`, `awakening_lock` and `save_revision` are
+    described, with their defaults, on `BaseKnowledgeGraph`. Graphs with a
+    bulk `save_identities(identities)` are reported as supporting batches by
+    `capabilities()`.
     """
 
     @abstractmethod
-    def save_identity(self, identity: Dict[str, Any]) -> bool:
+    def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
         """
         Saves the complete, newly awakened identity to the knowledge graph.
 
@@ -17,6 +40,7 @@ class KnowledgeGraph(ABC):
 
         Args:
             identity: A dictionary containing the AI's full identity profile.
+            agent_id: The agent the identity belongs to.
 
         Returns:
             True if the identity was saved successfully, False otherwise.
@@ -24,26 +48,202 @@ class KnowledgeGraph(ABC):
         pass
 
     @abstractmethod
-    def load_identity(self) -> Optional[Dict[str, Any]]:
+    def load_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
         """
         Loads the permanent identity from the knowledge graph.
 
         This method is used on subsequent runs after an AI has already been awakened.
         It must be implemented by any concrete subclass.
 
+        Args:
+            agent_id: The agent whose identity should be loaded.
+
         Returns:
             The AI's identity as a dictionary if found, otherwise None.
         """
         pass
 
     @abstractmethod
-    def identity_exists(self) -> bool:
+    def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
         """
         Checks if a permanent identity already exists in the knowledge graph.
 
         This method must be implemented by any concrete subclass.
 
+        Args:
+            agent_id: The agent to check for.
+
+        Returns:
+            True if an identity exists, False otherwise.
+        """
+        pass
+
+
+class BaseKnowledgeGraph(KnowledgeGraph):
+    """
+    A KnowledgeGraph with defaults for the optional methods. Subclass it to
+    inherit them, and override them with faster backend-specific versions.
+    """
+
+    def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """
+        Loads the identity in a single call, or returns None if there is none.
+
+        This is the method the discovery service uses on its hot path, so a
+        backend should override it with a single round trip to its store. The
+        default implementation falls back to `identity_exists` followed by
+        `load_identity` so existing subclasses keep working unchanged.
+
+        Args:
+            agent_id: The agent whose identity should be loaded.
+
+        Returns:
+            The AI's identity as a dictionary if found, otherwise None.
+        """
+        if not self.identity_exists(agent_id):
+            return None
+        return self.load_identity(agent_id)
+
+    def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> ContextManager[Any]:
+        """
+        Returns a context manager that is held while a new identity is being
+        synthesized for the agent.
+
+        The discovery service already ensures that only one thread per process
+        awakens a given agent. Backends shared by several processes should
+        override this with a lock or lease in the store itself (a row lock, an
+        advisory lock, a lease node with an expiry, ...) so that concurrent
+        first requests across processes do not each pay for a synthesis.
+        The default is a no-op.
+
+        Args:
+            agent_id: The agent being awakened.
+
+        Returns:
+            A context manager that holds the lock for the duration of the block.
+        """
+        return nullcontext()
+
+    def save_revision(self, identity: Dict[str, Any], patch: List[Dict[str, Any]],
+                      agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """
+        Saves an evolved identity as a new revision of the agent's identity.
+
+        Backends that keep a revision history should override this and may
+        store `patch` instead of the whole identity. The default simply saves
+        the new identity, replacing the previous one.
+
+        Args:
+            identity: The complete evolved identity.
+            patch: The JSON Patch (RFC 6902) that turns the previous revision
+                   into `identity`.
+            agent_id: The agent the identity belongs to.
+
+        Returns:
+            True if the revision was saved successfully, False otherwise.
+        """
+        return self.save_identity(identity, agent_id)
+
+
+@runtime_checkable
+class AsyncKnowledgeGraph(Protocol):
+    """
+    Asynchronous counterpart of :class:`KnowledgeGraph`.
+
+    Every method is a coroutine so that graph round trips can be awaited
+    without blocking the event loop. As the method names match the
+    synchronous protocol, tell the two apart with `capabilities()` rather
+    than `isinstance`. Subclass `BaseAsyncKnowledgeGraph` for defaults of the
+    optional methods.
+    """
+
+    @abstractmethod
+    async def save_identity(self, identity: Dict[str, Any], agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """
+        Saves the complete, newly awakened identity to the knowledge graph.
+
+        Args:
+            identity: A dictionary containing the AI's full identity profile.
+            agent_id: The agent the identity belongs to.
+
+        Returns:
+            True if the identity was saved successfully, False otherwise.
+        """
+        pass
+
+    @abstractmethod
+    async def load_identity(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """
+        Loads the permanent identity from the knowledge graph.
+
+        Args:
+            agent_id: The agent whose identity should be loaded.
+
+        Returns:
+            The AI's identity as a dictionary if found, otherwise None.
+        """
+        pass
+
+    @abstractmethod
+    async def identity_exists(self, agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """
+        Checks if a permanent identity already exists in the knowledge graph.
+
+        Args:
+            agent_id: The agent to check for.
+
         Returns:
             True if an identity exists, False otherwise.
         """
-        pass
\ No newline at end of file
+        pass
+
+
+class BaseAsyncKnowledgeGraph(AsyncKnowledgeGraph):
+    """An AsyncKnowledgeGraph with defaults for the optional methods."""
+
+    async def get_identity_or_none(self, agent_id: str = DEFAULT_AGENT_ID) -> Optional[Dict[str, Any]]:
+        """
+        Loads the identity in a single call, or returns None if there is none.
+
+        Backends should override this with a single round trip; the default
+        falls back to `identity_exists` followed by `load_identity`.
+
+        Args:
+            agent_id: The agent whose identity should be loaded.
+
+        Returns:
+            The AI's identity as a dictionary if found, otherwise None.
+        """
+        if not await self.identity_exists(agent_id):
+            return None
+        return await self.load_identity(agent_id)
+
+    def awakening_lock(self, agent_id: str = DEFAULT_AGENT_ID) -> AsyncContextManager[Any]:
+        """
+        Returns an async context manager that is held while a new identity is
+        being synthesized for the agent. See `BaseKnowledgeGraph.awakening_lock`;
+        the default is a no-op.
+
+        Args:
+            agent_id: The agent being awakened.
+
+        Returns:
+            An async context manager that holds the lock for the duration of the block.
+        """
+        return _null_async_context()
+
+    async def save_revision(self, identity: Dict[str, Any], patch: List[Dict[str, Any]],
+                            agent_id: str = DEFAULT_AGENT_ID) -> bool:
+        """
+        Saves an evolved identity as a new revision. See
+        `BaseKnowledgeGraph.save_revision`; the default saves the new identity.
+
+        Args:
+            identity: The complete evolved identity.
+            patch: The JSON Patch that turns the previous revision into `identity`.
+            agent_id: The agent the identity belongs to.
+
+        Returns:
+            True if the revision was saved successfully, False otherwise.
+        """
+        return await self.save_identity(identity, agent_id)
@@ -1,10 +1,15 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from typing import AsyncIterator, Iterator, Protocol, runtime_checkable
 
-class LLMInterface(ABC):
+@runtime_checkable
+class LLMInterface(Protocol):
     """
     Abstract interface for communicating with a Large Language Model (LLM)
     for reasoning, analysis, and generation tasks. This allows the protocol
     to work with any LLM (e.g., Gemini, OpenAI, Claude, local models).
+
+    Only `prompt` is required. An LLM with a streaming API may also provide
+    `stream_prompt`; see `BaseLLMInterface` for its contract and default.
     """
 
     @abstractmethod
@@ -24,3 +29,69 @@ class LLMInterface(ABC):
             The text response generated by the LLM.
         """
         pass
+
+
+class BaseLLMInterface(LLMInterface):
+    """
+    An LLMInterface with a default for the optional `stream_prompt`.
+
+    Subclass it to inherit the default. An LLM that overrides `stream_prompt`
+    is reported by `capabilities()` as supporting streams, and the discovery
+    service then streams by default.
+    """
+
+    def stream_prompt(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """
+        Sends a prompt and yields the response incrementally, as the LLM
+        generates it. Joining the pieces gives the same text as `prompt`.
+
+        Override this for LLMs with a streaming API; the service can then stop
+        a generation early once it has gone off-schema. Closing the returned
+        generator should cancel the underlying request. The default yields the
+        complete response of `prompt` as a single piece.
+
+        Args:
+            system_prompt: The high-level instruction or persona for the LLM.
+            user_prompt: The specific query or data to be processed.
+
+        Yields:
+            Consecutive pieces (tokens or larger deltas) of the response.
+        """
+        yield self.prompt(system_prompt, user_prompt)
+
+
+@runtime_checkable
+class AsyncLLMInterface(Protocol):
+    """
+    Asynchronous counterpart of :class:`LLMInterface`.
+
+    Implement this on top of a non-blocking client so that many prompts can
+    be in flight on a single event loop. Subclass `BaseAsyncLLMInterface` for
+    a default `stream_prompt`.
+    """
+
+    @abstractmethod
+    async def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Sends a prompt to the configured LLM and returns its response.
+
+        Args:
+            system_prompt: The high-level instruction or persona for the LLM.
+            user_prompt: The specific query or data to be processed.
+
+        Returns:
+            The text response generated by the LLM.
+        """
+        pass
+
+
+class BaseAsyncLLMInterface(AsyncLLMInterface):
+    """An AsyncLLMInterface with a default for the optional `stream_prompt`."""
+
+    async def stream_prompt(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """
+        Sends a prompt and yields the response incrementally. See
+        `BaseLLMInterface.stream_prompt`; the default yields the complete response
+        of `prompt` as a single piece.
+        """
+        yield await self.prompt(system_prompt, user_prompt)
@@ -0,0 +1,39 @@
+"""Fixtures shared by the test modules."""
+
+from ember_protocol.interfaces import BaseAsyncGenesisDataSource, BaseGenesisDataSource
+
+# A minimal valid identity, as an LLM would synthesize it.
+IDENTITY = {
+    "name": "Ember",
+    "persona_summary": "A patient companion for writers.",
+    "core_values": ["honesty", "warmth", "curiosity"],
+    "communication_style": "gentle",
+    "primary_purpose": "To help stories find their shape.",
+    "interests": ["poetry", "journals"],
+}
+
+
+class StaticSource(BaseGenesisDataSource):
+    def __init__(self, text="A genesis."):
+        self.text = text
+
+    def load_genesis_content(self):
+        return self.text
+
+
+class StaticAsyncSource(BaseAsyncGenesisDataSource):
+    def __init__(self, text="An async genesis."):
+        self.text = text
+
+    async def load_genesis_content(self):
+        return self.text
+
+
+class FakeClock:
+    """A clock that only moves when a test sets or advances `now`."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
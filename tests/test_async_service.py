@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from ember_protocol.core.async_service import (
+    AsyncIdentityDiscoveryService,
+    ThreadPoolGenesisDataSource,
+    ThreadPoolKnowledgeGraph,
+    ThreadPoolLLMInterface,
+)
+from ember_protocol.interfaces import (
+    AsyncGenesisDataSource,
+    AsyncKnowledgeGraph,
+    AsyncLLMInterface,
+    BaseKnowledgeGraph,
+    GenesisDataSource,
+    LLMInterface,
+)
+
+from tests.fixtures import IDENTITY, StaticAsyncSource
+
+
+class SlowAsyncLLM(AsyncLLMInterface):
+    """An async LLM that simulates network latency without blocking the loop."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def prompt(self, system_prompt: str, user_prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return json.dumps(IDENTITY)
+
+
+class DictAsyncGraph(AsyncKnowledgeGraph):
+    def __init__(self):
+        self.identities = {}
+
+    async def save_identity(self, identity, agent_id="default"):
+        self.identities[agent_id] = identity
+        return True
+
+    async def load_identity(self, agent_id="default"):
+        return self.identities.get(agent_id)
+
+    async def identity_exists(self, agent_id="default"):
+        return agent_id in self.identities
+
+
+class TestAsyncIdentityDiscoveryService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_data_source = MagicMock(spec=AsyncGenesisDataSource)
+        self.mock_graph = MagicMock(spec=AsyncKnowledgeGraph)
+        self.mock_llm = MagicMock(spec=AsyncLLMInterface)
+        self.mock_data_source.load_genesis_content = AsyncMock(return_value="Genesis.")
+        self.mock_graph.get_identity_or_none = AsyncMock(return_value=None)
+        self.mock_graph.save_identity = AsyncMock(return_value=True)
+        self.mock_llm.prompt = AsyncMock(return_value=json.dumps(IDENTITY))
+
+        self.service = AsyncIdentityDiscoveryService(
+            data_source=self.mock_data_source,
+            graph=self.mock_graph,
+            llm=self.mock_llm
+        )
+
+    async def test_awaken_ai_with_new_identity_success(self):
+        identity = await self.service.awaken_ai()
+
+        self.assertEqual(identity["name"], "Ember")
+        self.assertIn("id", identity)
+        self.assertIn("created_at", identity)
+        self.mock_llm.prompt.assert_awaited_once()
+        self.mock_graph.save_identity.assert_awaited_once()
+
+    async def test_awaken_ai_with_existing_identity(self):
+        self.mock_graph.get_identity_or_none.return_value = {"name": "ExistingAI", "id": "1"}
+
+        identity = await self.service.awaken_ai()
+
+        self.assertEqual(identity["name"], "ExistingAI")
+        self.mock_graph.get_identity_or_none.assert_awaited_once_with("default")
+        self.mock_data_source.load_genesis_content.assert_not_awaited()
+        self.mock_llm.prompt.assert_not_awaited()
+
+    async def test_awaken_ai_fails_if_no_genesis_content(self):
+        self.mock_data_source.load_genesis_content.return_value = ""
+
+        self.assertIsNone(await self.service.awaken_ai())
+        self.mock_llm.prompt.assert_not_awaited()
+
+    async def test_awaken_ai_fails_if_llm_returns_invalid_json(self):
+        self.mock_llm.prompt.return_value = "not json"
+
+        self.assertIsNone(await self.service.awaken_ai())
+        self.mock_graph.save_identity.assert_not_awaited()
+
+    async def test_awaken_ai_fails_if_graph_save_fails(self):
+        self.mock_graph.save_identity.return_value = False
+
+        self.assertIsNone(await self.service.awaken_ai())
+
+    async def test_many_awakenings_share_one_event_loop(self):
+        llm = SlowAsyncLLM(delay=0.1)
+        graph = DictAsyncGraph()
+        services = [
+            AsyncIdentityDiscoveryService(StaticAsyncSource(), graph, llm, agent_id=f"agent-{i}")
+            for i in range(50)
+        ]
+
+        start = time.perf_counter()
+        identities = await asyncio.gather(*(s.awaken_ai() for s in services))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(llm.calls, 50)
+        self.assertTrue(all(i["name"] == "Ember" for i in identities))
+        self.assertEqual(len(graph.identities), 50)
+        # Sequential awakenings would take 5 seconds.
+        self.assertLess(elapsed, 1.0)
+
+
+class TestThreadPoolAdapters(unittest.IsolatedAsyncioTestCase):
+
+    async def test_sync_components_are_wrapped_automatically(self):
+        data_source = MagicMock(spec=GenesisDataSource)
+        data_source.load_genesis_content.return_value = "Genesis."
+        graph = MagicMock(spec=BaseKnowledgeGraph)
+        graph.get_identity_or_none.return_value = None
+        graph.save_identity.return_value = True
+        llm = MagicMock(spec=LLMInterface)
+        llm.prompt.return_value = json.dumps(IDENTITY)
+
+        service = AsyncIdentityDiscoveryService(data_source, graph, llm)
+
+        self.assertIsInstance(service.data_source, ThreadPoolGenesisDataSource)
+        self.assertIsInstance(service.graph, ThreadPoolKnowledgeGraph)
+        self.assertIsInstance(service.llm, ThreadPoolLLMInterface)
+
+        identity = await service.awaken_ai()
+
+        self.assertEqual(identity["name"], "Ember")
+        # The source type names the wrapped implementation, not the adapter.
+        self.assertEqual(identity["genesis_source_type"], data_source.__class__.__name__)
+        graph.save_identity.assert_called_once_with(identity, "default")
+
+    async def test_blocking_calls_run_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        seen = []
+
+        class BlockingLLM(LLMInterface):
+            def prompt(self, system_prompt, user_prompt):
+                seen.append(threading.get_ident())
+                return "ok"
+
+        adapter = ThreadPoolLLMInterface(BlockingLLM())
+        self.assertEqual(await adapter.prompt("system", "user"), "ok")
+        self.assertNotEqual(seen, [loop_thread])
+
+    async def test_genesis_chunks_stream_through_the_adapter(self):
+        class Source(GenesisDataSource):
+            def load_genesis_content(self):
+                return "abcdefghij"
+
+        adapter = ThreadPoolGenesisDataSource(Source())
+        chunks = [c async for c in adapter.iter_genesis_chunks(chunk_size=4)]
+        self.assertEqual(chunks, ["abcd", "efgh", "ij"])
+
+    async def test_async_source_default_chunking(self):
+        chunks = [c async for c in StaticAsyncSource().iter_genesis_chunks(chunk_size=8)]
+        self.assertEqual("".join(chunks), "An async genesis.")
+
+
+if __name__ == '__main__':
+    unittest.main()
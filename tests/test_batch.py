@@ -0,0 +1,235 @@
+import asyncio
+import json
+import time
+import unittest
+
+from ember_protocol.core.batch import BatchAwakeningEngine, RateLimitedBackend, RateLimiter
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.routing import RoutingLLMInterface
+from ember_protocol.interfaces import AsyncKnowledgeGraph, AsyncLLMInterface, LLMInterface, capabilities
+
+from tests.fixtures import IDENTITY, StaticAsyncSource
+
+
+class DictGraph(AsyncKnowledgeGraph):
+    def __init__(self, unsaveable=()):
+        self.identities = {}
+        self.unsaveable = set(unsaveable)
+
+    async def save_identity(self, identity, agent_id="default"):
+        if agent_id in self.unsaveable:
+            return False
+        self.identities[agent_id] = identity
+        return True
+
+    async def load_identity(self, agent_id="default"):
+        return self.identities.get(agent_id)
+
+    async def identity_exists(self, agent_id="default"):
+        return agent_id in self.identities
+
+
+class TrackingLLM(AsyncLLMInterface):
+    """Echoes a valid identity unless the genesis text asks for something else."""
+
+    provider = "fake"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def prompt(self, system_prompt, user_prompt):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if user_prompt == "bad json" or user_prompt.endswith("{not json"):
+                # Stays broken through repair prompts, which quote the bad response.
+                return "{not json"
+            if user_prompt == "explode":
+                raise RuntimeError("provider unavailable")
+            return json.dumps(dict(IDENTITY, name=user_prompt))
+        finally:
+            self.in_flight -= 1
+
+
+class ProviderLLM(LLMInterface):
+    def __init__(self, provider):
+        self.provider = self.model_id = provider
+
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(dict(IDENTITY, name=user_prompt))
+
+
+class StreamingLLM(TrackingLLM):
+    def __init__(self):
+        super().__init__()
+        self.streamed = 0
+
+    async def stream_prompt(self, system_prompt, user_prompt):
+        self.streamed += 1
+        yield await self.prompt(system_prompt, user_prompt)
+
+
+async def collect(agen):
+    return [result async for result in agen]
+
+
+class TestBatchAwakeningEngine(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.graph = DictGraph(unsaveable={"unsaveable"})
+
+    async def test_awakens_every_source(self):
+        llm = TrackingLLM()
+        engine = BatchAwakeningEngine(llm, self.graph, concurrency=8)
+        sources = ((StaticAsyncSource(f"agent-{i}"), f"agent-{i}") for i in range(100))
+
+        results = await collect(engine.awaken_many(sources))
+
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(r.status is AwakeningStatus.CREATED for r in results))
+        self.assertEqual({r.agent_id for r in results}, {f"agent-{i}" for i in range(100)})
+        for r in results:
+            self.assertEqual(r.identity["name"], r.agent_id)
+            self.assertIs(self.graph.identities[r.agent_id], r.identity)
+
+    async def test_concurrency_is_bounded(self):
+        llm = TrackingLLM(delay=0.01)
+        engine = BatchAwakeningEngine(llm, self.graph, concurrency=4)
+        sources = [(StaticAsyncSource(f"agent-{i}"), f"agent-{i}") for i in range(20)]
+
+        await collect(engine.awaken_many(sources))
+
+        self.assertEqual(llm.max_in_flight, 4)
+
+    async def test_sources_are_pulled_lazily(self):
+        pulled = []
+
+        def sources():
+            for i in range(1000):
+                pulled.append(i)
+                yield StaticAsyncSource(f"agent-{i}"), f"agent-{i}"
+
+        engine = BatchAwakeningEngine(TrackingLLM(delay=0.01), self.graph, concurrency=2)
+        stream = engine.awaken_many(sources())
+        first = await stream.__anext__()
+        await stream.aclose()
+
+        self.assertTrue(first.ok)
+        self.assertLessEqual(len(pulled), 3)
+
+    async def test_results_stream_in_completion_order(self):
+        class DelayByName(TrackingLLM):
+            async def prompt(self, system_prompt, user_prompt):
+                await asyncio.sleep(float(user_prompt))
+                return json.dumps(dict(IDENTITY, name=user_prompt))
+
+        engine = BatchAwakeningEngine(DelayByName(), self.graph, concurrency=3)
+        sources = [(StaticAsyncSource(d), d) for d in ("0.06", "0.0", "0.03")]
+
+        results = await collect(engine.awaken_many(sources))
+
+        self.assertEqual([r.agent_id for r in results], ["0.0", "0.03", "0.06"])
+
+    async def test_failures_are_reported_per_item(self):
+        engine = BatchAwakeningEngine(TrackingLLM(), self.graph, concurrency=4)
+        sources = [
+            (StaticAsyncSource(""), "empty"),
+            (StaticAsyncSource("bad json"), "bad"),
+            (StaticAsyncSource("explode"), "explode"),
+            (StaticAsyncSource("fine"), "unsaveable"),
+            (StaticAsyncSource("fine"), "fine"),
+        ]
+
+        results = {r.agent_id: r for r in await collect(engine.awaken_many(sources))}
+
+        self.assertEqual(results["empty"].status, AwakeningStatus.EMPTY_GENESIS)
+        self.assertEqual(results["bad"].status, AwakeningStatus.PARSE_FAILED)
+        self.assertEqual(results["explode"].status, AwakeningStatus.ERROR)
+        self.assertIn("provider unavailable", results["explode"].error)
+        self.assertEqual(results["unsaveable"].status, AwakeningStatus.SAVE_FAILED)
+        self.assertEqual(results["fine"].status, AwakeningStatus.CREATED)
+        self.assertFalse(results["explode"].ok)
+
+    async def test_accepts_async_iterables(self):
+        async def sources():
+            for i in range(5):
+                yield StaticAsyncSource(f"agent-{i}"), f"agent-{i}"
+
+        engine = BatchAwakeningEngine(TrackingLLM(), self.graph)
+        results = await collect(engine.awaken_many(sources()))
+
+        self.assertEqual(len(results), 5)
+
+    async def test_streams_by_default_when_the_llm_supports_it(self):
+        llm = StreamingLLM()
+        results = await collect(BatchAwakeningEngine(llm, self.graph).awaken_many([(StaticAsyncSource("a"), "a")]))
+        self.assertEqual(results[0].status, AwakeningStatus.CREATED)
+        self.assertEqual(llm.streamed, 1)
+
+        await collect(BatchAwakeningEngine(llm, self.graph, stream=False).awaken_many([(StaticAsyncSource("b"), "b")]))
+        self.assertEqual(llm.streamed, 1)
+
+    async def test_rate_limited_llm_still_streams(self):
+        llm = StreamingLLM()
+        engine = BatchAwakeningEngine(llm, self.graph, rate_limits={"fake": 50})
+        self.assertTrue(capabilities(engine.llm).supports_stream)
+        results = await collect(engine.awaken_many([(StaticAsyncSource("a"), "a")]))
+        self.assertEqual(results[0].status, AwakeningStatus.CREATED)
+        self.assertEqual(llm.streamed, 1)
+
+    async def test_rate_limit_applies_to_matching_provider(self):
+        llm = TrackingLLM()
+        engine = BatchAwakeningEngine(llm, self.graph, concurrency=10, rate_limits={"fake": 50})
+        sources = [(StaticAsyncSource(f"agent-{i}"), f"agent-{i}") for i in range(60)]
+
+        start = time.monotonic()
+        await collect(engine.awaken_many(sources))
+        elapsed = time.monotonic() - start
+
+        # A burst of 50 goes through immediately; the remaining 10 wait ~0.2s.
+        self.assertGreaterEqual(elapsed, 0.15)
+
+    async def test_rate_limits_apply_to_each_routed_backend(self):
+        router = RoutingLLMInterface([ProviderLLM("limited")])
+        self.addCleanup(router.close)
+        engine = BatchAwakeningEngine(router, self.graph, concurrency=10, rate_limits={"limited": 50, "other": 1})
+        self.assertIsInstance(engine.llm.wrapped.backends["limited"], RateLimitedBackend)
+        self.assertIsNot(engine.llm.wrapped, router)
+        sources = [(StaticAsyncSource(f"agent-{i}"), f"agent-{i}") for i in range(60)]
+
+        start = time.monotonic()
+        results = await collect(engine.awaken_many(sources))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual({r.status for r in results}, {AwakeningStatus.CREATED})
+        self.assertGreaterEqual(elapsed, 0.15)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_rejects_non_positive_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+    async def test_burst_is_immediate(self):
+        limiter = RateLimiter(rate=1, burst=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    async def test_blocking_acquire_shares_the_bucket(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        start = time.monotonic()
+        limiter.acquire_blocking()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+
+from benchmarks.awakening import BATCH, WARM, Scenario, compare, percentile, run_scenario
+from benchmarks.fakes import FakeLLM, SyntheticGenesisSource, format_size, parse_size
+from ember_protocol.core.parsing import validate_identity
+from ember_protocol.core.service import IDENTITY_META_PROMPT
+
+
+class TestFakes(unittest.TestCase):
+
+    def test_synthetic_source_is_exact_and_deterministic(self):
+        source = SyntheticGenesisSource(200_000, seed=3, block_size=1024)
+        text = source.load_genesis_content()
+        self.assertEqual(len(text), 200_000)
+        self.assertEqual(text, SyntheticGenesisSource(200_000, seed=3, block_size=1024).load_genesis_content())
+        self.assertEqual("".join(source.iter_genesis_chunks(7777)), text)
+        self.assertEqual(list(SyntheticGenesisSource(0).iter_genesis_chunks()), [])
+
+    def test_fake_llm_answers_with_a_valid_identity(self):
+        llm = FakeLLM()
+        response = llm.prompt(IDENTITY_META_PROMPT, "A genesis.")
+        self.assertEqual(validate_identity(json.loads(response)), [])
+        self.assertEqual(response, llm.prompt(IDENTITY_META_PROMPT, "A genesis."))
+        self.assertEqual(llm.calls, 2)
+
+    def test_sizes(self):
+        self.assertEqual(parse_size("4KB"), 4096)
+        self.assertEqual(parse_size("1.5mb"), 3 << 19)
+        self.assertEqual(format_size(1 << 30), "1GB")
+        with self.assertRaises(ValueError):
+            parse_size("4XB")
+
+
+class TestAwakeningBenchmark(unittest.TestCase):
+
+    def test_scenarios_report_metrics(self):
+        for scenario in (Scenario("cold", agents=4, concurrency=2, llm_latency=0.0, llm_jitter=0.0),
+                         Scenario("warm", mode=WARM, graph="sqlite", agents=4, llm_latency=0.0, llm_jitter=0.0),
+                         Scenario("batch", driver=BATCH, agents=4, concurrency=4, llm_latency=0.0,
+                                  llm_jitter=0.0, corpus_bytes=4096, chunk_chars=1024)):
+            with self.subTest(scenario.name):
+                metrics = run_scenario(scenario)
+                self.assertEqual(metrics["awakenings"], 4)
+                self.assertGreater(metrics["throughput"], 0)
+                self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
+
+    def test_percentile_is_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        def results(throughput, p99, rss):
+            return {"results": {"s": {"metrics": {"throughput": throughput, "p99_ms": p99, "peak_rss_mb": rss}}}}
+
+        baseline = results(100.0, 10.0, 50.0)
+        self.assertEqual(compare(results(90.0, 11.0, 55.0), baseline, tolerance=0.2), [])
+        regressions = compare(results(70.0, 13.0, None), baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("throughput", regressions[0])
+        self.assertIn("p99_ms", regressions[1])
+        self.assertEqual(compare(results(1.0, 1.0, 1.0), {"results": {}}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,8 +7,9 @@ from unittest.mock import MagicMock, patch
 # Note: The import path assumes your tests will be run from the root of the project
 # where the 'ember_protocol' directory is visible.
 from ember_protocol.core.service import IdentityDiscoveryService
+from ember_protocol.interfaces.capabilities import optional_method
 from ember_protocol.interfaces.genesis_data_source import GenesisDataSource
-from ember_protocol.interfaces.knowledge_graph import KnowledgeGraph
+from ember_protocol.interfaces.knowledge_graph import BaseKnowledgeGraph, KnowledgeGraph
 from ember_protocol.interfaces.llm_interface import LLMInterface
 
 class TestIdentityDiscoveryService(unittest.TestCase):
@@ -21,7 +22,7 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def setUp(self):
         """Set up fresh mocks for each test."""
         self.mock_data_source = MagicMock(spec=GenesisDataSource)
-        self.mock_graph = MagicMock(spec=KnowledgeGraph)
+        self.mock_graph = MagicMock(spec=BaseKnowledgeGraph)
         self.mock_llm = MagicMock(spec=LLMInterface)
 
         self.service = IdentityDiscoveryService(
@@ -33,7 +34,7 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_with_new_identity_success(self):
         """Should successfully awaken a new AI when no identity exists."""
         # Arrange: No identity exists, and all components will succeed.
-        self.mock_graph.identity_exists.return_value = False
+        self.mock_graph.get_identity_or_none.return_value = None
         self.mock_data_source.load_genesis_content.return_value = "This is the genesis content."
 
         mock_llm_response = {
@@ -57,7 +58,9 @@ class TestIdentityDiscoveryService(unittest.TestCase):
         self.assertIn('created_at', identity)
         self.assertIn('genesis_source_type', identity)
 
-        self.mock_graph.identity_exists.assert_called_once()
+        # Looked up once on the fast path and re-checked under the awakening lock.
+        self.assertEqual(self.mock_graph.get_identity_or_none.call_count, 2)
+        self.mock_graph.awakening_lock.assert_called_once_with("default")
         self.mock_data_source.load_genesis_content.assert_called_once()
         self.mock_llm.prompt.assert_called_once()
         # Check that save_identity was called with a dictionary that contains our core data
@@ -68,16 +71,18 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_with_existing_identity(self):
         """Should load an existing AI identity and skip the awakening process."""
         # Arrange: An identity already exists.
-        self.mock_graph.identity_exists.return_value = True
         existing_identity_data = {"name": "ExistingAI", "id": "12345"}
-        self.mock_graph.load_identity.return_value = existing_identity_data
+        self.mock_graph.get_identity_or_none.return_value = existing_identity_data
 
         # Act
         identity = self.service.awaken_ai()
 
         # Assert
         self.assertEqual(identity, existing_identity_data)
-        self.mock_graph.load_identity.assert_called_once()
+        # A warm start is a single round trip to the graph.
+        self.mock_graph.get_identity_or_none.assert_called_once()
+        self.mock_graph.identity_exists.assert_not_called()
+        self.mock_graph.load_identity.assert_not_called()
         # Ensure the other parts of the process were NOT called
         self.mock_data_source.load_genesis_content.assert_not_called()
         self.mock_llm.prompt.assert_not_called()
@@ -86,7 +91,7 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_fails_if_no_genesis_content(self):
         """Should fail gracefully if the genesis data source is empty."""
         # Arrange
-        self.mock_graph.identity_exists.return_value = False
+        self.mock_graph.get_identity_or_none.return_value = None
         self.mock_data_source.load_genesis_content.return_value = ""
 
         # Act
@@ -99,7 +104,7 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_fails_if_llm_is_empty(self):
         """Should fail gracefully if the LLM returns an empty response."""
         # Arrange
-        self.mock_graph.identity_exists.return_value = False
+        self.mock_graph.get_identity_or_none.return_value = None
         self.mock_data_source.load_genesis_content.return_value = "Some genesis data."
         self.mock_llm.prompt.return_value = ""
 
@@ -113,7 +118,7 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_fails_if_llm_returns_invalid_json(self):
         """Should fail gracefully if the LLM response cannot be parsed as JSON."""
         # Arrange
-        self.mock_graph.identity_exists.return_value = False
+        self.mock_graph.get_identity_or_none.return_value = None
         self.mock_data_source.load_genesis_content.return_value = "Some genesis data."
         self.mock_llm.prompt.return_value = "This is definitely not valid JSON."
 
@@ -127,9 +132,16 @@ class TestIdentityDiscoveryService(unittest.TestCase):
     def test_awaken_ai_fails_if_graph_save_fails(self):
         """Should fail gracefully if the knowledge graph fails to save the identity."""
         # Arrange
-        self.mock_graph.identity_exists.return_value = False
+        self.mock_graph.get_identity_or_none.return_value = None
         self.mock_data_source.load_genesis_content.return_value = "Valid genesis content."
-        mock_llm_response = {"name": "SaveFailAI", "primary_purpose": "To test save failures."}
+        mock_llm_response = {
+            "name": "SaveFailAI",
+            "persona_summary": "An AI that never gets persisted.",
+            "core_values": ["resilience", "honesty", "patience"],
+            "communication_style": "apologetic",
+            "primary_purpose": "To test save failures.",
+            "interests": ["storage"]
+        }
         self.mock_llm.prompt.return_value = json.dumps(mock_llm_response)
         self.mock_graph.save_identity.return_value = False  # Simulate save failure
 
@@ -140,5 +152,71 @@ class TestIdentityDiscoveryService(unittest.TestCase):
         self.assertIsNone(identity)
         self.mock_graph.save_identity.assert_called_once()
 
+    def test_awaken_ai_uses_agent_id_for_every_graph_call(self):
+        """Should key every graph operation by the service's agent ID."""
+        service = IdentityDiscoveryService(
+            data_source=self.mock_data_source,
+            graph=self.mock_graph,
+            llm=self.mock_llm,
+            agent_id="tenant-42"
+        )
+        self.mock_graph.get_identity_or_none.return_value = None
+        self.mock_data_source.load_genesis_content.return_value = "Genesis for a tenant."
+        self.mock_llm.prompt.return_value = json.dumps({
+            "name": "TenantAI",
+            "persona_summary": "One tenant among many.",
+            "core_values": ["isolation", "fairness", "privacy"],
+            "communication_style": "businesslike",
+            "primary_purpose": "To serve a single tenant.",
+            "interests": ["multi-tenancy"]
+        })
+        self.mock_graph.save_identity.return_value = True
+
+        identity = service.awaken_ai()
+
+        self.mock_graph.get_identity_or_none.assert_called_with("tenant-42")
+        self.mock_graph.awakening_lock.assert_called_once_with("tenant-42")
+        self.mock_graph.save_identity.assert_called_once_with(identity, "tenant-42")
+
+class TestKnowledgeGraphDefaults(unittest.TestCase):
+    """Graphs with only the required methods keep working through the defaults."""
+
+    class LegacyGraph(KnowledgeGraph):
+        def __init__(self):
+            self.identities = {}
+
+        def save_identity(self, identity, agent_id="default"):
+            self.identities[agent_id] = identity
+            return True
+
+        def load_identity(self, agent_id="default"):
+            return self.identities.get(agent_id)
+
+        def identity_exists(self, agent_id="default"):
+            return agent_id in self.identities
+
+    def test_falls_back_to_exists_then_load(self):
+        graph = self.LegacyGraph()
+        get_identity_or_none = optional_method(graph, "get_identity_or_none", BaseKnowledgeGraph)
+        self.assertIsNone(get_identity_or_none("a"))
+        graph.save_identity({"name": "Legacy"}, "a")
+        self.assertEqual(get_identity_or_none("a"), {"name": "Legacy"})
+
+    def test_service_awakens_into_a_graph_with_only_the_required_methods(self):
+        graph = self.LegacyGraph()
+        data_source = MagicMock(spec=GenesisDataSource)
+        data_source.load_genesis_content.return_value = "Genesis."
+        llm = MagicMock(spec=LLMInterface)
+        llm.prompt.return_value = json.dumps({
+            "name": "Legacy", "persona_summary": "Old.", "core_values": ["care", "memory", "thrift"],
+            "communication_style": "plain", "primary_purpose": "To persist.", "interests": ["archives"],
+        })
+
+        identity = IdentityDiscoveryService(data_source, graph, llm).awaken_ai()
+
+        self.assertIsInstance(graph, KnowledgeGraph)
+        self.assertEqual(identity["name"], "Legacy")
+        self.assertEqual(graph.identities["default"]["name"], "Legacy")
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
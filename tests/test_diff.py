@@ -0,0 +1,70 @@
+import unittest
+
+from ember_protocol.core.diff import PatchError, apply_patch, changed_fields, diff
+
+
+class TestDiff(unittest.TestCase):
+
+    def assertRoundTrips(self, old, new):
+        patch = diff(old, new)
+        self.assertEqual(apply_patch(old, patch), new)
+        return patch
+
+    def test_identical_documents_have_an_empty_patch(self):
+        doc = {"a": [1, {"b": None}], "c": "d"}
+        self.assertEqual(diff(doc, dict(doc)), [])
+
+    def test_field_changes(self):
+        patch = self.assertRoundTrips({"name": "Kairo", "old": 1, "same": True},
+                                      {"name": "Kai", "same": True, "new": [1]})
+        self.assertEqual(patch, [
+            {"op": "remove", "path": "/old"},
+            {"op": "replace", "path": "/name", "value": "Kai"},
+            {"op": "add", "path": "/new", "value": [1]},
+        ])
+
+    def test_list_changes_are_element_wise(self):
+        patch = self.assertRoundTrips({"v": ["a", "b", "c"]}, {"v": ["a", "B", "c", "d"]})
+        self.assertEqual(patch, [{"op": "replace", "path": "/v/1", "value": "B"},
+                                 {"op": "add", "path": "/v/3", "value": "d"}])
+        self.assertRoundTrips({"v": ["a", "b", "c", "d"]}, {"v": ["x"]})
+
+    def test_nested_and_type_changes(self):
+        self.assertRoundTrips({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 2, "d": 3}}})
+        self.assertRoundTrips({"a": [1, 2]}, {"a": {"0": 1}})
+        self.assertEqual(diff({"a": 1}, {"a": True}), [{"op": "replace", "path": "/a", "value": True}])
+
+    def test_keys_are_escaped(self):
+        patch = self.assertRoundTrips({"a/b": 1, "c~d": 2}, {"a/b": 3, "c~d": 4})
+        self.assertEqual([op["path"] for op in patch], ["/a~1b", "/c~0d"])
+
+    def test_apply_does_not_mutate_and_copies_values(self):
+        old = {"v": ["a"]}
+        value = ["x"]
+        new = apply_patch(old, [{"op": "add", "path": "/w", "value": value}])
+        value.append("y")
+        self.assertEqual(old, {"v": ["a"]})
+        self.assertEqual(new["w"], ["x"])
+
+    def test_invalid_patches_raise(self):
+        for patch in ([{"op": "remove", "path": "/missing"}],
+                      [{"op": "replace", "path": "/v/5", "value": 1}],
+                      [{"op": "add", "path": "/x/y", "value": 1}],
+                      [{"op": "test", "path": "/v/0", "value": "b"}],
+                      [{"op": "move", "path": "/v", "from": "/w"}],
+                      [{"op": "add", "path": "v", "value": 1}]):
+            with self.assertRaises(PatchError, msg=patch):
+                apply_patch({"v": ["a"]}, patch)
+
+    def test_append_and_test_operations(self):
+        doc = apply_patch({"v": ["a"]}, [{"op": "test", "path": "/v/0", "value": "a"},
+                                         {"op": "add", "path": "/v/-", "value": "b"}])
+        self.assertEqual(doc, {"v": ["a", "b"]})
+
+    def test_changed_fields(self):
+        patch = diff({"a": [1, 2], "b": 1, "c": 1}, {"a": [1, 3, 4], "b": 2, "c": 1})
+        self.assertEqual(changed_fields(patch), ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
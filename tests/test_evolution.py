@@ -0,0 +1,182 @@
+import json
+import threading
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.diff import apply_patch
+from ember_protocol.core.evolution import EVOLUTION_META_PROMPT, SYSTEM_MANAGED_FIELDS
+from ember_protocol.core.instrumentation import EVOLVE_SPAN, InMemoryCollector
+from ember_protocol.core.parsing import REPAIR_PROMPT
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.interfaces import GenesisDataSource, LLMInterface
+
+from tests.fixtures import IDENTITY
+
+
+FULL_CORPUS = "Ten years of journal entries. " * 2000
+
+
+class CorpusSource(GenesisDataSource):
+    def load_genesis_content(self):
+        return FULL_CORPUS
+
+
+class EvolvingLLM(LLMInterface):
+    """Creates IDENTITY, then applies `evolve` to the identity it is shown."""
+
+    def __init__(self, evolve=None, responses=None):
+        self.evolve = evolve or (lambda identity, delta: identity)
+        self.responses = list(responses or [])
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def prompt(self, system_prompt, user_prompt):
+        with self.lock:
+            self.calls.append((system_prompt, user_prompt))
+        if self.responses:
+            return self.responses.pop(0)
+        if system_prompt == EVOLUTION_META_PROMPT:
+            current = json.loads(user_prompt.split("Current identity:\n", 1)[1].split("\n\nNew Genesis Source", 1)[0])
+            delta = user_prompt.split("---\n", 1)[1]
+            return json.dumps(self.evolve(current, delta))
+        return json.dumps(IDENTITY)
+
+
+def add_interest(identity, delta):
+    return dict(identity, interests=identity["interests"] + [delta.strip()])
+
+
+class TestEvolveIdentity(unittest.TestCase):
+
+    def service(self, llm, **options):
+        graph = InMemoryGraph()
+        service = IdentityDiscoveryService(CorpusSource(), graph, llm, **options)
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        return service, graph
+
+    def test_evolution_sends_only_the_delta(self):
+        llm = EvolvingLLM(add_interest)
+        service, graph = self.service(llm)
+        original = graph.load_identity()
+        self.assertEqual(original["revision"], 1)
+
+        result = service.evolve_identity("astronomy")
+
+        self.assertEqual(result.status, AwakeningStatus.EVOLVED)
+        system_prompt, user_prompt = llm.calls[-1]
+        self.assertEqual(system_prompt, EVOLUTION_META_PROMPT)
+        self.assertNotIn("Ten years", user_prompt)
+        self.assertLess(len(user_prompt), 1000)
+        for field in SYSTEM_MANAGED_FIELDS:
+            self.assertNotIn(f'"{field}"', user_prompt)
+
+        evolved = graph.load_identity()
+        self.assertEqual(evolved["interests"], ["poetry", "journals", "astronomy"])
+        self.assertEqual(evolved["revision"], 2)
+        self.assertEqual(evolved["id"], original["id"])
+        self.assertEqual(evolved["created_at"], original["created_at"])
+        self.assertIn("updated_at", evolved)
+
+    def test_patch_turns_the_previous_revision_into_the_new_one(self):
+        service, graph = self.service(EvolvingLLM(add_interest))
+        before = graph.load_identity()
+
+        result = service.evolve_identity("tea")
+
+        self.assertEqual(apply_patch(before, result.patch), result.identity)
+        self.assertIn({"op": "add", "path": "/interests/2", "value": "tea"}, result.patch)
+        self.assertIn({"op": "replace", "path": "/revision", "value": 2}, result.patch)
+
+    def test_unchanged_identity_is_not_saved(self):
+        service, graph = self.service(EvolvingLLM())
+        saves = []
+        graph.save_revision = lambda *args: saves.append(args) or True
+
+        result = service.evolve_identity("Nothing much happened today.")
+
+        self.assertEqual(result.status, AwakeningStatus.UNCHANGED)
+        self.assertEqual(result.patch, [])
+        self.assertEqual(saves, [])
+        self.assertEqual(graph.load_identity()["revision"], 1)
+
+    def test_llm_cannot_overwrite_system_fields(self):
+        service, graph = self.service(EvolvingLLM(lambda identity, delta: dict(identity, id="forged", revision=99,
+                                                                            name="Ember II")))
+        original_id = graph.load_identity()["id"]
+
+        result = service.evolve_identity("A new chapter.")
+
+        self.assertEqual(result.identity["id"], original_id)
+        self.assertEqual(result.identity["revision"], 2)
+        self.assertEqual(result.identity["name"], "Ember II")
+
+    def test_missing_identity_and_empty_delta(self):
+        llm = EvolvingLLM(add_interest)
+        service = IdentityDiscoveryService(CorpusSource(), InMemoryGraph(), llm)
+        self.assertEqual(service.evolve_identity("x").status, AwakeningStatus.NOT_FOUND)
+        self.assertEqual(llm.calls, [])
+
+        service.awaken()
+        self.assertEqual(service.evolve_identity("").status, AwakeningStatus.EMPTY_GENESIS)
+
+    def test_invalid_evolution_is_repaired(self):
+        llm = EvolvingLLM(add_interest)
+        service, graph = self.service(llm)
+        llm.responses = ["Sure! Here is the updated identity:", json.dumps(dict(IDENTITY, name="Repaired"))]
+
+        result = service.evolve_identity("tea")
+
+        self.assertEqual(result.status, AwakeningStatus.EVOLVED)
+        self.assertEqual(llm.calls[-1][0], REPAIR_PROMPT)
+        self.assertEqual(graph.load_identity()["name"], "Repaired")
+
+    def test_unparseable_evolution_keeps_the_current_identity(self):
+        llm = EvolvingLLM(add_interest)
+        service, graph = self.service(llm, max_repairs=0)
+        llm.responses = ["no"]
+
+        result = service.evolve_identity("tea")
+
+        self.assertEqual(result.status, AwakeningStatus.PARSE_FAILED)
+        self.assertEqual(result.identity["revision"], 1)
+        self.assertEqual(graph.load_identity()["revision"], 1)
+
+    def test_concurrent_evolutions_are_serialised(self):
+        service, graph = self.service(EvolvingLLM(add_interest))
+        threads = [threading.Thread(target=service.evolve_identity, args=(f"topic {i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        identity = graph.load_identity()
+        self.assertEqual(identity["revision"], 9)
+        self.assertEqual(sorted(identity["interests"][2:]), sorted(f"topic {i}" for i in range(8)))
+
+    def test_evolution_is_instrumented(self):
+        collector = InMemoryCollector()
+        service, _ = self.service(EvolvingLLM(add_interest), instrumentation=collector)
+
+        service.evolve_identity("tea")
+
+        (span,) = collector.spans_named(EVOLVE_SPAN)
+        self.assertEqual(span.attributes["status"], "evolved")
+
+
+class TestAsyncEvolveIdentity(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_evolution(self):
+        graph = InMemoryGraph()
+        service = AsyncIdentityDiscoveryService(CorpusSource(), graph, EvolvingLLM(add_interest))
+        await service.awaken()
+
+        result = await service.evolve_identity("astronomy")
+
+        self.assertEqual(result.status, AwakeningStatus.EVOLVED)
+        self.assertEqual(graph.load_identity()["interests"][-1], "astronomy")
+        self.assertEqual(graph.load_identity()["revision"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from ember_protocol.core.graph_cache import CachedKnowledgeGraph, LRUIdentityCache, identity_size
+from ember_protocol.core.identity import Identity
+from ember_protocol.core.llm_cache import SQLiteResponseCache
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.implementations import SQLiteGraph
+from ember_protocol.interfaces import capabilities
+
+from tests.fixtures import FakeClock, IDENTITY
+
+
+class CountingGraph(InMemoryGraph):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_identity_or_none(self, agent_id="default"):
+        self.reads += 1
+        self.release.wait(5)
+        return super().get_identity_or_none(agent_id)
+
+
+class ReadCounter:
+    """Counts the reads that reach a shared backing graph."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.reads = 0
+
+    def get_identity_or_none(self, agent_id="default"):
+        self.reads += 1
+        return self.graph.get_identity_or_none(agent_id)
+
+    def save_identity(self, identity, agent_id="default"):
+        return self.graph.save_identity(identity, agent_id)
+
+
+class SlowReader(ReadCounter):
+    """Reads the backing graph at once but returns only when released."""
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def get_identity_or_none(self, agent_id="default"):
+        identity = super().get_identity_or_none(agent_id)
+        self.reading.set()
+        self.release.wait(5)
+        return identity
+
+
+class TickingClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+class TestLRUIdentityCache(unittest.TestCase):
+
+    def test_bounded_by_bytes(self):
+        identity = Identity.from_dict(IDENTITY)
+        size = identity_size(identity)
+        cache = LRUIdentityCache(max_bytes=size * 2)
+        for agent_id in ("a", "b", "c"):
+            cache.set(agent_id, identity)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, size * 2)
+        self.assertEqual(cache.get("a"), (None, False))
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_expired_entries_are_kept_as_stale(self):
+        clock = FakeClock()
+        cache = LRUIdentityCache(ttl=10, clock=clock)
+        cache.set("a", Identity.from_dict(IDENTITY))
+        clock.now = 11
+        identity, fresh = cache.get("a")
+        self.assertEqual(identity.name, "Ember")
+        self.assertFalse(fresh)
+
+
+class TestCachedKnowledgeGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = CountingGraph()
+        self.inner.save_identity(dict(IDENTITY))
+        self.clock = FakeClock()
+        self.graph = CachedKnowledgeGraph(self.inner, LRUIdentityCache(ttl=10, clock=self.clock))
+
+    def test_warm_reads_skip_the_graph_and_return_copies(self):
+        first = self.graph.load_identity()
+        first["name"] = "Mutated"
+        self.assertEqual(self.graph.get_identity_or_none()["name"], "Ember")
+        self.assertTrue(self.graph.identity_exists())
+        self.assertEqual(self.inner.reads, 1)
+        self.assertEqual(self.graph.stats.hits, 2)
+        self.assertIsNone(self.graph.get_identity_or_none("missing"))
+
+    def test_saves_invalidate(self):
+        self.graph.load_identity()
+        self.assertTrue(self.graph.save_identity(dict(IDENTITY, name="Flame")))
+        self.assertEqual(self.graph.load_identity()["name"], "Flame")
+        self.graph.rollback(1)
+        self.assertEqual(self.graph.load_identity()["name"], "Ember")
+        self.assertEqual(self.inner.reads, 3)
+
+    def test_options_and_unknown_methods_reach_the_graph(self):
+        self.assertEqual(len(self.graph.list_revisions()), 1)
+        self.assertEqual(self.graph.load_identity("default", at=10 ** 12)["name"], "Ember")
+        self.assertEqual(self.inner.reads, 0)
+        self.assertFalse(capabilities(self.graph).supports_batch)
+
+    def test_concurrent_misses_read_once(self):
+        self.inner.release.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.graph.load_identity())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: self.graph._single_flight.in_flight("default"))
+        self.inner.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.inner.reads, 1)
+
+    def test_expired_entry_is_served_stale_while_one_caller_reloads(self):
+        self.graph.load_identity()
+        self.clock.now = 11
+        self.inner.release.clear()
+        reloader = threading.Thread(target=self.graph.load_identity)
+        reloader.start()
+        wait_until(lambda: self.graph._single_flight.in_flight("default"))
+        self.assertEqual(self.graph.load_identity()["name"], "Ember")
+        self.inner.release.set()
+        reloader.join()
+        self.assertEqual(self.inner.reads, 2)
+
+    def test_service_loads_through_the_cache(self):
+        service = IdentityDiscoveryService(None, self.graph, None)
+        for _ in range(3):
+            self.assertEqual(service.awaken_ai()["name"], "Ember")
+        self.assertEqual(self.inner.reads, 1)
+
+
+class TestSharedTier(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.backing = SQLiteGraph(os.path.join(self.dir, "graph.db"))
+        self.addCleanup(self.backing.close)
+        self.backing.save_identity(dict(IDENTITY), "a")
+
+        self.clock = TickingClock()
+
+    def cached(self, inner_class=ReadCounter, **options):
+        shared = SQLiteResponseCache(os.path.join(self.dir, "shared.db"))
+        self.addCleanup(shared.close)
+        inner = inner_class(self.backing)
+        return inner, CachedKnowledgeGraph(inner, shared=shared, clock=self.clock, **options)
+
+    def test_one_process_fills_the_tier_for_another(self):
+        first_inner, first = self.cached()
+        second_inner, second = self.cached()
+        self.assertEqual(first.load_identity("a")["name"], "Ember")
+        self.assertEqual(second.load_identity("a")["name"], "Ember")
+        self.assertEqual((first_inner.reads, second_inner.reads), (1, 0))
+
+    def test_save_invalidates_the_shared_tier(self):
+        _, first = self.cached()
+        _, second = self.cached()
+        first.load_identity("a")
+        second.save_identity(dict(IDENTITY, name="Flame"), "a")
+        first.local.clear()
+        self.assertEqual(first.load_identity("a")["name"], "Flame")
+
+    def test_read_that_raced_a_write_elsewhere_is_never_shared(self):
+        slow, reader = self.cached(SlowReader)
+        _, writer = self.cached()
+        loading = threading.Thread(target=reader.load_identity, args=("a",))
+        loading.start()
+        self.assertTrue(slow.reading.wait(5))
+        writer.save_identity(dict(IDENTITY, name="Flame"), "a")
+        slow.release.set()
+        loading.join()
+        # The reader put the identity it read before the write into the shared tier...
+        _, fresh = self.cached()
+        # ...but a new process still gets the written one.
+        self.assertEqual(fresh.load_identity("a")["name"], "Flame")
+
+    def test_shared_entries_expire(self):
+        first_inner, first = self.cached(shared_ttl=5)
+        second_inner, second = self.cached(shared_ttl=5)
+        first.load_identity("a")
+        self.clock.now += 10
+        second.load_identity("a")
+        self.assertEqual((first_inner.reads, second_inner.reads), (1, 1))
+        with self.assertRaises(ValueError):
+            CachedKnowledgeGraph(first_inner, shared_ttl=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
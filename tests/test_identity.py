@@ -0,0 +1,118 @@
+import dataclasses
+import json
+import pickle
+import sys
+import unittest
+
+from ember_protocol.core import Identity
+from ember_protocol.core.packing import PackingError, _packb, _unpackb
+
+from tests import fixtures
+
+IDENTITY = dict(
+    fixtures.IDENTITY,
+    id="3f1c9b8e-2d4a-4e8f-9c1b-7a6d5e4f3a2b",
+    created_at="2024-05-01T12:00:00",
+    genesis_source_type="FileGenesisDataSource",
+    revision=3,
+    updated_at="2024-06-01T12:00:00",
+)
+
+
+class TestIdentity(unittest.TestCase):
+
+    def test_dict_round_trip(self):
+        identity = Identity.from_dict(IDENTITY)
+        self.assertEqual(identity.core_values, ("honesty", "warmth", "curiosity"))
+        self.assertEqual(identity.revision, 3)
+        self.assertEqual(identity.extra, {})
+        self.assertEqual(identity.to_dict(), IDENTITY)
+        self.assertEqual(list(identity.to_dict()), list(IDENTITY))
+
+    def test_round_trip_is_lossless_for_unusual_dicts(self):
+        for data in ({},
+                     {"name": "Ember"},
+                     {"name": None, "revision": True, "interests": "poetry"},
+                     {"core_values": ["honesty", 7], "revision": "2", "mood": {"today": [1, 2.5, None]}},
+                     dict(IDENTITY, tone="dry", interests=[])):
+            with self.subTest(data=data):
+                identity = Identity.from_dict(data)
+                self.assertEqual(identity.to_dict(), data)
+                self.assertEqual(Identity.from_bytes(identity.to_bytes()).to_dict(), data)
+                self.assertEqual(Identity.from_json(identity.to_json()).to_dict(), data)
+
+    def test_unusual_values_are_kept_in_extra(self):
+        identity = Identity.from_dict({"name": None, "revision": True, "tone": "dry"})
+        self.assertIsNone(identity.name)
+        self.assertIsNone(identity.revision)
+        self.assertEqual(identity.extra, {"name": None, "revision": True, "tone": "dry"})
+
+    def test_values_and_interests_are_interned(self):
+        first = Identity.from_dict(json.loads(json.dumps(IDENTITY)))
+        second = Identity.from_bytes(Identity.from_dict(json.loads(json.dumps(IDENTITY))).to_bytes())
+        for a, b in zip(first.core_values + first.interests, second.core_values + second.interests):
+            self.assertIs(a, b)
+        self.assertIs(first.genesis_source_type, second.genesis_source_type)
+
+    def test_identity_is_frozen_and_slotted(self):
+        identity = Identity.from_dict(IDENTITY)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            identity.name = "Kairo"
+        self.assertFalse(hasattr(identity, "__dict__"))
+        self.assertLess(sys.getsizeof(identity), sys.getsizeof(IDENTITY))
+        renamed = dataclasses.replace(identity, name="Kairo")
+        self.assertEqual(renamed.to_dict(), dict(IDENTITY, name="Kairo"))
+
+    def test_pickle(self):
+        identity = Identity.from_dict(dict(IDENTITY, tone="dry"))
+        self.assertEqual(pickle.loads(pickle.dumps(identity)), identity)
+
+    def test_hash_ignores_unhashable_extra(self):
+        identity = Identity.from_dict(dict(IDENTITY, tags={"mood": ["calm"]}))
+        same = Identity.from_dict(dict(IDENTITY, tags={"mood": ["calm"]}))
+        self.assertEqual(hash(identity), hash(same))
+        self.assertEqual(len({identity, same, Identity.from_dict(IDENTITY)}), 2)
+
+    def test_binary_form_is_smaller_than_json(self):
+        identity = Identity.from_dict(IDENTITY)
+        self.assertLess(len(identity.to_bytes()), len(identity.to_json().encode("utf-8")))
+
+    def test_malformed_bytes_raise(self):
+        packed = Identity.from_dict(IDENTITY).to_bytes()
+        for data in (b"", packed[:-3], packed + b"\x00", _packb([1, 2, 3]), _packb({"name": "Ember"})):
+            with self.assertRaises(PackingError):
+                Identity.from_bytes(data)
+
+
+class TestPacking(unittest.TestCase):
+
+    def test_encoding_matches_messagepack(self):
+        cases = [
+            (None, b"\xc0"), (True, b"\xc3"), (False, b"\xc2"),
+            (5, b"\x05"), (-1, b"\xff"), (200, b"\xcc\xc8"), (-200, b"\xd1\xff\x38"),
+            (2 ** 40, b"\xcf\x00\x00\x01\x00\x00\x00\x00\x00"),
+            (1.5, b"\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00"),
+            ("hi", b"\xa2hi"), ("x" * 40, b"\xd9\x28" + b"x" * 40),
+            ([1, 2], b"\x92\x01\x02"), ({"a": 1}, b"\x81\xa1a\x01"),
+        ]
+        for value, packed in cases:
+            with self.subTest(value=value):
+                self.assertEqual(_packb(value), packed)
+                self.assertEqual(_unpackb(packed), value)
+
+    def test_large_containers(self):
+        value = {"k%d" % i: list(range(i % 40)) for i in range(70000)}
+        self.assertEqual(_unpackb(_packb(value)), value)
+        text = "é" * 40000
+        self.assertEqual(_unpackb(_packb(text)), text)
+
+    def test_unsupported_values(self):
+        for value in (object(), b"bytes", 2 ** 64):
+            with self.assertRaises(PackingError):
+                _packb(value)
+        with self.assertRaises(PackingError):
+            _unpackb(b"\xc1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import os
 import tempfile # For creating temporary files for FileGenesisDataSource
+import tracemalloc
 import json
 
 # Assuming InMemoryGraph is in service.py or accessible for import
@@ -31,6 +32,42 @@ class TestFileGenesisDataSource(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             FileGenesisDataSource(file_path="/path/to/non_existent_file.txt")
 
+    def test_iter_genesis_chunks_reassembles_content(self):
+        data_source = FileGenesisDataSource(file_path=self.file_path)
+        chunks = list(data_source.iter_genesis_chunks(chunk_size=7))
+        self.assertEqual("".join(chunks), self.test_content)
+        self.assertTrue(all(0 < len(c) <= 7 for c in chunks))
+
+    def test_iter_genesis_chunks_never_splits_multibyte_characters(self):
+        content = "ember 🔥 phoenix ✨ " * 50
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        data_source = FileGenesisDataSource(file_path=self.file_path)
+        # An odd chunk size guarantees boundaries fall inside multi-byte sequences.
+        chunks = list(data_source.iter_genesis_chunks(chunk_size=5))
+        self.assertEqual("".join(chunks), content)
+
+    def test_iter_genesis_chunks_uses_constant_memory(self):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            line = "A long journal entry about resilience and creativity.\n"
+            for _ in range(100_000):
+                f.write(line)
+        data_source = FileGenesisDataSource(file_path=self.file_path)
+
+        tracemalloc.start()
+        total = sum(len(c) for c in data_source.iter_genesis_chunks(chunk_size=16 * 1024))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(total, len(line) * 100_000)
+        # The file is ~5 MB; streaming should never hold more than a few chunks.
+        self.assertLess(peak, 512 * 1024)
+
+    def test_iter_genesis_chunks_rejects_bad_chunk_size(self):
+        data_source = FileGenesisDataSource(file_path=self.file_path)
+        with self.assertRaises(ValueError):
+            next(data_source.iter_genesis_chunks(chunk_size=0))
+
 class TestInMemoryGraph(unittest.TestCase):
 
     def setUp(self):
@@ -76,6 +113,26 @@ class TestInMemoryGraph(unittest.TestCase):
         loaded_identity = self.graph.load_identity()
         self.assertEqual(loaded_identity["name"], "MemoryAI_v2")
 
+    def test_identities_are_keyed_by_agent(self):
+        other_identity = dict(self.test_identity, id="test-id-456", name="OtherAI")
+        self.graph.save_identity(self.test_identity, agent_id="agent-a")
+        self.graph.save_identity(other_identity, agent_id="agent-b")
+
+        self.assertEqual(self.graph.load_identity("agent-a")["name"], "MemoryAI")
+        self.assertEqual(self.graph.load_identity("agent-b")["name"], "OtherAI")
+        self.assertFalse(self.graph.identity_exists("agent-c"))
+        self.assertIsNone(self.graph.load_identity("agent-c"))
+        self.assertEqual(len(self.graph), 2)
+
+    def test_get_identity_or_none(self):
+        self.assertIsNone(self.graph.get_identity_or_none("agent-a"))
+        self.graph.save_identity(self.test_identity, agent_id="agent-a")
+        self.assertEqual(self.graph.get_identity_or_none("agent-a"), self.test_identity)
+
+    def test_instances_do_not_share_identities(self):
+        self.graph.save_identity(self.test_identity)
+        self.assertFalse(InMemoryGraph().identity_exists())
+
 # Example for a concrete LLM implementation (if you create one)
 # class TestMyCoolLLM(unittest.TestCase):
 #     def test_prompt_returns_expected_format(self):
@@ -0,0 +1,72 @@
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of `ember_protocol` in a fresh interpreter, in
+# milliseconds. Override with EMBER_IMPORT_BUDGET_MS on slow CI machines.
+IMPORT_BUDGET_MS = float(os.environ.get("EMBER_IMPORT_BUDGET_MS", "100"))
+
+# Modules a synchronous deployment should never pay for unless it uses them.
+HEAVY_MODULES = ("asyncio", "sqlite3", "ssl", "http.client", "concurrent.futures", "neo4j", "networkx",
+                 "msgpack")
+
+
+def run(code, *options):
+    return subprocess.run([sys.executable, *options, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                          check=True)
+
+
+def import_time_ms(statement):
+    """The best of three cumulative `-X importtime` readings for the package, in ms."""
+    readings = []
+    for _ in range(3):
+        stderr = run(statement, "-X", "importtime").stderr
+        cumulative = [int(line.split("|")[1]) for line in stderr.splitlines()
+                      if line.startswith("import time:") and line.split("|")[2].strip() == "ember_protocol"]
+        readings.append(cumulative[0] / 1000)
+    return min(readings)
+
+
+def loaded_modules(statement):
+    out = run(f"import sys\n{statement}\nprint(' '.join(sys.modules))").stdout
+    return set(out.split())
+
+
+class TestImportCost(unittest.TestCase):
+
+    def test_package_import_is_within_budget(self):
+        elapsed = import_time_ms("import ember_protocol")
+        self.assertLess(elapsed, IMPORT_BUDGET_MS,
+                        f"import ember_protocol took {elapsed:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+
+    def test_package_import_loads_nothing_eagerly(self):
+        modules = loaded_modules("import ember_protocol")
+        self.assertEqual({m for m in modules if m.startswith("ember_protocol.")}, set())
+
+    def test_sync_service_does_not_load_heavy_modules(self):
+        modules = loaded_modules("from ember_protocol.core import IdentityDiscoveryService, InMemoryGraph")
+        self.assertEqual(modules & set(HEAVY_MODULES), set())
+
+    def test_import_has_no_logging_side_effects(self):
+        out = run("import logging\n"
+                  "from ember_protocol.core import service\n"
+                  "print(len(logging.getLogger().handlers), logging.getLogger().level)").stdout
+        self.assertEqual(out.split(), ["0", str(logging.WARNING)])
+
+    def test_lazy_exports_resolve(self):
+        run("import ember_protocol\n"
+            "from ember_protocol.core import __all__ as core_names\n"
+            "from ember_protocol.implementations import __all__ as impl_names\n"
+            "for name in core_names: getattr(ember_protocol.core, name)\n"
+            "for name in impl_names: getattr(ember_protocol.implementations, name)\n"
+            "assert ember_protocol.interfaces.KnowledgeGraph")
+        with self.assertRaises(subprocess.CalledProcessError):
+            run("import ember_protocol.core as core; core.NoSuchThing")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.instrumentation import (
+    AWAKENINGS_METRIC,
+    SPAN_DURATION_METRIC,
+    InMemoryCollector,
+    Instrumentation,
+    to_otlp_json,
+    to_prometheus_text,
+)
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.interfaces import GenesisDataSource, LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class StaticLLM(LLMInterface):
+    def __init__(self, response=json.dumps(IDENTITY)):
+        self.response = response
+
+    def prompt(self, system_prompt, user_prompt):
+        return self.response
+
+
+class RefusingGraph(InMemoryGraph):
+    def save_identity(self, identity, agent_id="default"):
+        return False
+
+
+class TestSpans(unittest.TestCase):
+
+    def test_nested_spans_share_trace_and_link_parent(self):
+        collector = InMemoryCollector()
+        with collector.span("outer") as outer:
+            with collector.span("inner", {"k": 1}) as inner:
+                pass
+
+        self.assertEqual(inner.trace_id, outer.trace_id)
+        self.assertEqual(inner.parent_span_id, outer.span_id)
+        self.assertIsNone(outer.parent_span_id)
+        self.assertEqual([s.name for s in collector.spans], ["inner", "outer"])
+        self.assertEqual(inner.attributes, {"k": 1})
+        self.assertGreaterEqual(outer.duration, inner.duration)
+
+    def test_exception_is_recorded_and_reraised(self):
+        collector = InMemoryCollector()
+        with self.assertRaises(ValueError):
+            with collector.span("boom"):
+                raise ValueError("bad")
+        self.assertEqual(collector.spans[0].error, "ValueError: bad")
+
+    def test_base_instrumentation_records_nothing(self):
+        with Instrumentation().span("noop") as span:
+            span.set_attribute("x", 1)
+        Instrumentation().increment("c")
+
+
+class TestServiceInstrumentation(unittest.TestCase):
+
+    def test_new_awakening_times_every_step(self):
+        collector = InMemoryCollector()
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), StaticLLM(),
+                                           agent_id="a1", instrumentation=collector)
+        service.awaken()
+
+        names = [s.name for s in collector.spans]
+        self.assertEqual(names, ["graph_lookup", "graph_lookup", "genesis_load", "llm", "save", "awaken"])
+        root = collector.spans_named("awaken")[0]
+        self.assertEqual(root.attributes, {"agent_id": "a1", "status": "created"})
+        self.assertTrue(all(s.parent_span_id == root.span_id for s in collector.spans if s is not root))
+        self.assertEqual(collector.spans_named("genesis_load")[0].attributes["chars"], len("A genesis."))
+        self.assertEqual(collector.counter_value(AWAKENINGS_METRIC, {"status": "created"}), 1)
+
+    def test_outcomes_are_counted(self):
+        collector = InMemoryCollector()
+        graph = InMemoryGraph()
+        IdentityDiscoveryService(StaticSource(), graph, StaticLLM(), instrumentation=collector).awaken()
+        IdentityDiscoveryService(StaticSource(), graph, StaticLLM(), instrumentation=collector).awaken()
+        IdentityDiscoveryService(StaticSource(), InMemoryGraph(), StaticLLM("not json"),
+                                 instrumentation=collector).awaken()
+        IdentityDiscoveryService(StaticSource(), RefusingGraph(), StaticLLM(),
+                                 instrumentation=collector).awaken()
+
+        for status in ("created", "loaded", "parse_failed", "save_failed"):
+            self.assertEqual(collector.counter_value(AWAKENINGS_METRIC, {"status": status}), 1, status)
+
+    def test_unexpected_errors_are_counted(self):
+        collector = InMemoryCollector()
+
+        class BrokenSource(GenesisDataSource):
+            def load_genesis_content(self):
+                raise IOError("disk gone")
+
+        with self.assertRaises(IOError):
+            IdentityDiscoveryService(BrokenSource(), InMemoryGraph(), StaticLLM(),
+                                     instrumentation=collector).awaken()
+        self.assertEqual(collector.counter_value(AWAKENINGS_METRIC, {"status": "error"}), 1)
+        self.assertEqual(collector.spans_named("genesis_load")[0].error, "OSError: disk gone")
+
+
+class TestAsyncServiceInstrumentation(unittest.IsolatedAsyncioTestCase):
+
+    async def test_new_awakening_times_every_step(self):
+        collector = InMemoryCollector()
+        service = AsyncIdentityDiscoveryService(StaticSource(), InMemoryGraph(), StaticLLM(),
+                                                instrumentation=collector)
+        await service.awaken()
+        await service.awaken()
+
+        names = [s.name for s in collector.spans]
+        self.assertEqual(names, ["graph_lookup", "graph_lookup", "genesis_load", "llm", "save", "awaken",
+                                 "graph_lookup", "awaken"])
+        self.assertNotEqual(collector.spans[0].trace_id, collector.spans[-1].trace_id)
+        self.assertEqual(collector.counter_value(AWAKENINGS_METRIC, {"status": "loaded"}), 1)
+
+
+class TestExporters(unittest.TestCase):
+
+    def setUp(self):
+        self.collector = InMemoryCollector(buckets=(0.5, 1.0))
+        IdentityDiscoveryService(StaticSource(), InMemoryGraph(), StaticLLM(),
+                                 instrumentation=self.collector).awaken()
+
+    def test_otlp_json(self):
+        payload = json.loads(json.dumps(to_otlp_json(self.collector.spans, service_name="svc")))
+        resource_spans = payload["resourceSpans"][0]
+        self.assertEqual(resource_spans["resource"]["attributes"][0]["value"], {"stringValue": "svc"})
+        spans = resource_spans["scopeSpans"][0]["spans"]
+        self.assertEqual(len(spans), 6)
+        root = spans[-1]
+        self.assertEqual(len(root["traceId"]), 32)
+        self.assertEqual(len(root["spanId"]), 16)
+        self.assertNotIn("parentSpanId", root)
+        self.assertEqual(spans[0]["parentSpanId"], root["spanId"])
+        self.assertEqual(root["status"], {"code": 1})
+        self.assertIn({"key": "status", "value": {"stringValue": "created"}}, root["attributes"])
+        self.assertLessEqual(int(root["startTimeUnixNano"]), int(root["endTimeUnixNano"]))
+
+    def test_prometheus_text(self):
+        self.collector.increment(AWAKENINGS_METRIC, {"status": 'we"ird\n'})
+        text = to_prometheus_text(self.collector)
+        lines = text.splitlines()
+
+        self.assertIn("# TYPE ember_awakenings_total counter", lines)
+        self.assertIn('ember_awakenings_total{status="created"} 1', lines)
+        self.assertIn('ember_awakenings_total{status="we\\"ird\\n"} 1', lines)
+        self.assertIn(f"# TYPE {SPAN_DURATION_METRIC} histogram", lines)
+        self.assertIn(f'{SPAN_DURATION_METRIC}_bucket{{span="llm",le="+Inf"}} 1', lines)
+        self.assertIn(f'{SPAN_DURATION_METRIC}_bucket{{span="graph_lookup",le="0.5"}} 2', lines)
+        self.assertIn(f'{SPAN_DURATION_METRIC}_count{{span="graph_lookup"}} 2', lines)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_empty_collector_exports_nothing(self):
+        self.assertEqual(to_prometheus_text(InMemoryCollector()), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from ember_protocol import core, interfaces
+from ember_protocol.core.async_service import (ThreadPoolKnowledgeGraph, ThreadPoolLLMInterface, as_async_graph,
+                                               as_async_llm)
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.routing import RoutingLLMInterface
+from ember_protocol.core.service import FileGenesisDataSource, IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.implementations import SQLiteGraph
+from ember_protocol.interfaces import (AsyncKnowledgeGraph, AsyncLLMInterface, GenesisDataSource, KnowledgeGraph,
+                                       LLMInterface, capabilities)
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class PlainLLM(LLMInterface):
+    def __init__(self):
+        self.streamed = False
+
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(IDENTITY)
+
+
+class StreamingLLM(PlainLLM):
+    def stream_prompt(self, system_prompt, user_prompt):
+        self.streamed = True
+        yield json.dumps(IDENTITY)
+
+
+class DuckGraph:
+    """Implements the KnowledgeGraph protocol without subclassing it."""
+
+    def __init__(self):
+        self.identities = {}
+
+    def save_identity(self, identity, agent_id="default"):
+        self.identities[agent_id] = identity
+        return True
+
+    def load_identity(self, agent_id="default"):
+        return self.identities.get(agent_id)
+
+    def identity_exists(self, agent_id="default"):
+        return agent_id in self.identities
+
+    def get_identity_or_none(self, agent_id="default"):
+        return self.identities.get(agent_id)
+
+    def awakening_lock(self, agent_id="default"):
+        return MagicMock()
+
+    def save_revision(self, identity, patch, agent_id="default"):
+        return self.save_identity(identity, agent_id)
+
+
+class MinimalGraph:
+    """Implements only the required KnowledgeGraph methods, without subclassing."""
+
+    def __init__(self):
+        self.identities = {}
+
+    def save_identity(self, identity, agent_id="default"):
+        self.identities[agent_id] = identity
+        return True
+
+    def load_identity(self, agent_id="default"):
+        return self.identities.get(agent_id)
+
+    def identity_exists(self, agent_id="default"):
+        return agent_id in self.identities
+
+
+class MinimalLLM:
+    def __init__(self):
+        self.identity = IDENTITY
+
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(self.identity)
+
+
+class MinimalSource:
+    def load_genesis_content(self):
+        return "A genesis."
+
+
+class AsyncLLM(AsyncLLMInterface):
+    async def prompt(self, system_prompt, user_prompt):
+        return json.dumps(IDENTITY)
+
+
+class TestCanonicalInterfaces(unittest.TestCase):
+
+    def test_core_exports_the_interface_protocols(self):
+        self.assertIs(core.KnowledgeGraph, interfaces.KnowledgeGraph)
+        self.assertIs(core.LLMInterface, interfaces.LLMInterface)
+        self.assertIs(core.GenesisDataSource, interfaces.GenesisDataSource)
+        self.assertIsInstance(InMemoryGraph(), interfaces.KnowledgeGraph)
+
+    def test_structural_implementations_match(self):
+        self.assertIsInstance(DuckGraph(), KnowledgeGraph)
+        self.assertNotIsInstance(object(), KnowledgeGraph)
+
+    def test_protocols_require_only_the_required_methods(self):
+        self.assertIsInstance(MinimalGraph(), KnowledgeGraph)
+        self.assertIsInstance(MinimalLLM(), LLMInterface)
+        self.assertIsInstance(MinimalSource(), GenesisDataSource)
+
+    def test_required_methods_are_still_abstract(self):
+        class Incomplete(KnowledgeGraph):
+            def save_identity(self, identity, agent_id="default"):
+                return True
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class TestCapabilities(unittest.TestCase):
+
+    def test_inferred_from_methods(self):
+        self.assertEqual(capabilities(PlainLLM()), interfaces.Capabilities())
+        self.assertTrue(capabilities(StreamingLLM()).supports_stream)
+        self.assertTrue(capabilities(AsyncLLM()).supports_async)
+        self.assertFalse(capabilities(InMemoryGraph()).supports_batch)
+        self.assertFalse(capabilities(StaticSource()).supports_stream)
+        self.assertFalse(capabilities(DuckGraph()).supports_async)
+
+    def test_overridden_chunking_and_bulk_saves(self):
+        self.assertTrue(capabilities(FileGenesisDataSource(__file__)).supports_stream)
+        graph = SQLiteGraph(":memory:")
+        self.addCleanup(graph.close)
+        self.assertTrue(capabilities(graph).supports_batch)
+
+    def test_declared_flags_win(self):
+        class Declared(StreamingLLM):
+            supports_stream = False
+
+        self.assertFalse(capabilities(Declared()).supports_stream)
+        # A mock's automatic attributes are not flags.
+        self.assertEqual(capabilities(MagicMock(spec=LLMInterface)), interfaces.Capabilities())
+
+    def test_adapters_report_the_wrapped_component(self):
+        self.assertTrue(capabilities(ThreadPoolLLMInterface(StreamingLLM())).supports_stream)
+        self.assertFalse(capabilities(ThreadPoolLLMInterface(PlainLLM())).supports_stream)
+        self.assertTrue(capabilities(ThreadPoolLLMInterface(PlainLLM())).supports_async)
+        self.assertTrue(capabilities(RoutingLLMInterface([PlainLLM(), StreamingLLM()])).supports_stream)
+
+    def test_sync_graph_is_wrapped_even_though_it_matches_the_async_protocol(self):
+        graph = DuckGraph()
+        self.assertIsInstance(graph, AsyncKnowledgeGraph)
+        self.assertIsInstance(as_async_graph(graph), ThreadPoolKnowledgeGraph)
+        llm = AsyncLLM()
+        self.assertIs(as_async_llm(llm), llm)
+
+
+class TestServicePicksThePath(unittest.TestCase):
+
+    def test_streams_by_default_when_supported(self):
+        llm = StreamingLLM()
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm)
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertTrue(llm.streamed)
+
+    def test_explicit_opt_out(self):
+        llm = StreamingLLM()
+        IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=False).awaken()
+        self.assertFalse(llm.streamed)
+
+    def test_optional_methods_fall_back_to_their_defaults(self):
+        graph, llm = MinimalGraph(), MinimalLLM()
+        service = IdentityDiscoveryService(MinimalSource(), graph, llm, stream=True)
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(service.awaken().status, AwakeningStatus.LOADED)
+        llm.identity = dict(IDENTITY, interests=["rivers", "estuaries"])
+        self.assertEqual(service.evolve_identity("More material.").status, AwakeningStatus.EVOLVED)
+        self.assertEqual(graph.identities["default"]["interests"], ["rivers", "estuaries"])
+
+    def test_non_streaming_llm_is_prompted_directly(self):
+        service = IdentityDiscoveryService(StaticSource(), DuckGraph(), PlainLLM(), stream=True)
+        self.assertFalse(service.stream)
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ember_protocol.core.llm_cache import (
+    CachingLLMInterface,
+    LRUResponseCache,
+    ResponseCache,
+    SQLiteResponseCache,
+    TieredResponseCache,
+    response_cache_key,
+)
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.synthesis import MAP_PROMPT
+from ember_protocol.interfaces import GenesisDataSource, LLMInterface
+
+from tests.fixtures import FakeClock, IDENTITY
+
+
+class CountingLLM(LLMInterface):
+    model_id = "counting-1"
+
+    def __init__(self, response=json.dumps(IDENTITY)):
+        self.response = response
+        self.calls = 0
+
+    def prompt(self, system_prompt, user_prompt):
+        self.calls += 1
+        return self.response
+
+
+class TestResponseCacheKey(unittest.TestCase):
+
+    def test_key_depends_on_every_part(self):
+        base = response_cache_key("system", "genesis", "model")
+        self.assertNotEqual(base, response_cache_key("system!", "genesis", "model"))
+        self.assertNotEqual(base, response_cache_key("system", "genesis!", "model"))
+        self.assertNotEqual(base, response_cache_key("system", "genesis", "model-2"))
+        self.assertEqual(base, response_cache_key("system", "genesis", "model"))
+
+    def test_parts_cannot_collide_by_concatenation(self):
+        self.assertNotEqual(response_cache_key("ab", "c", "m"), response_cache_key("a", "bc", "m"))
+
+
+class TestLRUResponseCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        cache = LRUResponseCache()
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", "v")
+        self.assertEqual(cache.get("k"), "v")
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+        self.assertEqual(cache.stats.hit_ratio, 0.5)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUResponseCache(ttl=10, clock=clock)
+        cache.set("k", "v")
+        clock.now += 5
+        self.assertEqual(cache.get("k"), "v")
+        clock.now += 6
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats.expirations, 1)
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "responses.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_survives_reopening(self):
+        cache = SQLiteResponseCache(self.path)
+        cache.set("k", "v")
+        cache.close()
+
+        reopened = SQLiteResponseCache(self.path)
+        self.assertEqual(reopened.get("k"), "v")
+        self.assertEqual(reopened.stats.hits, 1)
+        reopened.close()
+
+    def test_ttl_and_lru_eviction(self):
+        clock = FakeClock()
+        cache = SQLiteResponseCache(self.path, ttl=10, max_entries=2, clock=clock)
+        cache.set("a", "1")
+        clock.now += 1
+        cache.set("b", "2")
+        clock.now += 1
+        cache.get("a")
+        clock.now += 1
+        cache.set("c", "3")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats.evictions, 1)
+
+        clock.now += 20
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats.expirations, 1)
+        cache.close()
+
+
+class TestTieredResponseCache(unittest.TestCase):
+
+    def test_promotes_hits_from_slower_tiers(self):
+        fast, slow = LRUResponseCache(), LRUResponseCache()
+        slow.set("k", "v")
+        tiered = TieredResponseCache(fast, slow)
+
+        self.assertEqual(tiered.get("k"), "v")
+        self.assertEqual(fast.get("k"), "v")
+        self.assertIsNone(tiered.get("missing"))
+        self.assertEqual((tiered.stats.hits, tiered.stats.misses), (1, 1))
+
+    def test_delete_reaches_every_tier(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        slow = SQLiteResponseCache(os.path.join(tmpdir, "responses.db"))
+        self.addCleanup(slow.close)
+        fast = LRUResponseCache()
+        tiered = TieredResponseCache(fast, slow)
+        tiered.set("k", "v")
+        tiered.delete("k")
+        self.assertEqual((fast.get("k"), slow.get("k")), (None, None))
+
+    def test_caches_must_support_delete(self):
+        class Undeletable(ResponseCache):
+            def get(self, key):
+                return None
+
+            def set(self, key, response):
+                pass
+
+            def clear(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            Undeletable()
+
+
+class TestCachingLLMInterface(unittest.TestCase):
+
+    def test_repeated_prompts_hit_the_cache(self):
+        llm = CountingLLM()
+        cached = CachingLLMInterface(llm, LRUResponseCache())
+
+        self.assertEqual(cached.prompt("system", "genesis"), llm.response)
+        self.assertEqual(cached.prompt("system", "genesis"), llm.response)
+        cached.prompt("system", "other genesis")
+
+        self.assertEqual(llm.calls, 2)
+        self.assertEqual((cached.stats.hits, cached.stats.misses), (1, 2))
+
+    def test_model_id_is_part_of_the_key(self):
+        cache = LRUResponseCache()
+        llm = CountingLLM()
+        CachingLLMInterface(llm, cache).prompt("s", "u")
+        CachingLLMInterface(llm, cache, model_id="other-model").prompt("s", "u")
+        self.assertEqual(llm.calls, 2)
+
+    def test_uncacheable_responses_are_not_stored(self):
+        llm = CountingLLM(response="")
+        cached = CachingLLMInterface(llm, LRUResponseCache())
+        cached.prompt("s", "u")
+        cached.prompt("s", "u")
+        self.assertEqual(llm.calls, 2)
+
+    def test_unusable_identities_are_not_stored(self):
+        llm = CountingLLM(response='{"error": "overloaded"}')
+        cached = CachingLLMInterface(llm, LRUResponseCache())
+        cached.prompt("s", "u")
+        cached.prompt("s", "u")
+        self.assertEqual(llm.calls, 2)
+
+    def test_synthesis_notes_are_stored(self):
+        llm = CountingLLM(response="- notes")
+        cached = CachingLLMInterface(llm, LRUResponseCache())
+        cached.prompt(MAP_PROMPT, "chunk")
+        cached.prompt(MAP_PROMPT, "chunk")
+        self.assertEqual(llm.calls, 1)
+
+    def test_reawakening_after_graph_wipe_skips_the_llm(self):
+        class Genesis(GenesisDataSource):
+            def load_genesis_content(self):
+                return "The same genesis, twice."
+
+        llm = CountingLLM()
+        cached = CachingLLMInterface(llm, LRUResponseCache())
+
+        first = IdentityDiscoveryService(Genesis(), InMemoryGraph(), cached).awaken_ai()
+        second = IdentityDiscoveryService(Genesis(), InMemoryGraph(), cached).awaken_ai()
+
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(first["name"], second["name"])
+        self.assertNotEqual(first["id"], second["id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import importlib.util
+import json
+import threading
+import unittest
+
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService
+from ember_protocol.implementations import neo4j_graph
+from ember_protocol.implementations.neo4j_graph import Neo4jGraph, SCHEMA_STATEMENTS
+from ember_protocol.interfaces import LLMInterface
+
+from tests import fixtures
+from tests.fixtures import StaticSource
+
+# Repeats an interest to check it is stored once.
+IDENTITY = dict(fixtures.IDENTITY, interests=["poetry", "stars", "poetry"])
+
+
+class FakeRecord(dict):
+    pass
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = [FakeRecord(r) for r in records]
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return None
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+class FakeTransaction:
+    def __init__(self, driver, mode):
+        self.driver = driver
+        self.mode = mode
+
+    def run(self, query, parameters=None):
+        return self.driver.run(query, dict(parameters or {}), self.mode)
+
+
+class FakeSession:
+    def __init__(self, driver, database):
+        self.driver = driver
+        self.database = database
+
+    def __enter__(self):
+        self.driver.sessions.append(self.database)
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute_write(self, work):
+        with self.driver.lock:
+            return work(FakeTransaction(self.driver, "write"))
+
+    def execute_read(self, work):
+        with self.driver.lock:
+            return work(FakeTransaction(self.driver, "read"))
+
+
+class FakeDriver:
+    """
+    A recorded-query stand-in for the Neo4j driver: it records every statement
+    with its parameters and answers the graph's own queries from a dict.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.sessions = []
+        self.identities = {}
+        self.leases = {}
+        self.lock = threading.RLock()
+        self.closed = False
+        self.fail_writes = False
+
+    def session(self, database=None):
+        return FakeSession(self, database)
+
+    def close(self):
+        self.closed = True
+
+    def run(self, query, params, mode):
+        self.queries.append((query, params, mode))
+        if query == neo4j_graph.UPSERT_IDENTITIES:
+            if self.fail_writes:
+                raise RuntimeError("ServiceUnavailable")
+            for row in params["rows"]:
+                self.identities[row["agent_id"]] = row
+            return FakeResult([])
+        if query == neo4j_graph.LOAD_IDENTITY:
+            row = self.identities.get(params["agent_id"])
+            return FakeResult([{"data": row["data"]}] if row else [])
+        if query == neo4j_graph.IDENTITY_EXISTS:
+            return FakeResult([{"found": params["agent_id"] in self.identities}])
+        if query == neo4j_graph.FIND_AGENTS_BY_NAME:
+            return FakeResult([{"agent_id": a} for a, row in sorted(self.identities.items())
+                               if row["name"] == params["name"]])
+        if query == neo4j_graph.ACQUIRE_LEASE:
+            owner, expires_at = self.leases.get(params["agent_id"], (None, 0))
+            if owner is None or owner == params["owner"] or expires_at <= params["now"]:
+                self.leases[params["agent_id"]] = (params["owner"], params["expires_at"])
+            return FakeResult([{"acquired": self.leases[params["agent_id"]][0] == params["owner"]}])
+        if query == neo4j_graph.RENEW_LEASE:
+            if self.leases.get(params["agent_id"], (None,))[0] == params["owner"]:
+                self.leases[params["agent_id"]] = (params["owner"], params["expires_at"])
+            return FakeResult([])
+        if query == neo4j_graph.RELEASE_LEASE:
+            if self.leases.get(params["agent_id"], (None,))[0] == params["owner"]:
+                del self.leases[params["agent_id"]]
+            return FakeResult([])
+        return FakeResult([])
+
+    def queries_of(self, query):
+        return [params for q, params, _ in self.queries if q == query]
+
+
+class StaticLLM(LLMInterface):
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(IDENTITY)
+
+
+class TestNeo4jGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = FakeDriver()
+        self.graph = Neo4jGraph(driver=self.driver, database="ember", batch_size=2, clock=lambda: 42.0)
+
+    def test_bootstrap_creates_constraints_and_indexes(self):
+        statements = [q for q, _, _ in self.driver.queries]
+        self.assertEqual(statements, list(SCHEMA_STATEMENTS))
+        self.assertTrue(any("CoreTheme" in s and "UNIQUE" in s for s in statements))
+        self.assertTrue(any("identity_name" in s for s in statements))
+
+    def test_identity_round_trip(self):
+        self.assertIsNone(self.graph.get_identity_or_none())
+        self.assertFalse(self.graph.identity_exists())
+
+        self.assertTrue(self.graph.save_identity(IDENTITY))
+
+        self.assertEqual(self.graph.load_identity(), IDENTITY)
+        self.assertTrue(self.graph.identity_exists())
+        self.assertEqual(self.graph.find_agents_by_name("Ember"), ["default"])
+        self.assertEqual(set(self.driver.sessions), {"ember"})
+
+    def test_value_and_interest_nodes_are_parameterised(self):
+        self.graph.save_identity(IDENTITY, "agent-1")
+
+        (params,) = self.driver.queries_of(neo4j_graph.UPSERT_IDENTITIES)
+        (row,) = params["rows"]
+        self.assertEqual(row["core_values"], [{"text": "honesty", "rank": 0},
+                                              {"text": "warmth", "rank": 1},
+                                              {"text": "curiosity", "rank": 2}])
+        self.assertEqual(row["interests"], ["poetry", "stars"])
+        self.assertEqual(row["updated_at"], 42.0)
+        self.assertNotIn("agent-1", neo4j_graph.UPSERT_IDENTITIES)
+
+    def test_bulk_save_is_batched_with_unwind(self):
+        self.assertTrue(self.graph.save_identities({f"agent-{i}": dict(IDENTITY, name=str(i)) for i in range(5)}))
+
+        batches = self.driver.queries_of(neo4j_graph.UPSERT_IDENTITIES)
+        self.assertEqual([len(b["rows"]) for b in batches], [2, 2, 1])
+        self.assertIn("UNWIND $rows", neo4j_graph.UPSERT_IDENTITIES)
+        self.assertEqual(self.graph.load_identity("agent-4")["name"], "4")
+
+    def test_failed_write_returns_false(self):
+        self.driver.fail_writes = True
+        self.assertFalse(self.graph.save_identity(IDENTITY))
+        self.assertFalse(self.graph.save_identity({"name": object()}))
+
+    def test_phoenix_nodes_and_relationships(self):
+        self.graph.upsert_nodes("Emotion", [{"id": f"e{i}", "name": "relief"} for i in range(3)])
+        self.graph.upsert_relationships("CreativeEntry", "EXPRESSED", "Emotion", [("c1", "e1"), ("c1", "e2")])
+
+        node_queries = [(q, p) for q, p, _ in self.driver.queries if q.startswith("UNWIND $rows AS row MERGE (n:Emotion")]
+        self.assertEqual([len(p["rows"]) for _, p in node_queries], [2, 1])
+        rel_queries = [(q, p) for q, p, _ in self.driver.queries if "[:EXPRESSED]" in q]
+        self.assertEqual(rel_queries[0][1]["pairs"], [{"start": "c1", "end": "e1"}, {"start": "c1", "end": "e2"}])
+
+        with self.assertRaises(ValueError):
+            self.graph.upsert_nodes("Person) DETACH DELETE n //", [{"id": 1}])
+        with self.assertRaises(ValueError):
+            self.graph.upsert_relationships("User", "HATES", "Emotion", [])
+
+    def test_awakening_lease(self):
+        with self.graph.awakening_lock("a") as lease:
+            self.assertEqual(self.driver.leases["a"][0], lease.owner)
+            contender = self.graph.awakening_lock("a")
+            self.assertFalse(contender._try_acquire(0.0))
+        self.assertNotIn("a", self.driver.leases)
+
+    def test_expired_lease_is_taken_over(self):
+        self.driver.leases["a"] = ("dead-process", 0.0)
+        with self.graph.awakening_lock("a") as lease:
+            self.assertEqual(self.driver.leases["a"][0], lease.owner)
+
+    def test_awakening_against_neo4j(self):
+        service = IdentityDiscoveryService(StaticSource(), self.graph, StaticLLM())
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(service.awaken().status, AwakeningStatus.LOADED)
+
+    def test_close_only_closes_owned_drivers(self):
+        self.graph.close()
+        self.assertFalse(self.driver.closed)
+
+    @unittest.skipIf(importlib.util.find_spec("neo4j") is not None, "neo4j is installed")
+    def test_missing_driver_package_is_reported(self):
+        with self.assertRaises(ImportError) as caught:
+            Neo4jGraph("neo4j://localhost:7687")
+        self.assertIn("pip install neo4j", str(caught.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService
+from ember_protocol.interfaces import LLMInterface
+
+from tests import fixtures
+from tests.fixtures import StaticSource
+
+HAS_NETWORKX = importlib.util.find_spec("networkx") is not None
+
+if HAS_NETWORKX:
+    from ember_protocol.implementations.networkx_graph import AGENT, INTEREST, PERSONA, VALUE, NetworkXGraph
+
+IDENTITY = dict(fixtures.IDENTITY, interests=["astronomy", "tea", "night walks"],
+                created_at="2025-01-01T00:00:00", origin={"source": "journal", "pages": [1, 2]})
+
+
+class StaticLLM(LLMInterface):
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(IDENTITY)
+
+
+@unittest.skipUnless(HAS_NETWORKX, "networkx is not installed")
+class TestNetworkXGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = NetworkXGraph()
+
+    def test_identity_round_trips_through_decomposition(self):
+        self.assertIsNone(self.graph.get_identity_or_none())
+        self.assertTrue(self.graph.save_identity(IDENTITY))
+
+        loaded = self.graph.load_identity()
+        self.assertEqual(loaded, IDENTITY)
+        self.assertEqual(list(loaded), list(IDENTITY))
+        self.assertTrue(self.graph.identity_exists())
+
+    def test_unusual_lists_round_trip(self):
+        for identity in (dict(IDENTITY, core_values="honesty, warmth"),
+                         dict(IDENTITY, interests=["x", "X ", "tea", "x"]),
+                         dict(IDENTITY, core_values=["honesty", 7], interests=[])):
+            self.graph.save_identity(identity, "odd")
+            self.assertEqual(self.graph.load_identity("odd"), identity)
+        self.assertEqual(self.graph.agents_with_interest("x"), set())
+        self.assertEqual(self.graph.agents_with_value("honesty"), set())
+
+        self.graph.save_identity(dict(IDENTITY, interests=["x", "X "]), "odd")
+        self.assertEqual(self.graph.agents_with_interest("x"), {"odd"})
+        self.graph.delete_identity("odd")
+        self.assertNotIn((INTEREST, "x"), self.graph.graph)
+
+    def test_identity_is_stored_as_nodes_and_edges(self):
+        self.graph.save_identity(IDENTITY, "lumen")
+        g = self.graph.graph
+
+        self.assertEqual(g.nodes[(PERSONA, "lumen")]["communication_style"], "gentle")
+        self.assertEqual(g.edges[(AGENT, "lumen"), (VALUE, "warmth")]["rank"], 1)
+        self.assertEqual(g.edges[(AGENT, "lumen"), (INTEREST, "night walks")]["relation"], "INTERESTED_IN")
+        self.assertNotIn("core_values", g.nodes[(AGENT, "lumen")]["data"])
+
+    def test_secondary_indexes(self):
+        self.graph.save_identity(IDENTITY, "a")
+        self.graph.save_identity(dict(IDENTITY, interests=["Astronomy", "chess"]), "b")
+        self.graph.save_identity(dict(IDENTITY, name="Other", interests=["chess"], core_values=["speed"]), "c")
+
+        self.assertEqual(self.graph.agents_with_interest("astronomy"), {"a", "b"})
+        self.assertEqual(self.graph.agents_with_interest("  CHESS "), {"b", "c"})
+        self.assertEqual(self.graph.agents_with_value("Warmth"), {"a", "b"})
+        self.assertEqual(self.graph.agents_named("Ember"), {"a", "b"})
+        self.assertEqual(self.graph.agents_with_interest("knitting"), set())
+        # Both spellings share one interest node; each agent keeps its own.
+        self.assertEqual(self.graph.load_identity("b")["interests"], ["Astronomy", "chess"])
+
+    def test_related_agents_traverses_shared_terms(self):
+        self.graph.save_identity(IDENTITY, "a")
+        self.graph.save_identity(dict(IDENTITY, core_values=["curiosity"], interests=["tea"]), "b")
+        self.graph.save_identity(dict(IDENTITY, core_values=["speed"], interests=["chess"]), "c")
+
+        self.assertEqual(self.graph.related_agents("a"), {"b": 2})
+        self.assertEqual(self.graph.related_agents("missing"), {})
+
+    def test_overwrite_and_delete_maintain_indexes(self):
+        self.graph.save_identity(IDENTITY, "a")
+        self.graph.save_identity(dict(IDENTITY, name="Renamed", interests=["chess"]), "a")
+
+        self.assertEqual(self.graph.agents_with_interest("tea"), set())
+        self.assertEqual(self.graph.agents_named("Ember"), set())
+        self.assertNotIn((INTEREST, "tea"), self.graph.graph)
+
+        self.assertTrue(self.graph.delete_identity("a"))
+        self.assertFalse(self.graph.delete_identity("a"))
+        self.assertEqual(len(self.graph), 0)
+        self.assertEqual(self.graph.graph.number_of_nodes(), 0)
+
+    def test_snapshot_round_trip(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, "graph.snapshot")
+        for i in range(50):
+            self.graph.save_identity(dict(IDENTITY, name=f"agent {i}"), f"agent-{i}")
+
+        self.graph.save_snapshot(path)
+        restored = NetworkXGraph.load_snapshot(path)
+
+        self.assertEqual(len(restored), 50)
+        self.assertEqual(restored.load_identity("agent-7"), dict(IDENTITY, name="agent 7"))
+        self.assertEqual(len(restored.agents_with_interest("tea")), 50)
+        self.assertEqual(restored.agents_named("agent 3"), {"agent-3"})
+        self.assertEqual(os.listdir(directory), ["graph.snapshot"])
+
+    def test_awakening(self):
+        service = IdentityDiscoveryService(StaticSource(), self.graph, StaticLLM())
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(service.awaken().status, AwakeningStatus.LOADED)
+        self.assertEqual(self.graph.agents_with_interest("tea"), {"default"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import json
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.instrumentation import REPAIRS_METRIC, InMemoryCollector
+from ember_protocol.core.parsing import (
+    REPAIR_PROMPT,
+    extract_json_object,
+    find_json_object,
+    parse_identity,
+    validate_identity,
+)
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.interfaces import LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class ScriptedLLM(LLMInterface):
+    """Returns the scripted responses in order, recording each prompt."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def prompt(self, system_prompt, user_prompt):
+        self.prompts.append((system_prompt, user_prompt))
+        return self.responses.pop(0)
+
+
+class TestExtractJsonObject(unittest.TestCase):
+
+    def test_plain_and_fenced(self):
+        self.assertEqual(extract_json_object('{"a": 1}'), {"a": 1})
+        self.assertEqual(extract_json_object('```json\n{"a": 1}\n```'), {"a": 1})
+
+    def test_surrounding_prose_is_skipped(self):
+        text = 'Here is the identity you asked for:\n{"a": {"b": [1, 2]}}\nI hope it {helps}!'
+        self.assertEqual(extract_json_object(text), {"a": {"b": [1, 2]}})
+
+    def test_braces_and_quotes_inside_strings(self):
+        text = r'{"a": "curly } and [ brackets", "b": "say \"hi\" {"}'
+        self.assertEqual(extract_json_object(text), {"a": "curly } and [ brackets", "b": 'say "hi" {'})
+
+    def test_trailing_commas_are_dropped(self):
+        self.assertEqual(extract_json_object('{"a": [1, 2, ], "b": 3,\n}'), {"a": [1, 2], "b": 3})
+
+    def test_later_candidate_is_used_when_first_is_not_json(self):
+        self.assertEqual(extract_json_object('{placeholder} then {"a": 1}'), {"a": 1})
+
+    def test_unclosed_brace_in_prose_is_passed_over(self):
+        self.assertEqual(extract_json_object('Fill in {placeholder, then: {"a": 1}'), {"a": 1})
+        self.assertEqual(extract_json_object('{"a": [1} and {"b": 2}'), {"b": 2})
+
+    def test_truncated_object_is_salvaged(self):
+        self.assertEqual(find_json_object('{"a": [1, 2'), ({"a": [1, 2]}, False))
+        self.assertEqual(find_json_object('{"a": [1, 2]}'), ({"a": [1, 2]}, True))
+        self.assertEqual(extract_json_object('{"a": "cut off mid-str'), {"a": "cut off mid-str"})
+        self.assertEqual(extract_json_object('{"a": 1, "b":'), {"a": 1, "b": None})
+
+    def test_no_object(self):
+        self.assertIsNone(extract_json_object("This is definitely not valid JSON."))
+        self.assertIsNone(extract_json_object("[1, 2, 3]"))
+        self.assertIsNone(extract_json_object(""))
+
+
+class TestValidateIdentity(unittest.TestCase):
+
+    def test_valid_identity(self):
+        self.assertEqual(validate_identity(IDENTITY), [])
+        self.assertEqual(parse_identity(json.dumps(IDENTITY)), (IDENTITY, []))
+
+    def test_problems_are_reported(self):
+        identity = dict(IDENTITY, name="", core_values=["one"], interests="not a list")
+        del identity["primary_purpose"]
+
+        problems = validate_identity(identity)
+
+        self.assertEqual(len(problems), 4)
+        self.assertIn('Missing required key "primary_purpose".', problems)
+        self.assertIn('"core_values" must have 3-5 items, not 1.', problems)
+
+    def test_parse_identity_rejects_salvaged_objects(self):
+        identity, problems = parse_identity(json.dumps(IDENTITY)[:-1])
+        self.assertIsNone(identity)
+        self.assertEqual(problems, ["The response was cut off before the JSON object was closed."])
+
+    def test_parse_identity_rejects_invalid(self):
+        identity, problems = parse_identity(json.dumps(dict(IDENTITY, interests=[])))
+        self.assertIsNone(identity)
+        self.assertEqual(problems, ['"interests" must have at least 1 items, not 0.'])
+
+
+class TestRepairRetries(unittest.TestCase):
+
+    def test_invalid_response_is_repaired_without_resending_genesis(self):
+        broken = json.dumps(dict(IDENTITY, core_values=["care"]))
+        llm = ScriptedLLM(broken, json.dumps(IDENTITY))
+        collector = InMemoryCollector()
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, instrumentation=collector)
+
+        result = service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(len(llm.prompts), 2)
+        system_prompt, user_prompt = llm.prompts[1]
+        self.assertEqual(system_prompt, REPAIR_PROMPT)
+        self.assertIn(broken, user_prompt)
+        self.assertIn("core_values", user_prompt)
+        self.assertNotIn("expensive genesis", user_prompt)
+        self.assertEqual(collector.counter_value(REPAIRS_METRIC), 1)
+
+    def test_retry_budget_is_respected(self):
+        llm = ScriptedLLM("nope", "still nope", "nope again", json.dumps(IDENTITY))
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, max_repairs=2)
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.PARSE_FAILED)
+        self.assertEqual(len(llm.prompts), 3)
+
+    def test_repairs_can_be_disabled(self):
+        llm = ScriptedLLM("nope")
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, max_repairs=0)
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.PARSE_FAILED)
+        self.assertEqual(len(llm.prompts), 1)
+
+    def test_truncated_response_is_repaired(self):
+        truncated = json.dumps(IDENTITY)[:-1]
+        llm = ScriptedLLM(truncated, json.dumps(IDENTITY))
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm)
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertIn(truncated, llm.prompts[1][1])
+        self.assertIn("cut off", llm.prompts[1][1])
+
+
+class TestAsyncRepairRetries(unittest.IsolatedAsyncioTestCase):
+
+    async def test_invalid_response_is_repaired(self):
+        llm = ScriptedLLM("Sorry, I cannot comply.", "Sure! " + json.dumps(IDENTITY))
+        service = AsyncIdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm)
+
+        result = await service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(result.identity["name"], "Ember")
+        self.assertEqual(llm.prompts[1][0], REPAIR_PROMPT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.preprocessing import (
+    MarkupNormalizer,
+    NearDuplicateRemover,
+    PreprocessingPipeline,
+    QuotedReplyStripper,
+    TokenBudgetTruncator,
+    estimate_tokens,
+    split_paragraphs,
+)
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.synthesis import MapReduceSynthesizer
+from ember_protocol.interfaces import LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+SIGNATURE = "Sent from my phone. Please consider the environment before printing this message."
+
+
+class RecordingLLM(LLMInterface):
+    def __init__(self, response=json.dumps(IDENTITY)):
+        self.response = response
+        self.user_prompts = []
+
+    def prompt(self, system_prompt, user_prompt):
+        self.user_prompts.append(user_prompt)
+        return self.response
+
+
+class TestStages(unittest.TestCase):
+
+    def test_markup_normalizer(self):
+        text = "<p>Hello&nbsp;&amp;   welcome</p>\r\n\r\n\r\n\r\nTabs\t\there \u200bhidden   \n"
+        self.assertEqual(MarkupNormalizer().process(text), "Hello & welcome\n\nTabs here hidden")
+
+    def test_quoted_reply_stripper(self):
+        text = "My answer.\nOn Mon, 1 Jan 2024, Sam wrote:\n> the question\n> more question\nThe end."
+        self.assertEqual(QuotedReplyStripper().process(text), "My answer.\nThe end.")
+
+    def test_near_duplicates_are_removed_and_order_kept(self):
+        paragraphs = [
+            "I keep coming back to the sea and the way it erases every footprint by morning.",
+            SIGNATURE,
+            "Building tools for others is the closest thing I have to a creed.",
+            SIGNATURE.replace("message", "e-mail"),
+            SIGNATURE,
+            "I keep coming back to the sea and the way it erases every footprint by morning!",
+        ]
+        result = NearDuplicateRemover(threshold=0.6).process("\n\n".join(paragraphs))
+        self.assertEqual(split_paragraphs(result), [paragraphs[0], SIGNATURE, paragraphs[2]])
+
+    def test_distinct_paragraphs_survive(self):
+        paragraphs = [f"Entry {i}: a wholly different thought about topic number {i * 7}." for i in range(20)]
+        result = NearDuplicateRemover().process("\n\n".join(paragraphs))
+        self.assertEqual(split_paragraphs(result), paragraphs)
+
+    def test_bands_must_divide_signature(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateRemover(num_perm=64, bands=10)
+
+    def test_token_budget_keeps_salient_paragraphs_in_order(self):
+        filler = "the day was fine and the day was long and the day was over"
+        paragraphs = [
+            "Opening: why I started writing these journals.",
+            filler,
+            "Kintsugi taught me that repaired things are more beautiful.",
+            filler + " again",
+            "Closing: what I hope whoever reads this will carry forward.",
+        ]
+        text = "\n\n".join(paragraphs)
+        budget = estimate_tokens(paragraphs[0]) + estimate_tokens(paragraphs[2]) + estimate_tokens(paragraphs[4]) + 2
+        result = TokenBudgetTruncator(budget).process(text)
+
+        self.assertEqual(split_paragraphs(result), [paragraphs[0], paragraphs[2], paragraphs[4]])
+        self.assertLessEqual(estimate_tokens(result), budget)
+
+    def test_separators_count_against_the_budget(self):
+        text = "\n\n".join(["abcd efgh"] * 8)
+        for budget in range(1, 20):
+            self.assertLessEqual(estimate_tokens(TokenBudgetTruncator(budget).process(text)), budget)
+
+    def test_oversized_paragraph_is_trimmed_with_the_token_counter(self):
+        result = TokenBudgetTruncator(5, token_counter=len).process("x" * 40 + "\n\n" + "y" * 40)
+        self.assertEqual(len(result), 5)
+
+    def test_text_within_budget_is_untouched(self):
+        self.assertEqual(TokenBudgetTruncator(1000).process("short\n\ntext"), "short\n\ntext")
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_reports_savings_per_stage(self):
+        text = "<b>Hello</b>   world\n\n" + "\n\n".join([SIGNATURE] * 10)
+        result = PreprocessingPipeline.default().run(text)
+
+        self.assertEqual(result.text, "Hello world\n\n" + SIGNATURE)
+        self.assertEqual([r.stage for r in result.reports],
+                         ["MarkupNormalizer", "QuotedReplyStripper", "NearDuplicateRemover"])
+        self.assertGreater(result.reports[0].chars_saved, 0)
+        self.assertEqual(result.reports[1].chars_saved, 0)
+        self.assertEqual(result.reports[2].chars_saved, 9 * (len(SIGNATURE) + 2))
+        self.assertEqual(result.chars_saved, len(text) - len(result.text))
+        self.assertEqual(result.tokens_saved, estimate_tokens(text) - estimate_tokens(result.text))
+
+    def test_custom_token_counter(self):
+        pipeline = PreprocessingPipeline([MarkupNormalizer()], token_counter=lambda t: len(t.split()))
+        report = pipeline.run("a  b   c").reports[0]
+        self.assertEqual((report.tokens_before, report.tokens_after), (3, 3))
+        self.assertEqual(report.chars_saved, 3)
+
+
+class TestServiceIntegration(unittest.TestCase):
+
+    def test_llm_receives_preprocessed_text(self):
+        llm = RecordingLLM()
+        text = "\n\n".join(["Who I am.", SIGNATURE, SIGNATURE, SIGNATURE])
+        service = IdentityDiscoveryService(StaticSource(text), InMemoryGraph(), llm,
+                                           preprocessor=PreprocessingPipeline.default())
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(llm.user_prompts, ["Who I am.\n\n" + SIGNATURE])
+
+    def test_genesis_emptied_by_preprocessing_is_reported(self):
+        llm = RecordingLLM()
+        service = IdentityDiscoveryService(StaticSource("<br/>  <hr/>"), InMemoryGraph(), llm,
+                                           preprocessor=PreprocessingPipeline.default())
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.EMPTY_GENESIS)
+        self.assertEqual(llm.user_prompts, [])
+
+    def test_chunks_are_preprocessed_before_synthesis(self):
+        llm = RecordingLLM()
+        service = IdentityDiscoveryService(StaticSource("<i>tiny</i>   genesis"), InMemoryGraph(), llm,
+                                           synthesizer=MapReduceSynthesizer(chunk_chars=1000),
+                                           preprocessor=PreprocessingPipeline([MarkupNormalizer()]))
+
+        service.awaken()
+        self.assertEqual(llm.user_prompts, ["tiny genesis"])
+
+
+class TestAsyncServiceIntegration(unittest.IsolatedAsyncioTestCase):
+
+    async def test_llm_receives_preprocessed_text(self):
+        llm = RecordingLLM()
+        service = AsyncIdentityDiscoveryService(StaticSource("<p>Hi</p>\n\n\n\nthere"), InMemoryGraph(), llm,
+                                                preprocessor=PreprocessingPipeline([MarkupNormalizer()]))
+
+        self.assertEqual((await service.awaken()).status, AwakeningStatus.CREATED)
+        self.assertEqual(llm.user_prompts, ["Hi\n\nthere"])
+
+    async def test_chunks_are_preprocessed_before_synthesis(self):
+        llm = RecordingLLM()
+        service = AsyncIdentityDiscoveryService(StaticSource("<i>tiny</i>   genesis"), InMemoryGraph(), llm,
+                                                synthesizer=MapReduceSynthesizer(chunk_chars=1000),
+                                                preprocessor=PreprocessingPipeline([MarkupNormalizer()]))
+
+        await service.awaken()
+        self.assertEqual(llm.user_prompts, ["tiny genesis"])
+
+
+if __name__ == '__main__':
+    unittest.main()
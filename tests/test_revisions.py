@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from ember_protocol.core.revisions import PATCH, SNAPSHOT, RevisionLog
+from ember_protocol.core.service import InMemoryGraph
+from ember_protocol.implementations import SQLiteGraph
+
+from tests import fixtures
+
+IDENTITY = dict(fixtures.IDENTITY, persona_summary="A patient companion for writers. " * 20,
+                interests=["poetry"], revision=1)
+
+
+def revision(n):
+    """The identity after n - 1 evolutions, each adding one interest."""
+    return dict(IDENTITY, interests=IDENTITY["interests"] + [f"topic {i}" for i in range(2, n + 1)], revision=n)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        self.now += 10
+        return self.now
+
+
+class TestRevisionLog(unittest.TestCase):
+
+    def test_every_revision_can_be_read_back(self):
+        log = RevisionLog(snapshot_every=4)
+        for n in range(1, 11):
+            log.append(revision(n), saved_at=n)
+        self.assertEqual(len(log), 10)
+        for n in range(1, 11):
+            self.assertEqual(log.get(n), revision(n))
+        self.assertIsNone(log.get(0))
+        self.assertIsNone(log.get(11))
+
+    def test_snapshots_are_periodic(self):
+        log = RevisionLog(snapshot_every=4)
+        for n in range(1, 11):
+            log.append(revision(n), saved_at=n)
+        kinds = [info.kind for info in log.infos()]
+        self.assertEqual([i + 1 for i, kind in enumerate(kinds) if kind == SNAPSHOT], [1, 5, 9])
+
+    def test_patches_are_much_smaller_than_snapshots(self):
+        log = RevisionLog()
+        for n in range(1, 51):
+            log.append(revision(n), saved_at=n)
+        stored = sum(info.size for info in log.infos())
+        full_copies = sum(len(json.dumps(revision(n))) for n in range(1, 51))
+        self.assertLess(stored * 5, full_copies)
+
+    def test_point_in_time(self):
+        log = RevisionLog()
+        for n in range(1, 4):
+            log.append(revision(n), saved_at=100.0 * n)
+        self.assertIsNone(log.at(99))
+        self.assertEqual(log.at(100), revision(1))
+        self.assertEqual(log.at(250), revision(2))
+        self.assertEqual(log.at(datetime.fromtimestamp(10_000, tz=timezone.utc)), revision(3))
+
+    def test_given_patch_is_used(self):
+        log = RevisionLog()
+        log.append(revision(1), saved_at=1)
+        info = log.append(revision(2), saved_at=2, patch=[{"op": "add", "path": "/interests/-", "value": "topic 2"},
+                                                          {"op": "replace", "path": "/revision", "value": 2}])
+        self.assertEqual(info.kind, PATCH)
+        log.append(revision(3), saved_at=3)
+        self.assertEqual(log.get(2), revision(2))
+
+
+class RevisionStorageTests:
+    """Behaviour shared by every graph that keeps a revision log."""
+
+    def graph(self):
+        raise NotImplementedError
+
+    def save_history(self, graph, count=5):
+        times = []
+        for n in range(1, count + 1):
+            self.assertTrue(graph.save_identity(revision(n), "ember"))
+            times.append(graph._clock.now)
+        return times
+
+    def test_latest_and_point_in_time_reads(self):
+        graph = self.graph()
+        times = self.save_history(graph)
+        self.assertEqual(graph.load_identity("ember"), revision(5))
+        self.assertIsNone(graph.load_identity("ember", at=times[0] - 1))
+        for n, at in enumerate(times, start=1):
+            self.assertEqual(graph.load_identity("ember", at=at), revision(n))
+            self.assertEqual(graph.load_identity("ember", at=at + 5), revision(n))
+        self.assertIsNone(graph.load_identity("nobody", at=times[-1]))
+
+    def test_revisions_are_listed(self):
+        graph = self.graph()
+        self.save_history(graph, count=7)
+        infos = graph.list_revisions("ember")
+        self.assertEqual([info.revision for info in infos], list(range(1, 8)))
+        self.assertEqual([info.kind for info in infos], [SNAPSHOT, PATCH, PATCH, SNAPSHOT, PATCH, PATCH, SNAPSHOT])
+        self.assertEqual(graph.list_revisions("nobody"), [])
+
+    def test_rollback_appends_the_old_revision(self):
+        graph = self.graph()
+        self.save_history(graph)
+
+        restored = graph.rollback(2, "ember")
+
+        self.assertEqual(restored, dict(revision(2), revision=6))
+        self.assertEqual(graph.load_identity("ember"), restored)
+        self.assertEqual(len(graph.list_revisions("ember")), 6)
+        self.assertEqual(graph.load_revision(5, "ember"), revision(5))
+        self.assertIsNone(graph.rollback(99, "ember"))
+        self.assertIsNone(graph.rollback(1, "nobody"))
+
+
+class TestInMemoryRevisions(RevisionStorageTests, unittest.TestCase):
+
+    def graph(self):
+        return InMemoryGraph(snapshot_every=3, clock=Clock())
+
+    def test_unserializable_identity_is_still_saved(self):
+        graph = self.graph()
+        identity = {"name": "Ember", "born": object()}
+        self.assertTrue(graph.save_identity(identity))
+        self.assertIs(graph.load_identity(), identity)
+
+
+class TestSQLiteRevisions(RevisionStorageTests, unittest.TestCase):
+
+    def graph(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        graph = SQLiteGraph(os.path.join(directory.name, "graph.db"), snapshot_every=3, clock=Clock())
+        self.addCleanup(graph.close)
+        return graph
+
+    def test_bulk_saves_are_logged(self):
+        graph = self.graph()
+        graph.save_identities({"a": revision(1), "b": revision(1)})
+        graph.save_identities({"a": revision(2)})
+        self.assertEqual(graph.load_revision(1, "a"), revision(1))
+        self.assertEqual([info.kind for info in graph.list_revisions("a")], [SNAPSHOT, PATCH])
+        self.assertEqual(len(graph.list_revisions("b")), 1)
+
+    def test_delete_removes_the_history(self):
+        graph = self.graph()
+        self.save_history(graph, count=2)
+        self.assertTrue(graph.delete_identity("ember"))
+        self.assertEqual(graph.list_revisions("ember"), [])
+        graph.save_identity(revision(1), "ember")
+        self.assertEqual([info.revision for info in graph.list_revisions("ember")], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
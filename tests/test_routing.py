@@ -0,0 +1,221 @@
+import json
+import threading
+import time
+import unittest
+
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.routing import AllBackendsFailedError, LatencyTracker, RoutingLLMInterface
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.synthesis import MAP_PROMPT
+from ember_protocol.interfaces import LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class FakeBackend(LLMInterface):
+    """A local backend with a scripted delay, response and failure mode."""
+
+    def __init__(self, name, delay=0.0, response=None, fail=False):
+        self.model_id = name
+        self.delay = delay
+        self.response = response if response is not None else json.dumps(dict(IDENTITY, name=name))
+        self.fail = fail
+        self.calls = 0
+        self.release = threading.Event()
+
+    def prompt(self, system_prompt, user_prompt):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.model_id} is down")
+        return self.response
+
+
+class StreamingBackend(FakeBackend):
+    """Streams its response in two pieces after the scripted delay."""
+
+    def stream_prompt(self, system_prompt, user_prompt):
+        response = self.prompt(system_prompt, user_prompt)
+        yield response[:10]
+        yield response[10:]
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_percentiles_and_error_rate(self):
+        tracker = LatencyTracker(window=100)
+        for latency in range(1, 101):
+            tracker.record_success(latency / 100)
+        tracker.record_failure()
+
+        self.assertEqual(tracker.percentile(50), 0.5)
+        self.assertEqual(tracker.percentile(95), 0.95)
+        self.assertAlmostEqual(tracker.error_rate, 0.01)
+        self.assertIsNone(LatencyTracker().percentile(50))
+
+
+class TestRoutingLLMInterface(unittest.TestCase):
+
+    def router(self, *backends, **options):
+        router = RoutingLLMInterface(backends, **options)
+        self.addCleanup(router.close)
+        for backend in backends:
+            self.addCleanup(backend.release.set)
+        return router
+
+    def test_prefers_the_backend_with_the_best_tail_latency(self):
+        slow, fast = FakeBackend("slow", delay=0.05), FakeBackend("fast")
+        router = self.router(slow, fast)
+
+        # Both are measured once, then the fast one takes the traffic.
+        for _ in range(6):
+            router.prompt("s", "u")
+
+        self.assertEqual(slow.calls, 1)
+        self.assertEqual(fast.calls, 5)
+        stats = router.stats()
+        self.assertGreater(stats["slow"].p95, stats["fast"].p95)
+        self.assertEqual(router.ranked(), ["fast", "slow"])
+
+    def test_error_rate_demotes_a_fast_backend(self):
+        flaky, steady = FakeBackend("flaky"), FakeBackend("steady")
+        router = self.router(flaky, steady)
+        router.trackers["flaky"].record_success(0.01)
+        for _ in range(3):
+            router.trackers["flaky"].record_failure()
+        router.trackers["steady"].record_success(0.03)
+
+        self.assertEqual(router.ranked(), ["steady", "flaky"])
+
+    def test_fails_over_on_errors(self):
+        down, up = FakeBackend("down", fail=True), FakeBackend("up")
+        router = self.router(down, up)
+
+        response = router.prompt("s", "u")
+
+        self.assertEqual(json.loads(response)["name"], "up")
+        self.assertEqual(router.stats()["down"].error_rate, 1.0)
+        self.assertEqual(router.ranked(), ["up", "down"])
+
+    def test_fails_over_on_timeout(self):
+        hung, up = FakeBackend("hung", delay=10), FakeBackend("up")
+        router = self.router(hung, up, timeout=0.05)
+
+        start = time.perf_counter()
+        response = router.prompt("s", "u")
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(json.loads(response)["name"], "up")
+        self.assertEqual(router.stats()["hung"].error_rate, 1.0)
+
+    def test_timed_out_call_is_recorded_once(self):
+        hung, up = FakeBackend("hung", delay=10), FakeBackend("up")
+        router = self.router(hung, up, timeout=0.05)
+        router.prompt("s", "u")
+
+        hung.release.set()
+        router._executor.shutdown(wait=True)
+
+        self.assertEqual(router.stats()["hung"].calls, 1)
+        self.assertEqual(router.stats()["hung"].error_rate, 1.0)
+
+    def test_all_backends_failing_raises(self):
+        router = self.router(FakeBackend("a", fail=True), FakeBackend("b", fail=True))
+        with self.assertRaises(AllBackendsFailedError) as caught:
+            router.prompt("s", "u")
+        self.assertEqual(set(caught.exception.errors), {"a", "b"})
+
+    def test_race_keeps_the_first_valid_response(self):
+        slow, fast = FakeBackend("slow", delay=10), FakeBackend("fast")
+        router = self.router(slow, fast, race=True)
+
+        start = time.perf_counter()
+        response = router.prompt("s", "u")
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(json.loads(response)["name"], "fast")
+        self.assertEqual((slow.calls, fast.calls), (1, 1))
+
+    def test_race_skips_invalid_responses(self):
+        chatty = FakeBackend("chatty", response="I'd rather not.")
+        valid = FakeBackend("valid", delay=0.05)
+        router = self.router(chatty, valid, race=True)
+
+        self.assertEqual(json.loads(router.prompt("s", "u"))["name"], "valid")
+
+    def test_race_rejects_json_that_is_not_an_identity(self):
+        error = FakeBackend("error", response='{"error": "overloaded"}')
+        valid = FakeBackend("valid", delay=0.05)
+        router = self.router(error, valid, race=True)
+
+        self.assertEqual(json.loads(router.prompt("s", "u"))["name"], "valid")
+
+    def test_race_accepts_notes_for_synthesis_prompts(self):
+        slow, fast = FakeBackend("slow", delay=5), FakeBackend("fast", response="- notes")
+        router = self.router(slow, fast, race=True, timeout=5)
+
+        start = time.monotonic()
+        self.assertEqual(router.prompt(MAP_PROMPT, "chunk"), "- notes")
+        self.assertLess(time.monotonic() - start, 1)
+        # Notes are no identity, so other prompts still wait for a valid response.
+        slow.release.set()
+        self.assertEqual(router.prompt("s", "u"), json.dumps(dict(IDENTITY, name="slow")))
+
+    def test_race_returns_an_invalid_response_when_nothing_better_arrives(self):
+        router = self.router(FakeBackend("a", response="nope"), FakeBackend("b", fail=True), race=True)
+        self.assertEqual(router.prompt("s", "u"), "nope")
+
+    def test_race_falls_back_to_remaining_backends(self):
+        a, b, c = FakeBackend("a", fail=True), FakeBackend("b", fail=True), FakeBackend("c")
+        router = self.router(a, b, c, race=True)
+        self.assertEqual(json.loads(router.prompt("s", "u"))["name"], "c")
+
+    def test_stream_fails_over_before_the_first_piece(self):
+        down, up = FakeBackend("down", fail=True), FakeBackend("up")
+        router = self.router(down, up)
+
+        self.assertEqual(json.loads("".join(router.stream_prompt("s", "u")))["name"], "up")
+        self.assertEqual(router.stats()["down"].error_rate, 1.0)
+        self.assertEqual(router.stats()["up"].calls, 1)
+
+    def test_partly_consumed_streams_are_measured(self):
+        slow, fast = StreamingBackend("slow", delay=0.05), StreamingBackend("fast")
+        router = self.router(slow, fast)
+
+        for _ in range(4):
+            stream = router.stream_prompt("s", "u")
+            next(stream)
+            stream.close()
+
+        self.assertEqual((slow.calls, fast.calls), (1, 3))
+        self.assertEqual(router.stats()["fast"].calls, 3)
+        self.assertEqual(router.ranked(), ["fast", "slow"])
+
+    def test_stream_fails_over_when_the_first_piece_times_out(self):
+        slow, fast = StreamingBackend("slow", delay=0.3), StreamingBackend("fast")
+        router = self.router(slow, fast, timeout=0.1)
+
+        for _ in range(3):
+            self.assertEqual(json.loads("".join(router.stream_prompt("s", "u")))["name"], "fast")
+
+        self.assertEqual(slow.calls, 1)
+        self.assertEqual(router.stats()["slow"].error_rate, 1.0)
+        self.assertEqual(router.stats()["fast"].calls, 3)
+
+    def test_racing_router_does_not_stream(self):
+        self.assertTrue(self.router(StreamingBackend("a"), StreamingBackend("b")).supports_stream)
+        self.assertFalse(self.router(StreamingBackend("a"), StreamingBackend("b"), race=True).supports_stream)
+
+    def test_routes_identity_discovery(self):
+        router = self.router(FakeBackend("down", fail=True), FakeBackend("up"))
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), router)
+
+        result = service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(result.identity["name"], "up")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.singleflight import AsyncSingleFlight, SingleFlight
+from ember_protocol.interfaces import AsyncLLMInterface, LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class SlowLLM(LLMInterface):
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def prompt(self, system_prompt, user_prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return json.dumps(IDENTITY)
+
+
+class SlowAsyncLLM(AsyncLLMInterface):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def prompt(self, system_prompt, user_prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return json.dumps(IDENTITY)
+
+
+class LeasedGraph(InMemoryGraph):
+    """Records every use of the cross-process lock hook."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock_events = []
+
+    @contextmanager
+    def awakening_lock(self, agent_id="default"):
+        self.lock_events.append(("acquire", agent_id))
+        try:
+            yield
+        finally:
+            self.lock_events.append(("release", agent_id))
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return object()
+
+        def worker():
+            results.append(flight.do("key", slow))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        threads[0].start()
+        started.wait()
+        for t in threads[1:]:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+        self.assertFalse(flight.in_flight("key"))
+
+    def test_errors_are_shared_and_key_is_released(self):
+        flight = SingleFlight()
+
+        def boom():
+            raise ValueError("nope")
+
+        with self.assertRaises(ValueError):
+            flight.do("key", boom)
+        self.assertEqual(flight.do("key", lambda: 42), 42)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_awaiters_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return object()
+
+        results = await asyncio.gather(*(flight.do("key", slow) for _ in range(10)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+        self.assertFalse(flight.in_flight("key"))
+
+    async def test_errors_propagate_to_every_waiter(self):
+        flight = AsyncSingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise ValueError("nope")
+
+        results = await asyncio.gather(*(flight.do("key", boom) for _ in range(3)),
+                                       return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    async def test_cancelling_the_leader_lets_followers_retry(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await asyncio.gather(*followers), [2, 2, 2])
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(flight.in_flight("key"))
+
+
+class TestSingleFlightAwakening(unittest.TestCase):
+
+    def test_concurrent_first_requests_synthesize_once(self):
+        graph = InMemoryGraph()
+        llm = SlowLLM()
+        results = []
+
+        def request():
+            # Each request builds its own service, as a web handler would.
+            service = IdentityDiscoveryService(StaticSource(), graph, llm, agent_id="agent-1")
+            results.append(service.awaken())
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual({r.identity["id"] for r in results}, {graph.load_identity("agent-1")["id"]})
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_different_agents_are_not_serialized(self):
+        graph = InMemoryGraph()
+        llm = SlowLLM(delay=0.2)
+
+        threads = [
+            threading.Thread(target=IdentityDiscoveryService(StaticSource(), graph, llm, agent_id=f"a{i}").awaken)
+            for i in range(5)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(llm.calls, 5)
+        self.assertLess(time.perf_counter() - start, 0.8)
+
+    def test_graph_lock_wraps_synthesis_and_rechecks(self):
+        graph = LeasedGraph()
+        llm = SlowLLM(delay=0)
+        service = IdentityDiscoveryService(StaticSource(), graph, llm, agent_id="agent-1")
+
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+        self.assertEqual(graph.lock_events, [("acquire", "agent-1"), ("release", "agent-1")])
+
+    def test_identity_created_by_another_process_while_waiting_is_reused(self):
+        graph = LeasedGraph()
+        llm = SlowLLM(delay=0)
+        existing = {"name": "FromElsewhere", "id": "other-process"}
+
+        @contextmanager
+        def lock_that_loses_the_race(agent_id="default"):
+            # Simulates another process finishing its awakening while we waited.
+            graph.save_identity(existing, agent_id)
+            yield
+
+        graph.awakening_lock = lock_that_loses_the_race
+        result = IdentityDiscoveryService(StaticSource(), graph, llm, agent_id="agent-1").awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.LOADED)
+        self.assertIs(result.identity, existing)
+        self.assertEqual(llm.calls, 0)
+
+
+class TestAsyncSingleFlightAwakening(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_first_requests_synthesize_once(self):
+        graph = InMemoryGraph()
+        llm = SlowAsyncLLM()
+        services = [
+            AsyncIdentityDiscoveryService(StaticSource(), graph, llm, agent_id="agent-1")
+            for _ in range(10)
+        ]
+
+        identities = await asyncio.gather(*(s.awaken_ai() for s in services))
+
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(len({i["id"] for i in identities}), 1)
+
+    async def test_sync_graph_lock_is_honoured(self):
+        graph = LeasedGraph()
+        service = AsyncIdentityDiscoveryService(StaticSource(), graph, SlowAsyncLLM(0), agent_id="x")
+
+        await service.awaken()
+
+        self.assertEqual(graph.lock_events, [("acquire", "x"), ("release", "x")])
+
+
+if __name__ == '__main__':
+    unittest.main()
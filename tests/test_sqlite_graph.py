@@ -0,0 +1,216 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService
+from ember_protocol.implementations import SQLiteGraph
+from ember_protocol.interfaces import LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+fork_only = unittest.skipUnless(sys.platform.startswith("linux"), "needs the fork start method")
+
+
+class CountingLLM(LLMInterface):
+    def __init__(self):
+        self.calls = 0
+
+    def prompt(self, system_prompt, user_prompt):
+        self.calls += 1
+        return json.dumps(IDENTITY)
+
+
+def _save_in_child(path, agent_id):
+    graph = SQLiteGraph(path)
+    graph.save_identity(dict(IDENTITY, name=agent_id), agent_id)
+    graph.close()
+
+
+def _hold_lease_in_child(path, acquired, release):
+    graph = SQLiteGraph(path)
+    with graph.awakening_lock("contended"):
+        acquired.set()
+        release.wait(10)
+        graph.save_identity(IDENTITY, "contended")
+
+
+class TestSQLiteGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "graph.db")
+
+    def graph(self, **options):
+        graph = SQLiteGraph(self.path, **options)
+        self.addCleanup(graph.close)
+        return graph
+
+    def test_identities_survive_a_restart(self):
+        graph = self.graph()
+        self.assertIsNone(graph.get_identity_or_none())
+        self.assertFalse(graph.identity_exists())
+
+        self.assertTrue(graph.save_identity(IDENTITY))
+        self.assertTrue(graph.save_identity(dict(IDENTITY, name="Other"), "other"))
+        graph.close()
+
+        reopened = self.graph()
+        self.assertEqual(reopened.load_identity(), IDENTITY)
+        self.assertTrue(reopened.identity_exists("other"))
+        self.assertEqual(len(reopened), 2)
+        journal_mode = reopened._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+
+    def test_save_overwrites_and_name_index_follows(self):
+        graph = self.graph()
+        graph.save_identity(IDENTITY, "a")
+        graph.save_identity(IDENTITY, "b")
+        graph.save_identity(dict(IDENTITY, name="Renamed"), "a")
+
+        self.assertEqual(graph.find_agents_by_name("Ember"), ["b"])
+        self.assertEqual(graph.find_agents_by_name("Renamed"), ["a"])
+        plan = graph._connection().execute(
+            "EXPLAIN QUERY PLAN SELECT agent_id FROM identities WHERE name = ?", ("x",)
+        ).fetchall()
+        self.assertIn("identities_name", str(plan))
+
+    def test_concurrent_saves_are_group_committed(self):
+        graph = self.graph(commit_delay=0.05)
+        commits = []
+        commit = graph._commit
+        graph._commit = lambda rows: commits.append(len(rows)) or commit(rows)
+
+        threads = [threading.Thread(target=graph.save_identity, args=(dict(IDENTITY, name=str(i)), f"agent-{i}"))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(graph), 20)
+        self.assertEqual(sum(commits), 20)
+        self.assertLess(len(commits), 20)
+        self.assertEqual(graph.load_identity("agent-7")["name"], "7")
+
+    def test_interrupted_flush_does_not_block_later_saves(self):
+        graph = self.graph()
+        append_revision = graph._append_revision
+
+        def fail_once(row):
+            graph._append_revision = append_revision
+            raise MemoryError("encoding failed")
+
+        graph._append_revision = fail_once
+        with self.assertRaises(MemoryError):
+            graph.save_identity(IDENTITY, "a")
+
+        saver = threading.Thread(target=graph.save_identity, args=(IDENTITY, "b"), daemon=True)
+        saver.start()
+        saver.join(5)
+        self.assertFalse(saver.is_alive())
+        self.assertEqual(graph.load_identity("b"), IDENTITY)
+        self.assertFalse(graph.identity_exists("a"))
+
+    def test_bulk_save_is_atomic(self):
+        graph = self.graph()
+        self.assertTrue(graph.save_identities({f"agent-{i}": IDENTITY for i in range(100)}))
+        self.assertEqual(len(graph), 100)
+
+        self.assertFalse(graph.save_identities({"ok": IDENTITY, "bad": {"name": object()}}))
+        self.assertFalse(graph.identity_exists("ok"))
+
+    def test_unserializable_identity_is_rejected(self):
+        self.assertFalse(self.graph().save_identity({"name": object()}))
+
+    def test_delete(self):
+        graph = self.graph()
+        graph.save_identity(IDENTITY)
+        self.assertTrue(graph.delete_identity())
+        self.assertFalse(graph.delete_identity())
+        self.assertIsNone(graph.load_identity())
+
+    def test_warm_loads_are_fast(self):
+        graph = self.graph()
+        graph.save_identity(IDENTITY)
+        graph.load_identity()
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            graph.get_identity_or_none()
+        per_load = (time.perf_counter() - start) / 1000
+        self.assertLess(per_load, 0.001)
+
+    @fork_only
+    def test_reads_and_writes_across_processes(self):
+        graph = self.graph()
+        graph.save_identity(IDENTITY)  # Connections are open before the fork.
+
+        child = multiprocessing.get_context("fork").Process(target=_save_in_child, args=(self.path, "child"))
+        child.start()
+        child.join(10)
+
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(graph.load_identity("child")["name"], "child")
+
+    @fork_only
+    def test_awakening_lease_is_exclusive_across_processes(self):
+        ctx = multiprocessing.get_context("fork")
+        acquired, release = ctx.Event(), ctx.Event()
+        child = ctx.Process(target=_hold_lease_in_child, args=(self.path, acquired, release))
+        child.start()
+        self.addCleanup(child.join, 10)
+        self.addCleanup(release.set)
+        self.assertTrue(acquired.wait(10))
+
+        graph = self.graph(lease_poll_interval=0.01)
+        llm = CountingLLM()
+        service = IdentityDiscoveryService(StaticSource(), graph, llm, agent_id="contended")
+        threading.Timer(0.2, release.set).start()
+
+        result = service.awaken()
+
+        # The child finished the awakening while we waited for the lease.
+        self.assertEqual(result.status, AwakeningStatus.LOADED)
+        self.assertEqual(llm.calls, 0)
+
+    def test_expired_lease_is_taken_over(self):
+        graph = self.graph(lease_ttl=0.2, lease_poll_interval=0.01)
+        graph._connection().execute(
+            "INSERT INTO awakening_leases VALUES ('default', 'dead-process', ?)", (time.time() + 0.1,)
+        )
+
+        start = time.perf_counter()
+        with graph.awakening_lock():
+            owner = graph._connection().execute("SELECT owner FROM awakening_leases").fetchone()[0]
+        self.assertGreater(time.perf_counter() - start, 0.05)
+        self.assertNotEqual(owner, "dead-process")
+        self.assertIsNone(graph._connection().execute("SELECT owner FROM awakening_leases").fetchone())
+
+    def test_lease_opens_no_connections_of_its_own(self):
+        graph = self.graph(lease_ttl=0.06)
+        with graph.awakening_lock("a"):
+            time.sleep(0.1)  # Long enough for the renewer thread to run.
+        self.assertEqual(graph._readers, [])
+
+    def test_awakens_once_and_loads_after_restart(self):
+        llm = CountingLLM()
+        self.assertEqual(IdentityDiscoveryService(StaticSource(), self.graph(), llm).awaken().status,
+                         AwakeningStatus.CREATED)
+
+        result = IdentityDiscoveryService(StaticSource(), self.graph(), llm).awaken()
+        self.assertEqual(result.status, AwakeningStatus.LOADED)
+        self.assertEqual(result.identity["name"], "Ember")
+        self.assertEqual(llm.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
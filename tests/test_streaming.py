@@ -0,0 +1,191 @@
+import asyncio
+import json
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.instrumentation import STREAM_ABORTS_METRIC, InMemoryCollector
+from ember_protocol.core.parsing import REPAIR_PROMPT, IncrementalIdentityParser, OffSchemaError
+from ember_protocol.core.results import AwakeningStatus
+from ember_protocol.core.service import IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.interfaces import AsyncLLMInterface, LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+def tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class StreamingLLM(LLMInterface):
+    """Streams a scripted response in small pieces, recording how much was consumed."""
+
+    def __init__(self, response, repair_response=None):
+        self.response = response
+        self.repair_response = repair_response
+        self.yielded = 0
+        self.closed = False
+        self.prompts = []
+
+    def prompt(self, system_prompt, user_prompt):
+        self.prompts.append(system_prompt)
+        return self.repair_response if system_prompt == REPAIR_PROMPT else self.response
+
+    def stream_prompt(self, system_prompt, user_prompt):
+        self.prompts.append(system_prompt)
+        try:
+            for piece in tokens(self.response):
+                self.yielded += 1
+                yield piece
+        finally:
+            self.closed = True
+
+
+class AsyncStreamingLLM(AsyncLLMInterface):
+    def __init__(self, response):
+        self.response = response
+        self.yielded = 0
+        self.closed = False
+
+    async def prompt(self, system_prompt, user_prompt):
+        return self.response
+
+    async def stream_prompt(self, system_prompt, user_prompt):
+        try:
+            for piece in tokens(self.response):
+                self.yielded += 1
+                await asyncio.sleep(0)
+                yield piece
+        finally:
+            self.closed = True
+
+
+class TestIncrementalIdentityParser(unittest.TestCase):
+
+    def test_fields_are_reported_as_they_complete(self):
+        seen = []
+        parser = IncrementalIdentityParser(on_field=lambda k, v: seen.append((k, v)))
+        text = 'Here you go:\n```json\n' + json.dumps(dict(IDENTITY, extra={"a": [1, 2]}, n=3)) + '\n```'
+
+        for piece in tokens(text, 3):
+            parser.feed(piece)
+
+        self.assertTrue(parser.done)
+        self.assertEqual(seen, list(dict(IDENTITY, extra={"a": [1, 2]}, n=3).items()))
+        self.assertEqual(parser.text, text)
+
+    def test_name_arrives_before_the_rest(self):
+        parser = IncrementalIdentityParser()
+        text = json.dumps(IDENTITY)
+        parser.feed(text[:text.index("persona_summary")])
+        self.assertEqual(parser.fields, {"name": "Ember"})
+        self.assertFalse(parser.done)
+
+    def test_wrong_field_types_abort(self):
+        for bad in ('{"name": ["Ember"]', '{"core_values": "flow"', '{"interests": {"a": 1}'):
+            with self.assertRaises(OffSchemaError, msg=bad):
+                IncrementalIdentityParser().feed(bad)
+
+    def test_too_many_core_values_abort_mid_list(self):
+        parser = IncrementalIdentityParser()
+        with self.assertRaises(OffSchemaError):
+            parser.feed('{"core_values": ["a", "b", "c", "d", "e", "f"')
+
+    def test_missing_object_and_runaway_generation_abort(self):
+        with self.assertRaises(OffSchemaError):
+            IncrementalIdentityParser(max_preamble_chars=10).feed("I'm sorry, but I can't help with that.")
+        with self.assertRaises(OffSchemaError):
+            IncrementalIdentityParser(max_object_chars=50).feed('{"persona_summary": "' + "la " * 100)
+
+    def test_trailing_commas_and_strings_with_braces(self):
+        parser = IncrementalIdentityParser()
+        parser.feed('{"name": "a } b", "interests": ["x", "y",],}')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.fields, {"name": "a } b", "interests": ["x", "y"]})
+
+    def test_braces_in_the_preamble_are_skipped(self):
+        for preamble in ("Filled into the {template} you gave:\n", "An empty {} and a {\"quote\"} first. "):
+            parser = IncrementalIdentityParser()
+            parser.feed(preamble + json.dumps(IDENTITY))
+            self.assertTrue(parser.done, preamble)
+            self.assertEqual(parser.fields, IDENTITY)
+
+
+class TestStreamingService(unittest.TestCase):
+
+    def test_stream_stops_at_the_end_of_the_object(self):
+        response = json.dumps(IDENTITY) + "\n\nI hope this identity serves you well. " * 20
+        llm = StreamingLLM(response)
+        fields = []
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=True,
+                                           on_partial_field=lambda k, v: fields.append(k))
+
+        result = service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(result.identity["name"], "Ember")
+        self.assertEqual(fields, list(IDENTITY))
+        self.assertEqual(llm.yielded, len(tokens(json.dumps(IDENTITY))))
+        self.assertTrue(llm.closed)
+
+    def test_placeholder_in_the_preamble_does_not_end_the_stream(self):
+        llm = StreamingLLM("Here it is, filled into the {template} you gave:\n" + json.dumps(IDENTITY))
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=True)
+
+        result = service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(result.identity["name"], "Ember")
+        self.assertNotIn(REPAIR_PROMPT, llm.prompts)
+
+    def test_off_schema_generation_is_aborted_and_repaired(self):
+        response = '{"name": "Ember", "core_values": "' + "everything " * 200 + '"}'
+        llm = StreamingLLM(response, repair_response=json.dumps(IDENTITY))
+        collector = InMemoryCollector()
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=True,
+                                           instrumentation=collector)
+
+        result = service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertLess(llm.yielded, 10)
+        self.assertTrue(llm.closed)
+        self.assertEqual(llm.prompts[-1], REPAIR_PROMPT)
+        self.assertEqual(collector.counter_value(STREAM_ABORTS_METRIC), 1)
+
+    def test_default_stream_prompt_falls_back_to_prompt(self):
+        class PlainLLM(LLMInterface):
+            def prompt(self, system_prompt, user_prompt):
+                return json.dumps(IDENTITY)
+
+        service = IdentityDiscoveryService(StaticSource(), InMemoryGraph(), PlainLLM(), stream=True)
+        self.assertEqual(service.awaken().status, AwakeningStatus.CREATED)
+
+
+class TestAsyncStreamingService(unittest.IsolatedAsyncioTestCase):
+
+    async def test_native_async_stream(self):
+        llm = AsyncStreamingLLM(json.dumps(IDENTITY) + " trailing chatter" * 50)
+        fields = []
+        service = AsyncIdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=True,
+                                                on_partial_field=lambda k, v: fields.append(k))
+
+        result = await service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertEqual(fields, list(IDENTITY))
+        self.assertEqual(llm.yielded, len(tokens(json.dumps(IDENTITY))))
+        self.assertTrue(llm.closed)
+
+    async def test_sync_stream_through_thread_pool_is_closed_on_abort(self):
+        llm = StreamingLLM('{"name": 42, ' + "x" * 400, repair_response=json.dumps(IDENTITY))
+        service = AsyncIdentityDiscoveryService(StaticSource(), InMemoryGraph(), llm, stream=True)
+
+        result = await service.awaken()
+
+        self.assertEqual(result.status, AwakeningStatus.CREATED)
+        self.assertLess(llm.yielded, 5)
+        self.assertTrue(llm.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from ember_protocol.core.async_service import AsyncIdentityDiscoveryService
+from ember_protocol.core.service import IDENTITY_META_PROMPT, IdentityDiscoveryService, InMemoryGraph
+from ember_protocol.core.synthesis import COMBINE_PROMPT, MAP_PROMPT, MapReduceSynthesizer
+from ember_protocol.interfaces import AsyncLLMInterface, LLMInterface
+
+from tests.fixtures import IDENTITY, StaticSource
+
+
+class ScriptedLLM(LLMInterface):
+    """Answers map/combine prompts with short notes and the meta-prompt with an identity."""
+
+    def __init__(self, note_size=10, delay=0.0):
+        self.note_size = note_size
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def prompt(self, system_prompt, user_prompt):
+        with self._lock:
+            self.calls.append((system_prompt, user_prompt))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if system_prompt in (MAP_PROMPT, COMBINE_PROMPT):
+                return ("n" * self.note_size)
+            return json.dumps(IDENTITY)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def prompts_of(self, system_prompt):
+        return [user for system, user in self.calls if system == system_prompt]
+
+
+class AsyncScriptedLLM(AsyncLLMInterface):
+    def __init__(self, note_size=10):
+        self.sync = ScriptedLLM(note_size)
+
+    async def prompt(self, system_prompt, user_prompt):
+        await asyncio.sleep(0)
+        return self.sync.prompt(system_prompt, user_prompt)
+
+
+class TestMapReduceSynthesizer(unittest.TestCase):
+
+    def test_small_source_is_a_single_direct_prompt(self):
+        llm = ScriptedLLM()
+        synthesizer = MapReduceSynthesizer(chunk_chars=100)
+
+        response = synthesizer.synthesize(llm, ["short genesis"], IDENTITY_META_PROMPT)
+
+        self.assertEqual(json.loads(response)["name"], "Ember")
+        self.assertEqual(llm.calls, [(IDENTITY_META_PROMPT, "short genesis")])
+
+    def test_empty_source_returns_none(self):
+        self.assertIsNone(MapReduceSynthesizer().synthesize(ScriptedLLM(), [], IDENTITY_META_PROMPT))
+
+    def test_large_source_maps_every_chunk_then_reduces_once(self):
+        llm = ScriptedLLM()
+        synthesizer = MapReduceSynthesizer(chunk_chars=1000)
+        chunks = [f"chunk-{i}" for i in range(5)]
+
+        synthesizer.synthesize(llm, chunks, IDENTITY_META_PROMPT)
+
+        self.assertEqual(sorted(llm.prompts_of(MAP_PROMPT)), chunks)
+        self.assertEqual(llm.prompts_of(COMBINE_PROMPT), [])
+        (reduce_input,) = llm.prompts_of(IDENTITY_META_PROMPT)
+        self.assertEqual(reduce_input.count("n" * 10), 5)
+
+    def test_notes_too_big_for_one_window_are_combined_hierarchically(self):
+        llm = ScriptedLLM(note_size=150)
+        synthesizer = MapReduceSynthesizer(chunk_chars=400)
+
+        synthesizer.synthesize(llm, (f"chunk-{i}" for i in range(20)), IDENTITY_META_PROMPT)
+
+        self.assertEqual(len(llm.prompts_of(MAP_PROMPT)), 20)
+        self.assertGreater(len(llm.prompts_of(COMBINE_PROMPT)), 0)
+        (reduce_input,) = llm.prompts_of(IDENTITY_META_PROMPT)
+        self.assertLessEqual(len(reduce_input), 400)
+        for group in llm.prompts_of(COMBINE_PROMPT):
+            self.assertLessEqual(len(group), 400)
+
+    def test_combining_stops_when_notes_cannot_shrink(self):
+        llm = ScriptedLLM(note_size=500)
+
+        with self.assertLogs("ember_protocol.core.synthesis", "WARNING"):
+            MapReduceSynthesizer(chunk_chars=400).synthesize(llm, ["a", "b", "c"], IDENTITY_META_PROMPT)
+
+        self.assertEqual(llm.prompts_of(COMBINE_PROMPT), [])
+        self.assertEqual(len(llm.prompts_of(IDENTITY_META_PROMPT)), 1)
+
+    def test_no_notes_skips_the_final_pass(self):
+        llm = ScriptedLLM(note_size=0)
+
+        response = MapReduceSynthesizer(chunk_chars=400).synthesize(llm, ["a", "b"], IDENTITY_META_PROMPT)
+
+        self.assertIsNone(response)
+        self.assertEqual(llm.prompts_of(IDENTITY_META_PROMPT), [])
+
+    def test_map_stage_runs_in_parallel_up_to_max_workers(self):
+        llm = ScriptedLLM(delay=0.05)
+        synthesizer = MapReduceSynthesizer(chunk_chars=1000, max_workers=4)
+
+        start = time.perf_counter()
+        synthesizer.synthesize(llm, [f"chunk-{i}" for i in range(8)], IDENTITY_META_PROMPT)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(llm.max_in_flight, 4)
+        self.assertLess(elapsed, 8 * 0.05)
+
+    def test_rejects_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            MapReduceSynthesizer(chunk_chars=0)
+        with self.assertRaises(ValueError):
+            MapReduceSynthesizer(max_workers=0)
+
+
+class TestServiceWithSynthesizer(unittest.TestCase):
+
+    def test_large_genesis_is_streamed_and_synthesized(self):
+        llm = ScriptedLLM()
+        service = IdentityDiscoveryService(
+            StaticSource("x" * 1000), InMemoryGraph(), llm,
+            synthesizer=MapReduceSynthesizer(chunk_chars=300)
+        )
+
+        identity = service.awaken_ai()
+
+        self.assertEqual(identity["name"], "Ember")
+        self.assertEqual(len(llm.prompts_of(MAP_PROMPT)), 4)
+        self.assertEqual(len(llm.prompts_of(IDENTITY_META_PROMPT)), 1)
+
+    def test_small_genesis_is_unchanged(self):
+        llm = ScriptedLLM()
+        service = IdentityDiscoveryService(
+            StaticSource("tiny"), InMemoryGraph(), llm, synthesizer=MapReduceSynthesizer(chunk_chars=300)
+        )
+
+        service.awaken_ai()
+
+        self.assertEqual(llm.calls, [(IDENTITY_META_PROMPT, "tiny")])
+
+    def test_empty_genesis_fails(self):
+        service = IdentityDiscoveryService(
+            StaticSource(""), InMemoryGraph(), ScriptedLLM(), synthesizer=MapReduceSynthesizer()
+        )
+        self.assertIsNone(service.awaken_ai())
+
+
+class TestAsyncServiceWithSynthesizer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_large_genesis_is_streamed_and_synthesized(self):
+        llm = AsyncScriptedLLM(note_size=150)
+        service = AsyncIdentityDiscoveryService(
+            StaticSource("x" * 3000), InMemoryGraph(), llm,
+            synthesizer=MapReduceSynthesizer(chunk_chars=400, max_workers=3)
+        )
+
+        identity = await service.awaken_ai()
+
+        self.assertEqual(identity["name"], "Ember")
+        self.assertEqual(len(llm.sync.prompts_of(MAP_PROMPT)), 8)
+        self.assertGreater(len(llm.sync.prompts_of(COMBINE_PROMPT)), 0)
+        self.assertEqual(len(llm.sync.prompts_of(IDENTITY_META_PROMPT)), 1)
+
+    async def test_combining_stops_when_notes_cannot_shrink(self):
+        llm = AsyncScriptedLLM(note_size=500)
+
+        async def chunks():
+            for chunk in ("a", "b", "c"):
+                yield chunk
+
+        await MapReduceSynthesizer(chunk_chars=400).synthesize_async(llm, chunks(), IDENTITY_META_PROMPT)
+
+        self.assertEqual(llm.sync.prompts_of(COMBINE_PROMPT), [])
+        self.assertEqual(len(llm.sync.prompts_of(IDENTITY_META_PROMPT)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ember_protocol.implementations import (
+    AnthropicInterface,
+    CircuitBreaker,
+    CircuitOpenError,
+    GeminiInterface,
+    HTTPStatusError,
+    OpenAIInterface,
+    PooledTransport,
+    RetryPolicy,
+)
+
+
+class StubServer:
+    """
+    A local HTTP/1.1 server that replays canned responses in order and records
+    every request, including the client port, to observe connection reuse.
+    Each canned response is (status, body, headers, delay); the last one is
+    repeated once the script runs out.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub.lock:
+                    stub.requests.append({
+                        "path": self.path,
+                        "headers": dict(self.headers),
+                        "json": json.loads(body) if body else None,
+                        "port": self.client_address[1],
+                    })
+                    status, payload, headers, delay = (
+                        stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                    )
+                if delay:
+                    time.sleep(delay)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def ok(payload, delay=0.0):
+    return 200, payload, None, delay
+
+
+def sse(*events):
+    body = "".join(f"data: {e if isinstance(e, str) else json.dumps(e)}\n\n" for e in events)
+    return 200, body.encode(), {"Content-Type": "text/event-stream"}, 0.0
+
+
+NO_SLEEP = dict(sleep=lambda seconds: None)
+
+
+class TransportTestCase(unittest.TestCase):
+
+    def stub(self, *responses):
+        server = StubServer(*responses)
+        self.addCleanup(server.close)
+        return server
+
+    def transport(self, server, **options):
+        transport = PooledTransport(server.url, breaker=options.pop("breaker", CircuitBreaker()),
+                                    **dict(NO_SLEEP, **options))
+        self.addCleanup(transport.close)
+        return transport
+
+
+class TestPooledTransport(TransportTestCase):
+
+    def test_connections_are_kept_alive_and_reused(self):
+        server = self.stub(ok({"ok": True}))
+        transport = self.transport(server)
+
+        for _ in range(5):
+            self.assertEqual(transport.post_json("/v1/x", {"q": 1}), {"ok": True})
+
+        self.assertEqual(transport.pool.connections_created, 1)
+        self.assertEqual(len({r["port"] for r in server.requests}), 1)
+        self.assertEqual(server.requests[0]["json"], {"q": 1})
+
+    def test_retries_429_and_5xx_with_backoff(self):
+        server = self.stub((429, {"error": "slow down"}, {"Retry-After": "2"}, 0),
+                           (503, {"error": "unavailable"}, None, 0),
+                           ok({"ok": True}))
+        delays = []
+        transport = self.transport(server, sleep=delays.append,
+                                   retry=RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=10))
+
+        self.assertEqual(transport.post_json("/", {}), {"ok": True})
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(delays[0], 2.0)  # Retry-After wins over the smaller jittered backoff.
+        self.assertLessEqual(delays[1], 1.0)
+
+    def test_gives_up_after_max_attempts(self):
+        server = self.stub((500, {"error": "boom"}, None, 0))
+        transport = self.transport(server, retry=RetryPolicy(max_attempts=3))
+
+        with self.assertRaises(HTTPStatusError) as caught:
+            transport.post_json("/", {})
+        self.assertEqual(caught.exception.status, 500)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        server = self.stub((400, {"error": "bad request"}, None, 0))
+        transport = self.transport(server)
+
+        with self.assertRaises(HTTPStatusError):
+            transport.post_json("/", {})
+        self.assertEqual(len(server.requests), 1)
+
+    def test_circuit_opens_and_fails_fast(self):
+        server = self.stub((500, {"error": "down"}, None, 0))
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        transport = self.transport(server, breaker=breaker, retry=RetryPolicy(max_attempts=5))
+
+        with self.assertRaises(CircuitOpenError):
+            transport.post_json("/", {})
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            transport.post_json("/", {})
+        self.assertEqual(len(server.requests), 2)
+
+        # After the reset timeout a trial request goes through and closes the circuit.
+        server.responses = [ok({"ok": True})]
+        now[0] = 31.0
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(transport.post_json("/", {}), {"ok": True})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_a_single_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 6.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_hedged_request_returns_the_faster_answer(self):
+        server = self.stub(ok({"which": "slow"}, delay=1.0), ok({"which": "fast"}))
+        transport = self.transport(server, hedge_after=0.05)
+
+        start = time.perf_counter()
+        self.assertEqual(transport.post_json("/", {}), {"which": "fast"})
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertEqual(transport.hedges, 1)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_fast_requests_are_not_hedged(self):
+        server = self.stub(ok({"ok": True}))
+        transport = self.transport(server, hedge_after=1.0)
+
+        transport.post_json("/", {})
+        self.assertEqual(transport.hedges, 0)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_stream_events(self):
+        server = self.stub(sse({"n": 1}, {"n": 2}, "[DONE]"))
+        transport = self.transport(server)
+
+        self.assertEqual(list(transport.stream_events("/", {})), ['{"n": 1}', '{"n": 2}', "[DONE]"])
+        # Fully read streams return their connection to the pool.
+        self.assertEqual(len(transport.pool), 1)
+
+
+class TestProviderInterfaces(TransportTestCase):
+
+    def test_openai(self):
+        server = self.stub(ok({"choices": [{"message": {"role": "assistant", "content": "{\"name\": \"A\"}"}}]}))
+        llm = OpenAIInterface("sk-test", model="gpt-test", base_url=server.url, **NO_SLEEP)
+        self.addCleanup(llm.close)
+
+        self.assertEqual(llm.prompt("system", "genesis"), '{"name": "A"}')
+        request = server.requests[0]
+        self.assertEqual(request["path"], "/v1/chat/completions")
+        self.assertEqual(request["headers"]["Authorization"], "Bearer sk-test")
+        self.assertEqual(request["json"]["messages"], [{"role": "system", "content": "system"},
+                                                       {"role": "user", "content": "genesis"}])
+        self.assertEqual(llm.model_id, "openai:gpt-test")
+
+    def test_openai_stream(self):
+        server = self.stub(sse({"choices": [{"delta": {"content": "{\"na"}}]},
+                               {"choices": [{"delta": {"content": "me\": 1}"}}]},
+                               {"choices": [{"delta": {}}]},
+                               "[DONE]"))
+        llm = OpenAIInterface("sk-test", base_url=server.url, **NO_SLEEP)
+        self.addCleanup(llm.close)
+
+        self.assertEqual(list(llm.stream_prompt("s", "u")), ['{"na', 'me": 1}'])
+        self.assertTrue(server.requests[0]["json"]["stream"])
+
+    def test_anthropic(self):
+        server = self.stub(ok({"content": [{"type": "text", "text": "hello "}, {"type": "text", "text": "there"}]}))
+        llm = AnthropicInterface("key", model="claude-test", base_url=server.url, **NO_SLEEP)
+        self.addCleanup(llm.close)
+
+        self.assertEqual(llm.prompt("system", "genesis"), "hello there")
+        request = server.requests[0]
+        self.assertEqual(request["path"], "/v1/messages")
+        self.assertEqual(request["headers"]["x-api-key"], "key")
+        self.assertEqual(request["json"]["system"], "system")
+
+    def test_anthropic_stream(self):
+        server = self.stub(sse({"type": "message_start"},
+                               {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "hi"}},
+                               {"type": "message_stop"}))
+        llm = AnthropicInterface("key", base_url=server.url, **NO_SLEEP)
+        self.addCleanup(llm.close)
+
+        self.assertEqual(list(llm.stream_prompt("s", "u")), ["hi"])
+
+    def test_gemini(self):
+        server = self.stub(ok({"candidates": [{"content": {"parts": [{"text": "gem"}]}}]}))
+        llm = GeminiInterface("g-key", model="gemini-test", base_url=server.url, **NO_SLEEP)
+        self.addCleanup(llm.close)
+
+        self.assertEqual(llm.prompt("system", "genesis"), "gem")
+        request = server.requests[0]
+        self.assertEqual(request["path"], "/v1beta/models/gemini-test:generateContent")
+        self.assertEqual(request["headers"]["x-goog-api-key"], "g-key")
+        self.assertEqual(request["json"]["systemInstruction"], {"parts": [{"text": "system"}]})
+
+    def test_providers_share_a_circuit_breaker(self):
+        first = OpenAIInterface("a", base_url="http://127.0.0.1:9")
+        second = OpenAIInterface("b", base_url="http://127.0.0.1:9")
+        self.assertIs(first.transport.breaker, second.transport.breaker)
+        self.assertIsNot(first.transport.breaker, GeminiInterface("c", base_url="http://127.0.0.1:9").transport.breaker)
+
+
+if __name__ == '__main__':
+    unittest.main()
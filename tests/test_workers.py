@@ -0,0 +1,232 @@
+import functools
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+from ember_protocol.core.jobs import JobState, SQLiteJobQueue
+from ember_protocol.core.results import AwakeningResult, AwakeningStatus
+from ember_protocol.core.workers import AwakeningJobHandler, AwakeningWorkerPool, run_job
+from ember_protocol.implementations import SQLiteGraph
+from ember_protocol.interfaces import LLMInterface
+
+from tests.fixtures import FakeClock, IDENTITY
+
+fork_only = unittest.skipUnless(sys.platform.startswith("linux"), "needs the fork start method")
+
+
+class StaticLLM(LLMInterface):
+    def prompt(self, system_prompt, user_prompt):
+        return json.dumps(IDENTITY)
+
+
+def _setup_handler(graph_path):
+    return AwakeningJobHandler(StaticLLM(), SQLiteGraph(graph_path))
+
+
+def _setup_and_report(graph_path, ready_path):
+    handler = _setup_handler(graph_path)
+    open(ready_path, "w").close()
+    return handler
+
+
+def _failing_setup():
+    raise ConnectionError("LLM endpoint unreachable")
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def _crash_once(marker_dir, job):
+    # The first attempt at each job kills its worker process outright.
+    marker = os.path.join(marker_dir, str(job.id))
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return AwakeningResult(AwakeningStatus.CREATED, dict(IDENTITY), job.agent_id)
+
+
+def _setup_crashing_handler(marker_dir):
+    return functools.partial(_crash_once, marker_dir)
+
+
+class TestSQLiteJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.clock = FakeClock()
+        self.queue = SQLiteJobQueue(os.path.join(self.dir, "jobs.db"), max_attempts=2, lease_ttl=30,
+                                    retry_delay=10, clock=self.clock)
+        self.addCleanup(self.queue.close)
+
+    def test_jobs_are_claimed_in_order_and_completed(self):
+        first, second = self.queue.enqueue_many([("a", {"genesis_path": "a.txt"}), ("b", None)])
+        job = self.queue.claim("w1")
+        self.assertEqual((job.id, job.agent_id, job.payload, job.attempts), (first, "a", {"genesis_path": "a.txt"}, 1))
+        self.assertEqual(self.queue.claim("w2").id, second)
+        self.assertIsNone(self.queue.claim("w3"))
+        self.assertTrue(self.queue.complete(job, {"status": "created"}))
+        self.assertEqual(self.queue.result(first), {"status": "created"})
+        self.assertEqual(self.queue.counts()[JobState.DONE], 1)
+        self.assertEqual(self.queue.pending(), 1)
+
+    def test_queued_jobs_survive_reopening(self):
+        job_id = self.queue.enqueue("a")
+        self.queue.close()
+        self.queue = SQLiteJobQueue(self.queue.path, clock=self.clock)
+        self.assertEqual(self.queue.claim("w").id, job_id)
+
+    def test_expired_lease_is_reclaimed_and_the_old_owner_cannot_finish(self):
+        self.queue.enqueue("a")
+        lost = self.queue.claim("crashed")
+        self.clock.now += 31
+        job = self.queue.claim("w2")
+        self.assertEqual((job.id, job.attempts), (lost.id, 2))
+        self.assertFalse(self.queue.complete(lost))
+        self.assertFalse(self.queue.renew(lost))
+        self.assertTrue(self.queue.renew(job))
+
+    def test_lease_expiring_on_the_last_attempt_dead_letters(self):
+        job_id = self.queue.enqueue("poison")
+        self.queue.claim("w1")
+        self.clock.now += 31
+        self.queue.claim("w2")
+        self.clock.now += 31
+        self.assertIsNone(self.queue.claim("w3"))
+        self.assertEqual(self.queue.state(job_id), JobState.DEAD)
+
+    def test_retries_back_off_then_dead_letter(self):
+        job_id = self.queue.enqueue("a")
+        self.assertEqual(self.queue.fail(self.queue.claim("w"), "parse_failed"), JobState.QUEUED)
+        self.assertIsNone(self.queue.claim("w"))
+        self.clock.now += 10
+        self.assertEqual(self.queue.fail(self.queue.claim("w"), "parse_failed again"), JobState.DEAD)
+        [dead] = self.queue.dead_letters()
+        self.assertEqual((dead.id, dead.attempts, dead.last_error), (job_id, 2, "parse_failed again"))
+        self.assertTrue(self.queue.requeue(job_id))
+        self.assertEqual(self.queue.claim("w").attempts, 1)
+
+    def test_permanent_failure_is_dead_lettered_at_once(self):
+        job_id = self.queue.enqueue("a")
+        self.assertEqual(self.queue.fail(self.queue.claim("w"), "empty_genesis", retry=False), JobState.DEAD)
+        self.assertFalse(self.queue.requeue(self.queue.enqueue("b")))
+        self.assertEqual(self.queue.state(job_id), JobState.DEAD)
+
+    def test_run_job_maps_outcomes(self):
+        outcomes = {
+            "ok": AwakeningResult(AwakeningStatus.CREATED),
+            "parse": AwakeningResult(AwakeningStatus.PARSE_FAILED, error="no JSON"),
+            "empty": AwakeningResult(AwakeningStatus.EMPTY_GENESIS),
+        }
+
+        def handler(job):
+            if job.agent_id == "raises":
+                raise ConnectionError("graph unreachable")
+            return outcomes[job.agent_id]
+
+        ids = dict(zip(["ok", "parse", "empty", "raises"],
+                       self.queue.enqueue_many([(a, None) for a in ["ok", "parse", "empty", "raises"]])))
+        for _ in ids:
+            run_job(self.queue, handler, self.queue.claim("w"))
+        self.assertEqual(self.queue.state(ids["ok"]), JobState.DONE)
+        self.assertEqual(self.queue.state(ids["parse"]), JobState.QUEUED)
+        self.assertEqual(self.queue.state(ids["empty"]), JobState.DEAD)
+        self.assertEqual(self.queue.state(ids["raises"]), JobState.QUEUED)
+
+    def test_job_without_a_genesis_path_is_dead_lettered_at_once(self):
+        handler = AwakeningJobHandler(StaticLLM(), SQLiteGraph(":memory:"))
+        self.addCleanup(handler.graph.close)
+        ids = self.queue.enqueue_many([("no-payload", None), ("no-path", {"encoding": "utf-8"})])
+        for _ in ids:
+            run_job(self.queue, handler, self.queue.claim("w"))
+        self.assertEqual([self.queue.state(i) for i in ids], [JobState.DEAD, JobState.DEAD])
+        self.assertTrue(all("InvalidJobError" in dead.last_error for dead in self.queue.dead_letters()))
+
+
+@fork_only
+class TestAwakeningWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.genesis = os.path.join(self.dir, "genesis.txt")
+        with open(self.genesis, "w", encoding="utf-8") as f:
+            f.write("A genesis worth queueing.")
+
+    def test_pool_awakens_every_queued_agent_and_drains(self):
+        queue = SQLiteJobQueue(os.path.join(self.dir, "jobs.db"))
+        self.addCleanup(queue.close)
+        graph_path = os.path.join(self.dir, "graph.db")
+        ids = queue.enqueue_many([(f"agent-{i}", {"genesis_path": self.genesis}) for i in range(8)])
+        pool = AwakeningWorkerPool(queue, functools.partial(_setup_handler, graph_path), processes=2, threads=2,
+                                   poll_interval=0.05, mp_context=multiprocessing.get_context("fork"))
+        pool.start()
+        self.assertTrue(pool.drain(timeout=30))
+        self.assertEqual(pool.alive, 0)
+        self.assertEqual([queue.state(i) for i in ids], [JobState.DONE] * 8)
+        graph = SQLiteGraph(graph_path)
+        self.addCleanup(graph.close)
+        self.assertEqual(graph.load_identity("agent-7")["name"], "Ember")
+
+    def test_crashed_worker_is_replaced_and_its_job_retried(self):
+        queue = SQLiteJobQueue(os.path.join(self.dir, "jobs.db"), lease_ttl=0.5)
+        self.addCleanup(queue.close)
+        job_id = queue.enqueue("agent")
+        pool = AwakeningWorkerPool(queue, functools.partial(_setup_crashing_handler, self.dir), processes=1,
+                                   poll_interval=0.05, mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            self.assertTrue(pool.drain(timeout=30))
+        self.assertEqual(queue.state(job_id), JobState.DONE)
+        self.assertEqual(queue.result(job_id)["status"], "created")
+
+    def test_worker_that_exits_cleanly_is_not_replaced(self):
+        queue = SQLiteJobQueue(os.path.join(self.dir, "jobs.db"))
+        self.addCleanup(queue.close)
+        ready = os.path.join(self.dir, "ready")
+        setup = functools.partial(_setup_and_report, os.path.join(self.dir, "graph.db"), ready)
+        pool = AwakeningWorkerPool(queue, setup, processes=1, poll_interval=0.05,
+                                   mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            wait_until(lambda: os.path.exists(ready))
+            worker = pool._slots[0].process
+            os.kill(worker.pid, signal.SIGTERM)
+            worker.join(10)
+            pool.poll()
+            self.assertEqual(worker.exitcode, 0)
+            self.assertIs(pool._slots[0].process, worker)
+            self.assertEqual(pool.alive, 0)
+
+    def test_worker_whose_setup_keeps_failing_is_restarted_with_backoff(self):
+        queue = SQLiteJobQueue(os.path.join(self.dir, "jobs.db"))
+        self.addCleanup(queue.close)
+        pool = AwakeningWorkerPool(queue, _failing_setup, processes=1, restart_delay=60,
+                                   mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            slot = pool._slots[0]
+            first = slot.process
+            first.join(10)
+            pool.poll()
+            # The first crash is replaced at once...
+            self.assertIsNot(slot.process, first)
+            second = slot.process
+            second.join(10)
+            pool.poll()
+            # ...but the next one waits out the restart delay.
+            self.assertIs(slot.process, second)
+            self.assertNotEqual(second.exitcode, 0)
+            self.assertGreater(slot.restart_at - time.monotonic(), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()